@@ -6,12 +6,11 @@ directive (prose only), schema advice (advisory — never renames), and clamps a
 thinking budget.
 """
 
-import copy
-
 from cutok.core.ledger import Ledger
+from cutok.core.payload import PayloadWriter
 from cutok.core.providers import resolve
 from cutok.core.types import Change, OptimizationResult, OptimizerConfig, Provider
-from cutok.normalize.textclean import split_fences
+from cutok.normalize.document import document
 
 _BREVITY = "\n\nBe concise. No preamble, no recap."
 
@@ -20,14 +19,22 @@ def apply_response_budget(
     payload: dict, config: OptimizerConfig, ledger: Ledger
 ) -> tuple[dict, OptimizationResult]:
     """Apply output-side budget controls to ``payload``; record advisory changes only."""
-    payload = copy.deepcopy(payload)
+    writer = PayloadWriter(payload)
+    result = run_budget_stage(writer, config, ledger)
+    return writer.payload, result
+
+
+def run_budget_stage(
+    writer: PayloadWriter, config: OptimizerConfig, ledger: Ledger
+) -> OptimizationResult:
+    """``apply_response_budget`` against a shared writer (the pipeline's copy-on-write payload)."""
     changes: list[Change] = []
 
-    _inject_max_output(payload, config, changes)
+    _inject_max_output(writer, config, changes)
     if config.inject_brevity:
-        _inject_brevity(payload, changes)
-    _schema_advice(payload, changes)
-    _clamp_thinking(payload, config, changes)
+        _inject_brevity(writer, changes)
+    _schema_advice(writer.payload, changes)
+    _clamp_thinking(writer, config, changes)
 
     result = OptimizationResult(
         feature="response_budget",
@@ -36,10 +43,13 @@ def apply_response_budget(
         changes=changes,
     )
     ledger.record(result)
-    return payload, result
+    return result
 
 
-def _inject_max_output(payload: dict, config: OptimizerConfig, changes: list[Change]) -> None:
+def _inject_max_output(
+    writer: PayloadWriter, config: OptimizerConfig, changes: list[Change]
+) -> None:
+    payload = writer.payload
     if config.max_output_tokens is None:
         return
     # Only act on the OpenAI/Anthropic message shape; other schemas (e.g. Gemini's `contents` +
@@ -51,7 +61,7 @@ def _inject_max_output(payload: dict, config: OptimizerConfig, changes: list[Cha
     field = resolve(config.model).max_output_field
     if field in payload:
         return
-    payload[field] = config.max_output_tokens
+    writer.own()[field] = config.max_output_tokens
     changes.append(
         Change(
             kind="max_output_tokens",
@@ -61,27 +71,37 @@ def _inject_max_output(payload: dict, config: OptimizerConfig, changes: list[Cha
     )
 
 
-def _inject_brevity(payload: dict, changes: list[Change]) -> None:
-    messages = payload.get("messages")
+def _inject_brevity(writer: PayloadWriter, changes: list[Change]) -> None:
+    messages = writer.payload.get("messages")
     if not isinstance(messages, list):
         return
-    msg = next((m for m in reversed(messages) if isinstance(m, dict) and m.get("role") == "user"), None)
-    if msg is None:
+    mi = next(
+        (
+            i
+            for i in range(len(messages) - 1, -1, -1)
+            if isinstance(messages[i], dict) and messages[i].get("role") == "user"
+        ),
+        None,
+    )
+    if mi is None:
         return
-    content = msg.get("content")
+    content = messages[mi].get("content")
 
     if isinstance(content, str):
         if _BREVITY.strip() in content or _is_mostly_code(content):
             return
-        msg["content"] = content + _BREVITY
+        writer.own("messages", mi)["content"] = content + _BREVITY
     elif isinstance(content, list):
-        text_blocks = [b for b in content if isinstance(b, dict) and b.get("type") == "text"]
+        text_blocks = [
+            (j, b) for j, b in enumerate(content) if isinstance(b, dict) and b.get("type") == "text"
+        ]
         if not text_blocks:
             return
-        joined = "\n".join(b.get("text", "") for b in text_blocks)
+        joined = "\n".join(b.get("text", "") for _, b in text_blocks)
         if _BREVITY.strip() in joined or _is_mostly_code(joined):
             return
-        text_blocks[-1]["text"] = text_blocks[-1].get("text", "") + _BREVITY
+        last, block = text_blocks[-1]
+        writer.own("messages", mi, "content", last)["text"] = block.get("text", "") + _BREVITY
     else:
         return
 
@@ -91,9 +111,7 @@ def _inject_brevity(payload: dict, changes: list[Change]) -> None:
 
 
 def _is_mostly_code(text: str) -> bool:
-    parts = split_fences(text)
-    code_len = sum(len(seg) for is_code, seg in parts if is_code)
-    return code_len > 0.5 * max(1, len(text))
+    return document(text).code_chars > 0.5 * max(1, len(text))
 
 
 def _schema_advice(payload: dict, changes: list[Change]) -> None:
@@ -125,17 +143,17 @@ def _collect_long_property_names(node, out: set[str]) -> None:
             _collect_long_property_names(item, out)
 
 
-def _clamp_thinking(payload: dict, config: OptimizerConfig, changes: list[Change]) -> None:
+def _clamp_thinking(writer: PayloadWriter, config: OptimizerConfig, changes: list[Change]) -> None:
     # Cap is off by default; a caller may set `config.max_thinking_tokens` to enable it.
     cap = getattr(config, "max_thinking_tokens", None)
     if cap is None or config.provider is not Provider.ANTHROPIC:
         return
-    thinking = payload.get("thinking")
+    thinking = writer.payload.get("thinking")
     if not isinstance(thinking, dict):
         return
     budget = thinking.get("budget_tokens")
     if isinstance(budget, int) and budget > cap:
-        thinking["budget_tokens"] = cap
+        writer.own("thinking")["budget_tokens"] = cap
         changes.append(
             Change(
                 kind="clamp_thinking",
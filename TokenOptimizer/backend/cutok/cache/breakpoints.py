@@ -0,0 +1,145 @@
+"""Choose where explicit prefix-cache breakpoints go.
+
+A breakpoint after block *k* lets a later request that repeats blocks ``0..k`` read that prefix
+from cache. The planner sees the conversation as blocks with running token totals ``T`` and a
+survival estimate ``p`` — the chance the prefix through a block is resent unchanged next time,
+non-increasing along the conversation. For breakpoints ``s1 < … < sm`` the next request reads
+the longest surviving one, so the expected cached tokens are
+
+    sum(T[s_i] * (p[s_i] - p[s_(i+1)])),  with p[s_(m+1)] = 0.
+
+``plan_breakpoints`` maximizes that over at most ``max_breakpoints`` blocks whose prefix reaches
+``min_prefix_tokens``, keeping any breakpoints the caller already has. It is a dynamic program
+over (breakpoints left, next breakpoint); for each block the best next breakpoint is a maximum
+of lines ``g - p * T`` at ``x = T``, answered from a convex hull, so a plan costs
+O(max_breakpoints * blocks). Only the ``CachePolicy`` is provider-specific. Turning the plan into
+markers belongs to the schema (``cache_optimizer`` for Anthropic's ``cache_control``).
+"""
+
+from collections import deque
+from collections.abc import Sequence
+
+from cutok.core.providers.base import CachePolicy
+
+_NONE = float("-inf")
+
+
+def expected_cached_tokens(
+    totals: Sequence[int], survival: Sequence[float], breakpoints: Sequence[int]
+) -> float:
+    """The planner's objective for ``breakpoints`` (block indices, any order)."""
+    value = 0.0
+    chosen = sorted(breakpoints)
+    for i, s in enumerate(chosen):
+        after = survival[chosen[i + 1]] if i + 1 < len(chosen) else 0.0
+        value += totals[s] * (survival[s] - after)
+    return value
+
+
+def plan_breakpoints(
+    totals: Sequence[int],
+    survival: Sequence[float],
+    policy: CachePolicy,
+    *,
+    fixed: Sequence[int] = (),
+    reserved: int = 0,
+) -> list[int]:
+    """Block indices to mark, ascending: ``fixed`` plus the best additions.
+
+    ``totals[k]`` is the token count of blocks ``0..k``; ``survival[k]`` is clamped to be
+    non-increasing. ``fixed`` breakpoints are already marked and always kept; ``reserved`` are
+    used elsewhere (e.g. on tools) and only count against ``policy.max_breakpoints``.
+    """
+    fixed_set = set(fixed)
+    budget = policy.max_breakpoints - reserved
+    if budget <= len(fixed_set) or not totals:
+        return sorted(fixed_set)
+    p: list[float] = []
+    for k, value in enumerate(survival):
+        p.append(min(value, p[k - 1]) if k else value)
+    # A block that survives exactly as long as the next one, or that adds no tokens to a prefix
+    # surviving longer, is matched by its neighbour. Leaving those out makes every addition a
+    # strict gain, so no breakpoint is spent for nothing and re-planning a marked payload keeps it.
+    n = len(totals)
+    cand = [
+        k
+        for k in range(n)
+        if k in fixed_set
+        or (
+            totals[k] >= policy.min_prefix_tokens
+            and p[k] > 0
+            and not (k + 1 < n and p[k + 1] == p[k])
+            and not (k and totals[k - 1] == totals[k] and p[k - 1] > p[k])
+        )
+    ]
+    m = len(cand)
+    t = [float(totals[k]) for k in cand]
+    s = [p[k] for k in cand]
+    is_fixed = [k in fixed_set for k in cand]
+
+    # best[j][i]: the value of a plan whose first breakpoint is cand[i], with at most j
+    # breakpoints from there on and every fixed one after it; nxt[j][i] is its second one.
+    best = [[_NONE] * m]
+    nxt: list[list[int | None]] = [[None] * m]
+    for _ in range(budget):
+        prev = best[-1]
+        row = [_NONE] * m
+        links: list[int | None] = [None] * m
+        hull: deque[int] = deque()  # candidate indices l, slopes -s[l] decreasing front to back
+        may_end = True  # no fixed breakpoint to the right yet
+        for i in range(m - 1, -1, -1):
+            if i + 1 < m:
+                l = i + 1
+                if is_fixed[l]:
+                    hull.clear()  # a plan starting left of a fixed breakpoint must reach it
+                    may_end = False
+                if prev[l] > _NONE:
+                    _push(hull, l, s, prev)
+            while len(hull) >= 2 and _at(hull[0], t[i], s, prev) <= _at(hull[1], t[i], s, prev):
+                hull.popleft()
+            gain, link = (0.0, None) if may_end else (_NONE, None)
+            if hull and _at(hull[0], t[i], s, prev) > gain:
+                gain, link = _at(hull[0], t[i], s, prev), hull[0]
+            if gain > _NONE:
+                row[i], links[i] = t[i] * s[i] + gain, link
+        best.append(row)
+        nxt.append(links)
+
+    top, links = best[budget], nxt[budget]
+    start, value = None, 0.0 if not fixed_set else _NONE
+    for i in range(m):
+        if top[i] > value:
+            start, value = i, top[i]
+        if is_fixed[i]:
+            break  # the first breakpoint can't come after a fixed one
+    plan: list[int] = []
+    j = budget
+    while start is not None:
+        plan.append(cand[start])
+        start, j = nxt[j][start], j - 1
+    return plan
+
+
+def _at(line: int, x: float, slopes: list[float], intercepts: list[float]) -> float:
+    return intercepts[line] - slopes[line] * x
+
+
+def _push(hull: deque[int], line: int, slopes: list[float], intercepts: list[float]) -> None:
+    """Add a line with the smallest slope so far (``-slopes[line]``) to the back of the hull."""
+    a_new, b_new = -slopes[line], intercepts[line]
+    while hull:
+        a2, b2 = -slopes[hull[-1]], intercepts[hull[-1]]
+        if a2 == a_new:
+            if b2 >= b_new:
+                return
+            hull.pop()
+            continue
+        if len(hull) < 2:
+            break
+        a1, b1 = -slopes[hull[-2]], intercepts[hull[-2]]
+        # The back line wins only between its crossings with its neighbours; drop it if empty.
+        if (b2 - b1) * (a2 - a_new) <= (b_new - b2) * (a1 - a2):
+            hull.pop()
+        else:
+            break
+    hull.append(line)
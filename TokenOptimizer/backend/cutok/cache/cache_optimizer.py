@@ -1,46 +1,50 @@
 """Rewrite a messages payload for maximum prefix-cache hits.
 
 Nothing is removed, so ``tokens_after == tokens_before``; cache savings are ESTIMATED
-(0.9 x the tokens placed under ``cache_control``) and reported in a Change description, since
-the real saving is realized only at request time by the provider. The pass is idempotent:
-running it twice changes nothing.
+(the provider's cache discount x the prefix placed under ``cache_control``) and reported in a
+Change description, since the real saving is realized only at request time by the provider.
+Where markers go is decided by ``breakpoints.plan_breakpoints`` from the provider's
+``CachePolicy``. The pass is idempotent: running it twice changes nothing. Writes go through a
+``PayloadWriter``, so only the containers on the rewritten paths are copied and the caller's
+payload is never mutated.
 """
 
-import copy
-import re
-
+from cutok.cache.breakpoints import plan_breakpoints
+from cutok.cache.prefix_stability import canonicalize_prefix, is_volatile
 from cutok.core.ledger import Ledger
-from cutok.core.tokens import count_tokens
+from cutok.core.payload import PayloadWriter
+from cutok.core.prefix_chain import prefix_chain
+from cutok.core.providers import adapter_by_name
 from cutok.core.types import Change, OptimizationResult, OptimizerConfig, Provider
 
-_STABLE_CACHE_MIN_TOKENS = 1024
-_DOC_CACHE_MIN_TOKENS = 2000
-_MAX_CACHE_CONTROL_BLOCKS = 4
-_CACHE_DISCOUNT = 0.9
-
-_VOLATILE_PATTERNS = [
-    re.compile(r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}"),  # ISO timestamp
-    re.compile(r"\b\d{1,2}:\d{2}(:\d{2})?\b"),  # clock time
-    re.compile(r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}"),
-    re.compile(r"today is\b", re.IGNORECASE),
-]
+# The breakpoint planner's survival estimate: the chance each message of history is resent
+# unchanged.
+_TURN_SURVIVAL = 0.98
 
 
 def optimize_for_cache(
     payload: dict, config: OptimizerConfig, ledger: Ledger
 ) -> tuple[dict, OptimizationResult]:
-    """Reorder for prefix stability and inject cache_control markers where thresholds are met."""
-    payload = copy.deepcopy(payload)
-    changes: list[Change] = []
+    """Reorder for prefix stability and inject cache_control markers where they pay off most."""
+    writer = PayloadWriter(payload)
+    result = run_cache_stage(writer, config, ledger)
+    return writer.payload, result
+
+
+def run_cache_stage(
+    writer: PayloadWriter, config: OptimizerConfig, ledger: Ledger
+) -> OptimizationResult:
+    """``optimize_for_cache`` against a shared writer (the pipeline's copy-on-write payload)."""
+    # Canonicalizations for cache breakers the proxy has seen in this session (autofix).
+    changes = canonicalize_prefix(writer, config.prefix_fixes) if config.prefix_fixes else []
     model = config.model
 
     if config.provider is Provider.ANTHROPIC:
-        _optimize_anthropic_system(payload, model, changes)
-        _optimize_anthropic_document(payload, model, changes)
+        _optimize_anthropic(writer, model, changes)
     else:
-        _optimize_openai_system(payload, changes)
+        _optimize_openai_system(writer, changes)
 
-    tokens = _payload_token_estimate(payload, model)
+    tokens = _payload_token_estimate(writer.payload, model)
     result = OptimizationResult(
         feature="cache_optimization",
         tokens_before=tokens,
@@ -48,16 +52,12 @@ def optimize_for_cache(
         changes=changes,
     )
     ledger.record(result)
-    return payload, result
-
-
-def _is_volatile(line: str) -> bool:
-    return any(p.search(line) for p in _VOLATILE_PATTERNS)
+    return result
 
 
 def _partition(lines: list[str]) -> tuple[list[str], list[str]]:
-    stable = [ln for ln in lines if not _is_volatile(ln)]
-    volatile = [ln for ln in lines if _is_volatile(ln)]
+    stable = [ln for ln in lines if not is_volatile(ln)]
+    volatile = [ln for ln in lines if is_volatile(ln)]
     return stable, volatile
 
 
@@ -75,102 +75,122 @@ def _system_lines_and_cc(system) -> tuple[list[str], bool]:
     return [], False
 
 
-def _optimize_anthropic_system(payload: dict, model: str, changes: list[Change]) -> None:
+def _optimize_anthropic(writer: PayloadWriter, model: str, changes: list[Change]) -> None:
+    """Hoist volatile system lines, then place ``cache_control`` where the planner says.
+
+    The cacheable prefix is the system prompt's stable part followed by every message block; the
+    hoisted volatile suffix ends it. Blocks already marked keep their marker.
+    """
+    payload = writer.payload
+    policy = adapter_by_name("anthropic").cache_policy(model)
     system = payload.get("system")
-    if system is None:
-        return
-    lines, already_cc = _system_lines_and_cc(system)
-    stable, volatile = _partition(lines)
+    slots: list[tuple] = []  # (path, text, message index or -1 for the system prompt, marked)
+    stable_text, volatile_text, system_cc = "", "", False
+    if system is not None:
+        lines, system_cc = _system_lines_and_cc(system)
+        stable, volatile = _partition(lines)
+        if volatile and (stable + volatile) != lines:
+            changes.append(
+                Change(
+                    kind="hoist_volatile",
+                    description=f"moved {len(volatile)} volatile line(s) out of the cacheable "
+                    "prefix",
+                    tokens_saved=0,
+                )
+            )
+        stable_text, volatile_text = "\n".join(stable), "\n".join(volatile)
+        slots.append((("system",), stable_text, -1, system_cc))
 
-    if volatile and (stable + volatile) != lines:
+    messages = payload.get("messages")
+    turns = len(messages) if isinstance(messages, list) else 0
+    if turns and not volatile_text:
+        for mi, msg in enumerate(messages):
+            content = msg.get("content") if isinstance(msg, dict) else None
+            if isinstance(content, str):
+                slots.append((("messages", mi), content, mi, False))
+            elif isinstance(content, list):
+                for bi, block in enumerate(content):
+                    if isinstance(block, dict):
+                        text = block.get("text")
+                        path = ("messages", mi, "content", bi)
+                        marked = bool(block.get("cache_control"))
+                        slots.append((path, text if isinstance(text, str) else "", mi, marked))
+
+    plan: list[int] = []
+    totals: list[int] = []
+    if slots:
+        # The history is resent every turn: its running totals come from the chain.
+        totals = prefix_chain.totals([slot[1] for slot in slots], model)
+        survival = [_survival(slot[2], turns) for slot in slots]
+        if turns == 1 and slots[-1][2] == 0:
+            # A one-message request may be a one-off: its question isn't expected back, only
+            # what comes before it.
+            survival[-1] = 0.0
+        fixed = [k for k, slot in enumerate(slots) if slot[3]]
+        reserved = _count_cache_control(payload) - len(fixed)
+        plan = plan_breakpoints(totals, survival, policy, fixed=fixed, reserved=reserved)
+
+    marked_system = system_cc
+    for k in plan:
+        path, text, mi, marked = slots[k]
+        if marked:
+            continue
+        if mi < 0:
+            marked_system, kind, what = True, "cache_control_system", "system prefix"
+        else:
+            if len(path) == 2:
+                writer.own("messages", mi)["content"] = [{"type": "text", "text": text}]
+                path = (*path, "content", 0)
+            writer.own(*path)["cache_control"] = {"type": "ephemeral"}
+            if k == len(slots) - 1:
+                kind, what = "cache_control_rolling", "conversation prefix"
+            elif mi == turns - 1:
+                kind, what = "cache_control_document", "document"
+            else:
+                kind, what = "cache_control_history", "conversation prefix"
+        saved = round(policy.discount * totals[k])
         changes.append(
             Change(
-                kind="hoist_volatile",
-                description=f"moved {len(volatile)} volatile line(s) out of the cacheable prefix",
+                kind=kind,
+                description=f"marked {totals[k]}-token {what} cacheable "
+                f"(est. {saved} tokens/call saved)",
                 tokens_saved=0,
             )
         )
 
-    stable_text = "\n".join(stable)
-    volatile_text = "\n".join(volatile)
-    stable_tokens = count_tokens(stable_text, model).count
-    use_blocks = stable_tokens >= _STABLE_CACHE_MIN_TOKENS or already_cc
-
-    if use_blocks:
-        new_system: list = [
+    if system is None:
+        return
+    if marked_system:
+        new_system: list | str = [
             {"type": "text", "text": stable_text, "cache_control": {"type": "ephemeral"}}
         ]
         if volatile_text:
             new_system.append({"type": "text", "text": volatile_text})
-        if not already_cc and _count_cache_control(payload) < _MAX_CACHE_CONTROL_BLOCKS:
-            saved = round(_CACHE_DISCOUNT * stable_tokens)
-            changes.append(
-                Change(
-                    kind="cache_control_system",
-                    description=f"marked {stable_tokens}-token system prefix cacheable "
-                    f"(est. {saved} tokens/call saved)",
-                    tokens_saved=0,
-                )
-            )
-        elif not already_cc:
-            # Would exceed the 4-block cap — leave the prefix as plain blocks, no cache_control.
-            new_system = [{"type": "text", "text": stable_text}]
-            if volatile_text:
-                new_system.append({"type": "text", "text": volatile_text})
-        payload["system"] = new_system
     else:
-        payload["system"] = (
-            stable_text if not volatile_text else f"{stable_text}\n{volatile_text}"
-        )
+        new_system = stable_text if not volatile_text else f"{stable_text}\n{volatile_text}"
+    if new_system != system:
+        writer.own()["system"] = new_system
 
 
-def _optimize_anthropic_document(payload: dict, model: str, changes: list[Change]) -> None:
-    messages = payload.get("messages")
-    if not isinstance(messages, list):
-        return
-    first_user = next((m for m in messages if isinstance(m, dict) and m.get("role") == "user"), None)
-    if first_user is None:
-        return
-    content = first_user.get("content")
-    if not isinstance(content, list):
-        return
+def _survival(message_index: int, turns: int) -> float:
+    """Chance the prefix through a block is resent unchanged: 1 for the system prompt, decaying
+    per message as turns get edited, trimmed or summarized. The newest message is resent whenever
+    the one before it is, since the next turn appends to both, so the breakpoint rolls onto it."""
+    if message_index < 0:
+        return 1.0
+    return _TURN_SURVIVAL ** min(message_index + 1, turns - 1)
 
-    text_blocks = [
-        (i, b) for i, b in enumerate(content) if isinstance(b, dict) and b.get("type") == "text"
-    ]
-    for pos, (idx, block) in enumerate(text_blocks):
-        if block.get("cache_control"):
-            continue
-        doc_tokens = count_tokens(block.get("text", ""), model).count
-        has_following_short = pos + 1 < len(text_blocks) and (
-            count_tokens(text_blocks[pos + 1][1].get("text", ""), model).count < doc_tokens
-        )
-        if doc_tokens >= _DOC_CACHE_MIN_TOKENS and has_following_short:
-            if _count_cache_control(payload) >= _MAX_CACHE_CONTROL_BLOCKS:
-                break
-            block["cache_control"] = {"type": "ephemeral"}
-            saved = round(_CACHE_DISCOUNT * doc_tokens)
-            changes.append(
-                Change(
-                    kind="cache_control_document",
-                    description=f"marked {doc_tokens}-token document cacheable "
-                    f"(est. {saved} tokens/call saved)",
-                    tokens_saved=0,
-                )
-            )
-            break
 
-
-def _optimize_openai_system(payload: dict, changes: list[Change]) -> None:
-    messages = payload.get("messages")
+def _optimize_openai_system(writer: PayloadWriter, changes: list[Change]) -> None:
+    messages = writer.payload.get("messages")
     if not isinstance(messages, list):
         return
-    for msg in messages:
+    for i, msg in enumerate(messages):
         if isinstance(msg, dict) and msg.get("role") == "system" and isinstance(msg.get("content"), str):
             lines = msg["content"].split("\n")
             stable, volatile = _partition(lines)
             if volatile and (stable + volatile) != lines:
-                msg["content"] = "\n".join(stable + volatile)
+                writer.own("messages", i)["content"] = "\n".join(stable + volatile)
                 changes.append(
                     Change(
                         kind="hoist_volatile",
@@ -183,9 +203,10 @@ def _optimize_openai_system(payload: dict, changes: list[Change]) -> None:
 
 def _count_cache_control(payload: dict) -> int:
     n = 0
-    system = payload.get("system")
-    if isinstance(system, list):
-        n += sum(1 for b in system if isinstance(b, dict) and b.get("cache_control"))
+    for field in ("tools", "system"):  # the cap covers tool definitions too
+        blocks = payload.get(field)
+        if isinstance(blocks, list):
+            n += sum(1 for b in blocks if isinstance(b, dict) and b.get("cache_control"))
     for msg in payload.get("messages", []):
         content = msg.get("content") if isinstance(msg, dict) else None
         if isinstance(content, list):
@@ -195,15 +216,17 @@ def _count_cache_control(payload: dict) -> int:
 
 def _payload_token_estimate(payload: dict, model: str) -> int:
     lines, _ = _system_lines_and_cc(payload.get("system"))
-    total = count_tokens("\n".join(lines), model).count
+    texts = ["\n".join(lines)]
     for msg in payload.get("messages", []):
         if not isinstance(msg, dict):
             continue
         content = msg.get("content")
         if isinstance(content, str):
-            total += count_tokens(content, model).count
+            texts.append(content)
         elif isinstance(content, list):
             for block in content:
                 if isinstance(block, dict) and isinstance(block.get("text"), str):
-                    total += count_tokens(block["text"], model).count
-    return total
+                    texts.append(block["text"])
+    # Each request resends the history: only blocks past the longest already-counted prefix are
+    # tokenized (in one batched call), and an unchanged payload is a single lookup.
+    return prefix_chain.total(texts, model)
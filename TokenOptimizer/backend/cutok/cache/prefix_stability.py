@@ -0,0 +1,413 @@
+"""Why a prefix cache missed: compare each request's prefix with the session's previous one.
+
+Implicit-cache providers (OpenAI, DeepSeek, …) discount only a byte-identical prefix, and the
+usage block says how much was cached but not what broke it. ``PrefixTracker`` serializes each
+request's prefix blocks — tool definitions, ``functions``, ``response_format``, the system prompt,
+then every message — and keeps their digests per session: the schema and system blocks under the
+session, the messages under the conversation (keyed like ``HistoryStore``, by the first message,
+since one API key carries many conversations). A request whose blocks don't extend the previous
+request's has broken the cached prefix; the first divergent block and byte are classified:
+
+  - ``tool_order``: the same tool definitions in a different order.
+  - ``key_order``: the same JSON in a different key order (tool schemas, ``response_format``;
+    message and system blocks are compared key-sorted, since their key order isn't rendered).
+  - ``whitespace``: equal once whitespace runs inside strings are collapsed.
+  - ``timestamp``: the divergent line is volatile on both sides (a time, date, UUID, "today is").
+  - ``content``: anything else — an edited turn, a changed prompt, another conversation.
+  - ``unclassified``: the block lies past the per-session byte budget, so only its digest is kept.
+
+Counts per cause are exposed through ``stats()``. With autofix on, ``observe`` returns the causes
+that have a cheap canonicalization (tool order, key order, trailing whitespace in the system
+prompt) once a session has shown them, and the cache stage applies them via ``canonicalize_prefix``
+so the forwarded prefix stays stable; tool and key order are already canonical unless
+``canonicalize_schemas`` is off. A divergence counts as ``fixed`` only when its canonicalization
+changes the request. Other whitespace divergences and timestamps are only reported: the cache
+stage already hoists volatile system lines.
+
+Configured via ``TS_PREFIX_TRACKER`` (``0`` disables it), ``TS_PREFIX_AUTOFIX`` (``1`` enables
+the canonicalizations), ``TS_PREFIX_TRACKER_BYTES`` and ``TS_PREFIX_TRACKER_ENTRIES``.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict, deque
+from collections.abc import Collection
+from dataclasses import dataclass
+
+from cutok.cache.tool_schema import canonical_keys, sort_tools
+from cutok.core.payload import PayloadWriter
+from cutok.core.types import Change
+
+logger = logging.getLogger(__name__)
+
+CAUSES = ("tool_order", "key_order", "whitespace", "timestamp", "content", "unclassified")
+FIXABLE = frozenset({"tool_order", "key_order", "whitespace"})
+
+_VOLATILE_PATTERNS = [
+    re.compile(r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}"),  # ISO timestamp
+    re.compile(r"\b\d{1,2}:\d{2}(:\d{2})?\b"),  # clock time
+    re.compile(r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}"),
+    re.compile(r"today is\b", re.IGNORECASE),
+]
+_TOOL_FIELDS = ("tools", "functions")
+_SCHEMA_FIELDS = (*_TOOL_FIELDS, "response_format")
+_SYSTEM_FIELDS = ("system", "systemInstruction")
+_MESSAGE_FIELDS = ("messages", "contents")
+_SYSTEM_ROLES = ("system", "developer")
+_LINE_WINDOW = 200  # chars searched either side of a divergence for its line
+_RECENT = 16
+_DEFAULT_MAX_BYTES = 256 * 1024
+_DEFAULT_MAX_ENTRIES = 256
+
+
+def is_volatile(line: str) -> bool:
+    """True for text that changes between otherwise identical requests (times, dates, UUIDs)."""
+    return any(p.search(line) for p in _VOLATILE_PATTERNS)
+
+
+@dataclass(frozen=True)
+class Divergence:
+    """Where a request's prefix first departs from the previous one, and the likely cause."""
+
+    block: str  # e.g. "tools[2]", "system", "messages[5]"
+    offset: int | None  # first differing byte within the serialized block, if it was kept
+    cause: str
+
+
+# --------------------------------------------------------------------------- blocks
+
+
+def _dump(obj, *, sort_keys: bool) -> bytes:
+    text = json.dumps(obj, ensure_ascii=False, separators=(",", ":"), sort_keys=sort_keys)
+    return text.encode("utf-8", "surrogatepass")
+
+
+def prefix_blocks(payload: dict) -> tuple[list[tuple[str, bytes]], list[tuple[str, bytes]]]:
+    """Serialized ``(label, bytes)`` prefix blocks: the schema and system part, then the turns.
+
+    Schema blocks keep their key order (it is rendered into the prompt); the rest are key-sorted.
+    """
+    head: list[tuple[str, bytes]] = []
+    for field in _SCHEMA_FIELDS:
+        value = payload.get(field)
+        if field in _TOOL_FIELDS and isinstance(value, list):
+            head.extend(
+                (f"{field}[{i}]", _dump(tool, sort_keys=False)) for i, tool in enumerate(value)
+            )
+        elif value is not None:
+            head.append((field, _dump(value, sort_keys=False)))
+    for field in _SYSTEM_FIELDS:
+        if payload.get(field) is not None:
+            head.append((field, _dump(payload[field], sort_keys=True)))
+    body: list[tuple[str, bytes]] = []
+    for field in _MESSAGE_FIELDS:
+        value = payload.get(field)
+        if not isinstance(value, list):
+            continue
+        for i, msg in enumerate(value):
+            # Leading system/developer messages (OpenAI's system prompt) belong with the head.
+            leading = not body and isinstance(msg, dict) and msg.get("role") in _SYSTEM_ROLES
+            (head if leading else body).append((f"{field}[{i}]", _dump(msg, sort_keys=True)))
+    return head, body
+
+
+class _Seen:
+    """One request's blocks: labels and digests for all of them, bytes within the budget."""
+
+    __slots__ = ("blobs", "digests", "fixes", "labels")
+
+    def __init__(self, blocks: list[tuple[str, bytes]], max_bytes: int) -> None:
+        self.labels = [label for label, _ in blocks]
+        self.digests = [hashlib.blake2b(blob, digest_size=16).digest() for _, blob in blocks]
+        self.blobs: list[bytes | None] = []
+        kept = 0
+        for _, blob in blocks:
+            kept += len(blob)
+            self.blobs.append(blob if kept <= max_bytes else None)
+        self.fixes: frozenset[str] = frozenset()
+
+
+def _first_difference(old: _Seen, new: _Seen) -> int | None:
+    for k in range(min(len(old.digests), len(new.digests))):
+        if old.digests[k] != new.digests[k] or old.labels[k] != new.labels[k]:
+            return k
+    return None
+
+
+def _classify(old: _Seen, new: _Seen, k: int) -> Divergence:
+    label = new.labels[k]
+    before, after = old.blobs[k], new.blobs[k]
+    offset = None
+    if before is not None and after is not None:
+        offset = next(
+            (i for i, (a, b) in enumerate(zip(before, after, strict=False)) if a != b),
+            min(len(before), len(after)),
+        )
+    if label.startswith(_TOOL_FIELDS) or old.labels[k].startswith(_TOOL_FIELDS):
+        cause = _tool_cause(old, new)
+        if cause is not None:
+            return Divergence(label, offset, cause)
+    if before is None or after is None:
+        return Divergence(label, offset, "unclassified")
+    if old.labels[k] != label:
+        return Divergence(label, offset, "content")
+    a, b = json.loads(before), json.loads(after)
+    if a == b:
+        cause = "key_order"
+    elif _squash(a) == _squash(b):
+        cause = "whitespace"
+    elif _volatile_at(before, offset) and _volatile_at(after, offset):
+        cause = "timestamp"
+    else:
+        cause = "content"
+    return Divergence(label, offset, cause)
+
+
+def _tool_cause(old: _Seen, new: _Seen) -> str | None:
+    tools = []
+    for seen in (old, new):
+        blobs = [
+            b
+            for label, b in zip(seen.labels, seen.blobs, strict=True)
+            if label.startswith(_TOOL_FIELDS)
+        ]
+        if any(b is None for b in blobs):
+            return None
+        tools.append([json.dumps(json.loads(b), sort_keys=True) for b in blobs])
+    if tools[0] == tools[1]:
+        return "key_order"
+    if sorted(tools[0]) == sorted(tools[1]):
+        return "tool_order"
+    return None
+
+
+def _squash(obj):
+    if isinstance(obj, str):
+        return " ".join(obj.split())
+    if isinstance(obj, list):
+        return [_squash(v) for v in obj]
+    if isinstance(obj, dict):
+        return {k: _squash(v) for k, v in obj.items()}
+    return obj
+
+
+def _fixable(divergence: Divergence, old: _Seen, new: _Seen, k: int, in_head: bool) -> bool:
+    """Whether ``canonicalize_prefix`` would remove this divergence.
+
+    Whitespace is only tidied in the system prompt, and only at line ends.
+    """
+    if divergence.cause != "whitespace":
+        return divergence.cause in FIXABLE
+    label = new.labels[k]
+    if not in_head or not (label == "system" or label.startswith("messages[")):
+        return False
+    tidied = []
+    for blob in (old.blobs[k], new.blobs[k]):
+        block = json.loads(blob)
+        writer = PayloadWriter({"system": block} if label == "system" else {"messages": [block]})
+        _tidy_system(writer)
+        tidied.append(writer.payload)
+    return tidied[0] == tidied[1]
+
+
+def _volatile_at(blob: bytes, offset: int | None) -> bool:
+    """Whether the (JSON-escaped) line around ``offset`` carries volatile text."""
+    if offset is None:
+        return False
+    text = blob.decode("utf-8", "replace")
+    i = len(blob[:offset].decode("utf-8", "ignore"))
+    lo, hi = max(0, i - _LINE_WINDOW), i + _LINE_WINDOW
+    start, end = text.rfind("\\n", lo, i), text.find("\\n", i, hi)
+    return is_volatile(text[start + 2 if start >= 0 else lo : end if end >= 0 else hi])
+
+
+# --------------------------------------------------------------------------- tracker
+
+
+class PrefixTracker:
+    """Per-session prefix fingerprints, LRU-bounded, with per-cause divergence counts.
+
+    Thread-safe; serialization and classification happen outside the lock.
+    """
+
+    def __init__(
+        self,
+        *,
+        enabled: bool = True,
+        autofix: bool = False,
+        max_entries: int = _DEFAULT_MAX_ENTRIES,
+        max_bytes: int = _DEFAULT_MAX_BYTES,
+    ) -> None:
+        self._lock = threading.Lock()
+        self._seen: OrderedDict[tuple[str, bytes], _Seen] = OrderedDict()
+        self._enabled = enabled
+        self._autofix = autofix
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._requests = 0
+        self._extended = 0
+        self._fixed = 0
+        self._causes = dict.fromkeys(CAUSES, 0)
+        self._recent: deque[Divergence] = deque(maxlen=_RECENT)
+
+    def observe(self, session_id: str, payload: dict) -> frozenset[str]:
+        """Compare ``payload``'s prefix with the session's last one; return the fixes to apply."""
+        if not self._enabled:
+            return frozenset()
+        head, body = prefix_blocks(payload)
+        head_key = (session_id, b"")
+        # Many conversations share one session (one API key); their first messages tell them apart.
+        conv_key = (
+            session_id,
+            hashlib.blake2b(body[0][1], digest_size=16).digest() if body else b"",
+        )
+        new_head = _Seen(head, self._max_bytes)
+        new_conv = _Seen(body, self._max_bytes)
+        with self._lock:
+            old_head = self._seen.get(head_key)
+            old_conv = self._seen.get(conv_key) if body else None
+            fixes = old_head.fixes if old_head is not None and self._autofix else frozenset()
+            new_head.fixes = fixes
+            self._seen[head_key] = new_head
+            self._seen.move_to_end(head_key)
+            if body:
+                self._seen[conv_key] = new_conv
+                self._seen.move_to_end(conv_key)
+            while len(self._seen) > self._max_entries:
+                self._seen.popitem(last=False)
+            self._requests += 1
+
+        divergence = None
+        for old, new, in_head in ((old_head, new_head, True), (old_conv, new_conv, False)):
+            k = _first_difference(old, new) if old is not None else None
+            if k is not None:
+                divergence = _classify(old, new, k)
+                fixable = _fixable(divergence, old, new, k, in_head)
+                break
+        if divergence is None:
+            if old_head is not None or old_conv is not None:
+                with self._lock:
+                    self._extended += 1
+            return fixes
+
+        logger.debug("prefix diverged for %s: %s", session_id, divergence)
+        cause = divergence.cause
+        # Copy-on-write: canonicalizing here never touches the caller's payload.
+        fixed = (
+            fixable
+            and cause in fixes
+            and bool(canonicalize_prefix(PayloadWriter(payload), {cause}))
+        )
+        with self._lock:
+            self._causes[cause] += 1
+            self._recent.append(divergence)
+            if fixed:
+                self._fixed += 1
+            elif self._autofix and fixable:
+                fixes = new_head.fixes = fixes | {cause}
+        return fixes
+
+    def configure(self, *, enabled: bool | None = None, autofix: bool | None = None) -> None:
+        with self._lock:
+            if enabled is not None:
+                self._enabled = enabled
+                if not enabled:
+                    self._seen.clear()
+            if autofix is not None:
+                self._autofix = autofix
+
+    def clear(self) -> None:
+        with self._lock:
+            self._seen.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self._enabled,
+                "autofix": self._autofix,
+                "tracked": len(self._seen),
+                "requests": self._requests,
+                "extended": self._extended,
+                "diverged": sum(self._causes.values()),
+                "fixed": self._fixed,
+                "causes": dict(self._causes),
+                "recent": [
+                    {"block": d.block, "offset": d.offset, "cause": d.cause} for d in self._recent
+                ],
+            }
+
+
+def prefix_tracker_from_env() -> PrefixTracker:
+    return PrefixTracker(
+        enabled=os.getenv("TS_PREFIX_TRACKER", "1") != "0",
+        autofix=os.getenv("TS_PREFIX_AUTOFIX", "0") == "1",
+        max_entries=int(os.getenv("TS_PREFIX_TRACKER_ENTRIES", str(_DEFAULT_MAX_ENTRIES))),
+        max_bytes=int(os.getenv("TS_PREFIX_TRACKER_BYTES", str(_DEFAULT_MAX_BYTES))),
+    )
+
+
+# --------------------------------------------------------------------------- canonicalization
+
+
+def canonicalize_prefix(writer: PayloadWriter, fixes: Collection[str]) -> list[Change]:
+    """Apply the cheap canonicalizations named in ``fixes`` (a subset of ``FIXABLE``)."""
+    changes: list[Change] = []
+    payload = writer.payload
+    if "tool_order" in fixes:
+        for field in _TOOL_FIELDS:
+            tools = payload.get(field)
+            if isinstance(tools, list) and (ordered := sort_tools(tools)) is not tools:
+                writer.own()[field] = ordered
+                changes.append(_change("sort_tools", f"sorted {len(tools)} {field} by name"))
+    if "key_order" in fixes:
+        for field in _SCHEMA_FIELDS:
+            value = writer.payload.get(field)
+            if value is None:
+                continue
+            ordered, _ = canonical_keys(field, value)
+            if _dump(ordered, sort_keys=False) != _dump(value, sort_keys=False):
+                writer.own()[field] = ordered
+                changes.append(_change("sort_schema_keys", f"sorted the keys of {field}"))
+    if "whitespace" in fixes:
+        n = _tidy_system(writer)
+        if n:
+            changes.append(_change("tidy_whitespace", f"trimmed whitespace in {n} system block(s)"))
+    return changes
+
+
+def _change(kind: str, description: str) -> Change:
+    return Change(
+        kind=kind, description=f"{description} to keep the cached prefix stable", tokens_saved=0
+    )
+
+
+def _tidy(text: str) -> str:
+    return "\n".join(line.rstrip() for line in text.replace("\r\n", "\n").split("\n")).strip()
+
+
+def _tidy_system(writer: PayloadWriter) -> int:
+    """Trailing whitespace and CRLFs out of the system prompt (either schema); blocks changed."""
+    n = 0
+    system = writer.payload.get("system")
+    if isinstance(system, str) and _tidy(system) != system:
+        writer.own()["system"] = _tidy(system)
+        n += 1
+    elif isinstance(system, list):
+        for i, block in enumerate(system):
+            text = block.get("text") if isinstance(block, dict) else None
+            if isinstance(text, str) and _tidy(text) != text:
+                writer.own("system", i)["text"] = _tidy(text)
+                n += 1
+    messages = writer.payload.get("messages")
+    for i, msg in enumerate(messages if isinstance(messages, list) else []):
+        if not isinstance(msg, dict) or msg.get("role") not in ("system", "developer"):
+            break
+        content = msg.get("content")
+        if isinstance(content, str) and _tidy(content) != content:
+            writer.own("messages", i)["content"] = _tidy(content)
+            n += 1
+    return n
@@ -0,0 +1,249 @@
+"""Deterministic ``tools`` / ``functions`` / ``response_format``, so SDK churn can't break caching.
+
+Tool definitions sit at the very front of the cached prefix, and many SDKs rebuild them on every
+call: the same tools in a different order, schema keywords emitted in whatever order the model
+class produced them, generated ``title`` keys. Any of those changes the prefix and silently turns
+a cache read into a full-price write. This stage puts them in one canonical form:
+
+  - tools sorted by name (Gemini: the declarations inside each tool). A ``cache_control`` marker on
+    the last tool — Anthropic's "cache every tool" idiom — moves to the new last tool; with any
+    other marker the order is left alone, since it decides what the marker covers.
+  - object keys sorted, except a schema's ``properties``: their order is the order a model
+    generates structured output and arguments in (``reasoning`` before ``answer``), so it stays.
+  - ``title`` keys that pydantic generates from the property or ``$defs`` name dropped: they
+    repeat the key, so removing them is a no-op for the model and saves their tokens. Any other
+    title (and every root title) is kept.
+
+Canonical forms are memoized by a digest of each field's serialization in ``tool_schema_cache``, so
+a repeated tool set costs one serialization and a dict lookup. The memoized values are shared
+between requests; ``PayloadWriter`` copies before any later write, so they are never mutated.
+Configured via ``TS_TOOL_SCHEMA_CACHE_ENTRIES`` or ``tool_schema_cache.configure(...)``.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from cutok.core.ledger import Ledger
+from cutok.core.payload import PayloadWriter
+from cutok.core.tokens import count_tokens_batch
+from cutok.core.types import Change, OptimizationResult, OptimizerConfig
+
+FIELDS = ("tools", "functions", "response_format")
+_SCHEMA_KEYS = ("input_schema", "parameters", "parametersJsonSchema", "schema")
+_SCHEMA_MAPS = ("$defs", "definitions", "patternProperties")
+_SCHEMA_LISTS = ("allOf", "anyOf", "oneOf", "prefixItems")
+_SCHEMA_ONE = ("additionalProperties", "contains", "else", "if", "items", "not", "then")
+_DEFAULT_MAX_ENTRIES = 1024
+
+# (canonical value, titles dropped, tools reordered, keys reordered, tokens before, tokens after)
+_Entry = tuple[object, int, bool, bool, int, int]
+
+
+def _json(value) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def _dump(value) -> bytes:
+    return _json(value).encode("utf-8", "surrogatepass")
+
+
+def tool_name(tool) -> str | None:
+    """A tool's name in any of the schemas (OpenAI wraps it in ``function``)."""
+    if not isinstance(tool, dict):
+        return None
+    fn = tool.get("function")
+    name = fn.get("name") if isinstance(fn, dict) else tool.get("name")
+    return name if isinstance(name, str) else None
+
+
+def sort_tools(tools: list) -> list:
+    """``tools`` sorted by name; unchanged if a name is missing or a marker pins the order."""
+    names = [tool_name(t) for t in tools]
+    if None in names or names == sorted(names):
+        return tools
+    marked = [i for i, t in enumerate(tools) if isinstance(t, dict) and "cache_control" in t]
+    if marked and marked != [len(tools) - 1]:
+        return tools
+    ordered = [tools[i] for i in sorted(range(len(tools)), key=names.__getitem__)]
+    if marked:
+        last = dict(tools[-1])
+        marker = last.pop("cache_control")
+        ordered = [last if t is tools[-1] else t for t in ordered]
+        ordered[-1] = {**ordered[-1], "cache_control": marker}
+    return ordered
+
+
+def canonical_keys(field: str, value, *, strip_titles: bool = False) -> tuple[object, int]:
+    """``value`` of ``field`` with keys in canonical order (and generated titles dropped).
+
+    Returns the new value and the number of titles dropped.
+    """
+    dropped = [0]
+    if field in ("tools", "functions") and isinstance(value, list):
+        return [_tool(t, strip_titles, dropped) for t in value], dropped[0]
+    return _tool(value, strip_titles, dropped), dropped[0]
+
+
+def _tool(node, strip: bool, dropped: list[int]):
+    """A tool / declaration / response format: keys sorted, schemas canonicalized."""
+    if not isinstance(node, dict):
+        return _sorted(node)
+    out = {}
+    for key in sorted(node):
+        value = node[key]
+        if key in _SCHEMA_KEYS:
+            value = _schema(value, None, strip, dropped)
+        elif key in ("function", "json_schema"):
+            value = _tool(value, strip, dropped)
+        elif key == "functionDeclarations" and isinstance(value, list):
+            value = sort_tools([_tool(d, strip, dropped) for d in value])
+        else:
+            value = _sorted(value)
+        out[key] = value
+    return out
+
+
+def _schema(node, name: str | None, strip: bool, dropped: list[int]):
+    """One JSON schema; ``name`` is its property or ``$defs`` key, None at the root."""
+    if not isinstance(node, dict):
+        return _sorted(node)
+    out = {}
+    for key in sorted(node):
+        value = node[key]
+        if key == "title" and strip and name is not None and value in _generated_titles(name):
+            dropped[0] += 1
+            continue
+        if key == "properties" and isinstance(value, dict):
+            value = {k: _schema(v, k, strip, dropped) for k, v in value.items()}
+        elif key in _SCHEMA_MAPS and isinstance(value, dict):
+            value = {k: _schema(value[k], k, strip, dropped) for k in sorted(value)}
+        elif key in _SCHEMA_LISTS and isinstance(value, list):
+            value = [_schema(v, None, strip, dropped) for v in value]
+        elif key in _SCHEMA_ONE:
+            value = _schema(value, None, strip, dropped)
+        else:
+            value = _sorted(value)
+        out[key] = value
+    return out
+
+
+def _generated_titles(name: str) -> tuple[str, ...]:
+    # pydantic titles a field "user_id" as "User Id", and a model in $defs by its class name.
+    return (name, name.title().replace("_", " "), name.replace("_", " ").title())
+
+
+def _sorted(value):
+    if isinstance(value, dict):
+        return {k: _sorted(value[k]) for k in sorted(value)}
+    if isinstance(value, list):
+        return [_sorted(v) for v in value]
+    return value
+
+
+def _canonicalize(field: str, value, model: str) -> _Entry:
+    canonical, dropped = canonical_keys(field, value, strip_titles=True)
+    keys_moved = _dump(canonical_keys(field, value)[0]) != _dump(value)
+    reordered = False
+    if isinstance(canonical, list):
+        ordered = sort_tools(canonical)
+        reordered = ordered is not canonical
+        canonical = ordered
+    before, after = count_tokens_batch([_json(value), _json(canonical)], model)
+    return canonical, dropped, reordered, keys_moved, before, after
+
+
+class ToolSchemaCache:
+    """Bounded, thread-safe LRU of canonical schema fields keyed by field, model and digest."""
+
+    def __init__(self, max_entries: int = _DEFAULT_MAX_ENTRIES) -> None:
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple[str, str, bytes], _Entry] = OrderedDict()
+        self._max_entries = max_entries
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def canonical(self, field: str, value, model: str) -> _Entry:
+        key = (field, model, hashlib.blake2b(_dump(value), digest_size=16).digest())
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry
+        entry = _canonicalize(field, value, model)
+        with self._lock:
+            self._misses += 1
+            self._entries[key] = entry
+            self._evict_locked()
+        return entry
+
+    def configure(self, *, max_entries: int | None = None) -> None:
+        with self._lock:
+            if max_entries is not None:
+                self._max_entries = max_entries
+                self._evict_locked()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self._max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def _evict_locked(self) -> None:
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+
+tool_schema_cache = ToolSchemaCache(
+    max_entries=int(os.getenv("TS_TOOL_SCHEMA_CACHE_ENTRIES", str(_DEFAULT_MAX_ENTRIES)))
+)
+
+
+def run_schema_stage(
+    writer: PayloadWriter, config: OptimizerConfig, ledger: Ledger
+) -> OptimizationResult:
+    """Canonicalize the payload's tool and response-format schemas (memoized per tool set)."""
+    changes: list[Change] = []
+    tokens_before = tokens_after = 0
+    for field in FIELDS:
+        value = writer.payload.get(field)
+        if value is None:
+            continue
+        canonical, dropped, reordered, keys_moved, before, after = tool_schema_cache.canonical(
+            field, value, config.model
+        )
+        tokens_before += before
+        tokens_after += after
+        if not (dropped or reordered or keys_moved):
+            continue
+        writer.own()[field] = canonical
+        if reordered:
+            changes.append(Change("sort_tools", f"sorted {len(value)} {field} by name", 0))
+        if keys_moved:
+            changes.append(Change("sort_schema_keys", f"put {field} keys in canonical order", 0))
+        if dropped:
+            desc = f"dropped {dropped} generated schema title(s) from {field}"
+            changes.append(Change("strip_schema_titles", desc, before - after))
+    result = OptimizationResult(
+        feature="schema_canonicalization",
+        tokens_before=tokens_before,
+        tokens_after=tokens_after,
+        changes=changes,
+    )
+    ledger.record(result)
+    return result
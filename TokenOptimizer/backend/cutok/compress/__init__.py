@@ -1,8 +1,7 @@
 """Prompt compression via the shared LLMLingua-2 model (the Cloud Run service)."""
 
-import copy
-
 from cutok.core.ledger import Ledger
+from cutok.core.payload import PayloadWriter
 from cutok.core.types import Change, OptimizationResult, OptimizerConfig
 
 
@@ -10,34 +9,49 @@ def compress_payload(
     payload: dict, config: OptimizerConfig, ledger: Ledger
 ) -> tuple[dict, OptimizationResult]:
     """Compress prose in every user message through the shared model (no-op if it's unavailable)."""
-    from cutok.optimizer import compress_text
+    writer = PayloadWriter(payload)
+    result = run_compress_stage(writer, config, ledger)
+    return writer.payload, result
 
-    payload = copy.deepcopy(payload)
-    changes: list[Change] = []
-    before = 0
-    after = 0
 
-    for msg in payload.get("messages", []):
+def run_compress_stage(
+    writer: PayloadWriter, config: OptimizerConfig, ledger: Ledger
+) -> OptimizationResult:
+    """``compress_payload`` against a shared writer; only messages that changed are copied.
+
+    Every user text block goes to the service in one ``compress_texts`` call (batched, with a
+    bounded fan-out); blocks under ``compression_min_tokens`` are left alone.
+    """
+    from cutok.optimizer import compress_texts
+
+    paths: list[tuple] = []
+    texts: list[str] = []
+    for i, msg in enumerate(writer.payload.get("messages", [])):
         if not isinstance(msg, dict) or msg.get("role") != "user":
             continue
         content = msg.get("content")
         if isinstance(content, str):
-            new, res = compress_text(content, config)
-            msg["content"] = new
-            before += res.tokens_before
-            after += res.tokens_after
-            changes += res.changes
+            paths.append((i,))
+            texts.append(content)
         elif isinstance(content, list):
-            for block in content:
+            for j, block in enumerate(content):
                 if isinstance(block, dict) and isinstance(block.get("text"), str):
-                    new, res = compress_text(block["text"], config)
-                    block["text"] = new
-                    before += res.tokens_before
-                    after += res.tokens_after
-                    changes += res.changes
+                    paths.append((i, "content", j))
+                    texts.append(block["text"])
+
+    changes: list[Change] = []
+    before = 0
+    after = 0
+    for path, text, (new, res) in zip(paths, texts, compress_texts(texts, config), strict=True):
+        if new != text:
+            key = "content" if len(path) == 1 else "text"
+            writer.own("messages", *path)[key] = new
+        before += res.tokens_before
+        after += res.tokens_after
+        changes += res.changes
 
     result = OptimizationResult(
         feature="compression", tokens_before=before, tokens_after=after, changes=changes
     )
     ledger.record(result)
-    return payload, result
+    return result
@@ -0,0 +1,91 @@
+"""Micro-batching: merge work items from concurrent callers into one batched call.
+
+Under concurrent load the compression service spends most of its CPU on per-call overhead: every
+request scores its own few windows in its own ``session.run``. ``MicroBatcher.map`` queues a
+caller's items, and one worker thread drains the queue in batches of up to ``max_batch`` items,
+waiting at most ``max_wait`` seconds after the oldest queued item for more to arrive. Each
+caller gets its own results back in order. The wait is adaptive: it applies only while the
+previous batch merged several callers, i.e. under concurrent load, so a lone caller on an idle
+batcher pays no delay. Under load, items also queue up while a batch runs.
+
+``fn`` takes a list of items and returns one result per item. If it raises, every caller in that
+batch gets the exception.
+"""
+
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Sequence
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """Thread-safe batching front for ``fn``; the worker thread starts on first use."""
+
+    def __init__(self, fn: Callable[[list], list], *, max_batch: int = 32, max_wait: float = 0.005):
+        self._fn = fn
+        self._max_batch = max(1, max_batch)
+        self._max_wait = max(0.0, max_wait)
+        self._cond = threading.Condition()
+        # (enqueued at, item, future, caller token)
+        self._pending: deque[tuple[float, object, Future, object]] = deque()
+        self._loaded = False  # the previous batch merged several callers
+        self._worker: threading.Thread | None = None
+        self._batches = 0
+        self._items = 0
+
+    def map(self, items: Sequence) -> list:
+        """``fn(items)``, with the items batched together with other callers' items."""
+        if not items:
+            return []
+        futures = [Future() for _ in items]
+        now = time.monotonic()
+        caller = object()
+        with self._cond:
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run, name="cutok-microbatch", daemon=True
+                )
+                self._worker.start()
+            self._pending.extend(
+                (now, item, f, caller) for item, f in zip(items, futures, strict=True)
+            )
+            self._cond.notify()
+        return [f.result() for f in futures]
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "max_batch": self._max_batch,
+                "max_wait_ms": self._max_wait * 1000,
+                "batches": self._batches,
+                "items": self._items,
+                "mean_batch": round(self._items / self._batches, 2) if self._batches else 0.0,
+            }
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                deadline = self._pending[0][0] + self._max_wait
+                while len(self._pending) < self._max_batch and self._loaded:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                n = min(self._max_batch, len(self._pending))
+                batch = [self._pending.popleft() for _ in range(n)]
+                self._loaded = len({id(caller) for _, _, _, caller in batch}) > 1
+                self._batches += 1
+                self._items += n
+            try:
+                results = self._fn([item for _, item, _, _ in batch])
+                if len(results) != n:
+                    raise ValueError(f"{len(results)} results for a batch of {n}")
+            except Exception as exc:  # handed to every caller in the batch
+                for _, _, future, _ in batch:
+                    future.set_exception(exc)
+                continue
+            for (_, _, future, _), result in zip(batch, results, strict=True):
+                future.set_result(result)
@@ -7,12 +7,22 @@ the Cloud Run service (and is shared by every client). Verified against the int8
 
 The selection logic (``select_compressed``) is pure and unit-tested. Model inference is loaded
 lazily and exercised by an opt-in slow test when the model is present.
+
+A document's windows are scored together: padded into one ``[batch, seq]`` tensor per
+``session.run`` of up to ``max_batch`` windows, so a 3,000-word text costs one run, not ten. With
+``max_wait_ms`` set (the service sets it), a ``MicroBatcher`` also merges windows from concurrent
+``compress`` calls into shared runs.
 """
 
 import re
+import threading
 from pathlib import Path
 
+from cutok.compress.batcher import MicroBatcher
+
 _WORD_CHUNK = 300  # words per inference window (keeps subword count under the 512 model limit)
+_PAD_SLACK = 1.25  # a run's longest window is at most this times its shortest (bounds padding)
+_RUN_WORDS = 1200  # padded words per run: bigger runs of long windows get slower per window
 _DEFAULT_REPO = "Arcoldd/llmlingua4j-bert-base-onnx"  # ONNX export of microsoft/llmlingua-2 bert-base
 _TOKENIZER_FILES = (
     "config.json",
@@ -78,7 +88,8 @@ class LLMLingua2:
     """Loads the ONNX token classifier + tokenizer and scores word keep-probabilities.
 
     ``session`` and ``tokenizer`` are injectable for tests. ``keep_label_index`` is 1 for the
-    standard ``{0: EXCLUDE, 1: INCLUDE}`` head.
+    standard ``{0: EXCLUDE, 1: INCLUDE}`` head. ``max_batch`` caps the windows per
+    ``session.run``; ``max_wait_ms`` (None: off) enables cross-call micro-batching.
     """
 
     def __init__(
@@ -88,47 +99,95 @@ class LLMLingua2:
         session=None,
         tokenizer=None,
         keep_label_index: int = 1,
+        max_batch: int = 16,
+        max_wait_ms: float | None = None,
     ) -> None:
         self.model_dir = Path(model_dir)
         self._session = session
         self._tokenizer = tokenizer
         self.keep_idx = keep_label_index
+        self.max_batch = max(1, max_batch)
+        self._load_lock = threading.Lock()
+        self.batcher = None
+        if max_wait_ms is not None:
+            self.batcher = MicroBatcher(
+                self._score_windows, max_batch=self.max_batch, max_wait=max_wait_ms / 1000
+            )
 
     def _ensure_loaded(self) -> None:
-        if self._session is None:
-            import onnxruntime as ort
+        with self._load_lock:
+            if self._session is None:
+                import onnxruntime as ort
 
-            path = self.model_dir / "model.int8.onnx"
-            if not path.exists():
-                path = self.model_dir / "model.onnx"
-            self._session = ort.InferenceSession(str(path), providers=["CPUExecutionProvider"])
-        if self._tokenizer is None:
-            from transformers import AutoTokenizer
+                path = self.model_dir / "model.int8.onnx"
+                if not path.exists():
+                    path = self.model_dir / "model.onnx"
+                self._session = ort.InferenceSession(str(path), providers=["CPUExecutionProvider"])
+            if self._tokenizer is None:
+                from transformers import AutoTokenizer
 
-            self._tokenizer = AutoTokenizer.from_pretrained(str(self.model_dir))
+                self._tokenizer = AutoTokenizer.from_pretrained(str(self.model_dir))
 
     def score_words(self, words: list[str]) -> list[float]:
         """Per-word keep-probability, windowed so long inputs aren't silently truncated."""
         self._ensure_loaded()
-        scores: list[float] = []
-        for start in range(0, len(words), _WORD_CHUNK):
-            scores.extend(self._score_chunk(words[start : start + _WORD_CHUNK]))
-        return scores
-
-    def _score_chunk(self, words: list[str]) -> list[float]:
+        windows = [words[i : i + _WORD_CHUNK] for i in range(0, len(words), _WORD_CHUNK)]
+        scored = self.batcher.map(windows) if self.batcher else self._score_windows(windows)
+        return [score for window in scored for score in window]
+
+    def _score_windows(self, windows: list[list[str]]) -> list[list[float]]:
+        """Score windows in as few runs as padding allows; results in input order.
+
+        Windows are sorted by length and cut into runs of at most ``max_batch`` whose longest
+        window is within ``_PAD_SLACK`` of the shortest and whose padded size stays within
+        ``_RUN_WORDS``: a padded cell costs as much as a real one, so a 40-word tail window
+        padded to 300 words would cost more than a run of its own.
+        """
+        order = sorted(range(len(windows)), key=lambda i: len(windows[i]))
+        runs: list[list[int]] = []
+        for i in order:
+            run = runs[-1] if runs else None
+            size = len(windows[i])
+            if (
+                run is None
+                or len(run) == self.max_batch
+                or size > _PAD_SLACK * len(windows[run[0]])
+                or (len(run) + 1) * size > _RUN_WORDS
+            ):
+                runs.append([i])
+            else:
+                run.append(i)
+        scored: list[list[float]] = [[] for _ in windows]
+        for run in runs:
+            for i, scores in zip(run, self._score_run([windows[i] for i in run]), strict=True):
+                scored[i] = scores
+        return scored
+
+    def _score_run(self, windows: list[list[str]]) -> list[list[float]]:
+        """Score several windows in one ``session.run`` (right-padded to the longest)."""
         import numpy as np
 
         enc = self._tokenizer(
-            words, is_split_into_words=True, return_tensors="np", truncation=True, max_length=512
+            windows,
+            is_split_into_words=True,
+            return_tensors="np",
+            truncation=True,
+            max_length=512,
+            padding=True,
         )
         feed = {i.name: enc[i.name] for i in self._session.get_inputs() if i.name in enc}
-        logits = self._session.run(None, feed)[0][0]
-        probs = _softmax(logits)[:, self.keep_idx]
-        by_word: dict[int, list[float]] = {}
-        for token_idx, word_id in enumerate(enc.word_ids(0)):
-            if word_id is not None:
-                by_word.setdefault(word_id, []).append(float(probs[token_idx]))
-        return [float(np.mean(by_word.get(i, [0.0]))) for i in range(len(words))]
+        probs = _softmax(self._session.run(None, feed)[0])[:, :, self.keep_idx]
+        scored = []
+        for b, words in enumerate(windows):
+            # Mean over each word's subword tokens; padding and special tokens have no word.
+            ids = np.array([-1 if w is None else w for w in enc.word_ids(b)])
+            mask = ids >= 0
+            n = len(words)
+            sums = np.bincount(ids[mask], weights=probs[b, : len(ids)][mask], minlength=n)
+            counts = np.bincount(ids[mask], minlength=n)
+            means = np.divide(sums, counts, out=np.zeros(n), where=counts > 0)
+            scored.append([float(x) for x in means[:n]])
+        return scored
 
     def compress(self, text: str, rate: float = 0.6, *, force_digits: bool = True) -> dict:
         """Compress ``text`` keeping ~``rate`` of its words. Returns text + word counts."""
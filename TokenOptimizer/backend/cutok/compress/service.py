@@ -5,15 +5,33 @@ they all get identical results from the same model. The endpoint is configured v
 ``TS_COMPRESS_URL`` or ``cutok.configure(compress_url=...)``. When no endpoint is set or the call
 fails, ``compress()`` returns ``None`` and the caller leaves the text unchanged — there is no
 local fallback.
+
+Calls go through one pooled keep-alive ``httpx.Client`` per process, so only the first call pays
+for TCP and TLS setup. ``compress_many`` sends many texts as ``/v1/compress:batch`` requests of up
+to ``TS_COMPRESS_BATCH_SIZE`` texts, with at most ``TS_COMPRESS_CONCURRENCY`` in flight. A service
+without the batch endpoint gets one ``/v1/compress`` call per text under the same bound.
 """
 
 import logging
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
 
 logger = logging.getLogger(__name__)
 
+_DEFAULT_BATCH_SIZE = 16
+_DEFAULT_CONCURRENCY = 4
+
 _endpoint: str | None = None
-_client = None  # injectable httpx client (tests); else a per-call request
+_client = None  # injectable httpx client (tests); else the pooled one
+_pooled = None
+_pooled_pid = 0
+_pool_lock = threading.Lock()
+_no_batch: set[str] = set()  # endpoints that answered 404/405 to /v1/compress:batch
+# A transport failure, an error status, or a body that isn't the expected JSON.
+_FAILURES = (httpx.HTTPError, ValueError, KeyError, TypeError)
 
 
 def set_endpoint(url: str | None) -> None:
@@ -31,22 +49,93 @@ def get_endpoint() -> str | None:
     return _endpoint or os.getenv("TS_COMPRESS_URL")
 
 
+def _concurrency() -> int:
+    return max(1, int(os.getenv("TS_COMPRESS_CONCURRENCY", str(_DEFAULT_CONCURRENCY))))
+
+
+def _http():
+    """The injected client, else this process's pooled one (rebuilt after a fork)."""
+    global _pooled, _pooled_pid
+    if _client is not None:
+        return _client
+    with _pool_lock:
+        if _pooled is None or _pooled_pid != os.getpid():
+            n = _concurrency()
+            limits = httpx.Limits(max_connections=n, max_keepalive_connections=n)
+            _pooled = httpx.Client(limits=limits, timeout=30.0)
+            _pooled_pid = os.getpid()
+        return _pooled
+
+
+def close() -> None:
+    """Close the pooled client; the next call opens a new one."""
+    global _pooled
+    with _pool_lock:
+        if _pooled is not None and _pooled_pid == os.getpid():
+            _pooled.close()
+        _pooled = None
+
+
 def compress(text: str, *, rate: float, model: str, timeout: float = 30.0) -> dict | None:
     """POST to the compression service. Returns its JSON, or None if unconfigured/unreachable."""
     endpoint = get_endpoint()
     if not endpoint:
         return None
+    return _post_one(endpoint, text, rate, model, timeout)
+
+
+def compress_many(
+    texts: list[str], *, rate: float, model: str, timeout: float = 30.0
+) -> list[dict | None]:
+    """``compress`` for many texts at once: batched, pooled, bounded fan-out; input order kept."""
+    endpoint = get_endpoint()
+    if not endpoint or not texts:
+        return [None] * len(texts)
+    if len(texts) == 1:
+        return [_post_one(endpoint, texts[0], rate, model, timeout)]
+    size = max(1, int(os.getenv("TS_COMPRESS_BATCH_SIZE", str(_DEFAULT_BATCH_SIZE))))
+    batches = [texts[i : i + size] for i in range(0, len(texts), size)]
+    results = _fan_out(lambda batch: _post_batch(endpoint, batch, rate, model, timeout), batches)
+    return [r for batch in results for r in batch]
+
+
+def _fan_out(fn, items: list) -> list:
+    workers = min(_concurrency(), len(items))
+    if workers == 1:
+        return [fn(item) for item in items]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="cutok-compress") as pool:
+        return list(pool.map(fn, items))
+
+
+def _post_one(endpoint: str, text: str, rate: float, model: str, timeout: float) -> dict | None:
     url = endpoint.rstrip("/") + "/v1/compress"
     payload = {"text": text, "rate": rate, "model": model}
     try:
-        if _client is not None:
-            resp = _client.post(url, json=payload)
-        else:
-            import httpx
-
-            resp = httpx.post(url, json=payload, timeout=timeout)
+        resp = _http().post(url, json=payload, timeout=timeout)
         resp.raise_for_status()
         return resp.json()
-    except Exception:
+    except _FAILURES:
         logger.debug("compression service unavailable at %s; leaving text unchanged", url)
         return None
+
+
+def _post_batch(
+    endpoint: str, texts: list[str], rate: float, model: str, timeout: float
+) -> list[dict | None]:
+    if endpoint in _no_batch:
+        return [_post_one(endpoint, t, rate, model, timeout) for t in texts]
+    url = endpoint.rstrip("/") + "/v1/compress:batch"
+    payload = {"texts": texts, "rate": rate, "model": model}
+    try:
+        resp = _http().post(url, json=payload, timeout=timeout)
+        if resp.status_code in (404, 405):  # a service that predates the batch endpoint
+            _no_batch.add(endpoint)
+            return [_post_one(endpoint, t, rate, model, timeout) for t in texts]
+        resp.raise_for_status()
+        results = resp.json()["results"]
+        if len(results) != len(texts):
+            raise ValueError(f"{len(results)} results for {len(texts)} texts")
+        return results
+    except _FAILURES:
+        logger.debug("compression service unavailable at %s; leaving texts unchanged", url)
+        return [None] * len(texts)
@@ -0,0 +1,50 @@
+"""Copy-on-write access to a request payload shared by the optimizer stages.
+
+Request bodies can be tens of megabytes of base64 images and long histories, and every stage
+(cache, compression, response budget) used to ``copy.deepcopy`` the whole thing before touching
+one or two fields. Stages now read the payload directly and mutate only through a
+``PayloadWriter``, which shallow-copies the containers along the path being written — the root
+dict, the ``messages`` list, one message, its content list, one block — and nothing else.
+
+Guarantees: the caller's payload is never mutated, and a stage that changes nothing copies
+nothing. The result shares every untouched sub-object with the input, so callers that want to
+mutate the optimized payload further must copy it themselves.
+"""
+
+
+class PayloadWriter:
+    """Owns the copy of one payload as stages rewrite it.
+
+    Read ``writer.payload``; to write, call ``writer.own(*path)`` to get a container that is safe
+    to mutate. Containers already copied by this writer are reused, so many writes to one message
+    copy it once.
+    """
+
+    def __init__(self, payload: dict) -> None:
+        self.payload = payload
+        # id -> container for every copy this writer made. Holding the object keeps its id from
+        # being recycled for a caller-owned container while the writer is alive.
+        self._owned: dict[int, dict | list] = {}
+
+    def own(self, *path):
+        """Return the container at ``path`` (keys / indexes from the root), copying it and every
+        ancestor not already owned. ``own()`` with no path returns the owned root dict."""
+        if id(self.payload) not in self._owned:
+            self.payload = self._copy(self.payload)
+        node = self.payload
+        for key in path:
+            child = node[key]
+            if id(child) not in self._owned:
+                child = node[key] = self._copy(child)
+            node = child
+        return node
+
+    @property
+    def copied(self) -> bool:
+        """True once any write has happened (i.e. ``payload`` is no longer the caller's object)."""
+        return bool(self._owned)
+
+    def _copy(self, container):
+        copied = container.copy()
+        self._owned[id(copied)] = copied
+        return copied
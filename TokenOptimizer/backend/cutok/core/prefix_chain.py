@@ -0,0 +1,158 @@
+"""Token counts for a conversation's blocks, remembered by the prefix they sit on.
+
+Every request in a long session resends the whole conversation, and the stages that total it up
+(the cache stage's payload estimate, its document check) would count every block again: a
+200-turn session pays for its first turn 200 times. ``PrefixChain`` keys block *k* by a chain
+digest — blake2b of block *k* keyed with block *k-1*'s chain digest — so a key names the block and
+everything before it. An entry holds the block's own count and the running total through it, so
+the total for a payload whose last block was seen before is a single lookup, and otherwise only
+the blocks after the longest remembered prefix are tokenized (in one batched call).
+
+Unlike ``token_cache`` entries, chain entries are small and cover short blocks too. Configured
+from the environment (``TS_PREFIX_CHAIN=0`` disables it, ``TS_PREFIX_CHAIN_ENTRIES`` bounds the
+LRU) or at runtime via ``prefix_chain.configure(...)``.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Sequence
+from itertools import accumulate
+
+from cutok.core.providers import tokenizer_for
+from cutok.core.tokens import count_tokens_batch
+
+_DEFAULT_MAX_ENTRIES = 65536
+_DIGEST_SIZE = 16
+
+
+def chain_digests(texts: Sequence[str]) -> list[bytes]:
+    """The chain digest of each block: block *k*'s digest is keyed with block *k-1*'s."""
+    digests: list[bytes] = []
+    prev = b""
+    for text in texts:
+        prev = hashlib.blake2b(
+            text.encode("utf-8", "surrogatepass"), digest_size=_DIGEST_SIZE, key=prev
+        ).digest()
+        digests.append(prev)
+    return digests
+
+
+class PrefixChain:
+    """Bounded, thread-safe LRU of ``(block count, running total)`` keyed by chain digest.
+
+    Tokenizers without an ``identity`` bypass it. Counting happens outside the lock.
+    """
+
+    def __init__(self, max_entries: int = _DEFAULT_MAX_ENTRIES, *, enabled: bool = True) -> None:
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple[str, bytes], tuple[int, int]] = OrderedDict()
+        self._max_entries = max_entries
+        self._enabled = enabled
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def counts(self, texts: Sequence[str], model: str) -> list[int]:
+        """``count_tokens(t, model).count`` for each block, in order."""
+        return self._lookup(texts, model)[0]
+
+    def totals(self, texts: Sequence[str], model: str) -> list[int]:
+        """Running totals: ``totals[k]`` is the token count of blocks ``0..k``."""
+        return self._lookup(texts, model)[1]
+
+    def total(self, texts: Sequence[str], model: str) -> int:
+        """Token count of all the blocks: one lookup finds the longest remembered prefix, whose
+        entry carries its running total, and only the blocks after it are counted."""
+        keys = self._keys(texts, model)
+        if keys is None:
+            return sum(count_tokens_batch(texts, model))
+        known = base = 0
+        with self._lock:
+            for i in range(len(keys) - 1, -1, -1):
+                entry = self._entries.get(keys[i])
+                if entry is not None:
+                    self._entries.move_to_end(keys[i])
+                    known, base = i + 1, entry[1]
+                    break
+        fresh = count_tokens_batch(texts[known:], model)
+        totals = list(accumulate(fresh, initial=base))[1:]
+        with self._lock:
+            self._hits += known
+            self._misses += len(fresh)
+            for key, n, total in zip(keys[known:], fresh, totals, strict=True):
+                self._entries[key] = (n, total)
+            self._evict_locked()
+        return totals[-1] if totals else base
+
+    def configure(self, *, enabled: bool | None = None, max_entries: int | None = None) -> None:
+        """Turn the chain on/off or resize it. Disabling drops every entry."""
+        with self._lock:
+            if enabled is not None:
+                self._enabled = enabled
+                if not enabled:
+                    self._entries.clear()
+            if max_entries is not None:
+                self._max_entries = max_entries
+                self._evict_locked()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "enabled": self._enabled,
+                "entries": len(self._entries),
+                "max_entries": self._max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def _keys(self, texts: Sequence[str], model: str) -> list[tuple[str, bytes]] | None:
+        identity = getattr(tokenizer_for(model), "identity", None)
+        if not self._enabled or identity is None:
+            return None
+        return [(identity, digest) for digest in chain_digests(texts)]
+
+    def _lookup(self, texts: Sequence[str], model: str) -> tuple[list[int], list[int]]:
+        keys = self._keys(texts, model)
+        if keys is None:
+            counts = count_tokens_batch(texts, model)
+            return counts, list(accumulate(counts))
+        with self._lock:
+            entries = [self._entries.get(key) for key in keys]
+            for key, entry in zip(keys, entries, strict=True):
+                if entry is not None:
+                    self._entries.move_to_end(key)
+        # Past the longest remembered prefix every key misses; a miss inside it is an evicted
+        # entry. Either way only those blocks are counted.
+        missing = [i for i, entry in enumerate(entries) if entry is None]
+        fresh = dict(
+            zip(missing, count_tokens_batch([texts[i] for i in missing], model), strict=True)
+        )
+        counts = [fresh[i] if entry is None else entry[0] for i, entry in enumerate(entries)]
+        totals = list(accumulate(counts))
+        with self._lock:
+            self._hits += len(texts) - len(missing)
+            self._misses += len(missing)
+            for i in missing:
+                self._entries[keys[i]] = (counts[i], totals[i])
+            self._evict_locked()
+        return counts, totals
+
+    def _evict_locked(self) -> None:
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+
+prefix_chain = PrefixChain(
+    max_entries=int(os.getenv("TS_PREFIX_CHAIN_ENTRIES", str(_DEFAULT_MAX_ENTRIES))),
+    enabled=os.getenv("TS_PREFIX_CHAIN", "1") != "0",
+)
@@ -9,46 +9,84 @@ Exactness, by provider:
   - Google Gemini     o200k_base proxy x 1.10      estimate (SentencePiece, not shipped locally)
   - Cohere / DeepSeek / xAI   o200k_base proxy     estimate
 
-Every tokenizer exposes ``exact: bool`` and ``count(text) -> int``. Optional tokenizer libraries
+Every tokenizer exposes ``exact: bool``, ``count(text) -> int``, ``count_batch(texts) -> list[int]``
+for bulk callers (one call instead of a Python loop; tiktoken spreads it over threads), and an
+``identity`` string that
+names the exact vocabulary + scaling it counts with (the token-count cache keys on it, so two models
+sharing one tokenizer share cached counts). The tiktoken-based tokenizers are also ``segmentable``:
+they expose the unscaled ``raw_count`` and a ``scale`` step so per-segment counts can be summed
+exactly (see ``cutok.core.tokens.SegmentCounter``). Optional tokenizer libraries
 are imported lazily; if missing, the tokenizer degrades to a proxy and flips ``exact`` to False,
 so the engine still works on a minimal install and never lies about exactness.
 """
 
+import os
+from collections.abc import Sequence
 from functools import lru_cache
 from typing import Protocol, runtime_checkable
 
 import tiktoken
 
+# tiktoken's batch encoder releases the GIL per text, but spinning up its thread pool costs more
+# than encoding a handful of short strings; small batches stay on the calling thread.
+_BATCH_THREADS = min(8, os.cpu_count() or 1)
+_MIN_THREADED_TEXTS = 16
+_MIN_THREADED_CHARS = 32 * 1024
+
 
 @runtime_checkable
 class Tokenizer(Protocol):
     exact: bool
+    identity: str
 
     def count(self, text: str) -> int: ...
 
+    def count_batch(self, texts: Sequence[str]) -> list[int]: ...
+
 
 @lru_cache(maxsize=8)
 def _encoding(name: str):
     return tiktoken.get_encoding(name)
 
 
+def _encode_lengths(enc, texts: Sequence[str]) -> list[int]:
+    if (
+        _BATCH_THREADS > 1
+        and len(texts) >= _MIN_THREADED_TEXTS
+        and sum(map(len, texts)) >= _MIN_THREADED_CHARS
+    ):
+        return [len(ids) for ids in enc.encode_batch(list(texts), num_threads=_BATCH_THREADS)]
+    return [len(enc.encode(t)) for t in texts]
+
+
 class TiktokenTokenizer:
     """Exact tokenizer for OpenAI models (and a real BPE base for proxies)."""
 
     exact = True
+    segmentable = True
 
     def __init__(self, *, model: str | None = None, encoding: str = "o200k_base") -> None:
         if model is not None:
             try:
                 self._enc = tiktoken.encoding_for_model(model)
-                return
             except KeyError:
-                pass
-        self._enc = _encoding(encoding)
+                self._enc = _encoding(encoding)
+        else:
+            self._enc = _encoding(encoding)
+        self.identity = f"tiktoken:{self._enc.name}"
 
     def count(self, text: str) -> int:
         return len(self._enc.encode(text))
 
+    def count_batch(self, texts: Sequence[str]) -> list[int]:
+        return _encode_lengths(self._enc, texts)
+
+    def raw_count(self, text: str) -> int:
+        return len(self._enc.encode(text))
+
+    def scale(self, raw: int) -> int:
+        return raw
+
 
 class ProxyBPETokenizer:
     """Estimate via a real BPE (o200k_base) scaled by a documented per-provider factor.
@@ -58,13 +96,25 @@ class ProxyBPETokenizer:
     """
 
     exact = False
+    segmentable = True
 
     def __init__(self, factor: float, *, base_encoding: str = "o200k_base") -> None:
         self.factor = factor
         self._enc = _encoding(base_encoding)
+        self.identity = f"proxy:{base_encoding}x{factor}"
 
     def count(self, text: str) -> int:
-        return round(len(self._enc.encode(text)) * self.factor)
+        return self.scale(self.raw_count(text))
+
+    def count_batch(self, texts: Sequence[str]) -> list[int]:
+        return [self.scale(n) for n in _encode_lengths(self._enc, texts)]
+
+    def raw_count(self, text: str) -> int:
+        return len(self._enc.encode(text))
+
+    def scale(self, raw: int) -> int:
+        # Scale the summed BPE count once — rounding per segment would drift from the whole count.
+        return round(raw * self.factor)
 
 
 class MistralTokenizer:
@@ -79,15 +129,22 @@ class MistralTokenizer:
             )
 
             self._inner = _MT.v3().instruct_tokenizer.tokenizer
+            self.identity = "mistral:v3"
         except Exception:
             self._fallback = ProxyBPETokenizer(fallback_factor)
             self.exact = False
+            self.identity = self._fallback.identity
 
     def count(self, text: str) -> int:
         if self._inner is None:
             return self._fallback.count(text)
         return len(self._inner.encode(text, bos=False, eos=False))
 
+    def count_batch(self, texts: Sequence[str]) -> list[int]:
+        if self._inner is None:
+            return self._fallback.count_batch(texts)
+        return [self.count(t) for t in texts]  # mistral-common has no batch encoder
+
 
 class HFTokenizer:
     """Exact tokenizer for local / open models via HF `tokenizers` + a tokenizer.json.
@@ -100,16 +157,21 @@ class HFTokenizer:
         self._tok = None
         self.exact = True
         try:
-            import os
-
             from tokenizers import Tokenizer as _HF
 
             self._tok = _HF.from_file(source) if os.path.exists(source) else _HF.from_pretrained(source)
+            self.identity = f"hf:{source}"
         except Exception:
             self._fallback = ProxyBPETokenizer(fallback_factor)
             self.exact = False
+            self.identity = self._fallback.identity
 
     def count(self, text: str) -> int:
         if self._tok is None:
             return self._fallback.count(text)
         return len(self._tok.encode(text).ids)
+
+    def count_batch(self, texts: Sequence[str]) -> list[int]:
+        if self._tok is None:
+            return self._fallback.count_batch(texts)
+        return [len(enc.ids) for enc in self._tok.encode_batch(list(texts))]
@@ -0,0 +1,156 @@
+"""Content-addressed token-count cache shared by every ``count_tokens`` caller.
+
+One request re-counts the same strings many times — before/after every normalizer pass, per
+paragraph in dedup, in the delta store, and again in the final tally — and BPE-encoding a
+multi-megabyte attachment dominates that cost. Counts are memoized under
+``(tokenizer identity, blake2b digest of the text)`` in a thread-safe LRU bounded by an approximate
+byte budget, so a document is encoded once per tokenizer no matter how many stages ask.
+
+Configured from the environment (``TS_TOKEN_CACHE=0`` disables it, ``TS_TOKEN_CACHE_BYTES`` sets
+the budget) or at runtime via ``token_cache.configure(...)`` / ``cutok.configure(token_cache=...)``.
+Bulk callers use ``count_many``, which sends every miss to the tokenizer's ``count_batch`` at once.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Sequence
+
+_DEFAULT_MAX_BYTES = 8 * 1024 * 1024
+_MIN_CACHED_CHARS = 64  # shorter strings encode faster than they hash + look up
+# Approximate resident cost of one entry beyond its key: OrderedDict node, key tuple, int.
+_ENTRY_OVERHEAD = 120
+_DIGEST_SIZE = 16
+
+
+def _digest(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=_DIGEST_SIZE).digest()
+
+
+class TokenCountCache:
+    """Bounded, thread-safe LRU of token counts keyed by tokenizer identity + text digest.
+
+    Tokenizers without an ``identity`` (e.g. a caller's custom object) bypass the cache, as do
+    strings shorter than ``_MIN_CACHED_CHARS``. Encoding happens outside the lock, so concurrent
+    requests never serialize on a slow count.
+    """
+
+    def __init__(self, max_bytes: int = _DEFAULT_MAX_BYTES, *, enabled: bool = True) -> None:
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple[str, bytes], int] = OrderedDict()
+        self._bytes = 0
+        self._max_bytes = max_bytes
+        self._enabled = enabled
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def count(self, tokenizer, text: str) -> int:
+        """Return ``tokenizer.count(text)``, memoized when the cache is on and the text is large."""
+        identity = getattr(tokenizer, "identity", None)
+        if not self._enabled or identity is None or len(text) < _MIN_CACHED_CHARS:
+            return tokenizer.count(text)
+        key = (identity, _digest(text))
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return cached
+            self._misses += 1
+        n = tokenizer.count(text)
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = n
+                self._bytes += _entry_bytes(key)
+                self._evict_locked()
+        return n
+
+    def count_many(self, tokenizer, texts: Sequence[str]) -> list[int]:
+        """Counts for ``texts`` in order: cache hits are served, every miss goes out in one
+        ``tokenizer.count_batch`` call (repeats within the batch are encoded once)."""
+        identity = getattr(tokenizer, "identity", None)
+        use_cache = self._enabled and identity is not None
+        counts: list[int | None] = [None] * len(texts)
+        pending: dict[str, list[int]] = {}  # text -> positions still to count
+        keys: dict[str, tuple[str, bytes]] = {}
+        if use_cache:
+            for text in texts:
+                if len(text) >= _MIN_CACHED_CHARS and text not in keys:
+                    keys[text] = (identity, _digest(text))
+        with self._lock:
+            for i, text in enumerate(texts):
+                key = keys.get(text)
+                if key is not None:
+                    cached = self._entries.get(key)
+                    if cached is not None:
+                        self._entries.move_to_end(key)
+                        self._hits += 1
+                        counts[i] = cached
+                        continue
+                    self._misses += 1
+                pending.setdefault(text, []).append(i)
+        if pending:
+            batch = list(pending)
+            encode = getattr(tokenizer, "count_batch", None)
+            fresh = encode(batch) if encode is not None else [tokenizer.count(t) for t in batch]
+            with self._lock:
+                for text, n in zip(batch, fresh, strict=True):
+                    for i in pending[text]:
+                        counts[i] = n
+                    key = keys.get(text)
+                    if key is not None and key not in self._entries:
+                        self._entries[key] = n
+                        self._bytes += _entry_bytes(key)
+                self._evict_locked()
+        return counts
+
+    def configure(self, *, enabled: bool | None = None, max_bytes: int | None = None) -> None:
+        """Turn the cache on/off or resize it. Disabling drops every entry."""
+        with self._lock:
+            if enabled is not None:
+                self._enabled = enabled
+                if not enabled:
+                    self._clear_locked()
+            if max_bytes is not None:
+                self._max_bytes = max_bytes
+                self._evict_locked()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._clear_locked()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "enabled": self._enabled,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self._max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def _evict_locked(self) -> None:
+        while self._entries and self._bytes > self._max_bytes:
+            key, _ = self._entries.popitem(last=False)
+            self._bytes -= _entry_bytes(key)
+            self._evictions += 1
+
+    def _clear_locked(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+
+def _entry_bytes(key: tuple[str, bytes]) -> int:
+    return _ENTRY_OVERHEAD + len(key[0]) + len(key[1])
+
+
+token_cache = TokenCountCache(
+    max_bytes=int(os.getenv("TS_TOKEN_CACHE_BYTES", str(_DEFAULT_MAX_BYTES))),
+    enabled=os.getenv("TS_TOKEN_CACHE", "1") != "0",
+)
@@ -5,12 +5,32 @@ real local tokenizer exists (OpenAI via tiktoken, Mistral via mistral-common, lo
 ``tokenizers``), and an honest BPE-proxy estimate where the provider ships none (Anthropic,
 Gemini, Cohere, DeepSeek, xAI). ``TokenCount.exact`` reflects which path was taken — the engine
 never presents an estimate as exact.
+
+Counts go through the shared content-addressed cache in ``cutok.core.token_cache``, so the many
+stages that re-count the same document within a request encode it once. Multi-pass rewriters use
+``SegmentCounter`` instead, which re-encodes only the paragraphs a pass actually changed.
 """
 
+import re
+from collections.abc import Sequence
+
 from cutok.core.providers import provider_for, resolve, tokenizer_for
+from cutok.core.token_cache import token_cache
 from cutok.core.types import Provider, TokenCount
 
-__all__ = ["count_tokens", "provider_for", "estimate_bounds", "Provider"]
+__all__ = [
+    "count_tokens",
+    "count_tokens_batch",
+    "provider_for",
+    "estimate_bounds",
+    "Provider",
+    "SegmentCounter",
+]
+
+# A segment ends after a blank line that is followed by a character no newline-bearing BPE
+# pre-token can absorb (anything but whitespace or "/"). For the tiktoken regex families that makes
+# every boundary a pre-token boundary, so per-segment counts sum exactly to the whole-text count.
+_SEGMENT_BOUNDARY = re.compile(r"\n\n(?=[^\s/])")
 
 
 def count_tokens(text: str, model: str) -> TokenCount:
@@ -18,7 +38,63 @@ def count_tokens(text: str, model: str) -> TokenCount:
     tokenizer = tokenizer_for(model)
     if not text:
         return TokenCount(count=0, model=model, exact=tokenizer.exact)
-    return TokenCount(count=tokenizer.count(text), model=model, exact=tokenizer.exact)
+    return TokenCount(count=token_cache.count(tokenizer, text), model=model, exact=tokenizer.exact)
+
+
+def count_tokens_batch(texts: Sequence[str], model: str) -> list[int]:
+    """Token counts for many strings at once, in order — ``count_tokens(t, model).count`` for each.
+
+    Use this wherever the engine would otherwise loop over hundreds of paragraphs or message
+    blocks: cache misses go to the tokenizer's ``count_batch`` in a single call.
+    """
+    if not texts:
+        return []
+    return token_cache.count_many(tokenizer_for(model), texts)
+
+
+def split_segments(text: str) -> list[str]:
+    """Split ``text`` at count-composable paragraph boundaries. ``"".join`` restores it exactly."""
+    segments: list[str] = []
+    start = 0
+    for m in _SEGMENT_BOUNDARY.finditer(text):
+        segments.append(text[start : m.end()])
+        start = m.end()
+    segments.append(text[start:])
+    return segments
+
+
+class SegmentCounter:
+    """Incremental token counts for one document as it is rewritten pass by pass.
+
+    Each count splits the text at ``split_segments`` boundaries and encodes only segments this
+    counter has not seen, so a pass that edits a few paragraphs costs a few paragraphs of BPE
+    instead of the whole document. Totals equal ``count_tokens(text, model).count`` exactly;
+    tokenizers that can't guarantee that (not ``segmentable``) fall back to whole-text counts.
+    Scoped to one document's passes — create one per normalize call, not per process.
+    """
+
+    def __init__(self, model: str, *, tokenizer=None) -> None:
+        self.model = model
+        self._tokenizer = tokenizer or tokenizer_for(model)
+        self._raw: dict[str, int] = {}
+        self._last: tuple[str, int] | None = None
+
+    def count(self, text: str) -> int:
+        if self._last is not None and self._last[0] is text:
+            return self._last[1]
+        tok = self._tokenizer
+        if not getattr(tok, "segmentable", False):
+            total = token_cache.count(tok, text) if text else 0
+        else:
+            raw = 0
+            for segment in split_segments(text):
+                n = self._raw.get(segment)
+                if n is None:
+                    n = self._raw[segment] = tok.raw_count(segment) if segment else 0
+                raw += n
+            total = tok.scale(raw)
+        self._last = (text, total)
+        return total
 
 
 def estimate_bounds(text: str, model: str) -> tuple[int, int, int]:
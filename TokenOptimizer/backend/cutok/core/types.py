@@ -57,5 +57,11 @@ class OptimizerConfig:
     provider: Provider = Provider.ANTHROPIC
     enable_compression: bool = True  # compress by default (no-op for prompts/prose without a service)
     compression_keep_ratio: float = 0.8  # model keep-ratio (gentle default)
+    compression_min_tokens: int = 16  # blocks below this skip the compression round trip
     inject_brevity: bool = False  # response-budget directive is opt-in
     max_output_tokens: int | None = None
+    near_dedup_threshold: float | None = None  # opt-in: collapse paragraphs with Jaccard >= this
+    dedup_history: bool = True  # collapse paragraphs repeated from earlier messages
+    max_attachment_tokens: int | None = None  # opt-in: stream PDFs, truncating at this budget
+    canonicalize_schemas: bool = True  # stable tool order / schema keys, no generated titles
+    prefix_fixes: frozenset[str] = frozenset()  # cache breakers to canonicalize (proxy autofix)
@@ -4,15 +4,24 @@ Single-file passes: strip trailing whitespace, collapse blank-line runs. Cross-f
 dedup an identical leading license-header comment block across a fileset. Comments are never
 otherwise touched. For ``.py`` files the result is reverted to the original if the AST changes
 (e.g. trailing whitespace inside a triple-quoted string is meaningful), so the guarantee holds.
+
+``strip_comments`` is the opt-in lossy tier: it removes full-line and trailing comments found by
+a lexer — ``tokenize`` for Python, a string-aware scanner for the ``//`` languages — so a ``#``
+or ``//`` inside a string literal is never mistaken for one. Tool directives (``# type:``,
+``//go:build``, ``/// <reference>``...) are kept. AST dumps are memoized by source, so checking a
+rewrite costs one parse of the rewrite, not another of the original.
 """
 
 import ast
 import hashlib
+import io
 import re
+import tokenize
 from collections import defaultdict
+from functools import lru_cache
 from pathlib import Path
 
-from cutok.core.tokens import count_tokens
+from cutok.core.tokens import SegmentCounter, count_tokens
 from cutok.core.types import Change, NormalizeResult
 
 _LINE_COMMENT = {
@@ -50,11 +59,19 @@ def _collapse_blanks(text: str) -> str:
     return _BLANK_RE.sub("\n\n", text)
 
 
-def _ast_equal(before: str, after: str) -> bool:
+@lru_cache(maxsize=128)
+def _ast_fingerprint(source: str) -> bytes | None:
+    """Digest of ``ast.dump(ast.parse(source))``, or None when ``source`` doesn't parse."""
     try:
-        return ast.dump(ast.parse(before)) == ast.dump(ast.parse(after))
-    except SyntaxError:
-        return False
+        dump = ast.dump(ast.parse(source))
+    except (SyntaxError, ValueError):  # ValueError: null bytes, on older Pythons
+        return None
+    return hashlib.blake2b(dump.encode("utf-8"), digest_size=16).digest()
+
+
+def _ast_equal(before: str, after: str) -> bool:
+    fingerprint = _ast_fingerprint(before)
+    return fingerprint is not None and fingerprint == _ast_fingerprint(after)
 
 
 class CodeNormalizer:
@@ -68,18 +85,19 @@ class CodeNormalizer:
         guarantee = "ast-identical" if ext == ".py" else "render-equivalent"
         current = text
         changes: list[Change] = []
+        counter = SegmentCounter(model)
         for fn, kind, desc in (
             (_strip_trailing, "strip_trailing_ws", "stripped trailing whitespace"),
             (_collapse_blanks, "collapse_blank_lines", "collapsed runs of 3+ blank lines"),
         ):
             new = fn(current)
             if new != current:
-                before = count_tokens(current, model).count
-                after = count_tokens(new, model).count
+                before = counter.count(current)
+                after = counter.count(new)
                 changes.append(Change(kind=kind, description=desc, tokens_saved=before - after))
                 current = new
 
-        if ext == ".py" and not _ast_equal(text, current):
+        if ext == ".py" and current != text and not _ast_equal(text, current):
             # A transform changed semantics (or the file doesn't parse) — revert to be safe.
             return NormalizeResult(text=text, changes=[], guarantee=guarantee)
         return NormalizeResult(text=current, changes=changes, guarantee=guarantee)
@@ -150,3 +168,171 @@ def _hash_block(block: str, prefix: str) -> str:
             s = s[len(prefix):]
         norm.append(s.strip())
     return hashlib.sha256("\n".join(norm).encode("utf-8")).hexdigest()
+
+
+# --- Comment stripping (opt-in lossy tier) ----------------------------------------------------
+
+# Comments that tools read: type checkers, linters, formatters, coverage.
+_PY_DIRECTIVE_RE = re.compile(r"#\s*(?:type:|noqa|pragma|pylint:|mypy:|fmt:|isort:|pyright:|ruff:)")
+_PY_CODING_RE = re.compile(r"^[ \t\f]*#.*?coding[:=]")
+
+
+def strip_comments(text: str, filename: str) -> str:
+    """Remove comments from code; ``text`` unchanged when the file can't be lexed safely.
+
+    Python goes through ``tokenize`` and is AST-verified (comments aren't in the AST), so it stays
+    ast-identical. The ``//`` languages are scanned by ``_strip_slash_comments``; ``#`` languages
+    other than Python keep the line-prefix rule (whole comment lines only).
+    """
+    ext = Path(filename).suffix.lower()
+    prefix = _LINE_COMMENT.get(ext)
+    if ext == ".py":
+        stripped = _strip_python_comments(text)
+        return stripped if stripped == text or _ast_equal(text, stripped) else text
+    if prefix == "//":
+        return _strip_slash_comments(text, ext)
+    if prefix:
+        return "\n".join(ln for ln in text.split("\n") if not ln.lstrip().startswith(prefix))
+    return text
+
+
+def _strip_python_comments(text: str) -> str:
+    lines = text.split("\n")  # tokenize rows, as ``StringIO.readline`` splits only at "\n"
+    try:
+        comments = [
+            tok
+            for tok in tokenize.generate_tokens(io.StringIO(text).readline)
+            if tok.type == tokenize.COMMENT
+        ]
+    except (tokenize.TokenError, SyntaxError):
+        return text
+    drop: set[int] = set()
+    for tok in comments:
+        (row, col), (_, end) = tok.start, tok.end
+        if _PY_DIRECTIVE_RE.match(tok.string):
+            continue
+        if row <= 2 and (tok.string.startswith("#!") or _PY_CODING_RE.match(lines[row - 1])):
+            continue
+        line = lines[row - 1]
+        if not line[:col].strip():
+            drop.add(row - 1)
+        else:
+            lines[row - 1] = line[:col].rstrip() + line[end:]
+    if not comments:
+        return text
+    return "\n".join(line for i, line in enumerate(lines) if i not in drop)
+
+
+# String-literal syntaxes of the ``//`` languages. Each scanner matches, leftmost first, a line
+# comment, a block comment, a string literal, a (JS) regex literal, or a quote that opens none
+# of them — a sign the scanner has lost track, so the file is left alone.
+_DQ = r'"(?:[^"\\\n]|\\[\s\S])*"'
+_DQ_MULTILINE = r'"(?:[^"\\]|\\[\s\S])*"'
+_SQ = r"'(?:[^'\\\n]|\\[\s\S])*'"
+_SQ_MULTILINE = r"'(?:[^'\\]|\\[\s\S])*'"
+_CHAR = r"'(?:[^'\\\n]|\\[^\n][^'\n]{0,9})'"
+_TEMPLATE = r"`(?:[^`\\]|\\[\s\S])*`"
+_RAW_BACKTICK = r"`[^`]*`"
+_TRIPLE = r'"""[\s\S]*?"""'
+_VERBATIM = r'(?:\$@|@\$?)"(?:[^"]|"")*"'
+_CPP_RAW = r'(?<![\w])(?:u8|[uUL])?R"(?P<delim>[^()\\\s"]{0,16})\([\s\S]*?\)(?P=delim)"'
+_RUST_RAW = r'(?<![\w])b?r(?P<hashes>#*)"[\s\S]*?"(?P=hashes)'
+_HEREDOC = r"<<<[ \t]*['\"]?(?P<tag>\w+)['\"]?\n[\s\S]*?\n[ \t]*(?P=tag)\b"
+_REGEX = r"/(?![/*])(?:[^/\\\n\[]|\\.|\[(?:[^\]\\\n]|\\.)*\])+/"
+
+_C_STRINGS = (_DQ, _CHAR)
+_JS_STRINGS = (_DQ, _SQ, _TEMPLATE)
+_SLASH_SYNTAX = {  # ext -> (string patterns, quotes that may stand alone, nested block comments)
+    ".c": (_C_STRINGS, "", False),
+    ".h": (_C_STRINGS, "", False),
+    ".cpp": ((_CPP_RAW, *_C_STRINGS), "", False),
+    ".cc": ((_CPP_RAW, *_C_STRINGS), "", False),
+    ".hpp": ((_CPP_RAW, *_C_STRINGS), "", False),
+    ".java": ((_TRIPLE, *_C_STRINGS), "", False),
+    ".cs": ((_VERBATIM, _TRIPLE, *_C_STRINGS), "", False),
+    ".go": ((_RAW_BACKTICK, *_C_STRINGS), "", False),
+    ".kt": ((_TRIPLE, *_C_STRINGS), "", True),
+    ".scala": ((_TRIPLE, *_C_STRINGS), "'", True),  # 'symbol literals
+    ".swift": ((_TRIPLE, _DQ), "", True),
+    ".rs": ((_RUST_RAW, _DQ_MULTILINE, _CHAR), "'", True),  # 'lifetimes
+    ".php": ((_HEREDOC, _DQ_MULTILINE, _SQ_MULTILINE), "", False),
+    ".js": ((*_JS_STRINGS, _REGEX), "", False),
+    ".ts": ((*_JS_STRINGS, _REGEX), "", False),
+    ".jsx": ((*_JS_STRINGS, _REGEX), "", False),
+    ".tsx": ((*_JS_STRINGS, _REGEX), "", False),
+}
+_JSX_EXTS = {".jsx", ".tsx"}  # JSX text is not lexed: there, only whole comment lines go
+
+# Doc comments and directives: ``///`` and ``//!`` (doc / TS references), ``//#`` (source maps),
+# Go and cgo directives, and linter / formatter / coverage pragmas.
+_SLASH_DIRECTIVE_RE = re.compile(
+    r"//(?:[/!#]|go:|\+build|export |extern |line "
+    r"|\s*(?:\+build|@ts-|eslint|prettier-ignore|istanbul|c8 |nolint|NOLINT|lint:))"
+)
+# Keywords after which ``/`` starts a regex literal rather than a division.
+_REGEX_AFTER_WORD = re.compile(
+    r"(?:^|[^\w$])(?:return|typeof|case|do|else|in|of|void|yield|await|delete|instanceof|new)$"
+)
+
+
+def _slash_scanner(strings: tuple[str, ...]) -> re.Pattern:
+    alternatives = [r"(?P<line>//[^\r\n]*)", r"(?P<block>/\*[\s\S]*?\*/)"]
+    alternatives += [f"(?P<s{i}>{pattern})" for i, pattern in enumerate(strings)]
+    alternatives.append(r"(?P<quote>[\"'`])")
+    return re.compile("|".join(alternatives))
+
+
+_SLASH_SCANNERS = {ext: _slash_scanner(syntax[0]) for ext, syntax in _SLASH_SYNTAX.items()}
+
+
+def _regex_allowed(text: str, pos: int) -> bool:
+    before = text[max(0, pos - 16) : pos].rstrip()
+    return not before or before[-1] in "(,=:[!&|?{};+-*%<>~^" or bool(
+        _REGEX_AFTER_WORD.search(before)
+    )
+
+
+def _strip_slash_comments(text: str, ext: str) -> str:
+    strings, lone_quotes, nested = _SLASH_SYNTAX[ext]
+    scanner = _SLASH_SCANNERS[ext]
+    regex_group = f"s{strings.index(_REGEX)}" if _REGEX in strings else None
+    cuts: list[tuple[int, int]] = []
+    pos = 0
+    while (m := scanner.search(text, pos)) is not None:
+        kind = m.lastgroup
+        if kind == regex_group and not _regex_allowed(text, m.start()):
+            pos = m.start() + 1  # a division operator
+            continue
+        if kind == "quote":
+            if m.group() not in lone_quotes:
+                return text
+        elif kind == "block":
+            if nested and "/*" in m.group()[2:]:
+                return text
+        elif kind == "line":
+            comment = m.group()
+            # A trailing backslash splices the next line into the comment (C preprocessor), and
+            # in PHP ``?>`` ends a line comment along with PHP mode.
+            keep = _SLASH_DIRECTIVE_RE.match(comment) or comment.endswith("\\") or "?>" in comment
+            if not keep:
+                cuts.append(m.span())
+        pos = m.end()
+    if not cuts:
+        return text
+
+    out: list[str] = []
+    last = 0
+    for start, end in cuts:
+        line_start = text.rfind("\n", 0, start) + 1
+        if not text[line_start:start].strip():
+            # A whole comment line: drop it with its line break.
+            out.append(text[last:line_start])
+            last = end
+            for newline in ("\n", "\r\n"):
+                if text.startswith(newline, end):
+                    last = end + len(newline)
+        elif ext not in _JSX_EXTS:
+            out.append(text[last:start].rstrip(" \t"))
+            last = end
+    out.append(text[last:])
+    return "".join(out)
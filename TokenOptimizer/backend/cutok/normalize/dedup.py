@@ -3,29 +3,30 @@
 A paragraph repeated (>= ``min_chunk_tokens`` tokens) in two or more documents is kept verbatim
 at its first occurrence; later occurrences become a reference ``[¶ identical to ¶N in <name>]``.
 Paragraphs inside fenced code blocks are never touched. Output is deterministic.
+
+Opt-in near-duplicate mode (``near_threshold``): paragraphs that differ by a date or a name —
+contract versions, templated reports, quoted email threads — are found with MinHash + LSH
+(``minhash``), verified by exact word-3-gram Jaccard >= the threshold, and replaced by a reference
+to the earlier verbatim paragraph plus its word-level edits:
+``[¶ as ¶N in <name>, with "5 May" → "9 June"; "Alice" → "Bob"]``. A reference is only used
+when it costs at most three quarters of the paragraph's tokens.
 """
 
 import hashlib
 import re
-from collections import defaultdict
 
-from cutok.core.tokens import count_tokens
+from cutok.core.tokens import count_tokens_batch
 from cutok.core.types import Change
-from cutok.normalize.textclean import split_fences
+from cutok.normalize.diff import opcodes
+from cutok.normalize.document import Document, document
+from cutok.normalize.minhash import LSHIndex, jaccard, shingles, signature
 
-_PARA_SPLIT = re.compile(r"(\n[ \t]*\n)")  # capture blank-line separators so we can rebuild
+_NEAR_MAX_REF_RATIO = 0.75  # a near-duplicate reference must save at least a quarter
 
 
 def _tokenize(text: str) -> list[list]:
     """Break a document into [type, value, index] items: code blocks, paragraphs, separators."""
-    items: list[list] = []
-    for is_code, seg in split_fences(text):
-        if is_code:
-            items.append(["code", seg, None])
-            continue
-        for i, piece in enumerate(_PARA_SPLIT.split(seg)):
-            items.append(["sep" if i % 2 == 1 else "para", piece, None])
-    return items
+    return [[kind, value, None] for kind, value in document(text).blocks]
 
 
 def _chunk_hash(paragraph: str) -> str:
@@ -33,57 +34,169 @@ def _chunk_hash(paragraph: str) -> str:
     return hashlib.sha256(norm.encode("utf-8")).hexdigest()
 
 
+def _parse(text: str) -> tuple[tuple[tuple[str, str, int | None, str | None], ...], frozenset]:
+    """``_tokenize`` with paragraph numbers and hashes, plus the set of the document's hashes.
+
+    Kept as a view of the shared ``Document``: a growing conversation resends the same
+    attachments on every request, so only new documents are split and hashed, and the parse is
+    dropped with its document from the byte-bounded document cache.
+    """
+    return document(text).view("dedup", _parse_document)
+
+
+def _parse_document(doc: Document) -> tuple:
+    items = []
+    idx = 0
+    for kind, value in doc.blocks:
+        if kind == "para" and value.strip():
+            idx += 1
+            items.append((kind, value, idx, _chunk_hash(value)))
+        else:
+            items.append((kind, value, None, None))
+    return tuple(items), frozenset(h for *_, h in items if h is not None)
+
+
 def dedup_chunks(
-    named_texts: dict[str, str], model: str, min_chunk_tokens: int = 40
+    named_texts: dict[str, str],
+    model: str,
+    min_chunk_tokens: int = 40,
+    *,
+    near_threshold: float | None = None,
 ) -> tuple[dict[str, str], list[Change]]:
     names = sorted(named_texts)
-    docs_items = {name: _tokenize(named_texts[name]) for name in names}
+    parsed = {name: _parse(named_texts[name]) for name in names}
+
+    # Only paragraphs seen in 2+ documents can be deduped. Set operations find them without
+    # visiting every paragraph, and documents sharing none are passed through untouched.
+    seen_hashes: set[str] = set()
+    shared: set[str] = set()
+    for name in names:
+        hashes = parsed[name][1]
+        shared |= hashes & seen_hashes
+        seen_hashes |= hashes
+    if near_threshold is None:
+        expand = [name for name in names if not parsed[name][1].isdisjoint(shared)]
+    else:
+        expand = names
+    # Items are [type, value, paragraph number, chunk hash]; only the first two are rewritten.
+    docs_items = {name: [list(item) for item in parsed[name][0]] for name in expand}
 
-    hash_docs: dict[str, set[str]] = defaultdict(set)
     hash_first: dict[str, tuple[str, int]] = {}
-    chunk_tokens: dict[str, int] = {}
+    first_text: dict[str, str] = {}
+    for name in expand:
+        for _, value, idx, h in parsed[name][0]:
+            if h in shared and h not in hash_first:
+                hash_first[h] = (name, idx)
+                first_text[h] = value
 
-    for name in names:
-        idx = 0
-        for item in docs_items[name]:
-            if item[0] == "para" and item[1].strip():
-                idx += 1
-                item[2] = idx
-                h = _chunk_hash(item[1])
-                hash_docs[h].add(name)
-                if h not in hash_first:
-                    hash_first[h] = (name, idx)
-                    chunk_tokens[h] = count_tokens(item[1], model).count
-
-    eligible = {
-        h
-        for h, docs in hash_docs.items()
-        if len(docs) >= 2 and chunk_tokens[h] >= min_chunk_tokens
-    }
+    chunk_tokens = dict(
+        zip(hash_first, count_tokens_batch(list(first_text.values()), model), strict=True)
+    )
+    eligible = {h for h, tokens in chunk_tokens.items() if tokens >= min_chunk_tokens}
 
     seen: set[str] = set()
-    changes: list[Change] = []
-    result: dict[str, str] = {}
-    for name in names:
-        out: list[str] = []
+    replaced: list[tuple[str, str, str, str]] = []  # (paragraph, ref, kind, description)
+    for name in expand:
         for item in docs_items[name]:
-            if item[0] == "para" and item[1].strip():
-                h = _chunk_hash(item[1])
-                if h in eligible:
-                    if h in seen:
-                        kept_name, kept_idx = hash_first[h]
-                        ref = f"[¶ identical to ¶{kept_idx} in {kept_name}]"
-                        saved = count_tokens(item[1], model).count - count_tokens(ref, model).count
-                        changes.append(
-                            Change(
-                                kind="dedup_chunk",
-                                description=f"paragraph identical to ¶{kept_idx} in {kept_name}",
-                                tokens_saved=saved,
-                            )
-                        )
-                        out.append(ref)
-                        continue
-                    seen.add(h)
-            out.append(item[1])
-        result[name] = "".join(out)
+            h = item[3]
+            if h in eligible:
+                if h in seen:
+                    kept_name, kept_idx = hash_first[h]
+                    ref = f"[¶ identical to ¶{kept_idx} in {kept_name}]"
+                    description = f"paragraph identical to ¶{kept_idx} in {kept_name}"
+                    replaced.append((item[1], ref, "dedup_chunk", description))
+                    item[0], item[1] = "ref", ref
+                    continue
+                seen.add(h)
+
+    if near_threshold is not None:
+        replaced.extend(_near_dedup(names, docs_items, model, min_chunk_tokens, near_threshold))
+    result = {name: named_texts[name] for name in names}
+    for name, items in docs_items.items():
+        result[name] = "".join(item[1] for item in items)
+
+    counts = count_tokens_batch([t for para, ref, *_ in replaced for t in (para, ref)], model)
+    changes = [
+        Change(kind=kind, description=description, tokens_saved=counts[2 * i] - counts[2 * i + 1])
+        for i, (_, _, kind, description) in enumerate(replaced)
+    ]
     return result, changes
+
+
+def _near_dedup(
+    names: list[str],
+    docs_items: dict[str, list[list]],
+    model: str,
+    min_chunk_tokens: int,
+    threshold: float,
+) -> list[tuple[str, str, str, str]]:
+    """Replace near-duplicates of earlier verbatim paragraphs in place; return what was replaced.
+
+    Only verbatim paragraphs are indexed, so a reference never points at another reference.
+    """
+    index = LSHIndex()
+    kept: list[tuple[str, list, set[int]]] = []  # (doc name, item, shingles)
+    matches: list[tuple[list, int, float]] = []  # (item, kept position, similarity)
+    for name in names:
+        for item in docs_items[name]:
+            if item[0] != "para" or item[2] is None:
+                continue
+            hashed = shingles(item[1])
+            if not hashed:
+                continue
+            sig = signature(hashed)
+            best, best_sim = None, threshold
+            for k in sorted(index.candidates(sig)):
+                sim = jaccard(hashed, kept[k][2])
+                if sim > best_sim or (best is None and sim >= best_sim):
+                    best, best_sim = k, sim
+            if best is None:
+                index.add(sig, len(kept))
+                kept.append((name, item, hashed))
+            else:
+                matches.append((item, best, best_sim))
+    if not matches:
+        return []
+
+    refs = []
+    for item, k, _ in matches:
+        kept_name, kept_item, _ = kept[k]
+        edits = _word_edits(kept_item[1], item[1])
+        if edits:
+            refs.append(f"[¶ as ¶{kept_item[2]} in {kept_name}, with {'; '.join(edits)}]")
+        else:
+            refs.append(f"[¶ identical to ¶{kept_item[2]} in {kept_name}]")
+    pairs = zip(matches, refs, strict=True)
+    counts = count_tokens_batch([t for (item, _, _), ref in pairs for t in (item[1], ref)], model)
+    replaced = []
+    for i, ((item, k, sim), ref) in enumerate(zip(matches, refs, strict=True)):
+        para_tokens, ref_tokens = counts[2 * i], counts[2 * i + 1]
+        if para_tokens < min_chunk_tokens or ref_tokens > _NEAR_MAX_REF_RATIO * para_tokens:
+            continue
+        kept_name, kept_item, _ = kept[k]
+        description = (
+            f"paragraph near-identical to ¶{kept_item[2]} in {kept_name} (similarity {sim:.2f})"
+        )
+        replaced.append((item[1], ref, "near_dedup_chunk", description))
+        item[0], item[1] = "ref", ref
+    return replaced
+
+
+def _word_edits(old: str, new: str) -> list[str]:
+    """Word-level edits turning ``old`` into ``new`` as ``"before" → "after"`` phrases.
+
+    Pure insertions and deletions borrow a neighbouring word, so every phrase names text that
+    exists in ``old``.
+    """
+    a, b = old.split(), new.split()
+    edits = []
+    for tag, i1, i2, j1, j2 in opcodes(a, b):
+        if tag == "equal":
+            continue
+        if i1 == i2 or j1 == j2:
+            if i1 > 0:
+                i1, j1 = i1 - 1, j1 - 1
+            else:
+                i2, j2 = i2 + 1, j2 + 1
+        edits.append(f'"{" ".join(a[i1:i2])}" → "{" ".join(b[j1:j2])}"')
+    return edits
@@ -1,22 +1,30 @@
 """Delta-encode resent files: when the same file is sent again, send a unified diff, not the file.
 
 CRITICAL invariant: the store always holds the latest FULL text of each key, never a diff. So a
-third send diffs against the second version, not the first. LRU-bounded by file key.
-"""
+third send diffs against the second version, not the first. The read of the previous version
+and the write of the new one are one atomic swap, so concurrent requests (the proxy optimizes on
+a worker pool) never lose an update or diff against a torn state.
 
-import difflib
-from collections import OrderedDict
+Diffs come from ``diff.unified_diff`` (histogram diff, difflib's output format), which stays
+near-linear on large and repetitive files where ``difflib`` goes quadratic. Where the texts live
+is a pluggable backend (``delta_backends``): by default a compressed, byte-budgeted in-memory
+LRU; optionally sharded, or a SQLite file that survives restarts and is shared between proxy
+worker processes.
+"""
 
 from cutok.core.tokens import count_tokens
 from cutok.core.types import Change
+from cutok.normalize.delta_backends import DeltaBackend, MemoryBackend, backend_from_env
+from cutok.normalize.diff import unified_diff
+from cutok.normalize.document import document
 
 _DIFF_RATIO = 0.6  # use the diff only if it is < 60% of the full text's tokens
 
 
 class DeltaStore:
-    def __init__(self, max_files: int = 200) -> None:
-        self._max_files = max_files
-        self._store: OrderedDict[str, str] = OrderedDict()
+    def __init__(self, max_files: int = 200, *, backend: DeltaBackend | None = None) -> None:
+        # ``max_files`` only sizes the default backend; an explicit backend brings its own bounds.
+        self.backend = backend if backend is not None else MemoryBackend(max_files=max_files)
 
     def process(self, key: str, text: str, model: str) -> tuple[str, Change | None]:
         """Return (payload, change). First sight stores and returns text unchanged (change=None).
@@ -25,21 +33,20 @@ class DeltaStore:
         enough, return it, otherwise return the full text. Either way the store is updated to the
         NEW full text.
         """
-        if key not in self._store:
-            self._remember(key, text)
+        # Always advance the store to the new full text — never store a diff.
+        previous = self.backend.swap(key, text)
+        if previous is None:
             return text, None
 
-        previous = self._store[key]
-        diff = "".join(
-            difflib.unified_diff(
-                previous.splitlines(keepends=True),
-                text.splitlines(keepends=True),
+        if previous == text:  # unchanged resend, e.g. an old attachment in a growing chat
+            diff = ""
+        else:
+            diff = unified_diff(
+                list(document(previous).lines),
+                list(document(text).lines),
                 fromfile=key,
                 tofile=key,
             )
-        )
-        # Always advance the store to the new full text — never store a diff.
-        self._remember(key, text)
 
         full_tokens = count_tokens(text, model).count
         diff_tokens = count_tokens(diff, model).count
@@ -54,8 +61,10 @@ class DeltaStore:
             return payload, change
         return text, None
 
-    def _remember(self, key: str, text: str) -> None:
-        self._store[key] = text
-        self._store.move_to_end(key)
-        while len(self._store) > self._max_files:
-            self._store.popitem(last=False)
+    def stats(self) -> dict:
+        return self.backend.stats()
+
+
+def delta_store_from_env() -> DeltaStore:
+    """A ``DeltaStore`` on the backend selected by ``TS_DELTA_STORE`` (default: memory)."""
+    return DeltaStore(backend=backend_from_env(max_files=200))
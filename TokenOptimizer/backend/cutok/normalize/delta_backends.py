@@ -0,0 +1,269 @@
+"""Storage backends for ``DeltaStore``: where the latest full text of each resent file lives.
+
+Every backend implements one primitive, ``swap(key, text) -> previous | None``: store ``text`` as
+the latest version of ``key`` and return the version it replaced, atomically. That keeps the
+delta invariant (the store always holds the latest FULL text, never a diff) on every backend, and
+means concurrent requests never diff against a torn state or lose an update.
+
+  - ``MemoryBackend``: thread-safe LRU bounded by a total byte budget (and optionally an entry
+    count), texts stored compressed — zstd when ``zstandard`` is installed, zlib otherwise.
+  - ``SqliteBackend``: a WAL-mode SQLite file. Survives restarts and is shared by every process
+    that opens the same path (``process``-mode proxy workers, several proxies on one host).
+  - ``ShardedBackend``: N independent backends, keys routed by hash, so concurrent swaps on
+    different files don't serialize on one lock. LRU is per shard, which approximates global LRU.
+
+A text larger than the whole budget (a shard's share of it, for ``ShardedBackend``) is not kept,
+and storing it drops only the key's previous version: its next send is treated as a first sight.
+Selected with ``TS_DELTA_STORE=memory|sharded|sqlite`` (see ``backend_from_env``).
+"""
+
+import os
+import sqlite3
+import threading
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Protocol
+
+try:
+    import zstandard
+except ImportError:  # optional; zlib is always available
+    zstandard = None
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024  # compressed bytes held in memory
+DEFAULT_DISK_BYTES = 1024 * 1024 * 1024  # compressed bytes kept on disk
+_ENTRY_OVERHEAD = 64  # rough per-entry bookkeeping cost, so many tiny files still count
+_BACKENDS = ("memory", "sharded", "sqlite")
+
+# Stored blobs are tagged with their codec, so a store written with zstd available still reads
+# (or cleanly misses) in a process without it.
+_ZSTD, _ZLIB = b"s", b"z"
+
+
+class DeltaBackend(Protocol):
+    def swap(self, key: str, text: str) -> str | None:
+        """Atomically store ``text`` for ``key``; return the previous full text, or None."""
+        ...
+
+    def stats(self) -> dict: ...
+
+
+def _pack(text: str) -> bytes:
+    raw = text.encode("utf-8", "surrogatepass")
+    if zstandard is not None:
+        return _ZSTD + zstandard.ZstdCompressor(level=3).compress(raw)
+    return _ZLIB + zlib.compress(raw, 1)
+
+
+def _unpack(blob: bytes) -> str | None:
+    tag, body = blob[:1], blob[1:]
+    if tag == _ZSTD:
+        if zstandard is None:
+            return None  # written by a process with zstd; treat as a miss, not an error
+        raw = zstandard.ZstdDecompressor().decompress(body)
+    else:
+        raw = zlib.decompress(body)
+    return raw.decode("utf-8", "surrogatepass")
+
+
+def _codec_name() -> str:
+    return "zstd" if zstandard is not None else "zlib"
+
+
+class MemoryBackend:
+    """In-process LRU of compressed texts, bounded by total compressed bytes (and entry count)."""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, *, max_files: int | None = None) -> None:
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+        self._bytes = 0
+        self._raw_chars = 0  # uncompressed size of what is held, for the ratio in stats()
+        self._sizes: dict[str, int] = {}
+        self._evictions = 0
+        self._lock = threading.Lock()
+
+    def swap(self, key: str, text: str) -> str | None:
+        blob = _pack(text)  # compress outside the lock
+        fits = len(blob) + len(key) + _ENTRY_OVERHEAD <= self.max_bytes
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old) + len(key) + _ENTRY_OVERHEAD
+                self._raw_chars -= self._sizes.pop(key)
+            if fits:  # else storing it would evict everything, then itself
+                self._entries[key] = blob
+                self._sizes[key] = len(text)
+                self._bytes += len(blob) + len(key) + _ENTRY_OVERHEAD
+                self._raw_chars += len(text)
+            while self._entries and (
+                self._bytes > self.max_bytes
+                or (self.max_files is not None and len(self._entries) > self.max_files)
+            ):
+                evicted, dropped = self._entries.popitem(last=False)
+                self._bytes -= len(dropped) + len(evicted) + _ENTRY_OVERHEAD
+                self._raw_chars -= self._sizes.pop(evicted)
+                self._evictions += 1
+        return None if old is None else _unpack(old)  # decompress outside the lock too
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": "memory",
+                "compression": _codec_name(),
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "raw_chars": self._raw_chars,
+                "evictions": self._evictions,
+            }
+
+
+class ShardedBackend:
+    """Route keys to ``shards`` independent backends so unrelated swaps don't contend."""
+
+    def __init__(
+        self,
+        shards: int = 16,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        *,
+        max_files: int | None = None,
+    ) -> None:
+        shards = max(1, shards)
+        per_files = None if max_files is None else max(1, -(-max_files // shards))
+        self._shards = [
+            MemoryBackend(max(1, max_bytes // shards), max_files=per_files) for _ in range(shards)
+        ]
+
+    def swap(self, key: str, text: str) -> str | None:
+        shard = self._shards[zlib.crc32(key.encode("utf-8", "surrogatepass")) % len(self._shards)]
+        return shard.swap(key, text)
+
+    def stats(self) -> dict:
+        parts = [shard.stats() for shard in self._shards]
+        totals = {
+            name: sum(p[name] for p in parts)
+            for name in ("entries", "bytes", "max_bytes", "raw_chars", "evictions")
+        }
+        return {"backend": "sharded", "compression": _codec_name(), "shards": len(parts), **totals}
+
+
+class SqliteBackend:
+    """Persistent store in one SQLite file; safe to share between threads and processes.
+
+    Each swap is a single ``BEGIN IMMEDIATE`` transaction (read previous, write new, evict), so
+    it is atomic across processes too. LRU order is a monotonically increasing ``used`` stamp.
+    """
+
+    _SCHEMA = (
+        """CREATE TABLE IF NOT EXISTS delta (
+            key TEXT PRIMARY KEY,
+            blob BLOB NOT NULL,
+            size INTEGER NOT NULL,
+            used INTEGER NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS delta_used ON delta (used)",
+    )
+
+    def __init__(
+        self,
+        path: str | Path,
+        max_bytes: int = DEFAULT_DISK_BYTES,
+        *,
+        max_files: int | None = None,
+    ) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self._evictions = 0
+        self._lock = threading.Lock()  # one connection, shared by this process's threads
+        self._conn = sqlite3.connect(
+            self.path, timeout=30.0, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in self._SCHEMA:
+            self._conn.execute(statement)
+
+    def swap(self, key: str, text: str) -> str | None:
+        blob = _pack(text)
+        size = len(blob) + len(key.encode("utf-8", "surrogatepass")) + _ENTRY_OVERHEAD
+        with self._lock:
+            conn = self._conn
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT blob FROM delta WHERE key = ?", (key,)).fetchone()
+                if size > self.max_bytes:  # would evict everything, then itself
+                    conn.execute("DELETE FROM delta WHERE key = ?", (key,))
+                else:
+                    (used,) = conn.execute(
+                        "SELECT COALESCE(MAX(used), 0) + 1 FROM delta"
+                    ).fetchone()
+                    conn.execute(
+                        "INSERT OR REPLACE INTO delta (key, blob, size, used) VALUES (?, ?, ?, ?)",
+                        (key, blob, size, used),
+                    )
+                    self._evict(conn)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return None if row is None else _unpack(row[0])
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM delta").fetchone()
+        if total <= self.max_bytes and (self.max_files is None or count <= self.max_files):
+            return
+        doomed = []
+        for key, size in conn.execute("SELECT key, size FROM delta ORDER BY used"):
+            if total <= self.max_bytes and (self.max_files is None or count <= self.max_files):
+                break
+            doomed.append((key,))
+            total -= size
+            count -= 1
+        conn.executemany("DELETE FROM delta WHERE key = ?", doomed)
+        self._evictions += len(doomed)
+
+    def stats(self) -> dict:
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM delta"
+            ).fetchone()
+        return {
+            "backend": "sqlite",
+            "compression": _codec_name(),
+            "path": str(self.path),
+            "entries": count,
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+            "evictions": self._evictions,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def backend_from_env(max_files: int | None = None) -> DeltaBackend:
+    """Build the configured backend from ``TS_DELTA_*``.
+
+    ``TS_DELTA_STORE`` picks the backend (default ``memory``), ``TS_DELTA_MAX_BYTES`` its byte
+    budget, ``TS_DELTA_SHARDS`` the shard count and ``TS_DELTA_PATH`` the SQLite file (default
+    ``$TS_LOG_DIR/delta.sqlite3``, i.e. ``~/.cutok/delta.sqlite3``).
+    """
+    kind = os.getenv("TS_DELTA_STORE", "memory")
+    if kind not in _BACKENDS:
+        raise ValueError(f"unknown delta store {kind!r}; expected one of {_BACKENDS}")
+    budget = os.getenv("TS_DELTA_MAX_BYTES")
+    if kind == "sqlite":
+        log_dir = Path(os.getenv("TS_LOG_DIR", str(Path.home() / ".cutok")))
+        path = os.getenv("TS_DELTA_PATH", str(log_dir / "delta.sqlite3"))
+        return SqliteBackend(
+            path, int(budget) if budget else DEFAULT_DISK_BYTES, max_files=max_files
+        )
+    max_bytes = int(budget) if budget else DEFAULT_MAX_BYTES
+    if kind == "sharded":
+        shards = int(os.getenv("TS_DELTA_SHARDS", "16"))
+        return ShardedBackend(shards, max_bytes, max_files=max_files)
+    return MemoryBackend(max_bytes, max_files=max_files)
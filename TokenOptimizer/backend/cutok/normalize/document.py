@@ -0,0 +1,169 @@
+"""A document's structural views, computed once and shared by every stage that reads it.
+
+Several stages look at the same text the same way: textclean, dedup, history dedup and the
+response-budget check all split it at triple-backtick fences, dedup and history dedup split the
+prose into paragraphs, the delta store splits it into lines, and textclean counts its tokens
+paragraph by paragraph. ``Document`` holds those views — fence ``parts``, paragraph ``blocks``,
+``lines`` and a per-paragraph token ``counter`` — each built on first use, plus any
+stage-specific ``view`` (dedup's hashed paragraphs). ``document(text)`` returns the shared
+instance for a text, so a view computed by one stage is free for the next request too.
+
+Documents are immutable. A stage that rewrites only prose segments in place builds the result
+with ``Document.derive``, which keeps the known fence layout (no re-scan) and the token counter
+(unchanged paragraphs are not re-encoded), and ``register``s it for the stages downstream.
+The shared instances live in a small LRU bounded by text size (``TS_DOCUMENT_CACHE_CHARS``).
+"""
+
+import os
+import re
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Iterable
+from typing import TypeVar
+
+from cutok.core.tokens import SegmentCounter
+
+_FENCE_RE = re.compile(r"```[\s\S]*?```")
+_PARA_SPLIT = re.compile(r"(\n[ \t]*\n)")  # capture blank-line separators so we can rebuild
+
+Part = tuple[bool, str]  # (is_code, segment)
+T = TypeVar("T")
+
+
+def split_fences(text: str) -> list[Part]:
+    """Split into ``(is_code, segment)`` parts; code parts are whole fenced blocks, untouched."""
+    parts: list[Part] = []
+    idx = 0
+    for m in _FENCE_RE.finditer(text):
+        if m.start() > idx:
+            parts.append((False, text[idx : m.start()]))
+        parts.append((True, m.group()))
+        idx = m.end()
+    if idx < len(text):
+        parts.append((False, text[idx:]))
+    if not parts:
+        parts.append((False, text))
+    return parts
+
+
+class Document:
+    """One text plus lazily built views of it. Treat as immutable; rewrites make new ones."""
+
+    __slots__ = ("_blocks", "_counters", "_lines", "_views", "parts", "text")
+
+    def __init__(
+        self,
+        text: str,
+        parts: Iterable[Part] | None = None,
+        *,
+        counters: dict[str, SegmentCounter] | None = None,
+    ) -> None:
+        self.text = text
+        self.parts: tuple[Part, ...] = tuple(split_fences(text) if parts is None else parts)
+        self._blocks: tuple[tuple[str, str], ...] | None = None
+        self._lines: tuple[str, ...] | None = None
+        self._counters = {} if counters is None else counters
+        self._views: dict[str, object] = {}
+
+    @property
+    def blocks(self) -> tuple[tuple[str, str], ...]:
+        """``(kind, value)`` items, ``kind`` one of ``code`` (a whole fenced block), ``para`` or
+        ``sep`` (the blank-line run between paragraphs). Concatenated, they give back ``text``."""
+        if self._blocks is None:
+            blocks: list[tuple[str, str]] = []
+            for is_code, seg in self.parts:
+                if is_code:
+                    blocks.append(("code", seg))
+                    continue
+                for i, piece in enumerate(_PARA_SPLIT.split(seg)):
+                    blocks.append(("sep" if i % 2 == 1 else "para", piece))
+            self._blocks = tuple(blocks)
+        return self._blocks
+
+    @property
+    def lines(self) -> tuple[str, ...]:
+        """``text.splitlines(keepends=True)``."""
+        if self._lines is None:
+            self._lines = tuple(self.text.splitlines(keepends=True))
+        return self._lines
+
+    @property
+    def code_chars(self) -> int:
+        return sum(len(seg) for is_code, seg in self.parts if is_code)
+
+    def counter(self, model: str) -> SegmentCounter:
+        """Token counter for this document and the documents derived from it."""
+        counter = self._counters.get(model)
+        if counter is None:
+            counter = self._counters[model] = SegmentCounter(model)
+        return counter
+
+    def view(self, name: str, build: Callable[["Document"], T]) -> T:
+        """``build(self)``, computed once and kept with this document (derived ones start over)."""
+        if name not in self._views:
+            self._views[name] = build(self)
+        return self._views[name]
+
+    def derive(self, parts: Iterable[Part]) -> "Document":
+        """The document made of ``parts`` — this one's segments with some prose rewritten.
+
+        The caller vouches that ``split_fences`` of the result would give exactly these parts
+        (empty ones dropped), i.e. that no rewrite created, removed or re-paired a fence.
+        """
+        kept = tuple(part for part in parts if part[1]) or ((False, ""),)
+        return Document("".join(seg for _, seg in kept), kept, counters=self._counters)
+
+
+class _DocumentCache:
+    def __init__(self, max_chars: int) -> None:
+        self._lock = threading.Lock()
+        self._docs: OrderedDict[str, Document] = OrderedDict()
+        self._chars = 0
+        self.max_chars = max_chars
+
+    def get(self, text: str) -> Document:
+        with self._lock:
+            doc = self._docs.get(text)
+            if doc is not None:
+                self._docs.move_to_end(text)
+                return doc
+        doc = Document(text)
+        self.put(doc)
+        return doc
+
+    def put(self, doc: Document) -> None:
+        # Counted twice: the token counter keeps a copy of every paragraph it has encoded.
+        size = 2 * len(doc.text)
+        if size > self.max_chars:
+            return
+        with self._lock:
+            old = self._docs.pop(doc.text, None)
+            if old is not None:
+                self._chars -= 2 * len(old.text)
+            self._docs[doc.text] = doc
+            self._chars += size
+            while self._chars > self.max_chars:
+                _, evicted = self._docs.popitem(last=False)
+                self._chars -= 2 * len(evicted.text)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._docs.clear()
+            self._chars = 0
+
+
+_cache = _DocumentCache(int(os.getenv("TS_DOCUMENT_CACHE_CHARS", str(64 * 1024 * 1024))))
+
+
+def document(text: str) -> Document:
+    """The shared ``Document`` for ``text``, built on first use."""
+    return _cache.get(text)
+
+
+def register(doc: Document) -> None:
+    """Make ``doc`` (e.g. from ``derive``) the shared ``Document`` for its text."""
+    _cache.put(doc)
+
+
+def clear_documents() -> None:
+    _cache.clear()
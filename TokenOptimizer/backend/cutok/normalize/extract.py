@@ -1,10 +1,13 @@
 """Thin wrapper turning any file into markdown text. Never reimplement parsing — wrap MarkItDown."""
 
 import io
+import time
 from pathlib import Path
 
 from markitdown import MarkItDown
 
+from cutok.normalize.extract_cache import extraction_cache
+
 # Binary formats MarkItDown must parse (text is locked inside a container).
 _BINARY_EXTS = {".pdf", ".docx", ".pptx", ".xlsx", ".xls", ".html", ".htm"}
 
@@ -47,12 +50,18 @@ def extract_to_markdown(data: bytes, filename: str) -> str:
 
     Binary formats go through MarkItDown; on failure they fall back to a replace-decode for
     text-like extensions, otherwise raise ``ExtractionError``. Text formats bypass MarkItDown
-    entirely and are decoded directly so they round-trip unchanged.
+    entirely and are decoded directly so they round-trip unchanged. Successful MarkItDown
+    results are memoized by content hash in ``extraction_cache``.
     """
     ext = Path(filename).suffix.lower()
     if is_binary_format(filename):
         if not _magic_ok(ext, data):
             return _fallback_or_raise(data, ext, filename, None)
+        key = extraction_cache.key(data, ext)
+        cached = extraction_cache.get(key, len(data))
+        if cached is not None:
+            return cached
+        start = time.perf_counter()
         try:
             result = _markitdown.convert_stream(io.BytesIO(data), file_extension=ext)
             text = result.text_content
@@ -61,6 +70,7 @@ def extract_to_markdown(data: bytes, filename: str) -> str:
         # MarkItDown returns text_content=None when it cannot parse the container.
         if text is None:
             return _fallback_or_raise(data, ext, filename, None)
+        extraction_cache.put(key, text, time.perf_counter() - start)
         return text
     return data.decode("utf-8", errors="replace")
 
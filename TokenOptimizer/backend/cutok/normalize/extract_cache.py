@@ -0,0 +1,254 @@
+"""Content-addressed cache for ``extract_to_markdown`` results.
+
+Agents resend the same PDF/DOCX/XLSX attachment on every turn, and MarkItDown takes hundreds of
+milliseconds to seconds per large document. Extracted text is memoized under
+``sha256(bytes) : extension : markitdown version`` — a MarkItDown upgrade invalidates everything.
+
+Two tiers:
+
+  - **memory**: thread-safe LRU bounded by an approximate byte budget (always on unless disabled).
+    An extraction larger than the whole budget is not kept there (only on disk, if enabled).
+  - **disk** (optional): one zlib-compressed file per entry in a directory, written atomically
+    (temp file + rename), so proxy worker processes and restarts share it. Hits refresh the file's
+    mtime; when the directory outgrows its budget the least recently used files are deleted.
+    Disk errors are logged and treated as misses — the cache never fails an extraction.
+
+Only successful MarkItDown extractions are cached; text formats are decoded directly and are
+cheaper than a lookup. Configured with ``TS_EXTRACT_CACHE=0`` (disable), ``TS_EXTRACT_CACHE_BYTES``,
+``TS_EXTRACT_CACHE_DIR`` (enables the disk tier) and ``TS_EXTRACT_CACHE_DISK_BYTES``.
+"""
+
+import hashlib
+import logging
+import os
+import struct
+import tempfile
+import threading
+import zlib
+from collections import OrderedDict
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+_DEFAULT_DISK_BYTES = 1024 * 1024 * 1024
+_ENTRY_OVERHEAD = 200
+_HEADER = struct.Struct("<d")  # extraction seconds, so disk hits can report time saved
+_SUFFIX = ".md.z"
+
+try:
+    _MARKITDOWN_VERSION = version("markitdown")
+except PackageNotFoundError:  # running from a source checkout without metadata
+    _MARKITDOWN_VERSION = "unknown"
+
+
+class ExtractionCache:
+    """Memory LRU plus optional shared disk tier of extracted text. Thread-safe."""
+
+    def __init__(
+        self,
+        max_bytes: int = _DEFAULT_MAX_BYTES,
+        *,
+        enabled: bool = True,
+        disk_dir: str | Path | None = None,
+        disk_max_bytes: int = _DEFAULT_DISK_BYTES,
+    ) -> None:
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._bytes = 0
+        self._max_bytes = max_bytes
+        self._enabled = enabled
+        self._disk_dir = Path(disk_dir) if disk_dir else None
+        self._disk_max_bytes = disk_max_bytes
+        self._disk_bytes: int | None = None  # estimate; measured on first write
+        self._counts = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        self._bytes_saved = 0
+        self._seconds_saved = 0.0
+
+    def key(self, data: bytes, ext: str) -> str:
+        return f"{hashlib.sha256(data).hexdigest()}:{ext}:{_MARKITDOWN_VERSION}"
+
+    def get(self, key: str, size: int) -> str | None:
+        """Cached text for ``key`` (``size`` is the input's byte length, for ``bytes_saved``)."""
+        if not self._enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._hit_locked("memory_hits", size, entry[1])
+                return entry[0]
+        entry = self._disk_read(key) if self._disk_dir is not None else None
+        with self._lock:
+            if entry is None:
+                self._counts["misses"] += 1
+                return None
+            self._hit_locked("disk_hits", size, entry[1])
+            self._insert_locked(key, entry)
+        return entry[0]
+
+    def put(self, key: str, text: str, seconds: float) -> None:
+        """Remember ``text`` as the extraction for ``key``; it took ``seconds`` to produce."""
+        if not self._enabled:
+            return
+        with self._lock:
+            self._insert_locked(key, (text, seconds))
+        if self._disk_dir is not None:
+            self._disk_write(key, text, seconds)
+
+    def configure(
+        self,
+        *,
+        enabled: bool | None = None,
+        max_bytes: int | None = None,
+        disk_dir: str | Path | None = None,
+        disk_max_bytes: int | None = None,
+    ) -> None:
+        """Turn the cache on/off, resize it, or point the disk tier at a directory ("" = off)."""
+        with self._lock:
+            if enabled is not None:
+                self._enabled = enabled
+                if not enabled:
+                    self._clear_locked()
+            if max_bytes is not None:
+                self._max_bytes = max_bytes
+                self._evict_locked()
+            if disk_dir is not None:
+                self._disk_dir = Path(disk_dir) if disk_dir else None
+                self._disk_bytes = None
+            if disk_max_bytes is not None:
+                self._disk_max_bytes = disk_max_bytes
+
+    def clear(self) -> None:
+        """Drop the memory tier (the disk tier is shared, so it is left alone)."""
+        with self._lock:
+            self._clear_locked()
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self._counts["memory_hits"] + self._counts["disk_hits"]
+            lookups = hits + self._counts["misses"]
+            return {
+                "enabled": self._enabled,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self._max_bytes,
+                "hits": hits,
+                **self._counts,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "bytes_saved": self._bytes_saved,
+                "extract_ms_saved": round(self._seconds_saved * 1000, 1),
+                "disk_dir": str(self._disk_dir) if self._disk_dir else None,
+                "disk_bytes": self._disk_bytes,
+                "disk_max_bytes": self._disk_max_bytes if self._disk_dir else None,
+            }
+
+    def _hit_locked(self, kind: str, size: int, seconds: float) -> None:
+        self._counts[kind] += 1
+        self._bytes_saved += size
+        self._seconds_saved += seconds
+
+    def _insert_locked(self, key: str, entry: tuple[str, float]) -> None:
+        if key in self._entries or _entry_bytes(key, entry[0]) > self._max_bytes:
+            return  # too big to keep: inserting it would evict everything, then itself
+        self._entries[key] = entry
+        self._bytes += _entry_bytes(key, entry[0])
+        self._evict_locked()
+
+    def _evict_locked(self) -> None:
+        while self._entries and self._bytes > self._max_bytes:
+            key, (text, _) = self._entries.popitem(last=False)
+            self._bytes -= _entry_bytes(key, text)
+            self._counts["evictions"] += 1
+
+    def _clear_locked(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    # ------------------------------------------------------------------ disk tier
+
+    def _path(self, key: str) -> Path:
+        name = hashlib.blake2b(key.encode(), digest_size=20).hexdigest()
+        return self._disk_dir / (name + _SUFFIX)
+
+    def _disk_read(self, key: str) -> tuple[str, float] | None:
+        path = self._path(key)
+        try:
+            blob = path.read_bytes()
+            (seconds,) = _HEADER.unpack_from(blob)
+            text = zlib.decompress(blob[_HEADER.size :]).decode("utf-8", "surrogatepass")
+            os.utime(path)  # LRU across processes: a hit makes the file recent again
+        except FileNotFoundError:
+            return None
+        except (OSError, zlib.error, struct.error, UnicodeDecodeError):
+            logger.debug("unreadable extraction cache entry %s", path, exc_info=True)
+            return None
+        return text, seconds
+
+    def _disk_write(self, key: str, text: str, seconds: float) -> None:
+        blob = _HEADER.pack(seconds) + zlib.compress(text.encode("utf-8", "surrogatepass"), 6)
+        try:
+            self._disk_dir.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self._disk_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(blob)
+            os.replace(tmp, self._path(key))
+        except OSError:
+            logger.debug("could not write extraction cache entry", exc_info=True)
+            return
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = _dir_size(self._disk_dir)
+            else:
+                self._disk_bytes += len(blob)
+            over = self._disk_bytes > self._disk_max_bytes
+        if over:
+            self._disk_evict()
+
+    def _disk_evict(self) -> None:
+        """Delete least recently used files until the directory is at 90% of its budget."""
+        files = []
+        for path in self._disk_dir.glob("*" + _SUFFIX):
+            try:
+                st = path.stat()
+            except OSError:
+                continue  # removed by another process meanwhile
+            files.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in files)
+        target = int(self._disk_max_bytes * 0.9)
+        evicted = 0
+        for _, size, path in sorted(files):
+            if total <= target:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+            evicted += 1
+        with self._lock:
+            self._disk_bytes = total
+            self._counts["evictions"] += evicted
+
+
+def _entry_bytes(key: str, text: str) -> int:
+    return _ENTRY_OVERHEAD + len(key) + len(text)
+
+
+def _dir_size(directory: Path) -> int:
+    total = 0
+    for path in directory.glob("*" + _SUFFIX):
+        try:
+            total += path.stat().st_size
+        except OSError:
+            continue
+    return total
+
+
+extraction_cache = ExtractionCache(
+    max_bytes=int(os.getenv("TS_EXTRACT_CACHE_BYTES", str(_DEFAULT_MAX_BYTES))),
+    enabled=os.getenv("TS_EXTRACT_CACHE", "1") != "0",
+    disk_dir=os.getenv("TS_EXTRACT_CACHE_DIR") or None,
+    disk_max_bytes=int(os.getenv("TS_EXTRACT_CACHE_DISK_BYTES", str(_DEFAULT_DISK_BYTES))),
+)
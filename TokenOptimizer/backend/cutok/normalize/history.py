@@ -0,0 +1,226 @@
+"""Conversation-history dedup: collapse paragraphs repeated from earlier messages.
+
+Agent traffic re-sends the same text turn after turn — quoted tool output, re-pasted specs, an
+earlier assistant answer pasted back by the user. A paragraph (>= ``min_chunk_tokens`` tokens)
+that already appeared verbatim in an earlier message is replaced by ``[¶ identical to ¶N of
+message M]`` (1-based); its first occurrence always stays verbatim. Paragraphs are split and
+matched exactly as ``dedup`` does (whitespace-normalized, casefolded), and fenced code is never
+touched. Text is read from string contents, ``text`` blocks and ``tool_result`` contents.
+
+A message's rewrite depends only on the messages before it, so turn N+1 rewrites the shared
+history exactly as turn N did and the prompt-cache prefix stays stable.
+
+``HistoryIndex`` is incremental: it remembers each processed message's digest, its rewrites and
+the paragraphs it introduced. A request that extends the conversation reuses all of that and only
+indexes the new messages; one that edits or truncates history rolls the index back to the first
+changed message. ``HistoryStore`` keeps one index per conversation (session + first message).
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+from cutok.core.ledger import Ledger
+from cutok.core.payload import PayloadWriter
+from cutok.core.tokens import count_tokens_batch
+from cutok.core.types import Change, OptimizationResult, OptimizerConfig
+from cutok.normalize.dedup import _chunk_hash, _tokenize
+
+# (path from the message to the container, key in it, text)
+_Part = tuple[tuple, str, str]
+# (path from the message to the container, key in it, rewritten text)
+_Rewrite = tuple[tuple, str, str]
+
+
+def _text_parts(message) -> list[_Part]:
+    """Every text field of one message that the stage reads (and may rewrite)."""
+    if not isinstance(message, dict):
+        return []
+    content = message.get("content")
+    if isinstance(content, str):
+        return [((), "content", content)]
+    parts: list[_Part] = []
+    if not isinstance(content, list):
+        return parts
+    for j, block in enumerate(content):
+        if not isinstance(block, dict):
+            continue
+        if isinstance(block.get("text"), str):
+            parts.append((("content", j), "text", block["text"]))
+        elif block.get("type") == "tool_result":
+            inner = block.get("content")
+            if isinstance(inner, str):
+                parts.append((("content", j), "content", inner))
+            elif isinstance(inner, list):
+                for k, sub in enumerate(inner):
+                    if isinstance(sub, dict) and isinstance(sub.get("text"), str):
+                        parts.append((("content", j, "content", k), "text", sub["text"]))
+    return parts
+
+
+def _digest(parts: list[_Part]) -> bytes:
+    h = hashlib.blake2b(digest_size=16)
+    for path, key, text in parts:
+        h.update(repr((path, key)).encode())
+        h.update(text.encode("utf-8", "surrogatepass"))
+        h.update(b"\0")
+    return h.digest()
+
+
+class HistoryIndex:
+    """Paragraph index over one conversation, extended message by message. Thread-safe."""
+
+    def __init__(self, min_chunk_tokens: int = 40) -> None:
+        self.min_chunk_tokens = min_chunk_tokens
+        self._lock = threading.Lock()
+        self._digests: list[bytes] = []  # per indexed message
+        self._rewrites: list[list[_Rewrite]] = []
+        self._changes: list[list[Change]] = []
+        self._tokens: list[tuple[int, int]] = []  # per message: (replaced, references) tokens
+        self._added: list[list[str]] = []  # chunk hashes each message introduced
+        self._first: dict[str, tuple[int, int]] = {}  # chunk hash -> (message index, ¶ number)
+        self.messages_indexed = 0  # total messages ever processed (reuse shows as no growth)
+
+    def process(
+        self, messages: list, model: str
+    ) -> tuple[list[tuple[int, _Rewrite]], OptimizationResult]:
+        """Rewrites ``(message index, (path, key, text))`` for every message, and the result."""
+        parts = [_text_parts(m) for m in messages]
+        digests = [_digest(p) for p in parts]
+        with self._lock:
+            keep = 0
+            while (
+                keep < len(self._digests)
+                and keep < len(digests)
+                and self._digests[keep] == digests[keep]
+            ):
+                keep += 1
+            self._rollback(keep)
+            for i in range(keep, len(messages)):
+                rewrites, changes, tokens = self._index_message(i, parts[i], model)
+                self._digests.append(digests[i])
+                self._rewrites.append(rewrites)
+                self._changes.append(changes)
+                self._tokens.append(tokens)
+                self.messages_indexed += 1
+            result = OptimizationResult(
+                feature="history_dedup",
+                tokens_before=sum(before for before, _ in self._tokens),
+                tokens_after=sum(after for _, after in self._tokens),
+                changes=[c for changes in self._changes for c in changes],
+            )
+            return [(i, rw) for i, rws in enumerate(self._rewrites) for rw in rws], result
+
+    def _rollback(self, keep: int) -> None:
+        while len(self._digests) > keep:
+            for h in self._added.pop():
+                del self._first[h]
+            self._digests.pop()
+            self._rewrites.pop()
+            self._changes.pop()
+            self._tokens.pop()
+
+    def _index_message(
+        self, i: int, parts: list[_Part], model: str
+    ) -> tuple[list[_Rewrite], list[Change], tuple[int, int]]:
+        added: list[str] = []
+        repeats: list[tuple[int, list, tuple[int, int]]] = []  # (part no, item, first seen)
+        tokenized = []
+        para = 0
+        for n, (_, _, text) in enumerate(parts):
+            items = _tokenize(text)
+            tokenized.append(items)
+            for item in items:
+                if item[0] != "para" or not item[1].strip():
+                    continue
+                para += 1
+                h = _chunk_hash(item[1])
+                first = self._first.get(h)
+                if first is None:
+                    self._first[h] = (i, para)
+                    added.append(h)
+                elif first[0] < i:
+                    repeats.append((n, item, first))
+        self._added.append(added)
+        if not repeats:
+            return [], [], (0, 0)
+
+        refs = [f"[¶ identical to ¶{p} of message {m + 1}]" for _, _, (m, p) in repeats]
+        counts = count_tokens_batch(
+            [t for (_, item, _), ref in zip(repeats, refs, strict=True) for t in (item[1], ref)],
+            model,
+        )
+        changed_parts: set[int] = set()
+        changes: list[Change] = []
+        total_before = total_after = 0
+        for r, ((n, item, (m, p)), ref) in enumerate(zip(repeats, refs, strict=True)):
+            before, after = counts[2 * r], counts[2 * r + 1]
+            if before < self.min_chunk_tokens or after >= before:
+                continue
+            item[1] = ref
+            changed_parts.add(n)
+            total_before += before
+            total_after += after
+            description = f"paragraph repeated from ¶{p} of message {m + 1}"
+            changes.append(Change("history_dedup", description, before - after))
+        rewrites = [
+            (parts[n][0], parts[n][1], "".join(item[1] for item in tokenized[n]))
+            for n in sorted(changed_parts)
+        ]
+        return rewrites, changes, (total_before, total_after)
+
+
+class HistoryStore:
+    """One ``HistoryIndex`` per conversation, LRU-bounded. Thread-safe."""
+
+    def __init__(self, max_conversations: int = 256, min_chunk_tokens: int = 40) -> None:
+        self.max_conversations = max_conversations
+        self.min_chunk_tokens = min_chunk_tokens
+        self._indexes: OrderedDict[tuple[str, bytes], HistoryIndex] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def index_for(self, session_id: str, messages: list) -> HistoryIndex:
+        # Many conversations share one session (one API key); their first messages tell them apart.
+        key = (session_id, _digest(_text_parts(messages[0])) if messages else b"")
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is None:
+                index = self._indexes[key] = HistoryIndex(self.min_chunk_tokens)
+                while len(self._indexes) > self.max_conversations:
+                    self._indexes.popitem(last=False)
+            self._indexes.move_to_end(key)
+            return index
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "conversations": len(self._indexes),
+                "messages_indexed": sum(i.messages_indexed for i in self._indexes.values()),
+            }
+
+
+def run_history_stage(
+    writer: PayloadWriter,
+    config: OptimizerConfig,
+    ledger: Ledger,
+    history: HistoryStore | None = None,
+    session_id: str = "session",
+) -> OptimizationResult:
+    """Replace paragraphs repeated from earlier messages; only rewritten blocks are copied.
+
+    Without a ``history`` store the conversation is indexed from scratch for this call.
+    """
+    messages = writer.payload.get("messages")
+    if not isinstance(messages, list) or len(messages) < 2:
+        result = OptimizationResult(feature="history_dedup", tokens_before=0, tokens_after=0)
+        ledger.record(result)
+        return result
+    if history is None:
+        index = HistoryIndex()
+    else:
+        index = history.index_for(session_id, messages)
+    rewrites, result = index.process(messages, config.model)
+    for i, (path, key, text) in rewrites:
+        writer.own("messages", i, *path)[key] = text
+    ledger.record(result)
+    return result
@@ -0,0 +1,109 @@
+"""Session-scoped memo of per-message optimization work for growing conversations.
+
+Every request in a chat session carries the whole history, but only the newest turn is new. The
+per-file half of attachment normalization — base64 decode, extraction, text cleanup, format
+normalizers, comment stripping and the "before" token count — depends only on the attachment
+itself, its position-derived filename and the config, so its output is remembered per message
+under ``(session id, content hash)``. A request then redoes that work only for messages it hasn't
+seen. Model compression is not remembered: it depends on the service endpoint and on whether the
+service answers, so it runs on every request.
+
+The cross-file passes (paragraph dedup, delta encoding) still run over every attachment on every
+request: they depend on the whole set and on delta-store state, and they are cheap next to
+extraction (their token counts hit ``token_cache``). So the output is exactly what a run without
+the memo produces.
+
+The content hash covers the message's document blocks (media type and base64 data), the number of
+attachments before it (filenames are numbered across the payload) and the config fields the
+per-file pipeline reads. Entries live in one thread-safe LRU bounded by an approximate byte budget.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+from cutok.core.types import Change, OptimizerConfig
+
+_DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+_ENTRY_OVERHEAD = 200
+
+# One attachment after the per-file pipeline: (block index, filename, text, tokens before, changes).
+Prepared = tuple[int, str, str, int, tuple[Change, ...]]
+
+
+def message_digest(
+    blocks: list[tuple[int, str, str]], first_attachment: int, config: OptimizerConfig
+) -> bytes:
+    """Hash of one message's ``(block index, media type, base64 data)`` document blocks."""
+    h = hashlib.blake2b(digest_size=16)
+    settings = (
+        config.model,
+        config.enable_compression,
+        config.max_attachment_tokens,
+    )
+    h.update(repr((first_attachment, *settings)).encode())
+    for index, media_type, data in blocks:
+        h.update(f"\0{index}\0{media_type}\0{len(data)}\0".encode())
+        h.update(data.encode("utf-8", "surrogatepass"))
+    return h.digest()
+
+
+class MessageMemo:
+    """Bounded, thread-safe LRU of prepared attachments keyed by session id + message digest."""
+
+    def __init__(self, max_bytes: int = _DEFAULT_MAX_BYTES) -> None:
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple[str, bytes], tuple[Prepared, ...]] = OrderedDict()
+        self._bytes = 0
+        self._max_bytes = max_bytes
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, session_id: str, digest: bytes) -> tuple[Prepared, ...] | None:
+        key = (session_id, digest)
+        with self._lock:
+            prepared = self._entries.get(key)
+            if prepared is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return prepared
+
+    def put(self, session_id: str, digest: bytes, prepared: tuple[Prepared, ...]) -> None:
+        key = (session_id, digest)
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = prepared
+            self._bytes += _entry_bytes(key, prepared)
+            while self._entries and self._bytes > self._max_bytes:
+                old_key, old = self._entries.popitem(last=False)
+                self._bytes -= _entry_bytes(old_key, old)
+                self._evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self._max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+                "evictions": self._evictions,
+            }
+
+
+def _entry_bytes(key: tuple[str, bytes], prepared: tuple[Prepared, ...]) -> int:
+    size = _ENTRY_OVERHEAD + len(key[0]) + len(key[1])
+    for _, filename, text, _, changes in prepared:
+        size += len(filename) + len(text) + sum(len(c.description) for c in changes)
+    return size
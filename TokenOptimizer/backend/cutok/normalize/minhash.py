@@ -0,0 +1,79 @@
+"""MinHash signatures and an LSH index for near-duplicate paragraph lookup.
+
+A paragraph's shingles are its casefolded word 3-grams. Signatures use one-permutation hashing:
+each shingle is hashed once (32 bits), the hash picks one of ``BINS`` bins and the bin keeps its
+minimum — one hash per shingle instead of one per shingle per permutation. Empty bins (short
+paragraphs) borrow from the next non-empty bin, so similar sets still agree bin for bin.
+
+``LSHIndex`` splits each signature into ``BANDS`` bands of ``ROWS`` bins; paragraphs sharing any
+whole band are candidates. With 8 × 4 the chance of being a candidate is ~98% at Jaccard 0.8 and
+~40% at 0.5, and a lookup touches only its own buckets, so finding matches among N paragraphs is
+about linear rather than N². Candidates are always verified with exact Jaccard by the caller.
+"""
+
+import re
+import zlib
+from itertools import repeat
+
+BINS = 32
+ROWS = 4
+BANDS = BINS // ROWS
+_SHINGLE = 3
+_MASK = (1 << 32) - 1
+_EMPTY = 1 << 32
+_MAX_BUCKET = 32  # a band bucket stops growing here (boilerplate); earliest entries win
+_WORD = re.compile(r"\w+|[^\w\s]+")
+
+
+def shingles(text: str) -> set[int]:
+    """Hashed word 3-grams of ``text`` (all words when there are fewer than three)."""
+    words = _WORD.findall(text.casefold())
+    ids = list(map(zlib.crc32, map(str.encode, words, repeat("utf-8"), repeat("surrogatepass"))))
+    if len(ids) < _SHINGLE:
+        return {hash(tuple(ids)) & _MASK} if ids else set()
+    # Tuples of ints hash deterministically (unlike str), so signatures are stable across runs.
+    return {hash(gram) & _MASK for gram in zip(ids, ids[1:], ids[2:], strict=False)}
+
+
+def signature(hashed: set[int]) -> tuple[int, ...]:
+    """One-permutation MinHash of a shingle set, with rotation densification."""
+    bins = [_EMPTY] * BINS
+    for h in hashed:
+        b = h % BINS
+        bins[b] = min(bins[b], h // BINS)
+    if hashed and _EMPTY in bins:
+        for b in range(BINS):
+            if bins[b] == _EMPTY:
+                step = 1
+                while bins[(b + step) % BINS] == _EMPTY:
+                    step += 1
+                bins[b] = bins[(b + step) % BINS] + step * (1 << 27)  # offset marks the borrow
+    return tuple(bins)
+
+
+def jaccard(a: set[int], b: set[int]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class LSHIndex:
+    """Banded LSH over MinHash signatures; ``add`` hashable items, ``candidates`` for a query."""
+
+    def __init__(self) -> None:
+        self._buckets: dict[tuple, list] = {}
+
+    def add(self, sig: tuple[int, ...], item) -> None:
+        for band in range(BANDS):
+            key = (band, *sig[band * ROWS : (band + 1) * ROWS])
+            bucket = self._buckets.setdefault(key, [])
+            if len(bucket) < _MAX_BUCKET:
+                bucket.append(item)
+
+    def candidates(self, sig: tuple[int, ...]) -> list:
+        """Items sharing at least one band with ``sig``, without repeats."""
+        seen: dict = {}
+        for band in range(BANDS):
+            for item in self._buckets.get((band, *sig[band * ROWS : (band + 1) * ROWS]), ()):
+                seen[item] = None
+        return list(seen)
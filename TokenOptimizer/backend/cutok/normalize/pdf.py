@@ -0,0 +1,117 @@
+"""Streaming, page-parallel PDF extraction with an optional token budget.
+
+``extract_to_markdown`` hands a PDF to MarkItDown and gets one string back for the whole document,
+so peak memory and latency grow with page count even when only the first few thousand tokens
+will be sent. ``extract_pdf`` instead reads pages one at a time with pdfminer (MarkItDown's own
+PDF text backend): large documents are split into page ranges extracted in ``attachment_pool``
+workers, each page is cleaned by ``TextCleanStream`` as it arrives, and with a ``token_budget``
+extraction stops at the first page that would overrun it — later ranges are never parsed.
+
+Used by the optimizer when ``OptimizerConfig.max_attachment_tokens`` is set; MarkItDown remains
+the default PDF path (it also renders tables and forms via pdfplumber).
+"""
+
+import io
+import os
+import tempfile
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+
+from pdfminer.converter import TextConverter
+from pdfminer.layout import LAParams
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdfparser import PDFParser
+from pdfminer.pdftypes import resolve1
+
+from cutok.core.tokens import count_tokens
+from cutok.core.types import Change
+from cutok.normalize.pool import attachment_pool
+from cutok.normalize.textclean import TextCleanStream
+
+_RANGE_PAGES = 16  # pages per worker task
+
+
+@dataclass
+class PdfExtraction:
+    text: str  # cleaned text of the pages read, plus a truncation note when the budget hit
+    pages_read: int
+    pages_total: int
+    raw_tokens: int  # tokens of the pages read before cleanup
+    changes: list[Change] = field(default_factory=list)
+
+    @property
+    def truncated(self) -> bool:
+        return self.pages_read < self.pages_total
+
+
+def page_count(data: bytes) -> int:
+    document = PDFDocument(PDFParser(io.BytesIO(data)))
+    count = resolve1(resolve1(document.catalog["Pages"]).get("Count", 0))
+    return count if isinstance(count, int) else sum(1 for _ in PDFPage.create_pages(document))
+
+
+def iter_pages(fp, start: int = 0, stop: int | None = None) -> Iterator[str]:
+    """Text of pages ``start``..``stop`` (0-based, exclusive) of the PDF open as ``fp``."""
+    resources = PDFResourceManager(caching=True)
+    laparams = LAParams()
+    for number, page in enumerate(PDFPage.get_pages(fp)):
+        if number < start:
+            continue
+        if stop is not None and number >= stop:
+            break
+        out = io.StringIO()
+        device = TextConverter(resources, out, laparams=laparams)
+        PDFPageInterpreter(resources, device).process_page(page)
+        device.close()
+        yield out.getvalue().rstrip("\f")
+
+
+def _extract_range(path: str, start: int, stop: int) -> list[str]:
+    """Worker task: the pages of one range, read from a file rather than pickled bytes."""
+    with open(path, "rb") as fp:
+        return list(iter_pages(fp, start, stop))
+
+
+def _pages(data: bytes, total: int) -> Iterator[str]:
+    if total <= _RANGE_PAGES:
+        yield from iter_pages(io.BytesIO(data))
+        return
+    ranges = [(start, min(start + _RANGE_PAGES, total)) for start in range(0, total, _RANGE_PAGES)]
+    # Workers read the document from a temporary file (shared through the page cache) instead
+    # of receiving a pickled copy of the bytes with every range.
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as fh:
+        fh.write(data)
+    results = attachment_pool.imap(_extract_range, [(fh.name, a, b) for a, b in ranges])
+    try:
+        for pages in results:
+            yield from pages
+    finally:
+        results.close()
+        os.unlink(fh.name)
+
+
+def extract_pdf(data: bytes, model: str, *, token_budget: int | None = None) -> PdfExtraction:
+    """Extract and clean ``data`` page by page, stopping before the page that would overrun
+    ``token_budget`` (the first page is always kept). Raises pdfminer's errors on a broken PDF."""
+    total = page_count(data)
+    cleaner = TextCleanStream(model)
+    kept: list[str] = []
+    raw_tokens = used = 0
+    pages = _pages(data, total)
+    try:
+        for page in pages:
+            cleaned = cleaner.feed(page)
+            tokens = count_tokens(cleaned, model).count
+            if token_budget is not None and kept and used + tokens > token_budget:
+                break
+            kept.append(cleaned)
+            used += tokens
+            raw_tokens += count_tokens(page, model).count
+    finally:
+        pages.close()
+    text = "\n\n".join(page.strip("\n") for page in kept)
+    if len(kept) < total:
+        text += f"\n\n[truncated: token budget reached after page {len(kept)} of {total}]"
+    return PdfExtraction(text, len(kept), total, raw_tokens, cleaner.changes())
@@ -0,0 +1,211 @@
+"""Process pool fanning out the per-attachment half of normalization.
+
+Extraction, text cleanup, format normalizers and comment stripping are independent per file and
+CPU-bound (pure Python under the GIL), so a request with eight PDFs and a few large CSVs used to
+run on one core. ``AttachmentPool.map`` sends large attachments to ``spawn`` worker processes and
+runs small ones inline while those are in flight — pickling a few KiB costs more than normalizing
+it. Results come back in input order, so the cross-file passes that follow see exactly what the
+serial path produces.
+``AttachmentPool.imap`` streams ordered results of a longer job list (a PDF's page ranges) with
+bounded read-ahead, so a consumer that stops early leaves little wasted work.
+
+The pool starts on first use and degrades to inline work: with fewer than two workers, when fewer
+than two attachments are large enough to send, and for any attachment whose worker fails. Only
+a broken pool is discarded: an exception from the function itself leaves it to other requests.
+Configured with ``TS_ATTACHMENT_WORKERS`` and ``TS_ATTACHMENT_INLINE_BYTES`` (default 256 KiB),
+or ``attachment_pool.configure``. The pool is opt-in (default 0 = always inline): ``spawn`` workers
+re-import the caller's main module, which runs the top-level code of a script without an
+``if __name__ == "__main__"`` guard again in every worker. ``cutok start`` turns it on with
+``default_workers()`` (up to 4 on multi-core hosts) unless ``TS_ATTACHMENT_WORKERS`` is set.
+Worker processes keep their own token and extraction caches; set ``TS_EXTRACT_CACHE_DIR`` to share
+extracted text between them. With the proxy's ``process`` executor every optimizer worker gets its
+own pool, so size the two together.
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+from collections import deque
+from collections.abc import Callable, Iterator, Sequence
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_INLINE_BYTES = 256 * 1024
+# The pool, not the work, failed: a crashed worker, or a pool dropped or resized by another call.
+_POOL_GONE = (BrokenProcessPool, CancelledError)
+
+
+class AttachmentPool:
+    """Lazily started process pool that maps a function over attachments, small ones inline."""
+
+    def __init__(self, workers: int = 0, *, inline_bytes: int = _DEFAULT_INLINE_BYTES) -> None:
+        self._lock = threading.Lock()
+        self._workers = max(0, workers)
+        self._inline_bytes = inline_bytes
+        self._pool: ProcessPoolExecutor | None = None
+        self._counts = {"pooled": 0, "inline": 0, "failed": 0}
+
+    def map(self, fn: Callable, args: Sequence[tuple], sizes: Sequence[int]) -> list:
+        """``[fn(*a) for a in args]``; items whose size exceeds ``inline_bytes`` run in workers.
+
+        ``fn`` and its arguments must be picklable (a module-level function and plain data).
+        """
+        large = [i for i, size in enumerate(sizes) if size > self._inline_bytes]
+        pool = self._ensure_pool() if len(large) >= 2 else None
+        futures: dict[int, Future] = {}
+        if pool is not None:
+            try:
+                for i in large:
+                    futures[i] = _submit(pool, fn, args[i])
+            except _POOL_GONE:
+                # Broken by another call (or ``imap``) since we got it: everything runs inline.
+                logger.exception("attachment pool unusable; normalizing inline")
+                self._discard(pool)
+                for future in futures.values():
+                    future.cancel()
+                futures = {}
+        results = [None] * len(args)
+        for i, a in enumerate(args):
+            if i not in futures:
+                results[i] = fn(*a)
+        for i, future in futures.items():
+            try:
+                results[i] = future.result()
+            except _POOL_GONE:
+                # A crashed worker breaks the whole pool; drop it so the next call starts afresh.
+                logger.exception("attachment worker failed; normalizing inline")
+                self._discard(pool)
+                with self._lock:
+                    self._counts["failed"] += 1
+                results[i] = fn(*args[i])
+            except Exception:
+                # ``fn`` itself raised. The pool is shared and healthy, so keep it; rerun the item
+                # inline, which raises (or not) exactly as the serial path would.
+                logger.debug("attachment worker raised; rerunning inline", exc_info=True)
+                with self._lock:
+                    self._counts["failed"] += 1
+                results[i] = fn(*args[i])
+        with self._lock:
+            self._counts["pooled"] += len(futures)
+            self._counts["inline"] += len(args) - len(futures)
+        return results
+
+    def imap(self, fn: Callable, args: Sequence[tuple], *, window: int | None = None) -> Iterator:
+        """Lazily yield ``fn(*a)`` for each of ``args`` in order, computed in the workers.
+
+        At most ``window`` calls (default: twice the worker count) are queued ahead of the
+        consumer, so a caller that stops early — closing the iterator — wastes at most that much
+        work; calls not yet started are cancelled. Runs inline when the pool is off, and finishes
+        inline (discarding the pool) if a worker crashes part-way.
+        """
+        pool = self._ensure_pool() if len(args) >= 2 else None
+        if pool is None:
+            with self._lock:
+                self._counts["inline"] += len(args)
+            for a in args:
+                yield fn(*a)
+            return
+        limit = window or 2 * self._workers
+        pending: deque[Future] = deque()
+        submitted = done = 0
+        try:
+            while done < len(args):
+                try:
+                    while submitted < len(args) and submitted - done < limit:
+                        pending.append(_submit(pool, fn, args[submitted]))
+                        submitted += 1
+                    result = pending.popleft().result()
+                    if submitted < len(args):
+                        pending.append(_submit(pool, fn, args[submitted]))
+                        submitted += 1
+                except _POOL_GONE:
+                    logger.exception("attachment worker failed; finishing inline")
+                    self._discard(pool)
+                    with self._lock:
+                        self._counts["failed"] += 1
+                        self._counts["inline"] += len(args) - done
+                    for a in args[done:]:
+                        yield fn(*a)
+                    return
+                with self._lock:
+                    self._counts["pooled"] += 1
+                done += 1
+                yield result
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def configure(self, *, workers: int | None = None, inline_bytes: int | None = None) -> None:
+        """Resize the pool (0 = always inline) or change the inline threshold."""
+        with self._lock:
+            if inline_bytes is not None:
+                self._inline_bytes = inline_bytes
+            if workers is None or max(0, workers) == self._workers:
+                return
+            self._workers = max(0, workers)
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self._workers,
+                "inline_bytes": self._inline_bytes,
+                "started": self._pool is not None,
+                **self._counts,
+            }
+
+    def _ensure_pool(self) -> ProcessPoolExecutor | None:
+        with self._lock:
+            if self._workers < 2:
+                return None
+            if self._pool is None:
+                ctx = multiprocessing.get_context("spawn")
+                self._pool = ProcessPoolExecutor(
+                    self._workers, mp_context=ctx, initializer=_init_worker
+                )
+            return self._pool
+
+    def _discard(self, pool: ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._pool is not pool:
+                return
+            self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _submit(pool: ProcessPoolExecutor, fn: Callable, args: tuple) -> Future:
+    """``pool.submit``, reporting a pool that another caller already shut down as broken."""
+    try:
+        return pool.submit(fn, *args)
+    except BrokenProcessPool:
+        raise
+    except RuntimeError as exc:  # "cannot schedule new futures after shutdown"
+        raise BrokenProcessPool(str(exc)) from exc
+
+
+def _init_worker() -> None:
+    # Work running in a pool worker (e.g. a PDF split into page ranges) must not start a pool.
+    attachment_pool.configure(workers=0)
+
+
+def default_workers() -> int:
+    """The pool size ``cutok start`` uses: up to 4 on multi-core hosts, none on one core."""
+    cpus = os.cpu_count() or 1
+    return min(4, cpus) if cpus > 1 else 0
+
+
+attachment_pool = AttachmentPool(
+    int(os.getenv("TS_ATTACHMENT_WORKERS", "0")),
+    inline_bytes=int(os.getenv("TS_ATTACHMENT_INLINE_BYTES", str(_DEFAULT_INLINE_BYTES))),
+)
@@ -2,12 +2,24 @@
 
 Both guarantee ``value-identical`` output: parse both sides and the data structures compare
 equal. Invalid input is returned untouched — never corrupt.
+
+JSON of ``TS_STRUCTURED_STREAM_CHARS`` characters or more (default 8 Mi) is minified by
+``_stream_json`` without building the whole value: it walks the outer containers and decodes
+only values that fit a window, counting keys as it goes, and the key dictionary is one more
+pass of the same walk over the minified text. Output is the same as the in-memory path's except
+that an object with a repeated key, which ``json.loads`` would collapse, is left unchanged. Large
+YAML is still loaded whole, but with libyaml's ``CSafeLoader`` when PyYAML was built with it.
+Token counts on that path, and for CSV, are summed over chunks of about 1 Mi characters.
 """
 
 import csv
 import io
+import itertools
 import json
+import os
+import re
 from collections import Counter
+from collections.abc import Iterator
 from pathlib import Path
 from typing import Any
 
@@ -20,64 +32,97 @@ from cutok.core.types import Change, NormalizeResult
 _KEY_MIN_LEN = 12
 _KEY_MIN_COUNT = 10
 
+_STREAM_MIN_CHARS = int(os.getenv("TS_STRUCTURED_STREAM_CHARS", str(8 * 1024 * 1024)))
+_STREAM_WINDOW = 1024 * 1024  # characters decoded at once by the streaming minifier
+_COUNT_CHUNK = 1024 * 1024
+_CHUNK_BOUNDARY = re.compile(r"\n(?=[^\s/])")
+_YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+_WS = re.compile(r"[ \t\n\r]*")
+_DECODER = json.JSONDecoder()
+
 
 class JsonYamlNormalizer:
     name = "json_yaml"
 
+    def __init__(self, *, stream_min_chars: int = _STREAM_MIN_CHARS) -> None:
+        self.stream_min_chars = stream_min_chars
+
     def supports(self, filename: str) -> bool:
         return Path(filename).suffix.lower() in {".json", ".yaml", ".yml"}
 
     def normalize(self, text: str, filename: str, model: str) -> NormalizeResult:
         ext = Path(filename).suffix.lower()
         is_yaml = ext in {".yaml", ".yml"}
+        streaming = len(text) >= self.stream_min_chars
+        keys: Counter[str] = Counter()
+        obj: Any = None
         try:
-            obj = yaml.safe_load(text) if is_yaml else json.loads(text)
-        except (json.JSONDecodeError, yaml.YAMLError, ValueError):
+            if streaming and not is_yaml:
+                minified = _stream_json(text, keys=keys)
+            else:
+                if is_yaml:
+                    obj = yaml.load(text, Loader=_YAML_LOADER if streaming else yaml.SafeLoader)
+                else:
+                    obj = json.loads(text)
+                # TypeError: YAML dates and other non-JSON scalars. ValueError: a YAML alias
+                # that contains itself ("Circular reference detected").
+                minified = json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+                _count_keys(obj, keys)
+        except (json.JSONDecodeError, yaml.YAMLError, TypeError, ValueError):
             return NormalizeResult(text=text, changes=[], guarantee="value-identical")
-        if obj is None:
+        if minified == "null":
             return NormalizeResult(text=text, changes=[], guarantee="value-identical")
+        if streaming:
+            obj = None  # the rename pass walks the minified text; drop a loaded YAML tree now
 
-        changes: list[Change] = []
-        minified = json.dumps(obj, separators=(",", ":"), ensure_ascii=False, sort_keys=False)
+        def count(s: str) -> int:
+            return _count_chunked(s, model) if streaming else count_tokens(s, model).count
 
-        before = count_tokens(text, model).count
-        after = count_tokens(minified, model).count
+        changes: list[Change] = []
+        before = count(text)
+        after = count(minified)
         if minified != text:
             kind = "yaml_to_json" if is_yaml else "minify_json"
             desc = "converted YAML to minified JSON" if is_yaml else "minified JSON"
             changes.append(Change(kind=kind, description=desc, tokens_saved=before - after))
 
         current = minified
-        keymapped = self._apply_key_dictionary(obj, model)
+        keymapped = self._apply_key_dictionary(obj, minified, keys)
         if keymapped is not None:
-            kept = count_tokens(keymapped, model).count
-            if kept < count_tokens(current, model).count:
+            kept = count(keymapped)
+            if kept < after:
                 changes.append(
                     Change(
                         kind="key_dictionary",
                         description="aliased long repeated keys via KEYMAP header",
-                        tokens_saved=count_tokens(current, model).count - kept,
+                        tokens_saved=after - kept,
                     )
                 )
                 current = keymapped
 
         return NormalizeResult(text=current, changes=changes, guarantee="value-identical")
 
-    def _apply_key_dictionary(self, obj: Any, model: str) -> str | None:
-        """Return a KEYMAP-prefixed minified body, or None if no key qualifies."""
-        counter: Counter[str] = Counter()
-        _count_keys(obj, counter)
+    def _apply_key_dictionary(self, obj: Any, minified: str, keys: Counter[str]) -> str | None:
+        """Return a KEYMAP-prefixed minified body, or None if no key qualifies.
+
+        The body is ``obj`` renamed and dumped, or — when ``obj`` is None (streaming) — the
+        minified text walked again with the keys renamed on the way out.
+        """
         targets = sorted(
-            k for k, n in counter.items() if len(k) >= _KEY_MIN_LEN and n >= _KEY_MIN_COUNT
+            k for k, n in keys.items() if len(k) >= _KEY_MIN_LEN and n >= _KEY_MIN_COUNT
         )
         if not targets:
             return None
-        mapping = {orig: f"k{i + 1}" for i, orig in enumerate(targets)}
-        renamed = _rename_keys(obj, mapping)
+        # Aliases skip names the document already uses as keys: renaming a key onto a sibling's
+        # name would merge the two and lose a value.
+        aliases = (f"k{i}" for i in itertools.count(1))
+        mapping = {orig: next(a for a in aliases if a not in keys) for orig in targets}
         # KEYMAP maps short -> original so a consumer can restore exactly.
         restore = {short: orig for orig, short in mapping.items()}
         header = "KEYMAP: " + json.dumps(restore, separators=(",", ":"), ensure_ascii=False)
-        body = json.dumps(renamed, separators=(",", ":"), ensure_ascii=False)
+        if obj is None:
+            return _stream_json(minified, mapping=mapping, head=header + "\n")
+        body = json.dumps(_rename_keys(obj, mapping), separators=(",", ":"), ensure_ascii=False)
         return f"{header}\n{body}"
 
 
@@ -95,34 +140,35 @@ class CsvNormalizer:
         except csv.Error:
             return NormalizeResult(text=text, changes=[], guarantee="value-identical")
 
-        # Use only the detected delimiter with standard RFC-4180 quoting — never the sniffer's
-        # guessed quoting params, which can mis-unescape cells that contain quote characters.
-        rows = list(csv.reader(io.StringIO(text), delimiter=delimiter))
-        if not rows:
+        # Two passes over the text, one row in memory at a time. The first only measures: row
+        # counts, the widest row, and the last column holding a value. Use only the detected
+        # delimiter with standard RFC-4180 quoting — never the sniffer's guessed quoting params,
+        # which can mis-unescape cells that contain quote characters.
+        rows = empty_rows = width = keep = 0
+        for row in csv.reader(_lines(text), delimiter=delimiter):
+            rows += 1
+            # "Empty" means the empty string, not whitespace: a cell of " " is real data and
+            # must survive (value-identical). Only structurally-empty rows/columns are dropped.
+            last = len(row)
+            while last and not row[last - 1]:
+                last -= 1
+            if not last:
+                empty_rows += 1
+                continue
+            width = max(width, len(row))
+            keep = max(keep, last)
+        if rows == empty_rows:
             return NormalizeResult(text=text, changes=[], guarantee="value-identical")
 
         changes: list[Change] = []
-
-        # "Empty" means the empty string, not whitespace: a cell of " " is real data and must
-        # survive (value-identical). Only structurally-empty rows/columns are dropped.
-        non_empty = [r for r in rows if any(cell for cell in r)]
-        if len(non_empty) < len(rows):
+        if empty_rows:
             changes.append(
                 Change(
                     kind="strip_empty_rows",
-                    description=f"removed {len(rows) - len(non_empty)} empty row(s)",
+                    description=f"removed {empty_rows} empty row(s)",
                     tokens_saved=0,
                 )
             )
-        rows = non_empty
-        if not rows:
-            return NormalizeResult(text=text, changes=[], guarantee="value-identical")
-
-        width = max(len(r) for r in rows)
-        padded = [r + [""] * (width - len(r)) for r in rows]
-        keep = width
-        while keep > 0 and all(not row[keep - 1] for row in padded):
-            keep -= 1
         if keep < width:
             changes.append(
                 Change(
@@ -131,25 +177,52 @@ class CsvNormalizer:
                     tokens_saved=0,
                 )
             )
-        trimmed = [row[:keep] for row in padded]
 
+        # The second pass writes each kept row as TSV, padded or trimmed to ``keep`` cells.
+        # Value-identical-or-revert: every emitted line must re-parse to exactly that row.
         out = io.StringIO()
-        writer = csv.writer(out, delimiter="\t", lineterminator="\n", quoting=csv.QUOTE_MINIMAL)
-        writer.writerows(trimmed)
+        writer = csv.writer(_Echo(), delimiter="\t", lineterminator="\n", quoting=csv.QUOTE_MINIMAL)
+        for row in csv.reader(_lines(text), delimiter=delimiter):
+            if not any(row):
+                continue
+            cells = row[:keep] + [""] * (keep - len(row))
+            line = writer.writerow(cells)
+            try:
+                if next(csv.reader([line], delimiter="\t")) != cells:
+                    raise csv.Error("cell changed")
+            except csv.Error:  # e.g. a bare "\r", which "\n"-terminated TSV leaves unquoted
+                return NormalizeResult(text=text, changes=[], guarantee="value-identical")
+            out.write(line)
         result = out.getvalue()
 
-        # Value-identical-or-revert: the emitted TSV must re-parse to exactly the cells we kept.
-        if list(csv.reader(io.StringIO(result), delimiter="\t")) != trimmed:
-            return NormalizeResult(text=text, changes=[], guarantee="value-identical")
-
-        before = count_tokens(text, model).count
-        after = count_tokens(result, model).count
+        before = _count_chunked(text, model)
+        after = _count_chunked(result, model)
         changes.append(
             Change(kind="csv_to_tsv", description="compacted CSV to TSV", tokens_saved=before - after)
         )
         return NormalizeResult(text=result, changes=changes, guarantee="value-identical")
 
 
+class _Echo:
+    """A csv.writer target whose ``write`` returns the line, so ``writerow`` returns it too."""
+
+    def write(self, line: str) -> str:
+        return line
+
+
+def _lines(text: str) -> Iterator[str]:
+    """``text`` split after each line feed, as iterating ``io.StringIO(text)`` would, no copy."""
+    start = 0
+    while True:
+        end = text.find("\n", start) + 1
+        if not end:
+            if start < len(text):
+                yield text[start:]
+            return
+        yield text[start:end]
+        start = end
+
+
 def _count_keys(obj: Any, counter: Counter[str]) -> None:
     if isinstance(obj, dict):
         for k, v in obj.items():
@@ -167,3 +240,131 @@ def _rename_keys(obj: Any, mapping: dict[str, str]) -> Any:
     if isinstance(obj, list):
         return [_rename_keys(item, mapping) for item in obj]
     return obj
+
+
+def _count_chunked(text: str, model: str) -> int:
+    """``count_tokens`` summed over chunks of about ``_COUNT_CHUNK`` characters, so no token list
+    for the whole text is ever built.
+
+    Chunks end after a newline that starts a line with a non-space character, where the BPE
+    pre-tokenizers split anyway, so line-oriented text counts exactly. Text with no such newline
+    in reach (minified JSON) is cut at a fixed size and may be off by a token per chunk.
+    """
+    total = start = 0
+    while start < len(text):
+        end = start + _COUNT_CHUNK
+        if end < len(text):
+            m = _CHUNK_BOUNDARY.search(text, end, end + _COUNT_CHUNK)
+            end = m.end() if m else end
+        total += count_tokens(text[start:end], model).count
+        start = end
+    return total
+
+
+def _stream_json(
+    text: str,
+    *,
+    keys: Counter[str] | None = None,
+    mapping: dict[str, str] | None = None,
+    head: str = "",
+    window: int | None = None,
+) -> str:
+    """``head`` + ``text`` minified as ``json.dumps(json.loads(text))`` would, in bounded memory.
+
+    Containers are decoded whole when they fit a ``window``-character slice of the text (default
+    ``_STREAM_WINDOW``) and walked token by token when they don't, so only one window's worth of
+    values is alive at a time. Object keys are added to ``keys`` and renamed through ``mapping``
+    on the way out.
+    Raises ``ValueError`` for invalid JSON, and for a walked object that repeats a key.
+    """
+    window = window or _STREAM_WINDOW
+    out = io.StringIO()
+    out.write(head)
+    n = len(text)
+    buf_start, buf = 0, ""
+    stack: list[set[str] | None] = []  # per walked container: an object's keys, None for an array
+
+    def emit(obj: Any) -> None:
+        if keys is not None:
+            _count_keys(obj, keys)
+        if mapping:
+            obj = _rename_keys(obj, mapping)
+        out.write(json.dumps(obj, separators=(",", ":"), ensure_ascii=False))
+
+    def decode_container(pos: int) -> int | None:
+        """Decode and emit the container at ``pos`` if it fits a window; return its end."""
+        nonlocal buf_start, buf
+        while True:
+            rel = pos - buf_start
+            if rel < len(buf):
+                try:
+                    obj, end = _DECODER.raw_decode(buf, rel)
+                except json.JSONDecodeError:
+                    end = -1
+                if end >= 0:
+                    emit(obj)
+                    return buf_start + end
+                if rel == 0 or buf_start + len(buf) == n:
+                    return None  # bigger than a window (or invalid): walk it
+            buf_start, buf = pos, text[pos : pos + window]
+
+    pos = _WS.match(text, 0).end()
+    expect_key = False
+    while True:
+        if pos >= n:
+            raise ValueError("unexpected end of JSON")
+        if expect_key:
+            if text[pos] != '"':
+                raise ValueError(f"expecting a key at {pos}")
+            key, pos = json.decoder.scanstring(text, pos + 1)
+            seen = stack[-1]
+            assert seen is not None
+            if key in seen:
+                raise ValueError(f"repeated key {key!r}")
+            seen.add(key)
+            if keys is not None:
+                keys[key] += 1
+            out.write(json.dumps(mapping.get(key, key) if mapping else key, ensure_ascii=False))
+            pos = _WS.match(text, pos).end()
+            if text[pos : pos + 1] != ":":
+                raise ValueError(f"expecting ':' at {pos}")
+            out.write(":")
+            pos = _WS.match(text, pos + 1).end()
+            expect_key = False
+            continue
+
+        # A value: a container too big for a window opens a level; anything else is decoded.
+        char = text[pos]
+        end = decode_container(pos) if char in "{[" else None
+        if end is None and char in "{[":
+            close = "}" if char == "{" else "]"
+            out.write(char)
+            pos = _WS.match(text, pos + 1).end()
+            if text[pos : pos + 1] != close:
+                stack.append(set() if char == "{" else None)
+                expect_key = char == "{"
+                continue
+            out.write(close)
+            end = pos + 1
+        elif end is None:
+            obj, end = _DECODER.raw_decode(text, pos)
+            emit(obj)
+
+        # After a value: a comma, or the end of one or more walked containers.
+        pos = _WS.match(text, end).end()
+        while stack:
+            close = "]" if stack[-1] is None else "}"
+            if text[pos : pos + 1] == ",":
+                out.write(",")
+                pos = _WS.match(text, pos + 1).end()
+                expect_key = stack[-1] is not None
+                break
+            if text[pos : pos + 1] != close:
+                raise ValueError(f"expecting ',' or {close!r} at {pos}")
+            out.write(close)
+            stack.pop()
+            pos = _WS.match(text, pos + 1).end()
+        else:
+            if pos != n:
+                raise ValueError(f"extra data at {pos}")
+            return out.getvalue()
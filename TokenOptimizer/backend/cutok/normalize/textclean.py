@@ -2,21 +2,25 @@
 
 Five ordered passes (de-hyphenate, collapse blank runs, strip HTML comments, drop repeated
 header/footer lines, normalize unicode punctuation). Every pass is fence-aware: content inside
-triple-backtick fenced code blocks is byte-identical before and after.
+triple-backtick fenced code blocks is byte-identical before and after. ``TextCleanStream`` runs
+the same passes on a document that arrives page by page (streamed PDF extraction).
 """
 
 import re
 from collections import Counter
 from pathlib import Path
 
-from cutok.core.tokens import count_tokens
+from cutok.core.tokens import SegmentCounter
 from cutok.core.types import Change, NormalizeResult
+from cutok.normalize.document import Document, document, register, split_fences
 
-_FENCE_RE = re.compile(r"```[\s\S]*?```")
 _DEHYPHEN_RE = re.compile(r"(\w+)-\n(\w+)")
+_LINE_BREAK_HYPHEN_RE = re.compile(r"-\n(?=\w)")
+_WORD_RE = re.compile(r"\w+")
 _BLANK_RE = re.compile(r"\n{4,}")  # 3+ blank lines == 4+ newlines
 _COMMENT_RE = re.compile(r"<!--[\s\S]*?-->")
 _PAGE_NUM_RE = re.compile(r"\b\d{1,4}\b")
+_REPEAT_MIN = 4  # a header/footer line must occur this often before copies are dropped
 
 # Smart quotes, en/em dashes, ellipsis, non-breaking space → ASCII.
 _PUNCT_MAP = {
@@ -31,22 +35,6 @@ _PUNCT_MAP = {
 }
 
 
-def split_fences(text: str) -> list[tuple[bool, str]]:
-    """Split into ``(is_code, segment)`` parts; code parts are whole fenced blocks, untouched."""
-    parts: list[tuple[bool, str]] = []
-    idx = 0
-    for m in _FENCE_RE.finditer(text):
-        if m.start() > idx:
-            parts.append((False, text[idx : m.start()]))
-        parts.append((True, m.group()))
-        idx = m.end()
-    if idx < len(text):
-        parts.append((False, text[idx:]))
-    if not parts:
-        parts.append((False, text))
-    return parts
-
-
 def _map_prose(text: str, fn) -> str:
     return "".join(seg if is_code else fn(seg) for is_code, seg in split_fences(text))
 
@@ -55,8 +43,18 @@ def _prose_only(text: str) -> str:
     return "".join(seg for is_code, seg in split_fences(text) if not is_code)
 
 
-def dehyphenate(text: str) -> str:
-    words = {w.lower() for w in re.findall(r"\w+", _prose_only(text))}
+def _words(text: str) -> set[str]:
+    return {w.lower() for w in set(_WORD_RE.findall(_prose_only(text)))}
+
+
+def dehyphenate(text: str, words: set[str] | None = None) -> str:
+    """Join words hyphenated across a line break when the joined word occurs in the text.
+
+    ``words`` (lowercase) replaces the vocabulary taken from ``text``, for callers that see a
+    document in pieces.
+    """
+    if words is None:
+        words = _words(text)
 
     def repl(m: re.Match) -> str:
         joined = m.group(1) + m.group(2)
@@ -67,6 +65,30 @@ def dehyphenate(text: str) -> str:
     return _map_prose(text, lambda s: _DEHYPHEN_RE.sub(repl, s))
 
 
+def _join_hyphenated(seg: str, join) -> str:
+    """``_DEHYPHEN_RE.sub`` that finds each ``-\\n`` directly and walks back over the word before
+    it, instead of trying the pattern at every word character. ``join(head, tail)`` decides."""
+    out: list[str] = []
+    last = 0  # end of the previous match; its second word cannot start another
+    for m in _LINE_BREAK_HYPHEN_RE.finditer(seg):
+        start = head = m.start()
+        while head > last and (seg[head - 1].isalnum() or seg[head - 1] == "_"):
+            head -= 1
+        if head == start:
+            continue
+        tail = _WORD_RE.match(seg, m.end())
+        if join(seg[head:start], tail.group()):
+            out.append(seg[last:head])
+            out.append(seg[head:start] + tail.group())
+        else:
+            out.append(seg[last : tail.end()])
+        last = tail.end()
+    if not out:
+        return seg
+    out.append(seg[last:])
+    return "".join(out)
+
+
 def collapse_blank_lines(text: str) -> str:
     return _map_prose(text, lambda s: _BLANK_RE.sub("\n\n", s))
 
@@ -84,15 +106,17 @@ def _is_header_footer(stripped: str) -> bool:
     return False
 
 
+def _is_repeatable(stripped: str) -> bool:
+    return len(stripped) >= 20 and _is_header_footer(stripped)
+
+
 def remove_repeated_lines(text: str) -> str:
     parts = split_fences(text)
     counts: Counter[str] = Counter()
     for is_code, seg in parts:
         if not is_code:
             counts.update(line.strip() for line in seg.split("\n") if line.strip())
-    removable = {
-        s for s, n in counts.items() if n >= 4 and len(s) >= 20 and _is_header_footer(s)
-    }
+    removable = {s for s, n in counts.items() if n >= _REPEAT_MIN and _is_repeatable(s)}
     if not removable:
         return text
 
@@ -125,6 +149,103 @@ _PASSES = [
 ]
 
 
+_DESCRIPTIONS = {kind: desc for _, kind, desc in _PASSES}
+_PUNCT_RE = re.compile("[" + "".join(map(chr, _PUNCT_MAP)) + "]")
+
+
+def _replace_punct(seg: str) -> str:
+    # One C-level replace per character present beats ``str.translate`` with a mapping that has
+    # multi-character values, which falls back to a per-character dict lookup.
+    for code, ascii_ in _PUNCT_MAP.items():
+        if chr(code) in seg:
+            seg = seg.replace(chr(code), ascii_)
+    return seg
+
+
+def _sequential_stages(text: str) -> list[tuple[str, str]]:
+    """``(kind, text after the pass)`` for each of ``_PASSES`` that changed the text."""
+    stages = []
+    current = text
+    for fn, kind, _ in _PASSES:
+        new = fn(current)
+        if new != current:
+            stages.append((kind, new))
+            current = new
+    return stages
+
+
+def _fused_stages(doc: Document) -> list[tuple[str, Document]] | None:
+    """``_sequential_stages`` over the document's one fence split, skipping segments a pass cannot
+    touch; each stage's result is derived from ``doc`` without re-splitting.
+
+    The passes never add or remove backticks except by deleting a comment or a repeated line, so
+    the fence layout of the first split holds for every later pass unless one of those deletions
+    lands in a segment containing a backtick — then fences could re-pair, and this returns None
+    for the caller to run the passes one by one.
+    """
+    kinds = [is_code for is_code, _ in doc.parts]
+    segs = [seg for _, seg in doc.parts]
+    prose = [i for i, is_code in enumerate(kinds) if not is_code]
+    stages: list[tuple[str, Document]] = []
+    words: set[str] | None = None
+
+    def join(head: str, tail: str) -> bool:
+        nonlocal words
+        if tail[:1].islower():
+            return True
+        if words is None:  # the vocabulary only matters for capitalized continuations
+            prose_text = "".join(seg for is_code, seg in doc.parts if not is_code)
+            words = {w.lower() for w in set(_WORD_RE.findall(prose_text))}
+        return (head + tail).lower() in words
+
+    def run(kind: str, marker, fn, *, guarded: bool = False) -> bool:
+        changed = False
+        for i in prose:
+            seg = segs[i]
+            if not marker(seg):
+                continue
+            new = fn(seg)
+            if new != seg:
+                if guarded and "`" in seg:
+                    return False
+                segs[i] = new
+                changed = True
+        if changed:
+            stages.append((kind, doc.derive(zip(kinds, segs, strict=True))))
+        return True
+
+    run("dehyphenate", lambda s: "-\n" in s, lambda s: _join_hyphenated(s, join))
+    run("collapse_blank_lines", lambda s: "\n\n\n\n" in s, lambda s: _BLANK_RE.sub("\n\n", s))
+    comments = (lambda s: "<!--" in s, lambda s: _COMMENT_RE.sub("", s))
+    if not run("strip_html_comments", *comments, guarded=True):
+        return None
+
+    # Only lines of 20+ characters can be headers/footers, so only those are counted.
+    counts: Counter[str] = Counter()
+    for i in prose:
+        counts.update(s for line in segs[i].split("\n") if len(s := line.strip()) >= 20)
+    removable = {s for s, n in counts.items() if n >= _REPEAT_MIN and _is_repeatable(s)}
+    if removable:
+        seen: set[str] = set()
+
+        def drop_repeats(seg: str) -> str:
+            out = []
+            for line in seg.split("\n"):
+                s = line.strip()
+                if s in removable:
+                    if s in seen:
+                        continue
+                    seen.add(s)
+                out.append(line)
+            return "\n".join(out)
+
+        if not run("remove_repeated_lines", bool, drop_repeats, guarded=True):
+            return None
+
+    run("normalize_unicode_punct", _PUNCT_RE.search, _replace_punct)
+    return stages
+
+
 class TextCleanNormalizer:
     name = "textclean"
 
@@ -132,13 +253,81 @@ class TextCleanNormalizer:
         return Path(filename).suffix.lower() in {".md", ".txt"}
 
     def normalize(self, text: str, filename: str, model: str) -> NormalizeResult:
+        doc = document(text)
+        fused = _fused_stages(doc)
+        if fused is None:
+            stages = _sequential_stages(text)
+        else:
+            stages = [(kind, stage.text) for kind, stage in fused]
+            if fused:
+                register(fused[-1][1])  # dedup and delta downstream reuse its fence split
         current = text
         changes: list[Change] = []
-        for fn, kind, desc in _PASSES:
-            new = fn(current)
+        counter = doc.counter(model)  # re-encodes only the paragraphs each pass touched
+        for kind, new in stages:
+            before = counter.count(current)
+            after = counter.count(new)
+            desc = _DESCRIPTIONS[kind]
+            changes.append(Change(kind=kind, description=desc, tokens_saved=before - after))
+            current = new
+        return NormalizeResult(text=current, changes=changes, guarantee="render-equivalent")
+
+
+class TextCleanStream:
+    """The textclean passes applied page by page, for documents too large to hold whole.
+
+    ``feed`` cleans one page as it arrives. The two document-wide passes work from what has been
+    seen so far: de-hyphenation knows the words of this and earlier pages, and a header/footer
+    line is dropped once earlier pages have carried it ``_REPEAT_MIN - 1`` times (the batch pass
+    keeps only the first copy, but must see the whole document to know a line repeats).
+    Token savings are tallied per pass; ``changes()`` reports them like ``TextCleanNormalizer``.
+    """
+
+    def __init__(self, model: str) -> None:
+        self.model = model
+        self._words: set[str] = set()
+        self._line_pages: Counter[str] = Counter()
+        self._saved = {kind: 0 for _, kind, _ in _PASSES}
+        self._touched: set[str] = set()
+
+    def feed(self, page: str) -> str:
+        self._words |= _words(page)
+        passes = {
+            "dehyphenate": lambda text: dehyphenate(text, self._words),
+            "remove_repeated_lines": self._remove_seen_lines,
+        }
+        current = page
+        counter = SegmentCounter(self.model)
+        for fn, kind, _ in _PASSES:
+            new = passes.get(kind, fn)(current)
             if new != current:
-                before = count_tokens(current, model).count
-                after = count_tokens(new, model).count
-                changes.append(Change(kind=kind, description=desc, tokens_saved=before - after))
+                self._saved[kind] += counter.count(current) - counter.count(new)
+                self._touched.add(kind)
                 current = new
-        return NormalizeResult(text=current, changes=changes, guarantee="render-equivalent")
+        return current
+
+    def changes(self) -> list[Change]:
+        return [
+            Change(kind=kind, description=desc, tokens_saved=self._saved[kind])
+            for _, kind, desc in _PASSES
+            if kind in self._touched
+        ]
+
+    def _remove_seen_lines(self, page: str) -> str:
+        parts = split_fences(page)
+        on_page = {
+            line.strip()
+            for is_code, seg in parts
+            if not is_code
+            for line in seg.split("\n")
+            if _is_repeatable(line.strip())
+        }
+        removable = {s for s in on_page if self._line_pages[s] >= _REPEAT_MIN - 1}
+        self._line_pages.update(on_page)
+        if not removable:
+            return page
+
+        def process(seg: str) -> str:
+            return "\n".join(line for line in seg.split("\n") if line.strip() not in removable)
+
+        return "".join(seg if is_code else process(seg) for is_code, seg in parts)
@@ -3,23 +3,31 @@
 Extended in T13 (cache optimization) and T14 (response budgeting); the proxy (T17) drives all
 features in sequence. Normalizer failures are logged and degrade to a no-op — a bad file never
 crashes the request.
+
+``optimize_payload`` threads one copy-on-write ``PayloadWriter`` through every stage: the payload
+is copied only along the paths a stage rewrites, never deep-copied, and never mutated in place.
 """
 
-import ast
 import base64
 import logging
 from dataclasses import dataclass
 from pathlib import Path
 
-from cutok.budget.response_budget import apply_response_budget
-from cutok.cache.cache_optimizer import optimize_for_cache
+from cutok.budget.response_budget import run_budget_stage
+from cutok.cache.cache_optimizer import run_cache_stage
+from cutok.cache.tool_schema import run_schema_stage
 from cutok.core.ledger import Ledger
-from cutok.core.tokens import count_tokens
+from cutok.core.payload import PayloadWriter
+from cutok.core.tokens import count_tokens, count_tokens_batch
 from cutok.core.types import Change, OptimizationResult, OptimizerConfig
-from cutok.normalize.code import _LINE_COMMENT, CodeNormalizer
+from cutok.normalize.code import CodeNormalizer, strip_comments
 from cutok.normalize.dedup import dedup_chunks
 from cutok.normalize.delta import DeltaStore
 from cutok.normalize.extract import ExtractionError, extract_to_markdown, is_binary_format
+from cutok.normalize.history import HistoryStore, run_history_stage
+from cutok.normalize.memo import MessageMemo, message_digest
+from cutok.normalize.pdf import extract_pdf
+from cutok.normalize.pool import attachment_pool
 from cutok.normalize.structured import CsvNormalizer, JsonYamlNormalizer
 from cutok.normalize.textclean import TextCleanNormalizer
 
@@ -45,29 +53,12 @@ _FORMAT_NORMALIZERS = (_JSON_YAML, _CSV, _CODE)
 _PROSE_EXTS = {".txt", ".md", ".markdown"}
 
 
-def _strip_code_comments(text: str, filename: str) -> str:
-    """Remove full-line comments from code. Python is AST-verified (comments aren't in the AST), so
-    it stays ast-identical; other languages are best-effort behavior-preserving (comments dropped)."""
-    ext = Path(filename).suffix.lower()
-    prefix = _LINE_COMMENT.get(ext)
-    if not prefix:
-        return text
-    stripped = "\n".join(ln for ln in text.split("\n") if not ln.lstrip().startswith(prefix))
-    if ext == ".py":
-        try:
-            if ast.dump(ast.parse(text)) != ast.dump(ast.parse(stripped)):
-                return text
-        except SyntaxError:
-            return text
-    return stripped
-
-
-def _compress_prose_via_service(text: str, config: OptimizerConfig) -> str:
+def _compress_prose_via_service(texts: list[str], config: OptimizerConfig) -> list[str]:
     """Run prose through the shared compression model (no-op if the service isn't configured)."""
     from cutok.compress import service
 
-    remote = service.compress(text, rate=config.compression_keep_ratio, model=config.model)
-    return remote["text"] if remote else text
+    remote = service.compress_many(texts, rate=config.compression_keep_ratio, model=config.model)
+    return [r["text"] if r else text for text, r in zip(texts, remote, strict=True)]
 
 
 @dataclass
@@ -84,49 +75,160 @@ def normalize_attachments(
     ledger: Ledger,
 ) -> tuple[dict[str, str], OptimizationResult]:
     """Normalize every attachment, dedup across them, delta-encode resends; record to the ledger."""
+    prepared = _prepare_attachments(attachments, config)
+    return _finish_attachments(prepared, session_id, config, delta_store, ledger)
+
+
+def _prepare_attachments(
+    attachments: list[Attachment], config: OptimizerConfig
+) -> list[tuple[str, str, int, list[Change]]]:
+    """The per-file half of normalization: (filename, text, tokens before, changes) for each."""
+    return _compress_files(_normalize_files(attachments, config), config)
+
+
+def _normalize_files(
+    attachments: list[Attachment], config: OptimizerConfig
+) -> list[tuple[str, str, int, list[Change]]]:
+    """``_prepare_attachments`` up to model compression.
+
+    Depends only on the attachment and the config, which is what lets ``MessageMemo`` reuse it.
+    The CPU-bound part fans out over ``attachment_pool``; results keep the input order.
+    """
+    normalized = attachment_pool.map(
+        _normalize_file, [(att, config) for att in attachments], [len(a.data) for a in attachments]
+    )
+    return [(att.filename, *result) for att, result in zip(attachments, normalized, strict=True)]
+
+
+def _normalize_file(att: Attachment, config: OptimizerConfig) -> tuple[str, int, list[Change]]:
+    """Extract, clean, format-normalize and (lossy tier) strip comments. Runs in pool workers."""
     model = config.model
-    texts: dict[str, str] = {}
     changes: list[Change] = []
-    tokens_before = 0
-
-    for att in attachments:
+    streamed = _stream_pdf(att, config, changes)
+    if streamed is not None:
+        # Already cleaned page by page.
+        text, tokens_before = streamed
+    else:
         try:
-            extracted = extract_to_markdown(att.data, att.filename)
+            text = extract_to_markdown(att.data, att.filename)
         except ExtractionError:
             logger.warning("extraction failed for %s; using replace-decoded bytes", att.filename)
-            extracted = att.data.decode("utf-8", errors="replace")
-        tokens_before += count_tokens(extracted, model).count
-
-        text = extracted
+            text = att.data.decode("utf-8", errors="replace")
+        tokens_before = count_tokens(text, model).count
         # Binary extraction output always gets a text-cleanup pass (PDF artifacts etc.).
         if is_binary_format(att.filename):
             text = _safe_normalize(_TEXTCLEAN, text, att.filename, model, changes)
 
-        fmt = _select_format_normalizer(att.filename)
-        if fmt is not None:
-            text = _safe_normalize(fmt, text, att.filename, model, changes)
-        elif not is_binary_format(att.filename):
-            text = _safe_normalize(_TEXTCLEAN, text, att.filename, model, changes)
+    fmt = _select_format_normalizer(att.filename)
+    if fmt is not None:
+        text = _safe_normalize(fmt, text, att.filename, model, changes)
+    elif not is_binary_format(att.filename):
+        text = _safe_normalize(_TEXTCLEAN, text, att.filename, model, changes)
+
+    # Opt-in lossy tier, part one: strip code comments (prose compression is ``_compress_files``).
+    if config.enable_compression and _CODE.supports(att.filename):
+        new = strip_comments(text, att.filename)
+        if new != text:
+            desc = "removed code comments"
+            _record_lossy(changes, "strip_comments", desc, att.filename, text, new, model)
+            text = new
+    return text, tokens_before, changes
+
+
+def _stream_pdf(
+    att: Attachment, config: OptimizerConfig, changes: list[Change]
+) -> tuple[str, int] | None:
+    """Budgeted page-by-page PDF extraction when ``max_attachment_tokens`` is set.
+
+    Returns ``(text, tokens_before)``, or None to take the MarkItDown path (budget unset, not a
+    PDF, or pdfminer failed on it).
+    """
+    budget = config.max_attachment_tokens
+    if budget is None or Path(att.filename).suffix.lower() != ".pdf":
+        return None
+    if not att.data.startswith(b"%PDF"):
+        return None
+    try:
+        result = extract_pdf(att.data, config.model, token_budget=budget)
+    except Exception:
+        logger.exception("streamed extraction failed for %s; using MarkItDown", att.filename)
+        return None
+    changes.extend(result.changes)
+    tokens_before = result.raw_tokens
+    if result.truncated:
+        # Pages past the budget are never parsed; estimate their size from the pages read.
+        tokens_before = result.raw_tokens * result.pages_total // result.pages_read
+        desc = (
+            f"kept pages 1-{result.pages_read} of {result.pages_total} within the "
+            f"{budget}-token attachment budget ({att.filename})"
+        )
+        saved = tokens_before - result.raw_tokens
+        changes.append(Change(kind="truncate", description=desc, tokens_saved=saved))
+    return result.text, tokens_before
+
+
+def _compress_files(
+    prepared: list[tuple[str, str, int, list[Change]]], config: OptimizerConfig
+) -> list[tuple[str, str, int, list[Change]]]:
+    """Opt-in lossy tier, part two: model-compress prose / extracted documents via the service.
+
+    Kept in the calling process and out of ``MessageMemo``: the result depends on the runtime
+    endpoint and on whether the service answers. Every eligible file goes out in one
+    ``compress_many`` call.
+    """
+    if not config.enable_compression:
+        return prepared
+    out = list(prepared)
+    todo = [
+        i
+        for i, (filename, text, _, _) in enumerate(out)
+        if _wants_compression(filename)
+        and count_tokens(text, config.model).count >= config.compression_min_tokens
+    ]
+    if not todo:
+        return out
+    compressed = _compress_prose_via_service([out[i][1] for i in todo], config)
+    for i, new in zip(todo, compressed, strict=True):
+        filename, text, tokens_before, changes = out[i]
+        if new != text:
+            desc = "model-compressed prose"
+            _record_lossy(changes, "compress", desc, filename, text, new, config.model)
+            out[i] = (filename, new, tokens_before, changes)
+    return out
+
+
+def _wants_compression(filename: str) -> bool:
+    if _CODE.supports(filename):
+        return False
+    return is_binary_format(filename) or Path(filename).suffix.lower() in _PROSE_EXTS
+
+
+def _record_lossy(
+    changes: list[Change], kind: str, desc: str, filename: str, old: str, new: str, model: str
+) -> None:
+    b = count_tokens(old, model).count
+    a = count_tokens(new, model).count
+    changes.append(Change(kind=kind, description=f"{desc} ({filename})", tokens_saved=b - a))
+
+
+def _finish_attachments(
+    prepared: list[tuple[str, str, int, list[Change]]],
+    session_id: str,
+    config: OptimizerConfig,
+    delta_store: DeltaStore,
+    ledger: Ledger,
+) -> tuple[dict[str, str], OptimizationResult]:
+    """The cross-file half: dedup and delta-encode ``(filename, text, tokens before, changes)``."""
+    model = config.model
+    texts = {filename: text for filename, text, _, _ in prepared}
+    changes = [c for _, _, _, file_changes in prepared for c in file_changes]
+    tokens_before = sum(before for _, _, before, _ in prepared)
 
-        # Opt-in lossy tier: strip code comments, and model-compress prose / extracted documents.
-        if config.enable_compression:
-            kind = desc = None
-            new = text
-            if _CODE.supports(att.filename):
-                new, kind, desc = _strip_code_comments(text, att.filename), "strip_comments", "removed code comments"
-            elif is_binary_format(att.filename) or Path(att.filename).suffix.lower() in _PROSE_EXTS:
-                new, kind, desc = _compress_prose_via_service(text, config), "compress", "model-compressed prose"
-            if kind and new != text:
-                b = count_tokens(text, model).count
-                a = count_tokens(new, model).count
-                changes.append(Change(kind=kind, description=f"{desc} ({att.filename})", tokens_saved=b - a))
-                text = new
-
-        texts[att.filename] = text
-
-    # Cross-file: dedup identical paragraphs, then delta-encode resent files.
+    # Cross-file: dedup identical (opt-in: near-identical) paragraphs, then delta-encode resends.
     try:
-        texts, dedup_changes = dedup_chunks(texts, model)
+        texts, dedup_changes = dedup_chunks(
+            texts, model, near_threshold=config.near_dedup_threshold
+        )
         changes.extend(dedup_changes)
     except Exception:
         logger.exception("dedup pass failed; skipping")
@@ -141,7 +243,7 @@ def normalize_attachments(
         except Exception:
             logger.exception("delta pass failed for %s; skipping", filename)
 
-    tokens_after = sum(count_tokens(t, model).count for t in texts.values())
+    tokens_after = sum(count_tokens_batch(list(texts.values()), model))
     result = OptimizationResult(
         feature="normalization",
         tokens_before=tokens_before,
@@ -153,39 +255,105 @@ def normalize_attachments(
 
 
 def collect_document_attachments(payload: dict) -> tuple[list[Attachment], list[tuple]]:
-    """Find base64 document blocks in an Anthropic/OpenAI-shaped payload and where they sit."""
+    """Find base64 document blocks in an Anthropic/OpenAI-shaped payload and where they sit.
+
+    Placements are ``(message_index, block_index, filename)`` paths into ``payload``.
+    """
     attachments: list[Attachment] = []
     placements: list[tuple] = []
     messages = payload.get("messages")
     if not isinstance(messages, list):
         return attachments, placements
-    counter = 0
-    for msg in messages:
-        content = msg.get("content") if isinstance(msg, dict) else None
-        if not isinstance(content, list):
-            continue
-        for i, block in enumerate(content):
-            if not isinstance(block, dict) or block.get("type") != "document":
-                continue
-            source = block.get("source") or {}
-            if source.get("type") != "base64" or not isinstance(source.get("data"), str):
-                continue
-            try:
-                data = base64.b64decode(source["data"])
-            except (ValueError, TypeError):
-                continue
-            ext = _MEDIA_EXT.get(source.get("media_type", ""), ".txt")
-            fname = f"attachment_{counter}{ext}"
-            counter += 1
-            attachments.append(Attachment(fname, data))
-            placements.append((content, i, fname))
+    for mi, msg in enumerate(messages):
+        for i, att in _message_attachments(_document_blocks(msg), len(attachments)):
+            attachments.append(att)
+            placements.append((mi, i, att.filename))
     return attachments, placements
 
 
-def apply_attachment_texts(placements: list[tuple], texts: dict[str, str]) -> None:
-    for content, index, fname in placements:
+def _document_blocks(message) -> list[tuple[int, str, str]]:
+    """``(block index, media type, base64 data)`` of every base64 document block in ``message``."""
+    content = message.get("content") if isinstance(message, dict) else None
+    if not isinstance(content, list):
+        return []
+    blocks = []
+    for i, block in enumerate(content):
+        if not isinstance(block, dict) or block.get("type") != "document":
+            continue
+        source = block.get("source") or {}
+        if source.get("type") != "base64" or not isinstance(source.get("data"), str):
+            continue
+        blocks.append((i, source.get("media_type", ""), source["data"]))
+    return blocks
+
+
+def _message_attachments(
+    blocks: list[tuple[int, str, str]], counter: int
+) -> list[tuple[int, Attachment]]:
+    """Decode document blocks into attachments numbered from ``counter`` (bad base64 skipped)."""
+    attachments: list[tuple[int, Attachment]] = []
+    for i, media_type, data in blocks:
+        try:
+            raw = base64.b64decode(data)
+        except (ValueError, TypeError):
+            continue
+        ext = _MEDIA_EXT.get(media_type, ".txt")
+        attachments.append((i, Attachment(f"attachment_{counter + len(attachments)}{ext}", raw)))
+    return attachments
+
+
+def _prepare_documents(
+    payload: dict, config: OptimizerConfig, memo: MessageMemo, session_id: str
+) -> tuple[list[tuple[str, str, int, list[Change]]], list[tuple]]:
+    """``collect_document_attachments`` + ``_prepare_attachments``, reusing memoized messages.
+
+    The memo holds attachments as ``_normalize_files`` leaves them; model compression runs on
+    every request.
+    """
+    messages = payload.get("messages")
+    if not isinstance(messages, list):
+        return [], []
+    # First find every message the memo misses, so their attachments are prepared in one batch.
+    found: list[tuple[int, tuple | None, bytes, list[tuple[int, Attachment]]]] = []
+    counter = 0
+    for mi, msg in enumerate(messages):
+        blocks = _document_blocks(msg)
+        if not blocks:
+            continue
+        digest = message_digest(blocks, counter, config)
+        entries = memo.get(session_id, digest)
+        if entries is None:
+            fresh = _message_attachments(blocks, counter)
+            counter += len(fresh)
+            found.append((mi, None, digest, fresh))
+        else:
+            counter += len(entries)
+            found.append((mi, entries, digest, []))
+    missing = [att for _, _, _, fresh in found for _, att in fresh]
+    results = iter(_normalize_files(missing, config))
+
+    prepared: list[tuple[str, str, int, list[Change]]] = []
+    placements: list[tuple] = []
+    for mi, entries, digest, fresh in found:
+        if entries is None:
+            prepared_fresh = []
+            for i, att in fresh:
+                _, text, tokens_before, changes = next(results)
+                prepared_fresh.append((i, att.filename, text, tokens_before, tuple(changes)))
+            entries = tuple(prepared_fresh)
+            memo.put(session_id, digest, entries)
+        for i, filename, text, tokens_before, changes in entries:
+            prepared.append((filename, text, tokens_before, list(changes)))
+            placements.append((mi, i, filename))
+    return _compress_files(prepared, config), placements
+
+
+def apply_attachment_texts(
+    writer: PayloadWriter, placements: list[tuple], texts: dict[str, str]
+) -> None:
+    for mi, index, fname in placements:
         if fname in texts:
-            content[index] = {"type": "text", "text": texts[fname]}
+            writer.own("messages", mi, "content")[index] = {"type": "text", "text": texts[fname]}
 
 
 def optimize_payload(
@@ -194,34 +362,48 @@ def optimize_payload(
     ledger: Ledger,
     delta_store: DeltaStore,
     session_id: str = "session",
+    *,
+    history: HistoryStore | None = None,
+    memo: MessageMemo | None = None,
 ) -> tuple[dict, list[OptimizationResult]]:
     """Run the full secret-free engine over a request payload. Shared by the proxy and the demo.
 
-    Normalizes document attachments, optimizes for cache, optionally compresses prose, and applies
-    response-budget hints. Returns the optimized payload and one OptimizationResult per feature.
+    Normalizes document attachments, collapses paragraphs repeated across messages, canonicalizes
+    tool schemas, optimizes for cache, optionally compresses prose, and applies response-budget
+    hints. Returns the optimized payload and one OptimizationResult per feature. ``payload`` is
+    never mutated; the result shares every untouched sub-object with it. ``history`` keeps the
+    per-conversation paragraph index between calls; without it each call indexes the conversation
+    from scratch. ``memo`` likewise keeps each message's normalized attachments, so only new
+    messages are extracted.
     """
     results: list[OptimizationResult] = []
-
-    attachments, placements = collect_document_attachments(payload)
-    if attachments:
-        texts, norm_res = normalize_attachments(
-            attachments, session_id, config, delta_store, ledger
-        )
-        apply_attachment_texts(placements, texts)
+    writer = PayloadWriter(payload)
+
+    if memo is None:
+        attachments, placements = collect_document_attachments(payload)
+        prepared = _prepare_attachments(attachments, config)
+    else:
+        prepared, placements = _prepare_documents(payload, config, memo, session_id)
+    if prepared:
+        texts, norm_res = _finish_attachments(prepared, session_id, config, delta_store, ledger)
+        apply_attachment_texts(writer, placements, texts)
         results.append(norm_res)
 
-    payload, cache_res = optimize_for_cache(payload, config, ledger)
-    results.append(cache_res)
+    if config.dedup_history:
+        results.append(run_history_stage(writer, config, ledger, history, session_id))
+
+    if config.canonicalize_schemas:
+        results.append(run_schema_stage(writer, config, ledger))
+
+    results.append(run_cache_stage(writer, config, ledger))
 
     if config.enable_compression:
-        from cutok.compress import compress_payload
+        from cutok.compress import run_compress_stage
 
-        payload, comp_res = compress_payload(payload, config, ledger)
-        results.append(comp_res)
+        results.append(run_compress_stage(writer, config, ledger))
 
-    payload, budget_res = apply_response_budget(payload, config, ledger)
-    results.append(budget_res)
-    return payload, results
+    results.append(run_budget_stage(writer, config, ledger))
+    return writer.payload, results
 
 
 def compress_text(text: str, config: OptimizerConfig) -> tuple[str, OptimizationResult]:
@@ -233,22 +415,42 @@ def compress_text(text: str, config: OptimizerConfig) -> tuple[str, Optimization
     is no local fallback. All callers (library, MCP, proxy) go through here, so compression is
     consistent everywhere.
     """
-    before = count_tokens(text, config.model).count
-    out = text
-    kind = "none"
+    return compress_texts([text], config, min_tokens=0)[0]
+
+
+def compress_texts(
+    texts: list[str], config: OptimizerConfig, *, min_tokens: int | None = None
+) -> list[tuple[str, OptimizationResult]]:
+    """``compress_text`` for many strings, sent to the service together. Pure (no ledger).
+
+    Texts under ``min_tokens`` (default ``config.compression_min_tokens``) are returned unchanged
+    without a round trip: compressing them saves less than the call costs.
+    """
+    floor = config.compression_min_tokens if min_tokens is None else min_tokens
+    befores = count_tokens_batch(texts, config.model)
+    outs = list(texts)
     if config.enable_compression:
         from cutok.compress import service
 
-        remote = service.compress(text, rate=config.compression_keep_ratio, model=config.model)
-        if remote is not None:
-            out = remote["text"]
-            kind = "model"
-
-    after = count_tokens(out, config.model).count
-    changes = [Change(kind, f"prompt compression ({kind})", before - after)] if out != text else []
-    return out, OptimizationResult(
-        feature="compression", tokens_before=before, tokens_after=after, changes=changes
-    )
+        todo = [i for i, before in enumerate(befores) if before >= floor]
+        remote = service.compress_many(
+            [texts[i] for i in todo], rate=config.compression_keep_ratio, model=config.model
+        )
+        for i, r in zip(todo, remote, strict=True):
+            if r is not None:
+                outs[i] = r["text"]
+
+    afters = count_tokens_batch(outs, config.model)
+    results = []
+    for text, out, before, after in zip(texts, outs, befores, afters, strict=True):
+        changes = []
+        if out != text:
+            changes.append(Change("model", "prompt compression (model)", before - after))
+        result = OptimizationResult(
+            feature="compression", tokens_before=before, tokens_after=after, changes=changes
+        )
+        results.append((out, result))
+    return results
 
 
 def _select_format_normalizer(filename: str):
@@ -23,6 +23,28 @@ def build_parser() -> argparse.ArgumentParser:
     start.add_argument("--enable-compression", action="store_true", help="enable prompt compression")
     start.add_argument("--brevity", action="store_true", help="inject a concise-output directive")
     start.add_argument("--max-output-tokens", type=int, default=None)
+    start.add_argument(
+        "--near-dedup",
+        type=float,
+        default=None,
+        metavar="THRESHOLD",
+        help="also collapse near-duplicate paragraphs at this similarity (e.g. 0.8)",
+    )
+    start.add_argument(
+        "--max-attachment-tokens",
+        type=int,
+        default=None,
+        metavar="N",
+        help="stream PDF attachments page by page and stop after about N tokens",
+    )
+    start.add_argument("--no-token-cache", action="store_true", help="disable the token-count cache")
+    start.add_argument(
+        "--executor",
+        choices=("thread", "process", "inline"),
+        default=None,
+        help="where optimization runs (default: $TS_OPTIMIZE_EXECUTOR or thread)",
+    )
+    start.add_argument("--workers", type=int, default=None, help="optimization worker count")
 
     dl = sub.add_parser("download-model", help="download + int8-quantize the LLMLingua-2 model")
     dl.add_argument(
@@ -48,15 +70,27 @@ def config_from_args(args: argparse.Namespace) -> OptimizerConfig:
         enable_compression=args.enable_compression,
         inject_brevity=args.brevity,
         max_output_tokens=args.max_output_tokens,
+        near_dedup_threshold=args.near_dedup,
+        max_attachment_tokens=args.max_attachment_tokens,
     )
 
 
 def _cmd_start(args: argparse.Namespace) -> int:
     import uvicorn
 
+    from cutok.core.token_cache import token_cache
+    from cutok.normalize.pool import attachment_pool, default_workers
+    from cutok.pillars.proxy.executor import executor_from_env
     from cutok.pillars.proxy.server import app_factory
 
-    app = app_factory(config_from_args(args))
+    if args.no_token_cache:
+        token_cache.configure(enabled=False)
+    # The attachment pool is opt-in for library callers; the proxy is a guarded entry point.
+    # Set in the environment too, so process-mode optimizer workers get their own pools.
+    os.environ.setdefault("TS_ATTACHMENT_WORKERS", str(default_workers()))
+    attachment_pool.configure(workers=int(os.environ["TS_ATTACHMENT_WORKERS"]))
+    executor = executor_from_env(mode=args.executor, workers=args.workers)
+    app = app_factory(config_from_args(args), executor=executor)
     base = f"http://{args.host}:{args.port}"
     print(f"cutok proxy listening on {base}")
     print("Point your client at it with one of:")
@@ -35,6 +35,8 @@ from cutok.core.ledger import Ledger
 from cutok.core.providers import provider_for
 from cutok.core.types import OptimizerConfig
 from cutok.normalize.delta import DeltaStore
+from cutok.normalize.history import HistoryStore
+from cutok.normalize.memo import MessageMemo
 from cutok.optimizer import (
     Attachment,
     normalize_attachments,
@@ -46,6 +48,8 @@ from cutok.optimizer import (
 _config = OptimizerConfig()
 _ledger = Ledger()
 _delta_store = DeltaStore()
+_history = HistoryStore()
+_memo = MessageMemo()
 
 
 _UNSET = object()
@@ -58,14 +62,18 @@ def configure(
     inject_brevity: bool | None = None,
     max_output_tokens: int | None = -1,
     compression_keep_ratio: float | None = None,
+    compression_min_tokens: int | None = None,
     compress_url: str | None = _UNSET,  # type: ignore[assignment]
+    token_cache: bool | None = None,
 ) -> None:
     """Set library-wide defaults. Lossless-only unless ``enable_compression=True``.
 
     ``compress_url`` points prompt compression at the shared service (the LLMLingua-2 model),
     equivalent to the ``TS_COMPRESS_URL`` env var. When it is unset or the service is unreachable,
     prompt compression is a no-op (the rest of the optimization still runs); there is no local
-    fallback.
+    fallback. Text blocks under ``compression_min_tokens`` are not sent to the service.
+
+    ``token_cache`` switches the process-wide token-count cache on or off (``TS_TOKEN_CACHE``).
     """
     global _config
     changes: dict = {}
@@ -79,11 +87,17 @@ def configure(
         changes["max_output_tokens"] = max_output_tokens
     if compression_keep_ratio is not None:
         changes["compression_keep_ratio"] = compression_keep_ratio
+    if compression_min_tokens is not None:
+        changes["compression_min_tokens"] = compression_min_tokens
     _config = replace(_config, **changes)
     if compress_url is not _UNSET:
         from cutok.compress import service
 
         service.set_endpoint(compress_url)
+    if token_cache is not None:
+        from cutok.core.token_cache import token_cache as _token_cache
+
+        _token_cache.configure(enabled=token_cache)
 
 
 def _config_for(model: str | None) -> OptimizerConfig:
@@ -101,7 +115,9 @@ def optimize(payload: dict | None = None, **request) -> dict:
     req.update(request)
     model = req.get("model") if isinstance(req.get("model"), str) else None
     cfg = _config_for(model)
-    optimized_req, _results = _optimize_payload(req, cfg, _ledger, _delta_store, "lib")
+    optimized_req, _results = _optimize_payload(
+        req, cfg, _ledger, _delta_store, "lib", history=_history, memo=_memo
+    )
     _ledger.record_call([])
     return optimized_req
 
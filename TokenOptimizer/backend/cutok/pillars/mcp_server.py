@@ -14,7 +14,7 @@ from mcp.server.fastmcp import FastMCP
 from cutok.cache.cache_optimizer import optimize_for_cache as _optimize_for_cache
 from cutok.core.ledger import Ledger
 from cutok.core.tokens import count_tokens as _count_tokens
-from cutok.core.tokens import provider_for
+from cutok.core.tokens import count_tokens_batch, provider_for
 from cutok.core.types import OptimizationResult, OptimizerConfig
 from cutok.normalize.dedup import dedup_chunks
 from cutok.normalize.delta import DeltaStore
@@ -107,8 +107,8 @@ def dedupe_context(named_texts: dict[str, str], model: str) -> dict:
     of changes. Code fences are never deduped.
     """
     texts, changes = dedup_chunks(named_texts, model)
-    before = sum(_count_tokens(t, model).count for t in named_texts.values())
-    after = sum(_count_tokens(t, model).count for t in texts.values())
+    before = sum(count_tokens_batch(list(named_texts.values()), model))
+    after = sum(count_tokens_batch(list(texts.values()), model))
     ledger.record(
         OptimizationResult(
             feature="normalization", tokens_before=before, tokens_after=after, changes=changes
@@ -0,0 +1,256 @@
+"""JSON codec for the proxy's request-body rewrite path.
+
+Parsing and re-serializing a 20 MB body costs more CPU than most optimizations save, so the proxy
+avoids both wherever the result is already known:
+
+  - **Passthrough.** The optimizer is copy-on-write: if it returns the very payload object it was
+    given, nothing changed, and the original request bytes are forwarded untouched.
+  - **Splice** (stdlib backend). The body is parsed member by member with the stdlib scanner,
+    recording the source span of every top-level member and every ``messages`` element. On
+    re-encode, any member or message that is still the parsed object (the optimizer shares
+    untouched sub-objects) is copied from the original text; only rewritten ones are serialized.
+  - **orjson** (``pip install cutok[fast]``). When installed it parses and serializes everything
+    else; it is fast enough that splicing would cost more than it saves.
+
+Bodies orjson rejects but the stdlib accepts (``NaN``, very large integers, surrogate escapes) fall
+back to the stdlib path, so the codec never refuses a body the proxy used to forward. Backend
+selection: ``TS_JSON_CODEC=auto|orjson|stdlib`` (default ``auto``).
+"""
+
+import json
+import re
+import threading
+import time
+from dataclasses import dataclass
+
+try:
+    import orjson
+except ImportError:  # optional speedup; the stdlib path is complete on its own
+    orjson = None
+
+_DECODER = json.JSONDecoder()
+_WS = re.compile(r"[ \t\n\r]*")
+_BACKENDS = ("auto", "orjson", "stdlib")
+
+
+@dataclass
+class DecodedBody:
+    """A parsed request body plus what the codec needs to re-encode it cheaply."""
+
+    raw: bytes
+    obj: dict
+    backend: str
+    text: str | None = None  # decoded source, kept only when spans were recorded
+    members: dict[str, tuple[int, int]] | None = None  # key -> span of ``"key": value``
+    messages: list[tuple[int, int]] | None = None  # span of each ``messages`` element
+    raw_is_ascii: bool = False  # spans are then byte offsets into ``raw`` as well
+
+
+class JsonCodec:
+    """Decode request bodies and re-encode optimized payloads; thread-safe counters for /stats."""
+
+    def __init__(self, backend: str = "auto") -> None:
+        if backend not in _BACKENDS:
+            raise ValueError(f"unknown JSON codec {backend!r}; expected one of {_BACKENDS}")
+        if backend == "orjson" and orjson is None:
+            raise ValueError("TS_JSON_CODEC=orjson but orjson is not installed")
+        self.backend = "orjson" if backend != "stdlib" and orjson is not None else "stdlib"
+        self._lock = threading.Lock()
+        self._counts = {"decoded": 0, "passthrough": 0, "spliced": 0, "full": 0, "fallback": 0}
+        self._bytes_in = 0
+        self._bytes_reused = 0
+        self._decode_s = 0.0
+        self._encode_s = 0.0
+
+    def decode(self, body: bytes) -> DecodedBody | None:
+        """Parse ``body``; None unless it is a JSON object (the proxy then forwards it as-is)."""
+        start = time.process_time()
+        decoded = self._decode(body)
+        with self._lock:
+            self._decode_s += time.process_time() - start
+            if decoded is not None:
+                self._counts["decoded"] += 1
+                self._bytes_in += len(body)
+        return decoded
+
+    def encode(self, decoded: DecodedBody, payload: dict) -> bytes | None:
+        """Bytes to forward for ``payload``, or None when the original body can go out untouched."""
+        if payload is decoded.obj:
+            with self._lock:
+                self._counts["passthrough"] += 1
+                self._bytes_reused += len(decoded.raw)
+            return None
+        start = time.process_time()
+        if decoded.members is not None:
+            out, reused = _splice(decoded, payload)
+            path = "spliced"
+        else:
+            out, reused, path = self._dumps(payload, decoded.backend), 0, "full"
+        with self._lock:
+            self._encode_s += time.process_time() - start
+            self._counts[path] += 1
+            self._bytes_reused += reused
+        return out
+
+    def stats(self) -> dict:
+        with self._lock:
+            decoded = self._counts["decoded"]
+            cpu_ms = (self._decode_s + self._encode_s) * 1000
+            return {
+                "backend": self.backend,
+                **self._counts,
+                "bytes_in": self._bytes_in,
+                "bytes_reused": self._bytes_reused,
+                "decode_cpu_ms": round(self._decode_s * 1000, 3),
+                "encode_cpu_ms": round(self._encode_s * 1000, 3),
+                "cpu_ms_per_request": round(cpu_ms / decoded, 3) if decoded else 0.0,
+            }
+
+    def _decode(self, body: bytes) -> DecodedBody | None:
+        if self.backend == "orjson":
+            try:
+                obj = orjson.loads(body)
+            except orjson.JSONDecodeError:
+                pass  # maybe valid for the stdlib (NaN, big ints, ...); try it below
+            else:
+                return DecodedBody(body, obj, "orjson") if isinstance(obj, dict) else None
+            with self._lock:
+                self._counts["fallback"] += 1
+        try:
+            text = body.decode("utf-8")
+            obj, members, messages = _scan_object(text)
+        except (UnicodeDecodeError, ValueError, IndexError):
+            # Not a plain UTF-8 object (BOM, UTF-16, trailing junk...): let json decide, no spans.
+            try:
+                obj = json.loads(body)
+            except (json.JSONDecodeError, ValueError):
+                return None
+            return DecodedBody(body, obj, "stdlib") if isinstance(obj, dict) else None
+        return DecodedBody(body, obj, "stdlib", text, members, messages, body.isascii())
+
+    @staticmethod
+    def _dumps(payload: dict, backend: str) -> bytes:
+        if backend == "orjson":
+            try:
+                return orjson.dumps(payload)
+            except TypeError:
+                pass  # e.g. an int beyond 64 bits introduced after parsing
+        return json.dumps(payload).encode("utf-8")
+
+
+def _skip_ws(text: str, idx: int) -> int:
+    return _WS.match(text, idx).end()
+
+
+def _scan_object(text: str):
+    """Parse a top-level JSON object, recording member spans and ``messages`` element spans.
+
+    Raises ValueError on anything that isn't exactly one object (surrounding whitespace allowed).
+    """
+    members: dict[str, tuple[int, int]] = {}
+    messages: list[tuple[int, int]] | None = None
+    obj: dict = {}
+    idx = _skip_ws(text, 0)
+    if text[idx] != "{":
+        raise ValueError("not an object")
+    idx = _skip_ws(text, idx + 1)
+    if text[idx] == "}":
+        idx += 1
+    else:
+        while True:
+            start = idx
+            if text[idx] != '"':
+                raise ValueError("expected a key")
+            key, idx = _DECODER.raw_decode(text, idx)
+            idx = _skip_ws(text, idx)
+            if text[idx] != ":":
+                raise ValueError("expected ':'")
+            idx = _skip_ws(text, idx + 1)
+            if key == "messages" and text[idx] == "[":
+                value, idx, messages = _scan_array(text, idx)
+            else:
+                value, idx = _DECODER.raw_decode(text, idx)
+            obj[key] = value
+            members[key] = (start, idx)
+            idx = _skip_ws(text, idx)
+            if text[idx] == ",":
+                idx = _skip_ws(text, idx + 1)
+                continue
+            if text[idx] != "}":
+                raise ValueError("expected ',' or '}'")
+            idx += 1
+            break
+    if _skip_ws(text, idx) != len(text):
+        raise ValueError("trailing data")
+    if messages is not None and not isinstance(obj.get("messages"), list):
+        messages = None  # a later duplicate "messages" key replaced the scanned array
+    return obj, members, messages
+
+
+def _scan_array(text: str, idx: int):
+    items: list = []
+    spans: list[tuple[int, int]] = []
+    idx = _skip_ws(text, idx + 1)
+    if text[idx] == "]":
+        return items, idx + 1, spans
+    while True:
+        start = idx
+        value, idx = _DECODER.raw_decode(text, idx)
+        items.append(value)
+        spans.append((start, idx))
+        idx = _skip_ws(text, idx)
+        if text[idx] == ",":
+            idx = _skip_ws(text, idx + 1)
+            continue
+        if text[idx] != "]":
+            raise ValueError("expected ',' or ']'")
+        return items, idx + 1, spans
+
+
+def _splice(decoded: DecodedBody, payload: dict) -> tuple[bytes, int]:
+    """Re-encode ``payload`` reusing the source text of every member/message left untouched."""
+    orig, text = decoded.obj, decoded.text
+    # For an ASCII body (the norm: ensure_ascii clients, base64 media) character offsets are byte
+    # offsets, so untouched spans are zero-copy views of the request and the join is the only copy.
+    if decoded.raw_is_ascii:
+        source, encode, join = memoryview(decoded.raw), _encode_ascii, b"".join
+    else:
+        source, encode, join = text, str, "".join
+    parts: list = [encode("{")]
+    reused = 0
+
+    def emit(piece) -> None:
+        if len(parts) > 1:
+            parts.append(encode(", "))
+        parts.append(piece)
+
+    for key, value in payload.items():
+        span = decoded.members.get(key)
+        if span is not None and orig.get(key) is value:
+            emit(source[span[0] : span[1]])
+            reused += span[1] - span[0]
+        elif key == "messages" and decoded.messages is not None and isinstance(value, list):
+            originals = orig["messages"]
+            position = {id(m): i for i, m in enumerate(originals)}
+            emit(encode('"messages": ['))
+            for n, msg in enumerate(value):
+                if n:
+                    parts.append(encode(", "))
+                i = position.get(id(msg))
+                if i is not None and originals[i] is msg:
+                    s, e = decoded.messages[i]
+                    parts.append(source[s:e])
+                    reused += e - s
+                else:
+                    parts.append(encode(json.dumps(msg)))
+            parts.append(encode("]"))
+        else:
+            emit(encode(f"{json.dumps(key)}: {json.dumps(value)}"))
+    parts.append(encode("}"))
+    out = join(parts)
+    # Non-ASCII bodies count reused characters, not bytes; close enough for /stats.
+    return (out if decoded.raw_is_ascii else out.encode("utf-8")), reused
+
+
+def _encode_ascii(piece: str) -> bytes:
+    return piece.encode("utf-8")  # json.dumps output is ASCII; literal glue is too
@@ -0,0 +1,195 @@
+"""Bounded worker pool that keeps the optimization engine off the proxy's event loop.
+
+``optimize_payload`` is synchronous and can be slow — MarkItDown PDF extraction, tiktoken
+encoding, AST checks — and run inline it blocks uvicorn's loop, stalling every other in-flight
+stream. The proxy instead submits each request's optimization here:
+
+  - ``thread`` (default): a thread pool sharing the app's ledger, delta store and codec. tiktoken
+    releases the GIL; pure-Python work still competes for it, but the loop keeps getting slices.
+  - ``process``: one single-process pool per worker (``spawn``), so heavy extraction can't touch
+    the loop's GIL. Requests are pinned to a worker by session id, so each session's delta store
+    lives in one place; only the raw body and the re-encoded bytes cross the process boundary.
+  - ``inline``: the old behavior, run on the loop (tests, debugging).
+
+Admission is bounded: at most ``workers + queue_size`` requests are admitted at once. A request
+that can't get a slot within ``queue_timeout`` seconds — or whose optimization raises — is
+forwarded unoptimized (``submit`` returns None); it is never failed. ``stats()`` exposes queue
+depth and wait/run times for ``/stats``.
+
+Configured via ``TS_OPTIMIZE_EXECUTOR``, ``TS_OPTIMIZE_WORKERS``, ``TS_OPTIMIZE_QUEUE`` and
+``TS_OPTIMIZE_QUEUE_TIMEOUT``, or ``cutok start --executor/--workers``.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
+import zlib
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from cutok.core.ledger import Ledger
+from cutok.core.types import OptimizationResult, OptimizerConfig
+from cutok.normalize.delta import DeltaStore, delta_store_from_env
+from cutok.normalize.history import HistoryStore
+from cutok.normalize.memo import MessageMemo
+from cutok.optimizer import optimize_payload
+
+logger = logging.getLogger(__name__)
+
+_MODES = ("thread", "process", "inline")
+
+
+class OptimizeExecutor:
+    """Run optimization callables off the event loop with bounded admission and metrics."""
+
+    def __init__(
+        self,
+        mode: str = "thread",
+        *,
+        workers: int = 2,
+        queue_size: int = 32,
+        queue_timeout: float = 2.0,
+    ) -> None:
+        if mode not in _MODES:
+            raise ValueError(f"unknown executor mode {mode!r}; expected one of {_MODES}")
+        self.mode = mode
+        self.workers = max(1, workers)
+        self.queue_size = max(0, queue_size)
+        self.queue_timeout = queue_timeout
+        self._pools: list[Executor] = []
+        if mode == "thread":
+            self._pools = [ThreadPoolExecutor(self.workers, thread_name_prefix="cutok-opt")]
+        elif mode == "process":
+            ctx = multiprocessing.get_context("spawn")
+            self._pools = [ProcessPoolExecutor(1, mp_context=ctx) for _ in range(self.workers)]
+        self._slots: asyncio.Semaphore | None = None  # created on first use, inside the loop
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._in_flight = 0
+        self._counts = {"submitted": 0, "completed": 0, "skipped_queue_full": 0, "failed": 0}
+        self._wait_s = 0.0
+        self._wait_max_s = 0.0
+        self._run_s = 0.0
+
+    async def submit(self, affinity: str, fn, *args, prepare=None):
+        """Run ``fn(*args)`` on a worker; return its result, or None to forward unoptimized.
+
+        In process mode ``fn`` and ``args`` must be picklable; ``affinity`` (the session id)
+        picks the worker. Thread and inline modes ignore it. ``prepare``, if given, is work that
+        must stay in this process but share the request's slot: it runs on a thread once the
+        request is admitted and returns the arguments to call ``fn`` with instead of ``args``.
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers + self.queue_size)
+        submitted = time.monotonic()
+        with self._lock:
+            self._counts["submitted"] += 1
+            self._waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except TimeoutError:
+            with self._lock:
+                self._waiting -= 1
+                self._counts["skipped_queue_full"] += 1
+            logger.warning(
+                "optimization queue full for %.1fs; forwarding unoptimized", self.queue_timeout
+            )
+            return None
+        with self._lock:
+            self._waiting -= 1
+            self._in_flight += 1
+        try:
+            if prepare is not None:
+                args = prepare() if self.mode == "inline" else await asyncio.to_thread(prepare)
+            if self.mode == "inline":
+                started, result = _timed(fn, *args)
+            else:
+                pool = self._pools[zlib.crc32(affinity.encode()) % len(self._pools)]
+                loop = asyncio.get_running_loop()
+                started, result = await loop.run_in_executor(pool, _timed, fn, *args)
+        except Exception:
+            logger.exception("optimization failed; forwarding unoptimized")
+            with self._lock:
+                self._counts["failed"] += 1
+            return None
+        finally:
+            self._slots.release()
+            with self._lock:
+                self._in_flight -= 1
+        finished = time.monotonic()
+        with self._lock:
+            wait = max(0.0, started - submitted)
+            self._counts["completed"] += 1
+            self._wait_s += wait
+            self._wait_max_s = max(self._wait_max_s, wait)
+            self._run_s += finished - max(started, submitted)
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            done = self._counts["completed"]
+            return {
+                "mode": self.mode,
+                "workers": self.workers,
+                "queue_size": self.queue_size,
+                # Admitted beyond the worker count are queued in the pool; add those blocked on
+                # admission. (Process mode pins sessions, so a queue can form on one worker early.)
+                "queue_depth": self._waiting + max(0, self._in_flight - self.workers),
+                "in_flight": self._in_flight,
+                **self._counts,
+                "wait_ms_avg": round(self._wait_s * 1000 / done, 3) if done else 0.0,
+                "wait_ms_max": round(self._wait_max_s * 1000, 3),
+                "run_ms_avg": round(self._run_s * 1000 / done, 3) if done else 0.0,
+            }
+
+    def shutdown(self) -> None:
+        for pool in self._pools:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+def executor_from_env(*, mode: str | None = None, workers: int | None = None) -> OptimizeExecutor:
+    """Build the proxy's executor from ``TS_OPTIMIZE_*``; explicit arguments (CLI flags) win."""
+    default_workers = min(4, os.cpu_count() or 1)
+    return OptimizeExecutor(
+        mode or os.getenv("TS_OPTIMIZE_EXECUTOR", "thread"),
+        workers=workers or int(os.getenv("TS_OPTIMIZE_WORKERS", str(default_workers))),
+        queue_size=int(os.getenv("TS_OPTIMIZE_QUEUE", "32")),
+        queue_timeout=float(os.getenv("TS_OPTIMIZE_QUEUE_TIMEOUT", "2.0")),
+    )
+
+
+def _timed(fn, *args):
+    """Worker-side wrapper: stamp when execution actually started (monotonic is system-wide)."""
+    return time.monotonic(), fn(*args)
+
+
+# --------------------------------------------------------------------------- process workers
+
+_worker_state: tuple[DeltaStore, HistoryStore, MessageMemo, object] | None = None
+
+
+def optimize_body_in_worker(
+    body: bytes, config: OptimizerConfig, session: str
+) -> tuple[bytes | None, list[OptimizationResult]]:
+    """Process-mode entry point: decode, optimize and re-encode one body inside a worker.
+
+    Each worker keeps its own delta store (sessions are pinned to a worker; with
+    ``TS_DELTA_STORE=sqlite`` all workers share one file), history index and codec. Results
+    are recorded to a throwaway ledger here and returned for the parent to fold into its own.
+    """
+    global _worker_state
+    from cutok.pillars.proxy.codec import JsonCodec
+
+    if _worker_state is None:
+        codec = JsonCodec(os.getenv("TS_JSON_CODEC", "auto"))
+        _worker_state = (delta_store_from_env(), HistoryStore(), MessageMemo(), codec)
+    delta_store, history, memo, codec = _worker_state
+    decoded = codec.decode(body)
+    if decoded is None:
+        return None, []
+    payload, results = optimize_payload(
+        decoded.obj, config, Ledger(), delta_store, session, history=history, memo=memo
+    )
+    return codec.encode(decoded, payload), results
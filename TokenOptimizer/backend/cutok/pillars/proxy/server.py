@@ -6,7 +6,12 @@ the request path (Anthropic ``/v1/messages``, Gemini ``/v1beta/models/…``). Ea
 upstream is its ``TS_<PROVIDER>_UPSTREAM`` env override or its real API.
 
 Every POST is optimized (normalization → cache → optional compression → response budgeting) for
-the schemas we handle, and forwarded untouched otherwise — a request is never broken. Streaming
+the schemas we handle, and forwarded untouched otherwise — a request is never broken. A request
+the engine leaves unchanged is forwarded as its original bytes; a changed one is re-encoded by
+``codec.JsonCodec``, reusing the original text of every untouched member where it can. The engine
+runs on a bounded worker pool (``executor.OptimizeExecutor``), never on the event loop, so one
+heavy attachment can't stall other clients' streams; when the pool is saturated a request is
+forwarded unoptimized rather than delayed indefinitely. Streaming
 is byte-exact passthrough with retries only before the first downstream byte.
 
 Savings honesty: cache savings are **measured** from each response's ``usage`` (cached input
@@ -22,6 +27,7 @@ import json
 import logging
 import os
 import re
+from contextlib import asynccontextmanager
 from dataclasses import replace
 from pathlib import Path
 
@@ -29,12 +35,26 @@ import httpx
 from fastapi import FastAPI, Request, Response
 from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
 
+from cutok.cache.prefix_stability import PrefixTracker, prefix_tracker_from_env
+from cutok.cache.tool_schema import tool_schema_cache
 from cutok.core.ledger import Ledger
+from cutok.core.prefix_chain import prefix_chain
 from cutok.core.providers import resolve, resolve_by_path
 from cutok.core.providers.base import ProviderAdapter
+from cutok.core.token_cache import token_cache
 from cutok.core.types import Change, OptimizationResult, OptimizerConfig, Provider
-from cutok.normalize.delta import DeltaStore
+from cutok.normalize.delta import delta_store_from_env
+from cutok.normalize.extract_cache import extraction_cache
+from cutok.normalize.history import HistoryStore
+from cutok.normalize.memo import MessageMemo
+from cutok.normalize.pool import attachment_pool
 from cutok.optimizer import optimize_payload
+from cutok.pillars.proxy.codec import DecodedBody, JsonCodec
+from cutok.pillars.proxy.executor import (
+    OptimizeExecutor,
+    executor_from_env,
+    optimize_body_in_worker,
+)
 from cutok.pillars.proxy.stats_page import render_stats_html
 
 logger = logging.getLogger(__name__)
@@ -57,15 +77,6 @@ _CACHE_READ_RE = re.compile(
 
 # --------------------------------------------------------------------------- helpers
 
-def parse_body(body: bytes) -> dict | None:
-    """Parse a request body once. Returns the dict, or None if it isn't a JSON object."""
-    try:
-        parsed = json.loads(body)
-    except (json.JSONDecodeError, ValueError):
-        return None
-    return parsed if isinstance(parsed, dict) else None
-
-
 def filter_request_headers(headers, *, disable_compression: bool = False) -> dict[str, str]:
     out = {k: v for k, v in headers.items() if k.lower() not in _HOP_BY_HOP}
     if disable_compression:
@@ -96,19 +107,69 @@ def _build_config(payload: dict, family: Provider, base: OptimizerConfig) -> Opt
     return replace(base, model=model, provider=family)
 
 
-def optimize_request(
-    parsed: dict | None, request: Request, family: Provider
+async def optimize_request(
+    decoded: DecodedBody | None, request: Request, family: Provider
 ) -> tuple[bytes | None, list[OptimizationResult]]:
-    """Optimize an already-parsed request body. Returns (new_body or None, results)."""
-    if not isinstance(parsed, dict):
+    """Optimize an already-parsed request body on the app's worker pool.
+
+    Returns (new_body, results); new_body is None when the original bytes should be forwarded —
+    the body isn't a JSON object, no stage changed anything, or the pool was saturated / failed.
+    """
+    if decoded is None:
         return None, []
     app = request.app
-    cfg = _build_config(parsed, family, app.state.config)
+    cfg = _build_config(decoded.obj, family, app.state.config)
+    sid = session_id(request)
+    executor: OptimizeExecutor = app.state.executor
+    if executor.mode == "process":
+        # The tracker lives here, so it runs on a thread of this process inside the same slot.
+        def prepare():
+            return decoded.raw, _with_prefix_fixes(app, decoded.obj, cfg, sid), sid
+
+        outcome = await executor.submit(
+            sid, optimize_body_in_worker, decoded.raw, cfg, sid, prepare=prepare
+        )
+        if outcome is not None:
+            for result in outcome[1]:  # the worker recorded to a throwaway ledger
+                app.state.ledger.record(result)
+    else:
+        outcome = await executor.submit(sid, _optimize_decoded, app, decoded, cfg, sid)
+    app.state.ledger.record_call([])  # bump call counter once; features recorded their own savings
+    return outcome if outcome is not None else (None, [])
+
+
+def _optimize_decoded(
+    app: FastAPI, decoded: DecodedBody, cfg: OptimizerConfig, sid: str
+) -> tuple[bytes | None, list[OptimizationResult]]:
+    state = app.state
+    cfg = _with_prefix_fixes(app, decoded.obj, cfg, sid)
     payload, results = optimize_payload(
-        parsed, cfg, app.state.ledger, app.state.delta_store, session_id(request)
+        decoded.obj,
+        cfg,
+        state.ledger,
+        state.delta_store,
+        sid,
+        history=state.history,
+        memo=state.memo,
     )
-    app.state.ledger.record_call([])  # bump call counter once; features recorded their own savings
-    return json.dumps(payload).encode("utf-8"), results
+    return state.codec.encode(decoded, payload), results
+
+
+def _with_prefix_fixes(
+    app: FastAPI, payload: dict, cfg: OptimizerConfig, sid: str
+) -> OptimizerConfig:
+    """Fingerprint the prefix; ``cfg`` plus the canonicalizations the session has shown it needs.
+
+    Runs inside the request's executor slot: serializing a long history to fingerprint it costs
+    about as much as parsing it, so it is admitted (or skipped) with the optimization.
+    """
+    tracker: PrefixTracker = app.state.prefix_tracker
+    try:
+        fixes = tracker.observe(f"{sid}:{cfg.model}", payload)
+    except Exception:  # diagnostics never fail a request
+        logger.exception("prefix tracking failed; forwarding without canonicalization")
+        return cfg
+    return replace(cfg, prefix_fixes=fixes) if fixes else cfg
 
 
 def _log_results(app: FastAPI, results: list[OptimizationResult]) -> None:
@@ -202,12 +263,13 @@ async def _establish(client, method, url, body, headers, params) -> httpx.Respon
 
 async def _forward(request: Request) -> Response:
     body = await request.body()
-    parsed = parse_body(body)  # parse once; route/optimize/stream-detect all reuse it
+    decoded = request.app.state.codec.decode(body)  # parse once; route/optimize/stream reuse it
+    parsed = decoded.obj if decoded is not None else None
     adapter, upstream_base, family = route(request, parsed)
     model = (parsed.get("model") if isinstance(parsed, dict) else None) or request.app.state.config.model
     streaming = isinstance(parsed, dict) and parsed.get("stream") is True
 
-    optimized, results = optimize_request(parsed, request, family)
+    optimized, results = await optimize_request(decoded, request, family)
     forward_body = optimized if optimized is not None else body
 
     client: httpx.AsyncClient = request.app.state.client
@@ -271,13 +333,28 @@ async def _forward(request: Request) -> Response:
 
 # --------------------------------------------------------------------------- app
 
-def app_factory(config: OptimizerConfig | None = None) -> FastAPI:
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    yield
+    # Process-mode workers and the attachment pool's spawned children must not outlive the app.
+    app.state.executor.shutdown()
+    attachment_pool.shutdown()
+
+
+def app_factory(
+    config: OptimizerConfig | None = None, *, executor: OptimizeExecutor | None = None
+) -> FastAPI:
     """Build the proxy app. Upstreams are resolved per-provider from the environment at call time."""
-    app = FastAPI(title="cutok proxy")
+    app = FastAPI(title="cutok proxy", lifespan=_lifespan)
     app.state.client = httpx.AsyncClient(timeout=600.0)
     app.state.config = config or OptimizerConfig()
     app.state.ledger = Ledger()
-    app.state.delta_store = DeltaStore()
+    app.state.delta_store = delta_store_from_env()
+    app.state.history = HistoryStore()
+    app.state.memo = MessageMemo()
+    app.state.codec = JsonCodec(os.getenv("TS_JSON_CODEC", "auto"))
+    app.state.executor = executor or executor_from_env()
+    app.state.prefix_tracker = prefix_tracker_from_env()
 
     @app.get("/health")
     async def health() -> dict:
@@ -285,7 +362,23 @@ def app_factory(config: OptimizerConfig | None = None) -> FastAPI:
 
     @app.get("/stats")
     async def stats(request: Request) -> JSONResponse:
-        return JSONResponse(request.app.state.ledger.totals())
+        state = request.app.state
+        return JSONResponse(
+            {
+                **state.ledger.totals(),
+                "token_cache": token_cache.stats(),
+                "prefix_chain": prefix_chain.stats(),
+                "json_codec": state.codec.stats(),
+                "optimizer_pool": state.executor.stats(),
+                "delta_store": state.delta_store.stats(),
+                "history_index": state.history.stats(),
+                "message_memo": state.memo.stats(),
+                "attachment_pool": attachment_pool.stats(),
+                "extraction_cache": extraction_cache.stats(),
+                "prefix_stability": state.prefix_tracker.stats(),
+                "tool_schema_cache": tool_schema_cache.stats(),
+            }
+        )
 
     @app.get("/", response_class=HTMLResponse)
     async def index(request: Request) -> HTMLResponse:
@@ -3,9 +3,11 @@
 This is the secret-free half of the system: it normalizes, compresses, counts, and cache-rewrites
 payloads, but it never forwards to a provider, so it holds no credentials and is safe to host
 publicly. (The key-forwarding proxy in ``cutok.pillars.proxy`` stays local-only.) It also serves the
-shared ``/v1/compress`` endpoint that the library, MCP server, and browser extension call.
+shared ``/v1/compress`` endpoint that the library, MCP server, and browser extension call, and
+``/v1/compress:batch``, which the library and proxy use to send a payload's texts together.
 """
 
+import asyncio
 import logging
 import os
 from pathlib import Path
@@ -13,17 +15,20 @@ from pathlib import Path
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import HTMLResponse, JSONResponse
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from cutok.core.ledger import Ledger
+from cutok.core.token_cache import token_cache
 from cutok.core.tokens import count_tokens, provider_for
 from cutok.core.types import Change, OptimizationResult, OptimizerConfig
 from cutok.normalize.delta import DeltaStore
+from cutok.normalize.extract_cache import extraction_cache
 from cutok.optimizer import optimize_payload
 
 logger = logging.getLogger(__name__)
 
 DEMO_MODELS = ["gpt-4o", "claude-sonnet-4-5", "gemini-1.5-pro", "mistral-large-latest"]
+MAX_BATCH = int(os.getenv("TS_COMPRESS_MAX_BATCH", "64"))
 
 
 def _load_compressor():
@@ -47,7 +52,11 @@ def _load_compressor():
     try:
         from cutok.compress.llmlingua import LLMLingua2
 
-        return LLMLingua2(d)
+        return LLMLingua2(
+            d,
+            max_batch=int(os.getenv("TS_MODEL_MAX_BATCH", "16")),
+            max_wait_ms=float(os.getenv("TS_MODEL_MAX_WAIT_MS", "5")),
+        )
     except Exception:
         logger.exception("failed to load compression model from %s", model_dir)
         return None
@@ -74,6 +83,12 @@ class CompressV1Request(BaseModel):
     model: str = "gpt-4o"
 
 
+class CompressBatchRequest(BaseModel):
+    texts: list[str] = Field(max_length=MAX_BATCH)
+    rate: float = 0.6
+    model: str = "gpt-4o"
+
+
 def _result_dict(r) -> dict:
     return {
         "feature": r.feature,
@@ -125,12 +140,28 @@ def app_factory() -> FastAPI:
     @app.post("/v1/compress")
     async def v1_compress(req: CompressV1Request) -> JSONResponse:
         """The canonical compression endpoint every client (library, MCP, extension) calls. Uses
-        the loaded model; if none is loaded, returns the text unchanged with ``mode="none"``."""
-        text, before, after, mode = run_model_compression(req.text, req.rate, req.model)
+        the loaded model; if none is loaded, returns the text unchanged with ``mode="none"``.
+        Runs off the loop, so concurrent requests share the model's micro-batches."""
+        text, before, after, mode = await asyncio.to_thread(
+            run_model_compression, req.text, req.rate, req.model
+        )
         return JSONResponse(
             {"text": text, "tokens_before": before, "tokens_after": after, "mode": mode}
         )
 
+    @app.post("/v1/compress:batch")
+    async def v1_compress_batch(req: CompressBatchRequest) -> JSONResponse:
+        """``/v1/compress`` for up to ``TS_COMPRESS_MAX_BATCH`` texts in one round trip; results
+        are in request order, each shaped like a ``/v1/compress`` response."""
+        outcomes = await asyncio.gather(
+            *(asyncio.to_thread(run_model_compression, t, req.rate, req.model) for t in req.texts)
+        )
+        results = [
+            {"text": out, "tokens_before": before, "tokens_after": after, "mode": mode}
+            for out, before, after, mode in outcomes
+        ]
+        return JSONResponse({"results": results})
+
     @app.post("/api/count")
     async def api_count(req: CountRequest) -> JSONResponse:
         tc = count_tokens(req.text, req.model)
@@ -140,7 +171,9 @@ def app_factory() -> FastAPI:
 
     @app.post("/api/compress")
     async def api_compress(req: CompressRequest) -> JSONResponse:
-        text, before, after, mode = run_model_compression(req.text, 0.6, req.model)
+        text, before, after, mode = await asyncio.to_thread(
+            run_model_compression, req.text, 0.6, req.model
+        )
         return JSONResponse(
             {
                 "text": text,
@@ -165,7 +198,15 @@ def app_factory() -> FastAPI:
 
     @app.get("/stats")
     async def stats() -> JSONResponse:
-        return JSONResponse(app.state.ledger.totals())
+        batcher = getattr(app.state.compressor, "batcher", None)
+        return JSONResponse(
+            {
+                **app.state.ledger.totals(),
+                "token_cache": token_cache.stats(),
+                "extraction_cache": extraction_cache.stats(),
+                "micro_batcher": batcher.stats() if batcher is not None else None,
+            }
+        )
 
     @app.get("/", response_class=HTMLResponse)
     async def index() -> HTMLResponse:
@@ -0,0 +1,43 @@
+from cutok.cache.breakpoints import expected_cached_tokens, plan_breakpoints
+from cutok.core.providers.base import CachePolicy
+
+POLICY = CachePolicy(explicit=True, discount=0.9, min_prefix_tokens=100, max_breakpoints=4)
+
+
+def test_objective_counts_each_prefix_until_a_longer_one_survives():
+    totals, survival = [100, 300, 600], [1.0, 0.5, 0.25]
+    assert expected_cached_tokens(totals, survival, [2]) == 150
+    assert expected_cached_tokens(totals, survival, [0, 2]) == 100 * 0.75 + 150
+
+
+def test_prefixes_under_the_minimum_are_not_marked():
+    assert plan_breakpoints([10, 50, 99], [1.0, 1.0, 1.0], POLICY) == []
+    assert plan_breakpoints([10, 50, 120], [1.0, 1.0, 1.0], POLICY) == [2]
+
+
+def test_spends_the_budget_where_it_caches_most():
+    totals = [200, 400, 2000, 2100, 5000, 5100]
+    survival = [1.0, 0.95, 0.9, 0.85, 0.8, 0.4]
+    policy = CachePolicy(explicit=True, discount=0.9, min_prefix_tokens=100, max_breakpoints=2)
+    plan = plan_breakpoints(totals, survival, policy)
+    assert plan == [2, 4]
+    # Nothing else of the same size does better.
+    for a in range(6):
+        for b in range(a + 1, 6):
+            assert expected_cached_tokens(totals, survival, [a, b]) <= expected_cached_tokens(
+                totals, survival, plan
+            )
+
+
+def test_no_breakpoint_is_spent_for_nothing():
+    # Blocks of one message share a survival: only the last of them is worth marking.
+    plan = plan_breakpoints([500, 900, 1500], [0.9, 0.9, 0.9], POLICY)
+    assert plan == [2]
+
+
+def test_existing_breakpoints_are_kept_and_count_against_the_cap():
+    totals, survival = [500, 1000, 1500, 2000, 2500], [1.0, 0.9, 0.8, 0.7, 0.3]
+    plan = plan_breakpoints(totals, survival, POLICY, fixed=[1])
+    assert 1 in plan and len(plan) == 4
+    assert plan_breakpoints(totals, survival, POLICY, fixed=[1], reserved=3) == [1]
+    assert plan_breakpoints(totals, survival, POLICY, fixed=plan) == plan
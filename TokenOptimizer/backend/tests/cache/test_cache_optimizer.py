@@ -1,5 +1,8 @@
+from cutok.cache import cache_optimizer
 from cutok.cache.cache_optimizer import optimize_for_cache
 from cutok.core.ledger import Ledger
+from cutok.core.prefix_chain import PrefixChain
+from cutok.core.tokens import count_tokens
 from cutok.core.types import OptimizerConfig, Provider
 
 ANTHROPIC = OptimizerConfig(model="claude-sonnet-4-5", provider=Provider.ANTHROPIC)
@@ -110,6 +113,38 @@ def test_idempotent():
     assert result2.changes == []
 
 
+def _conversation(turns: int) -> list[dict]:
+    messages = []
+    for turn in range(turns):
+        messages.append({"role": "user", "content": f"question {turn} " + "lorem " * 400})
+        messages.append({"role": "assistant", "content": f"answer {turn} " + "ipsum " * 400})
+    return [*messages, {"role": "user", "content": "and finally?"}]
+
+
+def test_growing_conversation_gets_a_rolling_breakpoint():
+    payload = {"system": BIG_STABLE, "messages": _conversation(6)}
+    out, result = optimize_for_cache(payload, ANTHROPIC, Ledger())
+    kinds = [c.kind for c in result.changes]
+    assert kinds[0] == "cache_control_system" and kinds[-1] == "cache_control_rolling"
+    assert len(kinds) == 4
+    assert out["messages"][-1]["content"] == [
+        {"type": "text", "text": "and finally?", "cache_control": {"type": "ephemeral"}}
+    ]
+    assert payload["messages"][-1]["content"] == "and finally?"  # caller's payload untouched
+    twice, again = optimize_for_cache(out, ANTHROPIC, Ledger())
+    assert twice == out and again.changes == []
+
+
+def test_breakpoints_on_tools_count_against_the_cap():
+    payload = {
+        "tools": [{"name": f"t{i}", "cache_control": {"type": "ephemeral"}} for i in range(3)],
+        "system": BIG_STABLE,
+        "messages": _conversation(6),
+    }
+    _, result = optimize_for_cache(payload, ANTHROPIC, Ledger())
+    assert [c.kind for c in result.changes] == ["cache_control_rolling"]
+
+
 def test_openai_hoists_volatile_only():
     payload = {
         "messages": [
@@ -120,3 +155,19 @@ def test_openai_hoists_volatile_only():
     out, result = optimize_for_cache(payload, OPENAI, Ledger())
     assert out["messages"][0]["content"].endswith(VOLATILE_LINE)
     assert any(c.kind == "hoist_volatile" for c in result.changes)
+
+
+def test_later_requests_count_only_new_turns(monkeypatch):
+    chain = PrefixChain()
+    monkeypatch.setattr(cache_optimizer, "prefix_chain", chain)
+    messages = []
+    for turn in range(6):
+        messages = [*messages, {"role": "user", "content": f"question {turn}"}]
+        payload = {"system": "Be brief.", "messages": messages}
+        _, result = optimize_for_cache(payload, OPENAI, Ledger())
+        assert result.tokens_before == sum(
+            count_tokens(t, OPENAI.model).count
+            for t in ["Be brief.", *(m["content"] for m in messages)]
+        )
+    # One miss per block ever sent: the system prompt plus each new question.
+    assert chain.stats()["misses"] == 7
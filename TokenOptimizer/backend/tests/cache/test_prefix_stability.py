@@ -0,0 +1,114 @@
+from cutok.cache.prefix_stability import PrefixTracker, canonicalize_prefix
+from cutok.core.payload import PayloadWriter
+
+WEATHER = {
+    "type": "function",
+    "function": {"name": "weather", "parameters": {"type": "object", "properties": {}}},
+}
+SEARCH = {"type": "function", "function": {"name": "search", "description": "Search the web."}}
+
+
+def _request(system: str, tools=(WEATHER, SEARCH), turns: int = 1) -> dict:
+    messages = [{"role": "system", "content": system}]
+    for i in range(turns):
+        messages.append({"role": "user", "content": f"question {i}"})
+    return {"model": "gpt-4o", "tools": list(tools), "messages": messages}
+
+
+def _cause_of(first: dict, second: dict) -> str:
+    tracker = PrefixTracker()
+    tracker.observe("s", first)
+    tracker.observe("s", second)
+    stats = tracker.stats()
+    assert stats["diverged"] == 1
+    return stats["recent"][0]["cause"]
+
+
+def test_growing_conversation_keeps_its_prefix():
+    tracker = PrefixTracker()
+    for turns in range(1, 5):
+        tracker.observe("s", _request("Be brief.", turns=turns))
+    stats = tracker.stats()
+    assert (stats["requests"], stats["extended"], stats["diverged"]) == (4, 3, 0)
+
+
+def test_divergences_are_classified():
+    base = _request("Be brief.\nAnswer in English.")
+    assert _cause_of(base, _request("Be brief.\nAnswer in English.", tools=(SEARCH, WEATHER))) == (
+        "tool_order"
+    )
+    shuffled = {"function": WEATHER["function"], "type": "function"}
+    assert _cause_of(base, _request("Be brief.\nAnswer in English.", (shuffled, SEARCH))) == (
+        "key_order"
+    )
+    assert _cause_of(base, _request("Be brief. \r\nAnswer in English.")) == "whitespace"
+    assert _cause_of(base, _request("Be brief.\nAnswer in French.")) == "content"
+    stamped = _request("Be brief.\nNow: 2026-06-12T09:30.\nAnswer in English.")
+    restamped = _request("Be brief.\nNow: 2026-06-12T09:31.\nAnswer in English.")
+    assert _cause_of(stamped, restamped) == "timestamp"
+
+
+def test_divergence_reports_the_first_differing_byte():
+    tracker = PrefixTracker()
+    tracker.observe("s", _request("Be brief.", turns=3))
+    edited = _request("Be brief.", turns=3)
+    edited["messages"][2]["content"] = "question X"
+    tracker.observe("s", edited)
+    recent = tracker.stats()["recent"][0]
+    assert recent["block"] == "messages[2]"
+    assert recent["offset"] == len('{"content":"question ')
+
+
+def test_blocks_past_the_byte_budget_are_unclassified():
+    tracker = PrefixTracker(max_bytes=64)
+    tracker.observe("s", _request("x" * 100))
+    tracker.observe("s", _request("y" * 100))
+    assert tracker.stats()["causes"]["unclassified"] == 1
+
+
+def test_autofix_returns_the_fixes_a_session_needs():
+    tracker = PrefixTracker(autofix=True)
+    assert tracker.observe("s", _request("Be brief.")) == frozenset()
+    assert tracker.observe("s", _request("Be brief.", tools=(SEARCH, WEATHER))) == {"tool_order"}
+    assert tracker.observe("s", _request("Be brief.")) == {"tool_order"}
+    assert tracker.stats()["fixed"] == 1
+    assert tracker.observe("other", _request("Be brief.")) == frozenset()
+
+
+def test_canonicalize_prefix_makes_variants_identical():
+    variants = [
+        _request("Be brief.\nAnswer in English."),
+        _request("Be brief.  \r\nAnswer in English.\n", tools=(SEARCH, WEATHER)),
+        _request(
+            "Be brief.\nAnswer in English.",
+            tools=({**SEARCH}, {"function": WEATHER["function"], "type": "function"}),
+        ),
+    ]
+    outputs = []
+    for payload in variants:
+        writer = PayloadWriter(payload)
+        canonicalize_prefix(writer, frozenset({"tool_order", "key_order", "whitespace"}))
+        outputs.append(writer.payload)
+    assert outputs[0] == outputs[1] == outputs[2]
+    assert [list(t) for t in outputs[0]["tools"]] == [list(t) for t in outputs[2]["tools"]]
+    assert variants[1]["tools"][0] is SEARCH  # the caller's payload is untouched
+
+
+def test_only_trailing_system_whitespace_is_autofixed():
+    def with_answer(system: str, answer: str) -> dict:
+        payload = _request(system, turns=2)
+        payload["messages"].insert(2, {"role": "assistant", "content": answer})
+        return payload
+
+    tracker = PrefixTracker(autofix=True)
+    tracker.observe("s", with_answer("Be brief.", "a  b"))
+    # Whitespace inside an assistant turn: reported, but canonicalize_prefix can't fix it.
+    assert tracker.observe("s", with_answer("Be brief.", "a b")) == frozenset()
+    assert tracker.stats()["causes"]["whitespace"] == 1
+
+    assert tracker.observe("s", with_answer("Be brief.  \r\n", "a b")) == {"whitespace"}
+    tracker.observe("s", with_answer("Be brief.  \r\n", "a  b"))
+    assert tracker.stats()["fixed"] == 0  # the session's fix doesn't reach the assistant turn
+    tracker.observe("s", with_answer("Be brief. \n", "a  b"))
+    stats = tracker.stats()
+    assert stats["causes"]["whitespace"] == 4 and stats["fixed"] == 1
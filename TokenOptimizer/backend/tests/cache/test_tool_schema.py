@@ -0,0 +1,104 @@
+import json
+
+from cutok.cache.tool_schema import ToolSchemaCache, canonical_keys, run_schema_stage, sort_tools
+from cutok.core.ledger import Ledger
+from cutok.core.payload import PayloadWriter
+from cutok.core.types import OptimizerConfig
+
+
+def _tool(name: str, **extra) -> dict:
+    return {"name": name, "input_schema": {"type": "object", "properties": {}}, **extra}
+
+
+PYDANTIC_SCHEMA = {
+    "title": "Answer",
+    "type": "object",
+    "properties": {
+        "reasoning": {"title": "Reasoning", "type": "string"},
+        "user_id": {"type": "integer", "title": "User Id"},
+        "title": {"type": "string", "title": "Title of the page"},
+        "source": {"$ref": "#/$defs/Source"},
+    },
+    "required": ["reasoning", "user_id"],
+    "$defs": {"Source": {"title": "Source", "properties": {"url": {"title": "Url"}}}},
+}
+
+
+def test_tools_are_sorted_by_name():
+    tools = [_tool("search"), _tool("fetch"), _tool("lookup")]
+    assert [t["name"] for t in sort_tools(tools)] == ["fetch", "lookup", "search"]
+    ordered = [_tool("a"), _tool("b")]
+    assert sort_tools(ordered) is ordered
+    unnamed = [_tool("b"), {"type": "bash_20250124"}]
+    assert sort_tools(unnamed) is unnamed
+
+
+def test_marker_on_the_last_tool_moves_with_the_order():
+    marker = {"type": "ephemeral"}
+    tools = [_tool("search"), _tool("fetch", cache_control=marker)]
+    out = sort_tools(tools)
+    assert [t["name"] for t in out] == ["fetch", "search"]
+    assert "cache_control" not in out[0] and out[1]["cache_control"] == marker
+    assert tools[1]["cache_control"] == marker  # the input is not mutated
+    pinned = [_tool("search", cache_control=marker), _tool("fetch")]
+    assert sort_tools(pinned) is pinned
+
+
+def test_keys_are_sorted_but_property_order_is_kept():
+    tool = {"input_schema": PYDANTIC_SCHEMA, "name": "answer", "description": "Answer."}
+    (out,), dropped = canonical_keys("tools", [tool])
+    assert dropped == 0
+    assert list(out) == ["description", "input_schema", "name"]
+    schema = out["input_schema"]
+    assert list(schema) == sorted(PYDANTIC_SCHEMA)
+    assert list(schema["properties"]) == ["reasoning", "user_id", "title", "source"]
+    assert list(schema["properties"]["user_id"]) == ["title", "type"]
+
+
+def test_only_generated_titles_are_dropped():
+    fmt = {"type": "json_schema", "json_schema": {"name": "answer", "schema": PYDANTIC_SCHEMA}}
+    out, dropped = canonical_keys("response_format", fmt, strip_titles=True)
+    schema = out["json_schema"]["schema"]
+    assert dropped == 4  # Reasoning, User Id, Source, Url
+    assert schema["title"] == "Answer"
+    assert schema["properties"]["title"] == {"title": "Title of the page", "type": "string"}
+    assert "title" not in schema["properties"]["user_id"]
+    assert "title" not in schema["$defs"]["Source"]
+
+
+def test_cache_memoizes_by_content():
+    cache = ToolSchemaCache(max_entries=1)
+    tools = [_tool("search"), _tool("fetch")]
+    first = cache.canonical("tools", tools, "gpt-4o")
+    assert cache.canonical("tools", json.loads(json.dumps(tools)), "gpt-4o") is first
+    cache.canonical("tools", [_tool("other")], "gpt-4o")
+    assert cache.stats() | {"hit_rate": None} == {
+        "entries": 1,
+        "max_entries": 1,
+        "hits": 1,
+        "misses": 2,
+        "evictions": 1,
+        "hit_rate": None,
+    }
+
+
+def test_stage_canonicalizes_and_is_idempotent():
+    payload = {
+        "model": "gpt-4o",
+        "tools": [
+            {"type": "function", "function": {"name": "search", "parameters": PYDANTIC_SCHEMA}},
+            {"function": {"name": "fetch"}, "type": "function"},
+        ],
+        "messages": [{"role": "user", "content": "hi"}],
+    }
+    config = OptimizerConfig(model="gpt-4o")
+    writer = PayloadWriter(payload)
+    result = run_schema_stage(writer, config, Ledger())
+    kinds = {c.kind for c in result.changes}
+    assert kinds == {"sort_tools", "sort_schema_keys", "strip_schema_titles"}
+    assert result.tokens_after < result.tokens_before
+    out = writer.payload
+    assert [t["function"]["name"] for t in out["tools"]] == ["fetch", "search"]
+    assert payload["tools"][0]["function"]["name"] == "search"
+    again = run_schema_stage(PayloadWriter(out), config, Ledger())
+    assert again.changes == []
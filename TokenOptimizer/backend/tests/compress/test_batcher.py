@@ -0,0 +1,63 @@
+import threading
+import time
+
+import pytest
+from cutok.compress.batcher import MicroBatcher
+
+
+def test_single_caller_gets_results_in_order():
+    batcher = MicroBatcher(lambda items: [x * 2 for x in items], max_batch=4, max_wait=0.001)
+    assert batcher.map([1, 2, 3, 4, 5, 6]) == [2, 4, 6, 8, 10, 12]
+    assert batcher.map([]) == []
+    stats = batcher.stats()
+    assert stats["items"] == 6 and stats["batches"] == 2
+
+
+def test_concurrent_callers_share_batches():
+    sizes = []
+
+    def fn(items):
+        sizes.append(len(items))
+        time.sleep(0.01)
+        return [-x for x in items]
+
+    batcher = MicroBatcher(fn, max_batch=16, max_wait=0.05)
+    results = {}
+    barrier = threading.Barrier(8)
+
+    def call(k):
+        barrier.wait()
+        results[k] = batcher.map([k * 10, k * 10 + 1])
+
+    threads = [threading.Thread(target=call, args=(k,)) for k in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == {k: [-k * 10, -k * 10 - 1] for k in range(8)}
+    assert sum(sizes) == 16 and len(sizes) < 8
+    assert max(sizes) <= 16
+
+
+def test_errors_reach_every_caller_and_the_worker_survives():
+    calls = []
+
+    def fn(items):
+        calls.append(items)
+        if len(calls) == 1:
+            raise RuntimeError("model failed")
+        return items[:-1]  # one result short
+
+    batcher = MicroBatcher(fn, max_batch=8, max_wait=0.0)
+    with pytest.raises(RuntimeError, match="model failed"):
+        batcher.map([1, 2])
+    with pytest.raises(ValueError, match="1 results for a batch of 2"):
+        batcher.map([1, 2])
+
+
+def test_lone_caller_does_not_wait_for_company():
+    batcher = MicroBatcher(lambda items: items, max_batch=32, max_wait=1.0)
+    start = time.perf_counter()
+    for _ in range(3):
+        batcher.map([1, 2])
+    assert time.perf_counter() - start < 0.5
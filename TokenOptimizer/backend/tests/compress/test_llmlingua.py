@@ -47,3 +47,107 @@ def test_real_model_compresses_and_keeps_key_info():
     assert out["words_after"] < out["words_before"]  # actually compressed
     for keyword in ("Jonkoping", "Sweden", "September", "2026", "Engineer"):
         assert keyword in out["text"], f"dropped key info: {keyword}"
+
+
+# --- batched inference (numpy stand-ins for the session and tokenizer) ---
+
+class _Encoding(dict):
+    def __init__(self, data, word_ids):
+        super().__init__(data)
+        self._word_ids = word_ids
+
+    def word_ids(self, b):
+        return self._word_ids[b]
+
+
+class _WordTokenizer:
+    """``[CLS] w1 w2a w2b ... [SEP] [PAD]...``: words over six characters take two tokens."""
+
+    def __call__(
+        self, windows, *, is_split_into_words, return_tensors, truncation, max_length, padding=False
+    ):
+        import numpy as np
+
+        rows, word_ids = [], []
+        for words in windows:
+            ids, wids = [1], [None]
+            for w, word in enumerate(words):
+                for part in (word[:6], word[6:]) if len(word) > 6 else (word,):
+                    ids.append(10 + sum(map(ord, part)) % 90)
+                    wids.append(w)
+            rows.append([*ids[: max_length - 1], 2])
+            word_ids.append([*wids[: max_length - 1], None])
+        width = max(map(len, rows)) if padding else None
+        mask = [[1] * len(r) + [0] * (width - len(r)) for r in rows]
+        word_ids = [w + [None] * (width - len(w)) for w in word_ids]
+        ids = [r + [0] * (width - len(r)) for r in rows]
+        data = {"input_ids": np.array(ids), "attention_mask": np.array(mask)}
+        return _Encoding(data, word_ids)
+
+
+class _Session:
+    """Logits that depend on each token and on the unpadded tokens around it (mask-aware)."""
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def get_inputs(self):
+        from types import SimpleNamespace
+
+        return [SimpleNamespace(name="input_ids"), SimpleNamespace(name="attention_mask")]
+
+    def run(self, _outputs, feed):
+        import numpy as np
+
+        ids, mask = feed["input_ids"].astype(float), feed["attention_mask"].astype(float)
+        self.batch_sizes.append(len(ids))
+        context = (ids * mask).sum(axis=1, keepdims=True) / mask.sum(axis=1, keepdims=True)
+        keep = np.sin(ids) + 0.01 * context
+        return [np.stack([-keep, keep], axis=-1)]
+
+
+def _model(**kwargs):
+    pytest.importorskip("numpy")
+    session = _Session()
+    return LLMLingua2("unused", session=session, tokenizer=_WordTokenizer(), **kwargs), session
+
+
+def test_windows_are_scored_in_one_run_and_match_unbatched():
+    words = [f"word{i % 37}{'suffix' * (i % 3)}" for i in range(1200)]  # four full windows
+    batched, session = _model()
+    one_by_one, single = _model(max_batch=1)
+    assert batched.score_words(words) == pytest.approx(one_by_one.score_words(words))
+    assert session.batch_sizes == [4]
+    assert single.batch_sizes == [1, 1, 1, 1]
+    capped, runs = _model(max_batch=3)
+    capped.score_words(words)
+    assert runs.batch_sizes == [3, 1]
+
+
+def test_short_windows_are_not_padded_to_long_ones():
+    words = [f"w{i}" for i in range(1000)]  # three full windows and a 100-word tail
+    model, session = _model()
+    assert model.score_words(words) == pytest.approx(_model(max_batch=1)[0].score_words(words))
+    assert sorted(session.batch_sizes) == [1, 3]
+
+
+def test_concurrent_compress_calls_share_micro_batches():
+    import threading
+
+    model, session = _model(max_batch=32, max_wait_ms=50)
+    texts = [" ".join(f"t{k}w{i}" for i in range(40)) for k in range(6)]
+    expected = [_model()[0].compress(t, rate=0.5)["text"] for t in texts]
+    results = [None] * len(texts)
+    barrier = threading.Barrier(len(texts))
+
+    def call(k):
+        barrier.wait()
+        results[k] = model.compress(texts[k], rate=0.5)["text"]
+
+    threads = [threading.Thread(target=call, args=(k,)) for k in range(len(texts))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == expected
+    assert sum(session.batch_sizes) == 6 and len(session.batch_sizes) < 6
@@ -0,0 +1,142 @@
+import json
+import threading
+import time
+
+import httpx
+import pytest
+from cutok.compress import run_compress_stage, service
+from cutok.core.ledger import Ledger
+from cutok.core.payload import PayloadWriter
+from cutok.core.types import OptimizerConfig
+from cutok.normalize.delta import DeltaStore
+from cutok.optimizer import Attachment, normalize_attachments
+
+CONFIG = OptimizerConfig(model="gpt-4o", compression_keep_ratio=0.5)
+
+
+class FakeService:
+    """A compression service that keeps the first half of each text's words."""
+
+    def __init__(self, *, batch: bool = True, delay: float = 0.0) -> None:
+        self.batch = batch
+        self.delay = delay
+        self.calls: list[tuple[str, int]] = []
+        self.in_flight = self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            if request.url.path == "/v1/compress:batch":
+                if not self.batch:
+                    return httpx.Response(404)
+                self.calls.append((request.url.path, len(body["texts"])))
+                return httpx.Response(200, json={"results": [_half(t) for t in body["texts"]]})
+            self.calls.append((request.url.path, 1))
+            return httpx.Response(200, json=_half(body["text"]))
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+def _half(text: str) -> dict:
+    words = text.split()
+    return {"text": " ".join(words[: len(words) // 2]), "mode": "model"}
+
+
+@pytest.fixture
+def fake():
+    def install(**kwargs) -> FakeService:
+        svc = FakeService(**kwargs)
+        service.set_endpoint("http://compress.mock")
+        service.set_client(httpx.Client(transport=httpx.MockTransport(svc)))
+        return svc
+
+    yield install
+    service.set_endpoint(None)
+    service.set_client(None)
+    service._no_batch.clear()
+
+
+def _text(i: int) -> str:
+    return f"block {i} " + " ".join(f"word{j}" for j in range(30))
+
+
+def test_compress_many_batches_and_keeps_order(fake, monkeypatch):
+    monkeypatch.setenv("TS_COMPRESS_BATCH_SIZE", "4")
+    svc = fake()
+    texts = [_text(i) for i in range(10)]
+    results = service.compress_many(texts, rate=0.5, model="gpt-4o")
+    assert [r["text"] for r in results] == [_half(t)["text"] for t in texts]
+    assert sorted(svc.calls) == [("/v1/compress:batch", 2)] + [("/v1/compress:batch", 4)] * 2
+
+
+def test_fan_out_is_bounded(fake, monkeypatch):
+    monkeypatch.setenv("TS_COMPRESS_BATCH_SIZE", "1")
+    monkeypatch.setenv("TS_COMPRESS_CONCURRENCY", "3")
+    svc = fake(delay=0.02)
+    service.compress_many([_text(i) for i in range(12)], rate=0.5, model="gpt-4o")
+    assert len(svc.calls) == 12
+    assert 1 < svc.max_in_flight <= 3
+
+
+def test_service_without_batch_endpoint_gets_single_calls(fake):
+    svc = fake(batch=False)
+    texts = [_text(i) for i in range(3)]
+    results = service.compress_many(texts, rate=0.5, model="gpt-4o")
+    assert [r["text"] for r in results] == [_half(t)["text"] for t in texts]
+    service.compress_many(texts, rate=0.5, model="gpt-4o")
+    # The 404 is remembered: the second call goes straight to /v1/compress.
+    assert svc.calls == [("/v1/compress", 1)] * 6
+
+
+def test_unreachable_service_leaves_texts_unchanged():
+    service.set_endpoint("http://127.0.0.1:9")
+    try:
+        assert service.compress_many(["a b", "c d"], rate=0.5, model="gpt-4o") == [None, None]
+    finally:
+        service.set_endpoint(None)
+        service.close()
+
+
+def test_pooled_client_is_reused():
+    try:
+        assert service._http() is service._http()
+    finally:
+        service.close()
+
+
+def test_payload_blocks_go_out_together_and_short_ones_stay_home(fake):
+    svc = fake()
+    blocks = [{"type": "text", "text": _text(i)} for i in range(40)]
+    payload = {
+        "messages": [
+            {"role": "user", "content": [*blocks, {"type": "text", "text": "thanks!"}]},
+            {"role": "assistant", "content": _text(99)},
+            {"role": "user", "content": _text(100)},
+        ]
+    }
+    writer = PayloadWriter(payload)
+    result = run_compress_stage(writer, CONFIG, Ledger())
+    assert sorted(svc.calls) == [("/v1/compress:batch", 9)] + [("/v1/compress:batch", 16)] * 2
+    out = writer.payload["messages"]
+    assert out[0]["content"][0]["text"] == _half(_text(0))["text"]
+    assert out[0]["content"][-1]["text"] == "thanks!"  # under compression_min_tokens
+    assert out[1] is payload["messages"][1]
+    assert out[2]["content"] == _half(_text(100))["text"]
+    assert len(result.changes) == 41 and result.tokens_saved > 0
+
+
+def test_prose_attachments_are_compressed_in_one_batch(fake):
+    svc = fake()
+    files = [Attachment(f"notes{i}.md", _text(i).encode()) for i in range(3)]
+    files.append(Attachment("tiny.md", b"ok"))
+    texts, result = normalize_attachments(files, "s", CONFIG, DeltaStore(), Ledger())
+    assert svc.calls == [("/v1/compress:batch", 3)]
+    assert texts["notes1.md"] == _half(_text(1))["text"]
+    assert texts["tiny.md"] == "ok"
+    assert sum(c.kind == "compress" for c in result.changes) == 3
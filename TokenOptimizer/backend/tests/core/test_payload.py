@@ -0,0 +1,40 @@
+import copy
+
+from cutok.core.payload import PayloadWriter
+
+PAYLOAD = {
+    "model": "m",
+    "messages": [
+        {
+            "role": "user",
+            "content": [{"type": "text", "text": "a"}, {"type": "image", "data": "x"}],
+        },
+        {"role": "assistant", "content": "b"},
+    ],
+}
+
+
+def test_write_copies_only_the_path():
+    original = copy.deepcopy(PAYLOAD)
+    writer = PayloadWriter(PAYLOAD)
+    writer.own("messages", 0, "content", 0)["text"] = "changed"
+    out = writer.payload
+    assert PAYLOAD == original  # caller untouched
+    assert out["messages"][0]["content"][0]["text"] == "changed"
+    # Untouched siblings are shared, not copied.
+    assert out["messages"][1] is PAYLOAD["messages"][1]
+    assert out["messages"][0]["content"][1] is PAYLOAD["messages"][0]["content"][1]
+
+
+def test_repeat_writes_reuse_the_copy():
+    writer = PayloadWriter(PAYLOAD)
+    first = writer.own("messages", 0)
+    root = writer.payload
+    assert writer.own("messages", 0) is first
+    writer.own()["max_tokens"] = 5
+    assert writer.payload is root and "max_tokens" not in PAYLOAD
+
+
+def test_no_write_no_copy():
+    writer = PayloadWriter(PAYLOAD)
+    assert writer.payload is PAYLOAD and not writer.copied
@@ -0,0 +1,69 @@
+import pytest
+from cutok.core import prefix_chain as chain_module
+from cutok.core.prefix_chain import PrefixChain, chain_digests
+from cutok.core.tokens import count_tokens
+
+MODEL = "gpt-4o"
+TURNS = [f"turn {i}: please look at shard {i * 7} again" for i in range(12)]
+
+
+@pytest.fixture
+def counted(monkeypatch):
+    """Every block the chain actually sends to the tokenizer."""
+    sent: list[str] = []
+    real = chain_module.count_tokens_batch
+
+    def recording(texts, model):
+        sent.extend(texts)
+        return real(texts, model)
+
+    monkeypatch.setattr(chain_module, "count_tokens_batch", recording)
+    return sent
+
+
+def test_counts_and_totals_match_count_tokens(counted):
+    chain = PrefixChain()
+    expected = [count_tokens(t, MODEL).count for t in TURNS]
+    assert chain.counts(TURNS, MODEL) == expected
+    assert chain.totals(TURNS, MODEL)[-1] == sum(expected) == chain.total(TURNS, MODEL)
+    assert counted == TURNS  # the second and third calls were served from the chain
+
+
+def test_a_growing_conversation_counts_only_new_blocks(counted):
+    chain = PrefixChain()
+    for n in range(1, len(TURNS) + 1):
+        chain.total(TURNS[:n], MODEL)
+    assert counted == TURNS
+    assert chain.stats()["misses"] == len(TURNS)
+
+
+def test_an_edited_block_recounts_itself_and_everything_after(counted):
+    chain = PrefixChain()
+    chain.totals(TURNS, MODEL)
+    edited = [*TURNS[:5], "an edited turn", *TURNS[6:]]
+    assert chain.total(edited, MODEL) == sum(count_tokens(t, MODEL).count for t in edited)
+    assert counted[len(TURNS) :] == edited[5:]
+
+
+def test_evicted_entries_inside_the_prefix_are_recounted(counted):
+    chain = PrefixChain(max_entries=4)
+    chain.totals(TURNS[:4], MODEL)
+    chain.totals(TURNS[4:6], MODEL)  # another conversation evicts turns 0 and 1
+    total = chain.totals(TURNS[:5], MODEL)[-1]
+    assert total == sum(count_tokens(t, MODEL).count for t in TURNS[:5])
+    assert counted[6:] == [TURNS[0], TURNS[1], TURNS[4]]
+
+
+def test_disabled_chain_counts_everything(counted):
+    chain = PrefixChain(enabled=False)
+    chain.total(TURNS, MODEL)
+    chain.total(TURNS, MODEL)
+    assert len(counted) == 2 * len(TURNS)
+    assert chain.stats()["entries"] == 0
+
+
+def test_chain_digest_names_the_whole_prefix():
+    a = chain_digests(["x", "y"])
+    assert chain_digests(["x", "y", "z"])[:2] == a
+    assert chain_digests(["w", "y"])[1] != a[1]
+    assert chain_digests(["xy"])[0] != a[1]
@@ -0,0 +1,79 @@
+import pytest
+from cutok.core.providers import tokenizer_for
+from cutok.core.tokens import SegmentCounter, count_tokens, split_segments
+from cutok.normalize.textclean import TextCleanNormalizer
+from hypothesis import HealthCheck, given, settings
+from hypothesis import strategies as st
+
+# Text built from the pieces that sit on BPE pre-token edges: blank-line runs, indentation,
+# comment slashes, contractions, digits, and non-ASCII letters.
+_PIECES = st.sampled_from(
+    [
+        "\n",
+        "\n\n",
+        "\n\n\n",
+        " ",
+        "  ",
+        "\t",
+        "/",
+        "//",
+        "'s",
+        "x",
+        "Word",
+        "123",
+        "é",
+        "—",
+        "```",
+        "#",
+    ]
+)
+_TEXT = st.lists(st.one_of(_PIECES, st.text(max_size=6)), max_size=40).map("".join)
+
+_MODELS = ["gpt-4o", "gpt-4", "claude-sonnet-4-5", "gemini-2.5-pro"]
+
+
+class CountingTokenizer:
+    """Segmentable wrapper that records every string it actually encodes."""
+
+    segmentable = True
+
+    def __init__(self, inner):
+        self._inner = inner
+        self.encoded: list[str] = []
+
+    def raw_count(self, text):
+        self.encoded.append(text)
+        return self._inner.raw_count(text)
+
+    def scale(self, raw):
+        return self._inner.scale(raw)
+
+
+@pytest.mark.parametrize("model", _MODELS)
+@settings(deadline=None, max_examples=300, suppress_health_check=[HealthCheck.too_slow])
+@given(text=_TEXT)
+def test_segment_sum_matches_whole_count(model, text):
+    assert "".join(split_segments(text)) == text
+    assert SegmentCounter(model).count(text) == count_tokens(text, model).count
+
+
+def test_only_changed_segments_reencode():
+    paragraphs = [f"Paragraph {i} talks about item {i}.   " for i in range(20)]
+    doc = "\n\n".join(paragraphs)
+    tok = CountingTokenizer(tokenizer_for("gpt-4o"))
+    counter = SegmentCounter("gpt-4o", tokenizer=tok)
+    counter.count(doc)
+    assert len(tok.encoded) == 20
+
+    tok.encoded.clear()
+    edited = doc.replace("Paragraph 7 talks", "Paragraph 7 says")
+    assert counter.count(edited) == count_tokens(edited, "gpt-4o").count
+    assert tok.encoded == [split_segments(edited)[7]]
+
+
+def test_textclean_attribution_unchanged():
+    text = "Title   \n\n\n\n\nbody text  \n\n" + "More prose here.  \n\n" * 30
+    res = TextCleanNormalizer().normalize(text, "notes.md", "gpt-4o")
+    before = count_tokens(text, "gpt-4o").count
+    after = count_tokens(res.text, "gpt-4o").count
+    assert sum(c.tokens_saved for c in res.changes) == before - after
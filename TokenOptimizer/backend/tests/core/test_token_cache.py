@@ -0,0 +1,134 @@
+import threading
+
+from cutok.core.providers import tokenizer_for
+from cutok.core.token_cache import TokenCountCache
+from cutok.core.tokens import count_tokens
+
+DOC = "The quarterly report covers revenue, churn, and hiring across every region. " * 40
+
+
+class CountingTokenizer:
+    """Wraps a real tokenizer and records how often it actually encodes."""
+
+    def __init__(self, inner, identity="test:counting"):
+        self._inner = inner
+        self.identity = identity
+        self.exact = inner.exact
+        self.calls = 0
+
+    def count(self, text):
+        self.calls += 1
+        return self._inner.count(text)
+
+    def count_batch(self, texts):
+        self.calls += 1
+        return self._inner.count_batch(texts)
+
+
+def test_repeat_counts_encode_once():
+    cache = TokenCountCache()
+    tok = CountingTokenizer(tokenizer_for("gpt-4o"))
+    first = cache.count(tok, DOC)
+    assert all(cache.count(tok, DOC) == first for _ in range(10))
+    assert tok.calls == 1
+    stats = cache.stats()
+    assert stats["hits"] == 10 and stats["misses"] == 1
+
+
+def test_cached_count_matches_uncached():
+    cache = TokenCountCache()
+    for model in ("gpt-4o", "claude-sonnet-4-5", "gemini-1.5-pro"):
+        tok = tokenizer_for(model)
+        assert cache.count(tok, DOC) == tok.count(DOC)
+        assert cache.count(tok, DOC) == count_tokens(DOC, model).count
+
+
+def test_keyed_by_tokenizer_identity():
+    cache = TokenCountCache()
+    openai = tokenizer_for("gpt-4o")
+    claude = tokenizer_for("claude-sonnet-4-5")
+    # Same text, different tokenizers → different counts, never a cross-tokenizer hit.
+    assert cache.count(openai, DOC) != cache.count(claude, DOC)
+    assert cache.stats()["misses"] == 2
+
+
+def test_byte_budget_evicts_lru():
+    cache = TokenCountCache(max_bytes=600)  # room for a handful of entries
+    tok = CountingTokenizer(tokenizer_for("gpt-4o"))
+    for i in range(20):
+        cache.count(tok, f"{i} {DOC}")
+    stats = cache.stats()
+    assert stats["bytes"] <= 600
+    assert stats["evictions"] > 0
+    assert stats["entries"] < 20
+    # The most recent entry survived; the oldest was evicted and re-encodes.
+    calls = tok.calls
+    cache.count(tok, f"19 {DOC}")
+    assert tok.calls == calls
+    cache.count(tok, f"0 {DOC}")
+    assert tok.calls == calls + 1
+
+
+def test_disabled_cache_always_encodes():
+    cache = TokenCountCache(enabled=False)
+    tok = CountingTokenizer(tokenizer_for("gpt-4o"))
+    cache.count(tok, DOC)
+    cache.count(tok, DOC)
+    assert tok.calls == 2
+    assert cache.stats()["entries"] == 0
+
+
+def test_configure_off_drops_entries():
+    cache = TokenCountCache()
+    cache.count(tokenizer_for("gpt-4o"), DOC)
+    assert cache.stats()["entries"] == 1
+    cache.configure(enabled=False)
+    assert cache.stats()["entries"] == 0 and cache.stats()["enabled"] is False
+
+
+def test_short_text_and_anonymous_tokenizers_bypass():
+    cache = TokenCountCache()
+    cache.count(tokenizer_for("gpt-4o"), "hi")
+
+    class Anonymous:
+        exact = True
+
+        def count(self, text):
+            return 7
+
+    assert cache.count(Anonymous(), DOC) == 7
+    assert cache.stats()["entries"] == 0
+
+
+def test_thread_safe_under_contention():
+    cache = TokenCountCache(max_bytes=2_000)
+    tok = tokenizer_for("gpt-4o")
+    texts = [f"{i} {DOC}" for i in range(30)]
+    expected = {t: tok.count(t) for t in texts}
+    errors = []
+
+    def worker():
+        for t in texts:
+            if cache.count(tok, t) != expected[t]:
+                errors.append(t)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    assert errors == []
+    assert cache.stats()["bytes"] <= 2_000
+
+
+def test_count_many_batches_misses_and_serves_hits():
+    cache = TokenCountCache()
+    tok = CountingTokenizer(tokenizer_for("gpt-4o"))
+    texts = [f"{i} {DOC}" for i in range(5)] + ["hi", f"0 {DOC}"]
+    expected = [tokenizer_for("gpt-4o").count(t) for t in texts]
+    assert cache.count_many(tok, texts) == expected
+    assert tok.calls == 1  # one batch call; the in-batch repeat is encoded once
+    assert cache.stats()["entries"] == 5
+    assert cache.count_many(tok, texts[:5]) == expected[:5]
+    assert tok.calls == 1
+    assert cache.count(tok, f"3 {DOC}") == expected[3] and tok.calls == 1
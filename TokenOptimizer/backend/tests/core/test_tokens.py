@@ -1,7 +1,7 @@
 import json
 from pathlib import Path
 
-from cutok.core.tokens import count_tokens, provider_for
+from cutok.core.tokens import count_tokens, count_tokens_batch, provider_for
 from cutok.core.types import Provider
 
 _VECTORS = json.loads(
@@ -89,3 +89,12 @@ def test_anthropic_heuristic_matches_shared_vectors():
     # These vectors are also asserted in TypeScript (extension/src/__tests__/tokens.test.ts).
     for vector in _VECTORS:
         assert count_tokens(vector["text"], "claude-sonnet-4-5").count == vector["anthropic"]
+
+
+def test_batch_matches_single_counts():
+    # Enough volume to take tiktoken's threaded batch path, plus empties and repeats.
+    texts = [f"paragraph {i}: " + "lorem ipsum dolor sit amet " * (i % 50) for i in range(400)]
+    texts += ["", PANGRAM, PANGRAM]
+    for model in ("gpt-4o", "gpt-4", "claude-sonnet-4-5", "mistral-large-latest"):
+        assert count_tokens_batch(texts, model) == [count_tokens(t, model).count for t in texts]
+    assert count_tokens_batch([], "gpt-4o") == []
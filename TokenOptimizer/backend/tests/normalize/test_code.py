@@ -1,6 +1,7 @@
 import ast
 
-from cutok.normalize.code import CodeNormalizer
+from cutok.normalize import code
+from cutok.normalize.code import CodeNormalizer, strip_comments
 
 NORM = CodeNormalizer()
 MODEL = "gpt-4o"
@@ -61,3 +62,78 @@ def test_license_header_dedup_across_files():
     assert any(c.kind == "license_header_dedup" for c in results["b_file.py"].changes)
     # Deduped file still parses (comments don't affect the AST).
     ast.parse(results["b_file.py"].text)
+
+
+# --- Comment stripping (lossy tier) ---
+def test_python_comments_stripped_by_tokenizer():
+    src = (
+        "#!/usr/bin/env python\n"
+        "# -*- coding: utf-8 -*-\n"
+        "import os  # the os module\n"
+        "# a full comment line\n"
+        'URL = "http://x/#anchor"  # type: ignore\n'
+        "def f():\n"
+        "    # inside\n"
+        '    return "# kept"  # trailing\n'
+    )
+    out = strip_comments(src, "m.py")
+    assert out == (
+        "#!/usr/bin/env python\n"
+        "# -*- coding: utf-8 -*-\n"
+        "import os\n"
+        'URL = "http://x/#anchor"  # type: ignore\n'
+        "def f():\n"
+        '    return "# kept"\n'
+    )
+    assert ast.dump(ast.parse(out)) == ast.dump(ast.parse(src))
+
+
+def test_python_that_does_not_tokenize_is_left_alone():
+    src = 'x = """unterminated  # not a comment\n'
+    assert strip_comments(src, "m.py") == src
+
+
+def test_python_rewrites_parse_the_original_once(monkeypatch):
+    parses = []
+    real_parse = code.ast.parse
+    monkeypatch.setattr(code.ast, "parse", lambda src: parses.append(src) or real_parse(src))
+    code._ast_fingerprint.cache_clear()
+    src = "def f():   \n    return 1  # one\n"
+    normalized = NORM.normalize(src, "m.py", MODEL).text
+    strip_comments(normalized, "m.py")
+    assert len(parses) == 3  # original, whitespace-stripped, comment-stripped
+    assert len(set(parses)) == 3
+
+
+def test_slash_comments_skip_strings_and_regex_literals():
+    src = (
+        'const url = "http://x"; // trailing\n'
+        "// full line\n"
+        "const re = /\"/; const s = 'a//b'; // after a regex\n"
+        "let d = a / b; // division\n"
+        '/// <reference path="x.d.ts" />\n'
+        "/* block // inside */ let z = `tpl // text`;\n"
+    )
+    assert strip_comments(src, "a.ts") == (
+        'const url = "http://x";\n'
+        "const re = /\"/; const s = 'a//b';\n"
+        "let d = a / b;\n"
+        '/// <reference path="x.d.ts" />\n'
+        "/* block // inside */ let z = `tpl // text`;\n"
+    )
+
+
+def test_slash_comments_language_rules():
+    go = "//go:build linux\npackage main\n// Doc.\nvar s = `raw // text` // raw\n"
+    assert strip_comments(go, "a.go") == "//go:build linux\npackage main\nvar s = `raw // text`\n"
+    rust = "fn f<'a>(x: &'a str) -> &'a str { // lifetimes\n    let s = \"two\n// lines\"; x }\n"
+    assert strip_comments(rust, "a.rs") == (
+        "fn f<'a>(x: &'a str) -> &'a str {\n    let s = \"two\n// lines\"; x }\n"
+    )
+    c = "#define X 1 // spliced \\\n  still comment\nint y; // gone\n"
+    assert strip_comments(c, "a.c") == "#define X 1 // spliced \\\n  still comment\nint y;\n"
+
+
+def test_unlexable_slash_file_is_left_alone():
+    jsx = "const p = <p>Don't // stop</p>;\n// comment\n"
+    assert strip_comments(jsx, "a.jsx") == jsx
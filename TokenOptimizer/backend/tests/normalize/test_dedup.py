@@ -57,3 +57,50 @@ def test_deterministic():
     # First alphabetically (a.txt) keeps the verbatim copy.
     assert "confidential and intended" in out1["a.txt"]
     assert "[¶ identical to ¶" in out1["z.txt"]
+
+
+CLAUSE = (
+    "This agreement is made on {date} between Acme Holdings Limited and {party}, who agree that "
+    "all deliverables described in the attached statement of work shall be provided in full, "
+    "reviewed by both parties, and accepted in writing before any invoice is issued or paid."
+)
+
+
+def test_near_duplicates_untouched_unless_opted_in():
+    docs = {
+        "v1.txt": CLAUSE.format(date="5 May 2023", party="Alice Smith"),
+        "v2.txt": CLAUSE.format(date="9 June 2024", party="Alice Smith"),
+    }
+    out, changes = dedup_chunks(docs, MODEL)
+    assert out == docs and changes == []
+
+
+def test_near_duplicate_becomes_reference_with_inline_diff():
+    docs = {
+        "v1.txt": f"Intro.\n\n{CLAUSE.format(date='5 May 2023', party='Alice Smith')}",
+        "v2.txt": f"Other.\n\n{CLAUSE.format(date='9 June 2024', party='Bob Jones')}",
+    }
+    out, changes = dedup_chunks(docs, MODEL, near_threshold=0.6)
+    assert out["v1.txt"] == docs["v1.txt"]  # the earlier copy stays verbatim
+    assert out["v2.txt"].startswith("Other.\n\n[¶ as ¶2 in v1.txt, with ")
+    assert '"5 May 2023" → "9 June 2024"' in out["v2.txt"]
+    assert '"Alice Smith," → "Bob Jones,"' in out["v2.txt"]
+    assert [c.kind for c in changes] == ["near_dedup_chunk"]
+    assert changes[0].tokens_saved > 0
+
+
+def test_dissimilar_paragraphs_below_threshold_are_kept():
+    docs = {
+        "a.txt": CLAUSE.format(date="5 May 2023", party="Alice Smith"),
+        "b.txt": DISCLAIMER,
+    }
+    out, changes = dedup_chunks(docs, MODEL, near_threshold=0.5)
+    assert out == docs and changes == []
+
+
+def test_exact_dedup_runs_first_in_near_mode():
+    clause = CLAUSE.format(date="5 May 2023", party="Alice Smith")
+    docs = {"a.txt": clause, "b.txt": clause}
+    out, changes = dedup_chunks(docs, MODEL, near_threshold=0.8)
+    assert out["b.txt"] == "[¶ identical to ¶1 in a.txt]"
+    assert [c.kind for c in changes] == ["dedup_chunk"]
@@ -0,0 +1,132 @@
+import threading
+
+import pytest
+from cutok.normalize.delta import DeltaStore, delta_store_from_env
+from cutok.normalize.delta_backends import MemoryBackend, ShardedBackend, SqliteBackend
+
+MODEL = "gpt-4o"
+
+
+def make_file(n_lines, marker="x"):
+    return "\n".join(f"line {i} {marker}" for i in range(n_lines)) + "\n"
+
+
+@pytest.fixture(params=["memory", "sharded", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemoryBackend()
+    if request.param == "sharded":
+        return ShardedBackend(4)
+    return SqliteBackend(tmp_path / "delta.sqlite3")
+
+
+def test_swap_returns_previous_full_text(backend):
+    v1, v2 = make_file(50), make_file(50, marker="y")
+    assert backend.swap("k", v1) is None
+    assert backend.swap("k", v2) == v1
+    assert backend.swap("k", "é\U0001f600 \ud800") == v2  # non-ASCII and lone surrogates survive
+    assert backend.stats()["entries"] == 1
+
+
+def test_process_contract_holds_on_every_backend(backend):
+    store = DeltaStore(backend=backend)
+    v1 = make_file(200)
+    assert store.process("f|sess", v1, MODEL) == (v1, None)
+    v2 = v1.replace("line 10 x", "line 10 SECOND")
+    store.process("f|sess", v2, MODEL)
+    v3 = v2.replace("line 20 x", "line 20 THIRD")
+    out, change = store.process("f|sess", v3, MODEL)
+    # The store held v2 in full, so the diff carries only the third edit.
+    assert "THIRD" in out and "SECOND" not in out
+    assert change is not None and change.kind == "delta_encode"
+
+
+def test_concurrent_swaps_never_lose_an_update(backend):
+    # Each swap hands back exactly one earlier value: together they form a single chain.
+    returned: list[str | None] = []
+    lock = threading.Lock()
+
+    def worker(n):
+        for i in range(25):
+            previous = backend.swap("shared", f"{n}-{i}")
+            with lock:
+                returned.append(previous)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert returned.count(None) == 1
+    seen = [value for value in returned if value is not None]
+    assert len(seen) == len(set(seen)) == 99
+
+
+def test_memory_budget_is_enforced_on_compressed_bytes():
+    backend = MemoryBackend(max_bytes=32 * 1024)
+    for n in range(20):
+        backend.swap(f"file{n}", make_file(2000, marker=str(n)))
+    stats = backend.stats()
+    assert stats["bytes"] <= 32 * 1024
+    assert stats["raw_chars"] > stats["bytes"]  # stored compressed
+    assert stats["evictions"] > 0
+    assert backend.swap("file19", "new") is not None  # most recent survives
+    assert backend.swap("file0", "new") is None  # oldest was evicted
+
+
+def test_text_larger_than_budget_is_not_kept():
+    backend = MemoryBackend(max_bytes=256)
+    blob = "".join(chr(0x4E00 + (i * 7919) % 20000) for i in range(5000))  # incompressible-ish
+    backend.swap("big", blob)
+    assert backend.swap("big", blob) is None
+    assert backend.stats()["entries"] == 0
+
+
+@pytest.mark.parametrize("kind", ["memory", "sharded", "sqlite"])
+def test_oversized_text_leaves_other_entries_alone(kind, tmp_path):
+    if kind == "memory":
+        backend = MemoryBackend(10_000)
+    elif kind == "sharded":
+        backend = ShardedBackend(1, 10_000)
+    else:
+        backend = SqliteBackend(tmp_path / "delta.sqlite3", 10_000)
+    for n in range(5):
+        backend.swap(f"file{n}", make_file(20, marker=str(n)))
+    backend.swap("big", "x" * 100)
+    big = "".join(chr(0x4E00 + (i * 7919) % 20000) for i in range(40_000 // 3))
+    assert backend.swap("big", big) == "x" * 100
+    stats = backend.stats()
+    assert stats["entries"] == 5 and stats["evictions"] == 0
+    assert backend.swap("big", big) is None  # the previous version was dropped, not kept
+    assert backend.swap("file0", "new") is not None
+
+
+def test_sqlite_survives_restart_and_is_shared(tmp_path):
+    path = tmp_path / "delta.sqlite3"
+    first = SqliteBackend(path)
+    v1 = make_file(100)
+    first.swap("f|sess", v1)
+    first.close()
+    # A new process (or proxy worker) opening the same file sees the stored text.
+    store = DeltaStore(backend=SqliteBackend(path))
+    out, change = store.process("f|sess", v1.replace("line 5 x", "line 5 EDIT"), MODEL)
+    assert change is not None and "EDIT" in out
+
+
+def test_sqlite_evicts_least_recently_used(tmp_path):
+    backend = SqliteBackend(tmp_path / "delta.sqlite3", max_files=2)
+    backend.swap("a", "1")
+    backend.swap("b", "1")
+    backend.swap("a", "2")  # touch "a"; "b" is now the oldest
+    backend.swap("c", "1")
+    assert backend.swap("b", "2") is None
+    assert backend.stats()["evictions"] >= 1
+
+
+def test_backend_selected_from_env(monkeypatch, tmp_path):
+    monkeypatch.setenv("TS_DELTA_STORE", "sqlite")
+    monkeypatch.setenv("TS_DELTA_PATH", str(tmp_path / "d.sqlite3"))
+    assert delta_store_from_env().stats()["backend"] == "sqlite"
+    monkeypatch.setenv("TS_DELTA_STORE", "bogus")
+    with pytest.raises(ValueError):
+        delta_store_from_env()
@@ -0,0 +1,86 @@
+import difflib
+import random
+import re
+
+from cutok.normalize.diff import unified_diff
+from hypothesis import given, settings
+from hypothesis import strategies as st
+
+_HUNK = re.compile(r"@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@\n")
+
+
+def apply_patch(a: list[str], diff: str) -> list[str]:
+    """Apply a unified diff to ``a``, checking every context and removed line against it."""
+    if not diff:
+        return list(a)
+    lines = diff.splitlines(keepends=True)[2:]
+    out: list[str] = []
+    pos = k = 0
+    while k < len(lines):
+        match = _HUNK.fullmatch(lines[k])
+        assert match, lines[k]
+        length = 1 if match[2] is None else int(match[2])
+        start = int(match[1]) - 1 if length else int(match[1])
+        assert start >= pos
+        out += a[pos:start]
+        pos, k = start, k + 1
+        while k < len(lines) and not lines[k].startswith("@@"):
+            tag, line = lines[k][0], lines[k][1:]
+            if tag in " -":
+                assert a[pos] == line
+                pos += 1
+            if tag in " +":
+                out.append(line)
+            k += 1
+    return out + a[pos:]
+
+
+def reference(a, b):
+    return "".join(difflib.unified_diff(a, b, fromfile="f", tofile="f"))
+
+
+def test_matches_difflib_byte_for_byte_on_simple_edits():
+    a = [f"line {i}\n" for i in range(300)]
+    edited = list(a)
+    edited[150] = "EDITED\n"
+    cases = [
+        (a, edited),
+        (a, a[:40] + a[55:] + ["appended\n"]),
+        (a, ["prepended\n"] + a),
+        (["only"], ["other"]),  # no trailing newline, as difflib leaves it
+        ([], ["new\n"]),
+        (a, []),
+    ]
+    for old, new in cases:
+        assert unified_diff(old, new, "f", "f") == reference(old, new)
+
+
+def test_identical_inputs_give_empty_diff():
+    a = [f"{i}\n" for i in range(50)]
+    assert unified_diff(a, list(a), "f", "f") == ""
+
+
+@settings(deadline=None, max_examples=300)
+@given(
+    a=st.lists(st.sampled_from(["a\n", "b\n", "c\n", "{\n", "}\n", "\n"]), max_size=40),
+    b=st.lists(st.sampled_from(["a\n", "b\n", "d\n", "{\n", "}\n", "\n"]), max_size=40),
+)
+def test_patch_always_reconstructs_the_new_text(a, b):
+    # Few distinct lines, so every region is repetitive: anchors, fallback and grouping all run.
+    assert apply_patch(a, unified_diff(a, b, "f", "f")) == b
+
+
+def test_repetitive_log_yields_small_diff():
+    a = [f"{i} GET /health 200\n" if i % 3 else "heartbeat\n" for i in range(20_000)]
+    b = list(a)
+    b[10_000] = "ERROR boom\n"
+    diff = unified_diff(a, b, "f", "f")
+    assert apply_patch(a, diff) == b
+    assert diff.count("@@ -") == 1  # a single hunk
+
+
+def test_shuffled_input_uses_fallback_and_stays_valid():
+    a = [f"{i % 500}\n" for i in range(5_000)]
+    b = list(a)
+    random.Random(7).shuffle(b)
+    assert apply_patch(a, unified_diff(a, b, "f", "f")) == b
@@ -0,0 +1,80 @@
+import pytest
+from cutok.normalize import document as document_module
+from cutok.normalize.dedup import dedup_chunks
+from cutok.normalize.document import Document, clear_documents, document, split_fences
+from cutok.normalize.textclean import TextCleanNormalizer
+
+MODEL = "gpt-4o"
+TEXT = "Intro para.\n\n```py\nx = 1\n\n\ny = 2\n```\nOne.\n  \nTwo\nlines.\n"
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    clear_documents()
+    yield
+    clear_documents()
+
+
+def test_views_rebuild_the_text():
+    doc = Document(TEXT)
+    assert doc.parts == tuple(split_fences(TEXT))
+    kinds = [kind for kind, _ in doc.blocks]
+    assert kinds == ["para", "sep", "para", "code", "para", "sep", "para"]
+    assert "".join(value for _, value in doc.blocks) == TEXT
+    assert doc.lines == tuple(TEXT.splitlines(keepends=True))
+    assert doc.code_chars == len("```py\nx = 1\n\n\ny = 2\n```")
+
+
+def test_document_is_shared_per_text():
+    doc = document(TEXT)
+    assert document(TEXT[:5] + TEXT[5:]) is doc  # an equal string, not the same object
+    assert document(TEXT + " ") is not doc
+
+
+def test_derive_keeps_the_split_and_the_token_counter():
+    doc = Document(TEXT)
+    counter = doc.counter(MODEL)
+    rewritten = doc.derive((is_code, seg if is_code else seg.upper()) for is_code, seg in doc.parts)
+    assert rewritten.text == "INTRO PARA.\n\n```py\nx = 1\n\n\ny = 2\n```\nONE.\n  \nTWO\nLINES.\n"
+    assert rewritten.parts == Document(rewritten.text).parts
+    assert rewritten.counter(MODEL) is counter
+    assert doc.derive([(False, "")]).parts == ((False, ""),)
+
+
+def test_cache_is_bounded_by_text_size(monkeypatch):
+    monkeypatch.setattr(document_module._cache, "max_chars", 130)
+    first = document("a" * 30)
+    document("b" * 30)
+    assert document("a" * 30) is first  # 2 x 30 + 2 x 30 chars fit
+    document("c" * 30)  # evicts the least recently used, "b"
+    assert document("a" * 30) is first
+    assert document("x" * 70) is not document("x" * 70)  # too large to keep at all
+
+
+def test_textclean_output_is_reused_downstream(monkeypatch):
+    text = "“Quoted” intro.\n\n\n\n\n```\ncode\n```\nTail."
+    out = TextCleanNormalizer().normalize(text, "doc.md", MODEL).text
+    document("other")
+
+    def no_rescan(text):
+        raise AssertionError("the cleaned text was split again")
+
+    monkeypatch.setattr(document_module, "split_fences", no_rescan)
+    assert document(out).parts[1] == (True, "```\ncode\n```")
+    dedup_chunks({"a.md": out, "b.md": "other"}, MODEL)
+
+
+def test_dedup_parse_lives_and_dies_with_the_document(monkeypatch):
+    from cutok.normalize import dedup
+
+    hashed = []
+    real = dedup._chunk_hash
+    monkeypatch.setattr(dedup, "_chunk_hash", lambda p: hashed.append(p) or real(p))
+    texts = {"a.md": TEXT, "b.md": TEXT.upper()}
+    dedup_chunks(texts, MODEL)
+    dedup_chunks(texts, MODEL)
+    assert len(hashed) == 6  # three paragraphs per document, hashed once
+    monkeypatch.setattr(document_module._cache, "max_chars", 2 * len(TEXT))
+    document("z" * len(TEXT))  # evicts both documents, and their parses with them
+    dedup_chunks(texts, MODEL)
+    assert len(hashed) == 12
@@ -0,0 +1,99 @@
+import os
+
+import pytest
+from cutok.normalize import extract
+from cutok.normalize.extract_cache import ExtractionCache
+
+HTML = b"<html><body><h1>Quarterly report</h1><p>Revenue grew.</p></body></html>"
+
+
+class CountingMarkItDown:
+    def __init__(self, inner):
+        self.inner = inner
+        self.calls = 0
+
+    def convert_stream(self, *args, **kwargs):
+        self.calls += 1
+        return self.inner.convert_stream(*args, **kwargs)
+
+
+@pytest.fixture
+def counting(monkeypatch):
+    cache = ExtractionCache()
+    markitdown = CountingMarkItDown(extract._markitdown)
+    monkeypatch.setattr(extract, "extraction_cache", cache)
+    monkeypatch.setattr(extract, "_markitdown", markitdown)
+    return cache, markitdown
+
+
+def test_repeat_extraction_is_served_from_memory(counting):
+    cache, markitdown = counting
+    first = extract.extract_to_markdown(HTML, "r.html")
+    assert extract.extract_to_markdown(HTML, "copy.HTML") == first  # name doesn't matter, ext does
+    assert markitdown.calls == 1
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+    assert stats["hit_rate"] == 0.5 and stats["bytes_saved"] == len(HTML)
+
+    extract.extract_to_markdown(HTML, "r.htm")  # different extension, different key
+    assert markitdown.calls == 2
+
+
+def test_failures_and_text_formats_are_not_cached(counting):
+    cache, markitdown = counting
+    for _ in range(2):
+        with pytest.raises(extract.ExtractionError):
+            extract.extract_to_markdown(b"\x00not a real docx", "broken.docx")
+    extract.extract_to_markdown(b"plain", "notes.txt")
+    assert markitdown.calls == 0
+    assert cache.stats()["entries"] == 0
+
+
+def test_disk_tier_is_shared_across_instances(tmp_path):
+    writer = ExtractionCache(disk_dir=tmp_path)
+    key = writer.key(HTML, ".html")
+    writer.put(key, "# Quarterly report", 0.25)
+
+    reader = ExtractionCache(disk_dir=tmp_path)  # another worker, or after a restart
+    assert reader.get(key, len(HTML)) == "# Quarterly report"
+    assert reader.get(key, len(HTML)) == "# Quarterly report"
+    stats = reader.stats()
+    assert (stats["disk_hits"], stats["memory_hits"]) == (1, 1)
+    assert stats["extract_ms_saved"] == 500.0
+
+    (path,) = tmp_path.iterdir()
+    path.write_bytes(b"garbage")
+    assert ExtractionCache(disk_dir=tmp_path).get(key, 0) is None  # corrupt entry is a miss
+
+
+def test_eviction_keeps_both_tiers_within_budget(tmp_path):
+    cache = ExtractionCache(max_bytes=2000, disk_dir=tmp_path, disk_max_bytes=1000)
+    keys = [cache.key(bytes([n]), ".pdf") for n in range(5)]
+    for n, key in enumerate(keys):
+        cache.put(key, os.urandom(400).decode("latin-1"), 0.1)  # incompressible: ~600 B on disk
+        os.utime(tmp_path / cache._path(key).name, (n, n))  # deterministic LRU order
+    stats = cache.stats()
+    assert stats["bytes"] <= 2000 and stats["entries"] < 5 and stats["evictions"] > 0
+    assert stats["disk_bytes"] <= 1000
+    assert [p.name for p in tmp_path.iterdir()] == [cache._path(keys[-1]).name]
+
+
+def test_oversized_extraction_leaves_the_memory_tier_alone(tmp_path):
+    cache = ExtractionCache(max_bytes=2000, disk_dir=tmp_path)
+    small = [cache.key(bytes([n]), ".pdf") for n in range(3)]
+    for key in small:
+        cache.put(key, "x" * 100, 0.1)
+    big = cache.key(b"big", ".pdf")
+    cache.put(big, "y" * 5000, 1.0)
+    assert cache.get(big, 10) == "y" * 5000  # a disk hit, not re-inserted in memory
+    stats = cache.stats()
+    assert (stats["entries"], stats["evictions"], stats["disk_hits"]) == (3, 0, 1)
+    assert all(cache.get(key, 1) == "x" * 100 for key in small)
+
+
+def test_disabled_cache_is_inert():
+    cache = ExtractionCache(enabled=False)
+    key = cache.key(HTML, ".html")
+    cache.put(key, "text", 1.0)
+    assert cache.get(key, len(HTML)) is None
+    assert cache.stats()["misses"] == 0
@@ -0,0 +1,79 @@
+from cutok.core.ledger import Ledger
+from cutok.core.types import OptimizerConfig
+from cutok.normalize.delta import DeltaStore
+from cutok.normalize.history import HistoryIndex, HistoryStore
+from cutok.optimizer import optimize_payload
+
+MODEL = "gpt-4o"
+CONFIG = OptimizerConfig(model=MODEL, enable_compression=False)
+
+SPEC = (
+    "The export job must write one CSV per tenant, include a header row, quote every field that "
+    "contains a comma, and finish within fifteen minutes for tenants with fewer than one million "
+    "rows; larger tenants are split into numbered parts of at most one million rows each."
+)
+CODE = "```\nfor tenant in tenants:\n    export(tenant)\n```"
+
+
+def conversation(*user_texts):
+    messages = []
+    for i, text in enumerate(user_texts):
+        messages.append({"role": "user", "content": text})
+        messages.append({"role": "assistant", "content": [{"type": "text", "text": f"ok {i}"}]})
+    return messages
+
+
+def test_repeated_paragraph_becomes_back_reference():
+    messages = conversation(f"Spec:\n\n{SPEC}", f"Reminder, the spec again:\n\n{SPEC}\n\n{CODE}")
+    payload = {"model": MODEL, "messages": messages}
+    out, results = optimize_payload(payload, CONFIG, Ledger(), DeltaStore())
+    assert out["messages"][0] is messages[0]  # first occurrence untouched, not even copied
+    later = out["messages"][2]["content"]
+    assert later == f"Reminder, the spec again:\n\n[¶ identical to ¶2 of message 1]\n\n{CODE}"
+    assert payload["messages"][2]["content"].count(SPEC) == 1  # caller's payload not mutated
+    history = next(r for r in results if r.feature == "history_dedup")
+    assert history.tokens_saved > 0 and history.changes[0].kind == "history_dedup"
+
+
+def test_fenced_code_and_tool_results():
+    block = f"```\n{SPEC}\n```"
+    tool_result = {"type": "tool_result", "tool_use_id": "t1", "content": SPEC}
+    messages = [
+        {"role": "user", "content": block},
+        {"role": "assistant", "content": "noted"},
+        {"role": "user", "content": [tool_result]},
+        {"role": "user", "content": [{"type": "text", "text": block}]},
+    ]
+    out, _ = optimize_payload({"messages": messages}, CONFIG, Ledger(), DeltaStore())
+    assert out["messages"][2]["content"][0]["content"] == SPEC  # the fenced copy is not indexed
+    assert out["messages"][3] is messages[3]  # fenced code is never replaced
+
+
+def test_index_grows_incrementally_and_rolls_back_on_edit():
+    store = HistoryStore()
+    first = conversation("hello", f"spec\n\n{SPEC}")
+    index = store.index_for("s", first)
+    index.process(first, MODEL)
+    assert index.messages_indexed == 4
+
+    grown = [*first, {"role": "user", "content": SPEC}]
+    assert store.index_for("s", grown) is index
+    rewrites, result = index.process(grown, MODEL)
+    assert index.messages_indexed == 5  # only the new message was indexed
+    assert rewrites == [(4, ((), "content", "[¶ identical to ¶2 of message 3]"))]
+    assert len(result.changes) == 1
+
+    # Editing message 3 drops the indexed paragraph; the repeat is now a first occurrence.
+    edited = [first[0], first[1], {"role": "user", "content": "changed"}, first[3], grown[4]]
+    rewrites, result = index.process(edited, MODEL)
+    fresh_rewrites, fresh_result = HistoryIndex().process(edited, MODEL)
+    assert rewrites == fresh_rewrites == []
+    assert result.changes == fresh_result.changes == []
+
+
+def test_conversations_sharing_a_session_get_separate_indexes():
+    store = HistoryStore()
+    a = store.index_for("s", conversation("task A"))
+    b = store.index_for("s", conversation("task B"))
+    assert a is not b
+    assert store.index_for("s", conversation("task A", "more")) is a
@@ -0,0 +1,143 @@
+import base64
+import json
+from dataclasses import asdict
+from pathlib import Path
+
+import pytest
+from cutok import optimizer
+from cutok.core.ledger import Ledger
+from cutok.core.types import OptimizerConfig
+from cutok.normalize.delta import DeltaStore
+from cutok.normalize.history import HistoryStore
+from cutok.normalize.memo import MessageMemo
+from cutok.optimizer import optimize_payload
+
+FIXTURES = Path(__file__).resolve().parents[3] / "scripts" / "fixtures"
+MEDIA = {
+    ".pdf": "application/pdf",
+    ".json": "application/json",
+    ".csv": "text/csv",
+    ".md": "text/markdown",
+    ".txt": "text/plain",
+    ".py": "text/plain",
+}
+
+
+def document(name: str, data: bytes | None = None) -> dict:
+    data = (FIXTURES / name).read_bytes() if data is None else data
+    media_type = MEDIA[Path(name).suffix]
+    source = {"type": "base64", "media_type": media_type, "data": base64.b64encode(data).decode()}
+    return {"type": "document", "source": source}
+
+
+def user(text: str, *docs: dict) -> dict:
+    return {"role": "user", "content": [*docs, {"type": "text", "text": text}]}
+
+
+def assistant(text: str) -> dict:
+    return {"role": "assistant", "content": text}
+
+
+def grow(turns: list[dict]) -> list[list[dict]]:
+    """The request history of a session whose user turns are ``turns``: each resends it all."""
+    requests, messages = [], []
+    for n, turn in enumerate(turns):
+        messages = [*messages, turn]
+        requests.append(messages)
+        messages = [*messages, assistant(f"answer {n}")]
+    return requests
+
+
+CSV = (FIXTURES / "sales.csv").read_bytes()
+SESSIONS = {
+    "attachments_over_time": grow(
+        [
+            user("summarize", document("report.pdf")),
+            user("and these", document("config.json"), document("sales.csv")),
+            user("no attachment this turn"),
+            user("compare", document("notes.md"), document("email.txt")),
+            user("and the script", document("pipeline.py")),
+        ]
+    ),
+    # The same file attached again, then an edited version: delta encoding must match too.
+    "resend_and_edit": grow(
+        [
+            user("here", document("sales.csv")),
+            user("again", document("sales.csv")),
+            user("edited", document("sales.csv", CSV + b"extra,row,1\n")),
+        ]
+    ),
+    # The client rewrote history: an earlier attachment is dropped, so later ones renumber.
+    "history_rewritten": [
+        [user("one", document("config.json")), assistant("ok"), user("two", document("notes.md"))],
+        [user("two", document("notes.md")), assistant("ok"), user("three", document("email.txt"))],
+        [user("two", document("notes.md")), assistant("ok"), user("four")],
+    ],
+}
+
+
+def replay(requests: list[list[dict]], memo: MessageMemo | None) -> list[str]:
+    config = OptimizerConfig(model="gpt-4o", near_dedup_threshold=0.7)
+    delta_store, history, ledger = DeltaStore(), HistoryStore(), Ledger()
+    outputs = []
+    for messages in requests:
+        payload = {"model": "gpt-4o", "messages": messages}
+        out, results = optimize_payload(
+            payload, config, ledger, delta_store, "s", history=history, memo=memo
+        )
+        outputs.append(json.dumps([out, [asdict(r) for r in results]], sort_keys=True))
+    return outputs
+
+
+@pytest.mark.parametrize("name", sorted(SESSIONS))
+def test_memoized_run_is_identical_to_cold_run(name):
+    requests = SESSIONS[name]
+    memo = MessageMemo()
+    assert replay(requests, memo) == replay(requests, None)
+    assert memo.stats()["hits"] > 0
+
+
+def test_only_new_messages_are_prepared(monkeypatch):
+    prepared = []
+    real = optimizer._normalize_file
+    monkeypatch.setattr(
+        optimizer, "_normalize_file", lambda att, cfg: prepared.append(att) or real(att, cfg)
+    )
+    replay(SESSIONS["attachments_over_time"], MessageMemo())
+    assert len(prepared) == 6  # every attachment once, not once per request that carries it
+
+
+def test_memo_is_byte_bounded():
+    memo = MessageMemo(max_bytes=1000)
+    for n in range(10):
+        memo.put("s", bytes([n]), ((0, "attachment_0.txt", "x" * 300, 80, ()),))
+    stats = memo.stats()
+    assert stats["bytes"] <= 1000 and stats["evictions"] > 0
+    assert memo.get("s", bytes([9])) is not None and memo.get("s", bytes([0])) is None
+    assert memo.get("other", bytes([9])) is None  # sessions never share entries
+
+
+def test_model_compression_is_not_memoized(monkeypatch):
+    from cutok.compress import service
+
+    def halve(texts, *, rate, model):
+        return [{"text": " ".join(t.split()[: len(t.split()) // 2])} for t in texts]
+
+    monkeypatch.setattr(service, "compress_many", halve)
+    payload = {"model": "gpt-4o", "messages": [user("read this", document("notes.md"))]}
+    memo = MessageMemo()
+
+    def attachment_text(min_tokens: int, memo: MessageMemo) -> str:
+        config = OptimizerConfig(
+            model="gpt-4o", enable_compression=True, compression_min_tokens=min_tokens
+        )
+        out, _ = optimize_payload(payload, config, Ledger(), DeltaStore(), "s", memo=memo)
+        return out["messages"][0]["content"][0]["text"]
+
+    compressed = attachment_text(16, memo)
+    original = attachment_text(100_000, MessageMemo())
+    assert len(original.split()) > len(compressed.split())
+    assert attachment_text(100_000, memo) == original  # a raised floor is honored on a memo hit
+    monkeypatch.setattr(service, "compress_many", lambda texts, **_: [None] * len(texts))
+    assert attachment_text(16, memo) == original  # service down: the memo holds no compressed text
+    assert memo.stats()["hits"] == 2
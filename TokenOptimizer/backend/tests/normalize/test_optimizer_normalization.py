@@ -1,9 +1,11 @@
+import base64
+import copy
 import json
 
 from cutok.core.ledger import Ledger
-from cutok.core.types import OptimizerConfig
+from cutok.core.types import OptimizerConfig, Provider
 from cutok.normalize.delta import DeltaStore
-from cutok.optimizer import Attachment, normalize_attachments
+from cutok.optimizer import Attachment, normalize_attachments, optimize_payload
 
 CONFIG = OptimizerConfig(model="gpt-4o")
 
@@ -67,3 +69,50 @@ def test_raising_normalizer_does_not_crash(monkeypatch):
     # The run completes; the JSON is just left unnormalized.
     assert "data.json" in texts
     assert result.feature == "normalization"
+
+
+def test_optimize_payload_never_mutates_the_caller():
+    pretty = json.dumps({"a": 1, "b": [1, 2, 3]}, indent=2)
+    image = {"type": "image", "source": {"type": "base64", "data": "iVBORw0KGgo=" * 1000}}
+    payload = {
+        "model": "claude-sonnet-4-5",
+        "system": "You are helpful.\nToday is 2025-01-01 10:00",
+        "messages": [
+            {"role": "assistant", "content": "earlier turn"},
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "document",
+                        "source": {
+                            "type": "base64",
+                            "media_type": "application/json",
+                            "data": base64.b64encode(pretty.encode()).decode(),
+                        },
+                    },
+                    image,
+                    {"type": "text", "text": "Summarize."},
+                ],
+            },
+        ],
+    }
+    original = copy.deepcopy(payload)
+    cfg = OptimizerConfig(
+        model="claude-sonnet-4-5",
+        provider=Provider.ANTHROPIC,
+        max_output_tokens=256,
+        inject_brevity=True,
+    )
+    out, _ = optimize_payload(payload, cfg, Ledger(), DeltaStore())
+    assert payload == original
+    assert out["messages"][1]["content"][0]["type"] == "text"
+    assert out["max_tokens"] == 256
+    # Untouched blocks and messages are shared with the input, not copied.
+    assert out["messages"][1]["content"][1] is image
+    assert out["messages"][0] is payload["messages"][0]
+
+
+def test_optimize_payload_unchanged_stages_copy_nothing():
+    payload = {"model": "gpt-4o", "messages": [{"role": "user", "content": "hi"}]}
+    out, _ = optimize_payload(payload, CONFIG, Ledger(), DeltaStore())
+    assert out is payload
@@ -0,0 +1,120 @@
+from pathlib import Path
+
+import pytest
+from cutok import optimizer
+from cutok.core.ledger import Ledger
+from cutok.core.types import OptimizerConfig
+from cutok.normalize.delta import DeltaStore
+from cutok.normalize.pdf import extract_pdf, page_count
+from cutok.normalize.pool import AttachmentPool
+from cutok.normalize.textclean import TextCleanStream
+from cutok.optimizer import Attachment, normalize_attachments
+
+MODEL = "gpt-4o"
+REPORT = Path(__file__).resolve().parents[3] / "scripts" / "fixtures" / "report.pdf"
+
+
+def make_pdf(pages: list[list[str]]) -> bytes:
+    """A minimal valid PDF: one Helvetica text line per string, one page per list."""
+    catalog = b"<< /Type /Catalog /Pages 2 0 R >>"
+    font = b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"
+    objects = [catalog, b"", font]  # object 2, the page tree, is filled in once kids are known
+    kids = []
+    for lines in pages:
+        ops = "".join(f"({line}) Tj 0 -14 Td " for line in lines)
+        stream = f"BT /F1 11 Tf 72 760 Td {ops}ET".encode()
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        kids.append(len(objects) + 1)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents %d 0 R "
+            b"/Resources << /Font << /F1 3 0 R >> >> >>" % (len(objects))
+        )
+    refs = " ".join(f"{k} 0 R" for k in kids).encode()
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (refs, len(kids))
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\n" % (len(objects) + 1)
+    out += b"startxref\n%d\n%%%%EOF\n" % xref
+    return bytes(out)
+
+
+def report_pages(n: int) -> list[list[str]]:
+    return [
+        [f"Section {i}: the pipeline processed batch {i} without errors.", "Quarterly Review Draft"]
+        for i in range(1, n + 1)
+    ]
+
+
+def test_reads_the_fixture_report():
+    data = REPORT.read_bytes()
+    result = extract_pdf(data, MODEL)
+    assert (result.pages_read, result.pages_total, result.truncated) == (1, 1, False)
+    assert "Quarterly Engineering Review" in result.text
+    assert page_count(data) == 1
+
+
+def test_every_page_without_a_budget():
+    result = extract_pdf(make_pdf(report_pages(40)), MODEL)
+    assert result.pages_total == 40 and not result.truncated
+    assert "batch 1 " in result.text and "batch 40 " in result.text
+    # The repeated running header survives only on the first pages that carried it.
+    assert result.text.count("Quarterly Review Draft") == 3
+    assert [c.kind for c in result.changes] == ["remove_repeated_lines"]
+
+
+def test_budget_stops_before_the_overrunning_page():
+    result = extract_pdf(make_pdf(report_pages(40)), MODEL, token_budget=60)
+    assert result.truncated and 1 <= result.pages_read < 40
+    assert f"batch {result.pages_read} " in result.text
+    assert f"batch {result.pages_read + 1} " not in result.text
+    assert result.text.endswith(f"after page {result.pages_read} of 40]")
+    # The first page is kept whatever the budget.
+    assert extract_pdf(make_pdf(report_pages(3)), MODEL, token_budget=1).pages_read == 1
+
+
+def test_page_ranges_in_workers_match_serial(monkeypatch):
+    data = make_pdf(report_pages(40))
+    serial = extract_pdf(data, MODEL)
+    pool = AttachmentPool(2)
+    monkeypatch.setattr("cutok.normalize.pdf.attachment_pool", pool)
+    try:
+        assert extract_pdf(data, MODEL) == serial
+        assert pool.stats()["pooled"] == 3  # 40 pages in ranges of 16
+    finally:
+        pool.shutdown()
+
+
+def test_stream_joins_hyphenation_with_words_from_earlier_pages():
+    stream = TextCleanStream(MODEL)
+    stream.feed("International teams met.")
+    assert stream.feed("The Inter-\nnational office.") == "The International office."
+    assert [c.kind for c in stream.changes()] == ["dehyphenate"]
+
+
+@pytest.mark.parametrize("budget", [None, 60])
+def test_optimizer_streams_pdfs_only_with_a_budget(budget):
+    config = OptimizerConfig(model=MODEL, max_attachment_tokens=budget)
+    att = Attachment("long.pdf", make_pdf(report_pages(40)))
+    texts, result = normalize_attachments([att], "s", config, DeltaStore(), Ledger())
+    truncated = [c for c in result.changes if c.kind == "truncate"]
+    assert bool(truncated) == (budget is not None)
+    assert ("[truncated: token budget reached" in texts["long.pdf"]) == (budget is not None)
+    if budget is not None:
+        assert truncated[0].tokens_saved > 0
+
+
+def test_optimizer_falls_back_to_markitdown_on_a_broken_pdf(monkeypatch):
+    def boom(*args, **kwargs):
+        raise ValueError("bad xref")
+
+    monkeypatch.setattr(optimizer, "extract_pdf", boom)
+    config = OptimizerConfig(model=MODEL, max_attachment_tokens=500)
+    att = Attachment("report.pdf", REPORT.read_bytes())
+    texts, _ = normalize_attachments([att], "s", config, DeltaStore(), Ledger())
+    assert "Quarterly Engineering Review" in texts["report.pdf"]
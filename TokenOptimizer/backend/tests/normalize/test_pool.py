@@ -0,0 +1,93 @@
+import json
+import multiprocessing
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+from cutok import optimizer
+from cutok.core.ledger import Ledger
+from cutok.core.types import OptimizerConfig
+from cutok.normalize.delta import DeltaStore
+from cutok.normalize.pool import AttachmentPool
+from cutok.optimizer import Attachment, normalize_attachments
+
+CONFIG = OptimizerConfig(model="gpt-4o")
+
+
+@pytest.fixture
+def pool():
+    pool = AttachmentPool(2, inline_bytes=0)
+    yield pool
+    pool.shutdown()
+
+
+def test_results_keep_input_order_with_small_items_inline(pool):
+    pool.configure(inline_bytes=5)
+    assert pool.map(divmod, [(7, 2), (9, 4), (1, 1), (8, 3)], [10, 0, 10, 10]) == [
+        (3, 1),
+        (2, 1),
+        (1, 0),
+        (2, 2),
+    ]
+    stats = pool.stats()
+    assert (stats["pooled"], stats["inline"], stats["started"]) == (3, 1, True)
+
+
+def test_pool_stays_idle_unless_two_attachments_are_large():
+    pool = AttachmentPool(4, inline_bytes=100)
+    assert pool.map(divmod, [(7, 2), (9, 4)], [1000, 10]) == [(3, 1), (2, 1)]
+    assert pool.stats()["started"] is False
+    assert AttachmentPool(1, inline_bytes=0).map(divmod, [(1, 1)] * 3, [9] * 3) == [(1, 0)] * 3
+
+
+def test_pooled_normalization_matches_serial(monkeypatch, pool):
+    records = [{"id": i, "name": f"user {i}", "tags": ["a", "b"]} for i in range(200)]
+    rows = "\n".join(f"{i},  region {i % 7}  ,{i * 3}" for i in range(300))
+    attachments = [
+        Attachment("data.json", json.dumps(records, indent=4).encode()),
+        Attachment("rows.csv", f"id,region,amount\n{rows}\n".encode()),
+        Attachment("page.html", b"<html><body><h1>Title</h1><p>Body text.</p></body></html>"),
+        Attachment("notes.txt", b"Some   notes\n\n\n\nwith   spacing.\n"),
+    ]
+
+    def run():
+        return normalize_attachments(attachments, "s", CONFIG, DeltaStore(), Ledger())
+
+    monkeypatch.setattr(optimizer, "attachment_pool", AttachmentPool(0))
+    serial = run()
+    monkeypatch.setattr(optimizer, "attachment_pool", pool)
+    assert run() == serial
+    assert pool.stats()["pooled"] == len(attachments)
+
+
+def test_failing_item_keeps_the_shared_pool(pool):
+    with pytest.raises(ZeroDivisionError):
+        pool.map(divmod, [(7, 2), (1, 0)], [10, 10])
+    stats = pool.stats()
+    assert stats["started"] is True and stats["failed"] == 1
+    assert pool.map(divmod, [(7, 2), (9, 4)], [10, 10]) == [(3, 1), (2, 1)]
+    assert pool.stats()["failed"] == 1
+
+
+def _crash_in_worker(n: int) -> int:
+    if multiprocessing.parent_process() is not None:
+        os._exit(1)  # a worker killed mid-job (OOM)
+    return n * 2
+
+
+def test_crashed_worker_is_discarded_and_the_rest_finishes_inline(pool):
+    assert list(pool.imap(_crash_in_worker, [(n,) for n in range(5)])) == [0, 2, 4, 6, 8]
+    stats = pool.stats()
+    assert stats["started"] is False and stats["failed"] == 1
+    # The next call starts a fresh pool instead of failing on the broken one.
+    assert pool.map(len, [("ab",), ("abc",)], [10, 10]) == [2, 3]
+    assert pool.stats()["started"] is True
+
+
+def test_map_falls_back_inline_when_the_pool_is_already_broken(pool):
+    pool.map(divmod, [(7, 2), (9, 4)], [10, 10])
+    broken = pool._pool
+    with pytest.raises(BrokenProcessPool):
+        broken.submit(os._exit, 1).result(timeout=30)  # broken behind the pool's back
+    assert pool.map(divmod, [(7, 2), (9, 4)], [10, 10]) == [(3, 1), (2, 1)]
+    assert pool.stats()["started"] is False  # discarded; the next call starts a fresh one
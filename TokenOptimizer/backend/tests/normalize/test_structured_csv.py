@@ -42,3 +42,24 @@ def test_pathological_input_passes_through():
     res = NORM.normalize(src, "x.csv", MODEL)
     assert res.text == src
     assert res.changes == []
+
+
+def test_rows_are_padded_and_trimmed_to_the_kept_width():
+    # Ragged rows past the 4 KiB the sniffer reads.
+    src = "a,b,c,\n" + "d,e,f,\n" * 600 + "1\n2,,,,\n3,4\n"
+    res = NORM.normalize(src, "x.csv", MODEL)
+    expected = [["a", "b", "c"]] + [["d", "e", "f"]] * 600
+    assert cells(res.text, "\t") == expected + [["1", "", ""], ["2", "", ""], ["3", "4", ""]]
+    assert [c.kind for c in res.changes] == ["strip_empty_columns", "csv_to_tsv"]
+
+
+def test_cell_that_tsv_cannot_round_trip_reverts():
+    src = 'a,b\n"x\ry",z\n'
+    res = NORM.normalize(src, "x.csv", MODEL)
+    assert (res.text, res.changes) == (src, [])
+
+
+def test_quoted_newlines_and_crlf_survive():
+    src = 'id,note\n1,plain\n2,"two\nlines"\n3,"crlf\r\ninside"\n4,x\n5,y\n'
+    res = NORM.normalize(src, "x.csv", MODEL)
+    assert cells(res.text, "\t") == cells(src, ",")
@@ -1,5 +1,6 @@
 import json
 
+from cutok.normalize import structured
 from cutok.normalize.structured import JsonYamlNormalizer
 
 NORM = JsonYamlNormalizer()
@@ -58,3 +59,40 @@ def test_key_dictionary_skipped_when_not_beneficial():
     res = NORM.normalize(json.dumps([{"a": 1}, {"a": 2}]), "x.json", MODEL)
     assert not res.text.startswith("KEYMAP")
     assert not any(c.kind == "key_dictionary" for c in res.changes)
+
+
+def test_aliases_skip_names_already_used_as_keys():
+    key = "very_long_descriptive_metadata_attribute_name"
+    records = [{key: i, "k1": "mine"} for i in range(12)]
+    res = NORM.normalize(json.dumps(records), "x.json", MODEL)
+    header, body = res.text.split("\n", 1)
+    assert json.loads(header[len("KEYMAP: ") :]) == {"k2": key}
+    assert json.loads(body)[0] == {"k2": 0, "k1": "mine"}
+
+
+def test_yaml_that_has_no_json_form_passes_through():
+    for src in ("released: 2024-05-01\n", "loop: &a [*a]\n"):
+        res = NORM.normalize(src, "x.yaml", MODEL)
+        assert (res.text, res.changes) == (src, [])
+
+
+def test_streaming_output_matches_in_memory(monkeypatch):
+    monkeypatch.setattr(structured, "_STREAM_WINDOW", 64)
+    key = "very_long_descriptive_metadata_attribute_name"
+    docs = [
+        json.dumps({"rows": [{key: i, "tags": ["a", "é"]} for i in range(40)]}, indent=2),
+        json.dumps([{"n": 1.50, "s": "x\\/y"}] * 5, indent=1),
+        "name: alice\nitems:\n  - 1\n  - 2\n",
+    ]
+    for text in docs:
+        name = "x.yaml" if text.startswith("name") else "x.json"
+        streamed = JsonYamlNormalizer(stream_min_chars=0).normalize(text, name, MODEL)
+        assert streamed == NORM.normalize(text, name, MODEL)
+    assert streamed.changes[0].kind == "yaml_to_json"
+
+
+def test_streaming_leaves_invalid_or_ambiguous_json_alone(monkeypatch):
+    monkeypatch.setattr(structured, "_STREAM_WINDOW", 4)
+    stream = JsonYamlNormalizer(stream_min_chars=0)
+    for text in ('{"rows": [1, 2,]}', '{"a": [1], "a": [2]}', "[1] [2]", "null"):
+        assert stream.normalize(text, "x.json", MODEL).text == text
@@ -1,3 +1,4 @@
+import os
 import socket
 import threading
 import time
@@ -32,11 +33,14 @@ def test_no_command_prints_version(capsys):
 def test_config_from_args():
     args = build_parser().parse_args(
         ["start", "--enable-compression", "--brevity", "--max-output-tokens", "256"]
+        + ["--near-dedup", "0.8", "--max-attachment-tokens", "4000"]
     )
     cfg = config_from_args(args)
     assert cfg.enable_compression is True
     assert cfg.inject_brevity is True
     assert cfg.max_output_tokens == 256
+    assert cfg.near_dedup_threshold == 0.8
+    assert cfg.max_attachment_tokens == 4000
 
 
 def test_stats_no_server_fails_friendly(capsys):
@@ -63,3 +67,17 @@ def test_start_boots_and_health_responds():
     finally:
         server.should_exit = True
         thread.join(timeout=10)
+
+
+def test_attachment_pool_is_opt_in_and_start_enables_it(monkeypatch):
+    from cutok.normalize import pool
+
+    monkeypatch.setenv("TS_ATTACHMENT_WORKERS", "")
+    monkeypatch.delenv("TS_ATTACHMENT_WORKERS")  # restored (unset) after the test
+    assert pool.attachment_pool.stats()["workers"] == 0  # library default: always inline
+    monkeypatch.setattr(uvicorn, "run", lambda *args, **kwargs: None)
+    monkeypatch.setattr(pool, "attachment_pool", pool.AttachmentPool(0))
+    monkeypatch.setattr(pool, "default_workers", lambda: 3)
+    assert main(["start"]) == 0
+    assert pool.attachment_pool.stats()["workers"] == 3
+    assert os.environ["TS_ATTACHMENT_WORKERS"] == "3"
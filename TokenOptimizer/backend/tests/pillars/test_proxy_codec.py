@@ -0,0 +1,120 @@
+import json
+
+import httpx
+import pytest
+from cutok.core.payload import PayloadWriter
+from cutok.pillars.proxy import codec as codec_mod
+from cutok.pillars.proxy.codec import JsonCodec
+from cutok.pillars.proxy.server import app_factory
+from fastapi import FastAPI, Request, Response
+from hypothesis import HealthCheck, given, settings
+from hypothesis import strategies as st
+
+BACKENDS = ["stdlib"] + (["orjson"] if codec_mod.orjson is not None else [])
+
+# Odd-but-valid formatting, so a reused span is distinguishable from a re-serialization.
+BODY = (
+    b'{ "model" :"claude-sonnet-4-5",\n "messages":[ {"role":"user","content":"first"} ,'
+    b'\n  {"role" : "assistant", "content":"second"},{"role":"user","content":"third"}],'
+    b' "stream":false }'
+)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_unchanged_payload_passes_through(backend):
+    codec = JsonCodec(backend)
+    decoded = codec.decode(BODY)
+    assert codec.encode(decoded, decoded.obj) is None
+    assert codec.stats()["passthrough"] == 1
+
+
+def test_splice_reuses_untouched_messages_verbatim():
+    codec = JsonCodec("stdlib")
+    decoded = codec.decode(BODY)
+    writer = PayloadWriter(decoded.obj)
+    writer.own("messages", 2)["content"] = "THIRD"
+    writer.own()["max_tokens"] = 64
+    out = codec.encode(decoded, writer.payload)
+    assert json.loads(out) == writer.payload
+    assert b'{"role" : "assistant", "content":"second"}' in out
+    assert b'"model" :"claude-sonnet-4-5"' in out
+    stats = codec.stats()
+    assert stats["spliced"] == 1 and stats["bytes_reused"] > 0
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_non_objects_and_garbage_are_not_decoded(backend):
+    codec = JsonCodec(backend)
+    for body in (b"[1, 2]", b"not json {{{", b'{"a": 1} trailing', b""):
+        assert codec.decode(body) is None
+
+
+def test_bodies_orjson_rejects_fall_back_to_stdlib():
+    codec = JsonCodec()
+    decoded = codec.decode(b'{"x": NaN, "big": 123456789012345678901234567890}')
+    assert decoded is not None and decoded.backend == "stdlib"
+    assert decoded.obj["big"] == 123456789012345678901234567890
+
+
+_SCALARS = st.one_of(
+    st.none(), st.booleans(), st.integers(), st.floats(allow_nan=False), st.text(max_size=8)
+)
+_JSON = st.recursive(
+    _SCALARS,
+    lambda inner: (
+        st.lists(inner, max_size=3) | st.dictionaries(st.text(max_size=5), inner, max_size=3)
+    ),
+    max_leaves=8,
+)
+_MESSAGE = st.fixed_dictionaries({"role": st.sampled_from(["user", "assistant"]), "content": _JSON})
+
+
+@settings(deadline=None, max_examples=200, suppress_health_check=[HealthCheck.too_slow])
+@given(
+    extra=st.dictionaries(st.text(max_size=6), _JSON, max_size=4),
+    messages=st.lists(_MESSAGE, max_size=6),
+    indent=st.sampled_from([None, 1, 4]),
+    ascii_only=st.booleans(),
+    edits=st.lists(st.tuples(st.integers(0, 5), _JSON), max_size=3),
+    new_key=st.one_of(st.none(), st.text(max_size=6)),
+)
+def test_splice_matches_full_reserialization(extra, messages, indent, ascii_only, edits, new_key):
+    # Raw UTF-8 bodies exercise the character-offset splice (lone surrogates, the byte fallback).
+    doc = {**extra, "messages": messages}
+    body = json.dumps(doc, indent=indent, ensure_ascii=ascii_only).encode("utf-8", "surrogatepass")
+    codec = JsonCodec("stdlib")
+    decoded = codec.decode(body)
+    writer = PayloadWriter(decoded.obj)
+    for index, value in edits:
+        if index < len(messages):
+            writer.own("messages", index)["content"] = value
+    if new_key is not None:
+        writer.own()[new_key] = {"added": True}
+    out = codec.encode(decoded, writer.payload)
+    expected = writer.payload
+    if out is None:
+        assert expected is decoded.obj
+    else:
+        assert json.loads(out) == json.loads(json.dumps(expected))
+
+
+def make_echo_upstream() -> FastAPI:
+    mock = FastAPI()
+
+    @mock.post("/v1/messages")
+    async def messages(request: Request) -> Response:
+        return Response(content=await request.body(), status_code=200)
+
+    return mock
+
+
+async def test_proxy_forwards_unchanged_request_bytes_exactly(monkeypatch, tmp_path):
+    monkeypatch.setenv("TS_ANTHROPIC_UPSTREAM", "http://upstream.mock")
+    monkeypatch.setenv("TS_LOG_DIR", str(tmp_path / "logs"))
+    app = app_factory()
+    app.state.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=make_echo_upstream()))
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://proxy")
+    resp = await client.post("/v1/messages", content=BODY)
+    assert resp.content == BODY
+    stats = (await client.get("/stats")).json()["json_codec"]
+    assert stats["passthrough"] == 1 and stats["decoded"] == 1
@@ -0,0 +1,141 @@
+import asyncio
+import base64
+import json
+import threading
+import time
+
+import httpx
+import pytest
+from cutok.pillars.proxy import server
+from cutok.pillars.proxy.executor import OptimizeExecutor
+from cutok.pillars.proxy.server import app_factory
+from fastapi import FastAPI, Request, Response
+
+HEAVY = "HEAVY-REQUEST"
+PRETTY = json.dumps({"rows": [{"id": i, "ok": True} for i in range(20)]}, indent=4)
+
+
+def make_echo_upstream() -> FastAPI:
+    mock = FastAPI()
+
+    @mock.post("/v1/messages")
+    async def messages(request: Request) -> Response:
+        return Response(content=await request.body(), status_code=200)
+
+    return mock
+
+
+def build(monkeypatch, tmp_path, executor: OptimizeExecutor):
+    monkeypatch.setenv("TS_ANTHROPIC_UPSTREAM", "http://upstream.mock")
+    monkeypatch.setenv("TS_LOG_DIR", str(tmp_path / "logs"))
+    app = app_factory(executor=executor)
+    app.state.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=make_echo_upstream()))
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://proxy"), app
+
+
+def body(text: str) -> bytes:
+    return json.dumps(
+        {"model": "claude-sonnet-4-5", "messages": [{"role": "user", "content": text}]}
+    ).encode()
+
+
+def document_body() -> bytes:
+    """A pretty-printed JSON attachment the engine would minify."""
+    source = {
+        "type": "base64",
+        "media_type": "application/json",
+        "data": base64.b64encode(PRETTY.encode()).decode(),
+    }
+    content = [{"type": "document", "source": source}]
+    return json.dumps(
+        {"model": "claude-sonnet-4-5", "messages": [{"role": "user", "content": content}]}
+    ).encode()
+
+
+@pytest.fixture
+def slow_heavy(monkeypatch):
+    """Make optimizing the HEAVY request block (synchronously) until released."""
+    release = threading.Event()
+    real = server.optimize_payload
+
+    def optimize(payload, *args, **kwargs):
+        if payload["messages"][0]["content"] == HEAVY:
+            release.wait(5)
+        return real(payload, *args, **kwargs)
+
+    monkeypatch.setattr(server, "optimize_payload", optimize)
+    yield release
+    release.set()
+
+
+async def test_heavy_optimization_does_not_stall_other_requests(monkeypatch, tmp_path, slow_heavy):
+    client, _ = build(monkeypatch, tmp_path, OptimizeExecutor("thread", workers=2))
+    heavy = asyncio.create_task(client.post("/v1/messages", content=body(HEAVY)))
+    await asyncio.sleep(0.05)
+    start = time.monotonic()
+    light = await client.post("/v1/messages", content=body("quick question"))
+    assert light.status_code == 200
+    assert time.monotonic() - start < 1.0  # the event loop was free while HEAVY was optimizing
+    assert not heavy.done()
+    slow_heavy.set()
+    assert (await heavy).status_code == 200
+
+
+async def test_full_queue_forwards_unoptimized_after_timeout(monkeypatch, tmp_path, slow_heavy):
+    executor = OptimizeExecutor("thread", workers=1, queue_size=0, queue_timeout=0.1)
+    client, _ = build(monkeypatch, tmp_path, executor)
+    heavy = asyncio.create_task(client.post("/v1/messages", content=body(HEAVY)))
+    await asyncio.sleep(0.05)
+    # A document that would normally be minified goes out untouched instead of waiting.
+    raw = document_body()
+    resp = await client.post("/v1/messages", content=raw)
+    assert resp.status_code == 200 and resp.content == raw
+    stats = (await client.get("/stats")).json()
+    assert stats["optimizer_pool"]["skipped_queue_full"] == 1
+    assert stats["optimizer_pool"]["in_flight"] == 1
+    assert stats["prefix_stability"]["requests"] == 1  # not fingerprinted without a slot
+    slow_heavy.set()
+    await heavy
+    stats = (await client.get("/stats")).json()["optimizer_pool"]
+    assert stats["completed"] == 1 and stats["queue_depth"] == 0 and stats["wait_ms_max"] >= 0
+
+
+async def test_failed_optimization_forwards_original(monkeypatch, tmp_path):
+    def boom(*args, **kwargs):
+        raise RuntimeError("engine exploded")
+
+    monkeypatch.setattr(server, "optimize_payload", boom)
+    client, _ = build(monkeypatch, tmp_path, OptimizeExecutor("inline"))
+    raw = body("hello")
+    resp = await client.post("/v1/messages", content=raw)
+    assert resp.status_code == 200 and resp.content == raw
+    assert (await client.get("/stats")).json()["optimizer_pool"]["failed"] == 1
+
+
+async def test_process_mode_optimizes_and_folds_results(monkeypatch, tmp_path):
+    executor = OptimizeExecutor("process", workers=1)
+    client, app = build(monkeypatch, tmp_path, executor)
+    try:
+        resp = await client.post("/v1/messages", content=document_body())
+        forwarded = json.loads(resp.content)
+        assert forwarded["messages"][0]["content"][0]["type"] == "text"
+        assert "\n    " not in forwarded["messages"][0]["content"][0]["text"]
+        assert app.state.ledger.totals()["tokens_saved"] > 0
+        assert app.state.prefix_tracker.stats()["requests"] == 1  # tracked in this process
+    finally:
+        executor.shutdown()
+
+
+async def test_app_shutdown_stops_the_worker_pools(monkeypatch, tmp_path):
+    from cutok.normalize.pool import attachment_pool
+
+    executor = OptimizeExecutor("process", workers=1)
+    client, app = build(monkeypatch, tmp_path, executor)
+    stopped = []
+    real = executor.shutdown
+    monkeypatch.setattr(executor, "shutdown", lambda: stopped.append("executor") or real())
+    monkeypatch.setattr(attachment_pool, "shutdown", lambda: stopped.append("attachments"))
+    async with app.router.lifespan_context(app):  # what uvicorn runs around serving
+        assert (await client.get("/health")).status_code == 200
+        assert stopped == []
+    assert stopped == ["executor", "attachments"]
@@ -65,6 +65,7 @@ async def test_document_block_minified_before_forwarding(proxy_client):
     stats = (await client.get("/stats")).json()
     assert stats["tokens_saved"] > 0
     assert stats["calls"] == 1
+    assert {"hits", "misses", "evictions", "bytes"} <= set(stats["token_cache"])
 
 
 async def test_malformed_body_forwarded_untouched(proxy_client):
@@ -98,3 +99,27 @@ async def test_savings_log_written(proxy_client, tmp_path):
     assert len(lines) == 1
     record = json.loads(lines[0])
     assert any(r["feature"] == "normalization" for r in record)
+
+
+async def test_reordered_tools_are_diagnosed_and_fixed(monkeypatch, tmp_path):
+    monkeypatch.setenv("TS_ANTHROPIC_UPSTREAM", "http://upstream.mock")
+    monkeypatch.setenv("TS_LOG_DIR", str(tmp_path / "logs"))
+    monkeypatch.setenv("TS_PREFIX_AUTOFIX", "1")
+    app = app_factory()
+    app.state.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=make_echo_upstream()))
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://proxy")
+    tools = [{"name": n, "input_schema": {"type": "object"}} for n in ("lookup", "fetch")]
+    forwarded = []
+    for order in (tools, tools[::-1], tools):
+        payload = {
+            "model": "claude-sonnet-4-5",
+            "tools": order,
+            "messages": [{"role": "user", "content": "hi"}],
+        }
+        resp = await client.post("/v1/messages", content=json.dumps(payload).encode())
+        forwarded.append([t["name"] for t in json.loads(resp.content)["tools"]])
+    # The tracker sees the client's order; the schema stage forwards every request sorted.
+    assert forwarded == [["fetch", "lookup"]] * 3
+    stats = (await client.get("/stats")).json()["prefix_stability"]
+    assert stats["causes"]["tool_order"] == 2
+    assert stats["fixed"] == 1
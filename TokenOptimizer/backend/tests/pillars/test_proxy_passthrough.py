@@ -36,9 +36,9 @@ def proxy_client(monkeypatch):
 
 
 async def test_body_semantically_round_trips(proxy_client):
-    # With the engine wired in (T17) the proxy re-serializes JSON, so the forwarded body is
-    # semantically equal rather than byte-identical. Non-JSON bodies pass through byte-exact
-    # (covered by test_malformed_body_forwarded_untouched in test_proxy_optimized.py).
+    # With the engine wired in (T17) a rewritten body is re-serialized, so the contract is semantic
+    # equality; unchanged and non-JSON bodies pass through byte-exact (test_proxy_codec.py and
+    # test_malformed_body_forwarded_untouched in test_proxy_optimized.py).
     payload = {"model": "claude-sonnet-4-5", "messages": [{"role": "user", "content": "hi"}]}
     resp = await proxy_client.post("/v1/messages", content=json.dumps(payload).encode())
     assert resp.status_code == 200
@@ -141,3 +141,19 @@ def test_web_entrypoint_boots_and_serves():
     finally:
         server.should_exit = True
         thread.join(timeout=10)
+
+
+async def test_v1_compress_batch_keeps_order(client):
+    c, app = client
+
+    class FakeCompressor:
+        def compress(self, text, rate=0.6):
+            return {"text": text.split()[0]}
+
+    app.state.compressor = FakeCompressor()
+    r = await c.post("/v1/compress:batch", json={"texts": ["a b c", "d e f"], "rate": 0.5})
+    results = r.json()["results"]
+    assert [x["text"] for x in results] == ["a", "d"]
+    assert all(x["mode"] == "model" for x in results)
+    too_many = await c.post("/v1/compress:batch", json={"texts": ["x"] * 1000})
+    assert too_many.status_code == 422
@@ -5,10 +5,15 @@ hand-tuned fixtures. If any of these can be broken, the 'lossless-first' claim i
 import ast
 import csv
 import io
+import itertools
 import json
 
+from cutok.cache.breakpoints import expected_cached_tokens, plan_breakpoints
+from cutok.core.providers.base import CachePolicy
 from cutok.normalize.code import CodeNormalizer
-from cutok.normalize.structured import CsvNormalizer, JsonYamlNormalizer
+from cutok.normalize.document import Document
+from cutok.normalize.structured import CsvNormalizer, JsonYamlNormalizer, _stream_json
+from cutok.normalize.textclean import _fused_stages, _sequential_stages
 from hypothesis import HealthCheck, given, settings
 from hypothesis import strategies as st
 
@@ -51,6 +56,17 @@ def test_json_normalization_is_value_identical(obj):
     assert _decode(res.text) == obj
 
 
+@given(
+    obj=_json | st.lists(_json, max_size=8),
+    window=st.integers(min_value=1, max_value=64),
+    indent=st.none() | st.integers(min_value=0, max_value=3),
+)
+def test_streamed_json_matches_the_in_memory_minify(obj, window, indent):
+    text = json.dumps(obj, indent=indent)
+    expected = json.dumps(json.loads(text), separators=(",", ":"), ensure_ascii=False)
+    assert _stream_json(text, window=window) == expected
+
+
 # --- CSV: cell values are identical (rectangular, non-empty → no trimming ambiguity) ---------
 
 _cell = st.text(
@@ -93,3 +109,57 @@ def test_code_normalizer_preserves_ast(pad, trailing_blanks):
     noisy += "\n" * trailing_blanks
     res = CodeNormalizer().normalize(noisy, "m.py", MODEL)
     assert ast.dump(ast.parse(res.text)) == ast.dump(ast.parse(_BASE_PY))
+
+
+# --- Textclean: the fused engine is byte-identical to running the passes one by one ---------
+
+_HEADER = "Confidential Report Page 12 of 40"
+_prose_piece = st.sampled_from(
+    ["word", "Word", "inter", "National", "_x1", " ", "\n", "\n\n\n\n", "-", "-\n", "`", "```"]
+    + ["<!--", "-->", "“", "’", "—", "…", "\u00a0", "\u0130", "\u212a", f"{_HEADER}\n"]
+)
+_textclean_text = st.lists(_prose_piece, max_size=60).map("".join) | st.text(max_size=200)
+
+
+@given(text=_textclean_text)
+def test_fused_textclean_matches_pass_pipeline(text):
+    fused = _fused_stages(Document(text))
+    if fused is not None:
+        assert [(kind, doc.text) for kind, doc in fused] == _sequential_stages(text)
+        # Every stage's fence layout is the one a fresh split would find.
+        assert all(doc.parts == Document(doc.text).parts for _, doc in fused)
+    else:
+        assert "`" in text  # falls back only when a deletion could re-pair fences
+
+
+# --- cache breakpoints: the planner finds the best plan ---------------------------------------
+
+
+@given(
+    blocks=st.lists(
+        st.tuples(st.integers(0, 60), st.sampled_from([0.0, 0.3, 0.5, 0.9, 1.0])), max_size=8
+    ),
+    budget=st.integers(0, 4),
+    min_prefix=st.integers(0, 120),
+    pins=st.sets(st.integers(0, 7), max_size=2),
+)
+def test_breakpoint_plan_is_optimal(blocks, budget, min_prefix, pins):
+    totals = list(itertools.accumulate(n for n, _ in blocks))
+    survival = sorted((p for _, p in blocks), reverse=True)
+    fixed = sorted(k for k in pins if k < len(blocks))
+    policy = CachePolicy(
+        explicit=True, discount=0.9, min_prefix_tokens=min_prefix, max_breakpoints=budget
+    )
+    plan = plan_breakpoints(totals, survival, policy, fixed=fixed)
+    assert set(fixed) <= set(plan) and len(plan) <= max(budget, len(fixed))
+    if budget <= len(fixed):
+        assert plan == fixed
+        return
+    extra = [k for k in range(len(blocks)) if totals[k] >= min_prefix and survival[k] > 0]
+    best = max(
+        expected_cached_tokens(totals, survival, [*fixed, *more])
+        for r in range(budget - len(fixed) + 1)
+        for more in itertools.combinations([k for k in extra if k not in fixed], r)
+    )
+    assert abs(expected_cached_tokens(totals, survival, plan) - best) < 1e-6
+    assert plan_breakpoints(totals, survival, policy, fixed=plan) == plan
@@ -0,0 +1,99 @@
+"""Code normalize + comment-strip cost: the previous line-prefix path vs the lexer-driven one.
+
+Runs every ``.py`` file under the given roots (default: the cutok package and the Python standard
+library's top level) through ``CodeNormalizer`` and then comment stripping, twice:
+
+  - ``prefix``: the previous path — normalize parses and ``ast.dump``s both versions, then the
+    line-prefix stripper parses and dumps both versions again (four parses a file).
+  - ``lexer``: ``CodeNormalizer`` plus ``strip_comments`` — ``tokenize`` for the comments and one
+    cached AST fingerprint per source (at most one parse beyond the original).
+
+Reports wall time, ``ast.parse`` calls and the comment lines removed by each path. No API calls.
+Usage: ``python scripts/bench_code_comments.py [ROOT ...] [--repeat 3]``
+"""
+
+import argparse
+import ast
+import sys
+import sysconfig
+import time
+from pathlib import Path
+
+from cutok.normalize import code
+from cutok.normalize.code import CodeNormalizer, strip_comments
+
+MODEL = "gpt-4o"
+
+
+def _prefix_strip(text: str) -> str:
+    stripped = "\n".join(ln for ln in text.split("\n") if not ln.lstrip().startswith("#"))
+    try:
+        if ast.dump(ast.parse(text)) != ast.dump(ast.parse(stripped)):
+            return text
+    except SyntaxError:
+        return text
+    return stripped
+
+
+def _prefix_normalize(text: str) -> str:
+    # The normalize transforms are unchanged; the old path always re-verified the result.
+    current = CodeNormalizer().normalize(text, "m.py", MODEL).text
+    try:
+        if ast.dump(ast.parse(text)) != ast.dump(ast.parse(current)):
+            return text
+    except SyntaxError:
+        return text
+    return current
+
+
+def run(files: list[str], engine: str) -> tuple[float, int]:
+    code._ast_fingerprint.cache_clear()
+    removed = 0
+    start = time.perf_counter()
+    for text in files:
+        if engine == "prefix":
+            out = _prefix_strip(_prefix_normalize(text))
+        else:
+            out = strip_comments(CodeNormalizer().normalize(text, "m.py", MODEL).text, "m.py")
+        removed += text.count("\n") - out.count("\n")
+    return time.perf_counter() - start, removed
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    default_roots = [str(Path(code.__file__).parents[1]), sysconfig.get_paths()["stdlib"]]
+    parser.add_argument("roots", nargs="*", default=default_roots)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per engine (best is kept)")
+    args = parser.parse_args(argv)
+
+    paths = [p for root in args.roots for p in sorted(Path(root).glob("*.py"))]
+    paths += [p for p in sorted(Path(args.roots[0]).rglob("*.py")) if p not in paths]
+    files = [p.read_text(encoding="utf-8", errors="replace") for p in paths]
+
+    real_parse = ast.parse
+    parses = 0
+
+    def counting_parse(*a, **kw):
+        nonlocal parses
+        parses += 1
+        return real_parse(*a, **kw)
+
+    print(f"files: {len(files)}, {sum(len(f) for f in files) / 2**20:.1f} MiB")
+    print(f"{'Engine':<8}  {'Seconds':>8}  {'Parses':>7}  {'Lines removed':>13}")
+    print(f"{'-' * 8}  {'-' * 8}  {'-' * 7}  {'-' * 13}")
+    ast.parse = counting_parse
+    try:
+        for engine in ("prefix", "lexer"):
+            times = []
+            for _ in range(args.repeat):
+                parses = 0
+                seconds, removed = run(files, engine)
+                times.append(seconds)
+            print(f"{engine:<8}  {min(times):>8.3f}  {parses:>7}  {removed:>13}")
+    finally:
+        ast.parse = real_parse
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""Wall time to compress a message of many text blocks through the compression service.
+
+Starts the webapp in-process (uvicorn on localhost) with a stand-in model and ``--latency`` ms of
+simulated network delay per HTTP request, then sends a user message of ``--blocks`` text blocks
+two ways: one fresh-connection ``/v1/compress`` POST per block in sequence (the previous client),
+and ``run_compress_stage`` (pooled keep-alive client, ``/v1/compress:batch``, bounded fan-out).
+Localhost has no TLS handshake, so the fresh-connection column understates a Cloud Run endpoint.
+No API calls.
+Usage: ``python scripts/bench_compress_fanout.py [--blocks 40] [--latency 30] [--batch 8]``
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import sys
+import threading
+import time
+
+import httpx
+import uvicorn
+from cutok.compress import run_compress_stage, service
+from cutok.core.ledger import Ledger
+from cutok.core.payload import PayloadWriter
+from cutok.core.types import OptimizerConfig
+from cutok.pillars import webapp
+
+CONFIG = OptimizerConfig(model="gpt-4o")
+
+
+class _Model:
+    def compress(self, text: str, rate: float = 0.6) -> dict:
+        words = text.split()
+        return {"text": " ".join(words[: max(1, int(len(words) * rate))])}
+
+
+def serve(latency: float) -> tuple[uvicorn.Server, str]:
+    app = webapp.app_factory()
+    app.state.compressor = _Model()
+
+    @app.middleware("http")
+    async def delay(request, call_next):
+        await asyncio.sleep(latency)
+        return await call_next(request)
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}"
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--blocks", type=int, default=40)
+    parser.add_argument(
+        "--latency", type=float, default=30.0, help="ms added per HTTP request"
+    )
+    parser.add_argument("--batch", type=int, default=8, help="TS_COMPRESS_BATCH_SIZE")
+    args = parser.parse_args(argv)
+
+    os.environ["TS_COMPRESS_BATCH_SIZE"] = str(args.batch)
+    server, url = serve(args.latency / 1000)
+    texts = [
+        f"Block {i}: " + "the build failed on shard four, see logs " * 6
+        for i in range(args.blocks)
+    ]
+    try:
+        start = time.perf_counter()
+        for text in texts:
+            payload = {
+                "text": text,
+                "rate": CONFIG.compression_keep_ratio,
+                "model": CONFIG.model,
+            }
+            httpx.post(
+                f"{url}/v1/compress", json=payload, timeout=30.0
+            ).raise_for_status()
+        serial = time.perf_counter() - start
+
+        service.set_endpoint(url)
+        content = [{"type": "text", "text": t} for t in texts]
+        writer = PayloadWriter({"messages": [{"role": "user", "content": content}]})
+        start = time.perf_counter()
+        result = run_compress_stage(writer, CONFIG, Ledger())
+        pooled = time.perf_counter() - start
+        assert len(result.changes) == args.blocks
+    finally:
+        service.close()
+        server.should_exit = True
+
+    print(f"blocks: {args.blocks}  latency: {args.latency:.0f} ms  batch: {args.batch}")
+    print(f"{'Client':<28}  {'Requests':>8}  {'Wall ms':>8}")
+    print(f"{'-' * 28}  {'-' * 8}  {'-' * 8}")
+    print(f"{'serial, fresh connections':<28}  {args.blocks:>8}  {serial * 1000:>8.1f}")
+    batches = -(-args.blocks // args.batch)
+    print(f"{'pooled, batched, fan-out':<28}  {batches:>8}  {pooled * 1000:>8.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+"""CSV→TSV compaction: the previous materialize-everything normalizer vs the two-pass stream.
+
+Generates a CSV export of each requested size (quoted cells with commas and embedded newlines,
+two trailing empty columns, an empty row every few hundred) and runs each mode in a fresh
+subprocess, reporting wall time and the peak-RSS growth over the process's resident size just
+before the run (the input text itself is already resident; on Linux the high-water mark is reset
+first, so building the input doesn't count):
+
+  - ``lists``: the previous implementation, reproduced below — ``list(csv.reader(...))``, a
+    padded and a trimmed copy, and the whole TSV re-parsed into a fourth list to verify it.
+  - ``stream``: ``CsvNormalizer`` — a measuring pass, then a write-and-verify pass row by row.
+
+Both modes must produce the same text. No API calls.
+Usage: ``python scripts/bench_csv_stream.py [--mib 16 64 256]``
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+
+from cutok.core.tokens import count_tokens
+from cutok.normalize.structured import CsvNormalizer
+
+MODEL = "gpt-4o"
+MODES = ("lists", "stream")
+
+
+def build_csv(mib: float) -> str:
+    rng = random.Random(11)
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\n")
+    writer.writerow(["id", "customer", "city", "note", "amount", "", ""])
+    i = 0
+    while out.tell() < mib * 2**20:
+        i += 1
+        note = rng.choice(["ok", "late, refunded", 'said "thanks"', "two\nlines", ""])
+        city = rng.choice(["Berlin", "Lyon", "Porto, PT"])
+        writer.writerow([i, f"cust-{i % 997}", city, note, f"{i * 7 % 1000}.{i % 100:02d}", "", ""])
+        if i % 400 == 0:
+            writer.writerow([])
+    return out.getvalue()
+
+
+def previous_normalize(text: str) -> str:
+    """The normalizer before streaming, minus its change records."""
+    delimiter = csv.Sniffer().sniff(text[:4096], delimiters=",\t").delimiter
+    rows = list(csv.reader(io.StringIO(text), delimiter=delimiter))
+    rows = [r for r in rows if any(cell for cell in r)]
+    width = max(len(r) for r in rows)
+    padded = [r + [""] * (width - len(r)) for r in rows]
+    keep = width
+    while keep > 0 and all(not row[keep - 1] for row in padded):
+        keep -= 1
+    trimmed = [row[:keep] for row in padded]
+    out = io.StringIO()
+    writer = csv.writer(out, delimiter="\t", lineterminator="\n", quoting=csv.QUOTE_MINIMAL)
+    writer.writerows(trimmed)
+    result = out.getvalue()
+    assert list(csv.reader(io.StringIO(result), delimiter="\t")) == trimmed
+    count_tokens(text, MODEL)
+    count_tokens(result, MODEL)
+    return result
+
+
+def _reset_peak() -> None:
+    """Reset the kernel's high-water mark so building the input doesn't count (Linux only)."""
+    try:
+        with open("/proc/self/clear_refs", "w") as fh:
+            fh.write("5")
+    except OSError:
+        pass
+
+
+def _peak_rss_kib() -> int:
+    try:
+        with open("/proc/self/status") as fh:
+            return next(int(ln.split()[1]) for ln in fh if ln.startswith("VmHWM:"))
+    except (OSError, StopIteration):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak // 1024 if sys.platform == "darwin" else peak  # macOS reports bytes
+
+
+def _current_rss_kib() -> int:
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except OSError:
+        return _peak_rss_kib()
+
+
+def measure(mode: str, mib: float) -> dict:
+    """Run one mode in this process; call from a fresh interpreter for a clean peak."""
+    text = build_csv(mib)
+    count_tokens("warm up", MODEL)
+    _reset_peak()
+    before = _current_rss_kib()
+    start = time.perf_counter()
+    if mode == "lists":
+        result = previous_normalize(text)
+    else:
+        result = CsvNormalizer().normalize(text, "export.csv", MODEL).text
+    elapsed = time.perf_counter() - start
+    return {
+        "out_chars": len(result),
+        "digest": hash(result),
+        "wall_s": elapsed,
+        "peak_growth_kib": max(0, _peak_rss_kib() - before),
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mib", type=float, nargs="+", default=[16, 64, 256])
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)  # subprocess entry
+    args = parser.parse_args(argv)
+
+    if args.mode:
+        print(json.dumps(measure(args.mode, args.mib[0])))
+        return 0
+
+    env = dict(os.environ, PYTHONHASHSEED="0")  # comparable digests across subprocesses
+    print(f"{'MiB':>5}  {'Mode':<7}  {'Wall s':>7}  {'Peak RSS growth':>16}  {'Out MiB':>7}")
+    print(f"{'-' * 5}  {'-' * 7}  {'-' * 7}  {'-' * 16}  {'-' * 7}")
+    for mib in args.mib:
+        rows = []
+        for mode in MODES:
+            cmd = [sys.executable, __file__, "--mode", mode, "--mib", str(mib)]
+            out = subprocess.run(cmd, check=True, capture_output=True, text=True, env=env).stdout
+            row = json.loads(out)
+            rows.append(row)
+            print(
+                f"{mib:>5g}  {mode:<7}  {row['wall_s']:>7.2f}  "
+                f"{row['peak_growth_kib'] / 1024:>12.1f} MiB  {row['out_chars'] / 2**20:>7.1f}"
+            )
+        assert rows[0]["digest"] == rows[1]["digest"], "streamed output differs"
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
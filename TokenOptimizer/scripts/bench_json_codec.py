@@ -0,0 +1,80 @@
+"""CPU benchmark for the proxy's request-body codec: per-request CPU time saved vs json round-trip.
+
+Scenarios over one large agent-style body (see ``bench_payload_memory.build_payload``):
+
+  - ``unchanged``: the optimizer returns the payload untouched (forwarded as the original bytes).
+  - ``one block``: a single message was rewritten (spliced by the stdlib codec).
+
+Each row is the median CPU time (``time.process_time``) of decode + encode per request. The
+``json`` row is the previous proxy behavior: ``json.loads`` then a full ``json.dumps``. No API
+calls. Usage: ``python scripts/bench_json_codec.py [--messages N] [--images N] [--runs N]``
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+
+from bench_payload_memory import build_payload
+from cutok.core.payload import PayloadWriter
+from cutok.pillars.proxy import codec as codec_mod
+from cutok.pillars.proxy.codec import JsonCodec
+
+
+def _edit(payload: dict, scenario: str) -> dict:
+    if scenario == "unchanged":
+        return payload
+    writer = PayloadWriter(payload)
+    writer.own("messages", len(payload["messages"]) - 1)["content"] = "Continue, briefly."
+    return writer.payload
+
+
+def _time_json(body: bytes, scenario: str) -> float:
+    start = time.process_time()
+    payload = json.loads(body)
+    json.dumps(_edit(payload, scenario)).encode("utf-8")
+    return time.process_time() - start
+
+
+def _time_codec(codec: JsonCodec, body: bytes, scenario: str) -> float:
+    start = time.process_time()
+    decoded = codec.decode(body)
+    codec.encode(decoded, _edit(decoded.obj, scenario))
+    return time.process_time() - start
+
+
+def run(messages: int, images: int, runs: int) -> list[tuple[str, str, float]]:
+    body = json.dumps(build_payload(messages, images)).encode("utf-8")
+    modes = {"json": None, "stdlib": JsonCodec("stdlib")}
+    if codec_mod.orjson is not None:
+        modes["orjson"] = JsonCodec("orjson")
+    rows: list[tuple[str, str, float]] = []
+    for scenario in ("unchanged", "one block"):
+        for name, codec in modes.items():
+            samples = [
+                _time_json(body, scenario) if codec is None else _time_codec(codec, body, scenario)
+                for _ in range(runs)
+            ]
+            rows.append((scenario, name, statistics.median(samples) * 1000))
+    return rows
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=3000)
+    parser.add_argument("--images", type=int, default=40)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    rows = run(args.messages, args.images, args.runs)
+    baseline = {scenario: ms for scenario, name, ms in rows if name == "json"}
+    print(f"{'Scenario':<10}  {'Codec':<7}  {'CPU ms/req':>10}  {'Saved ms':>8}")
+    print(f"{'-' * 10}  {'-' * 7}  {'-' * 10}  {'-' * 8}")
+    for scenario, name, ms in rows:
+        print(f"{scenario:<10}  {name:<7}  {ms:>10.1f}  {baseline[scenario] - ms:>8.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,212 @@
+"""Compression-model throughput and p99 latency: per-window runs vs batched vs micro-batched.
+
+Builds a small randomly initialized token classifier in ONNX (embedding, ``--layers`` masked
+self-attention + feed-forward blocks of width ``--hidden``, a two-way head) as a stand-in for
+LLMLingua-2, and a word-level stand-in tokenizer. Then ``--requests`` texts of ``--words`` words
+go through ``LLMLingua2.compress`` from 1, 8 and 32 concurrent threads, in three modes:
+
+  - per window: one ``session.run`` per 300-word window (the previous behavior).
+  - document batch: all of a text's windows padded into one run.
+  - micro-batch: windows from concurrent calls merged by ``MicroBatcher`` (as the service runs).
+
+Reports throughput (requests/s) and p99 latency. Absolute numbers are far below the real
+bert-base model's costs; the ratios between the modes are what to read, and they depend on the
+core count: on one core inference is compute-bound and the modes come out close. Needs ``onnx``,
+``onnxruntime`` and ``numpy`` (the ``compress`` extra). No API calls.
+Usage: ``python scripts/bench_llmlingua_batching.py [--requests 192] [--words 50-900]
+[--hidden 256] [--layers 2]``
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import onnx
+from cutok.compress.llmlingua import LLMLingua2
+from onnx import TensorProto, helper, numpy_helper
+
+VOCAB = 4096
+CONCURRENCY = (1, 8, 32)
+MODES = {
+    "per window": {"max_batch": 1},
+    "document batch": {"max_batch": 16},
+    "micro-batch": {"max_batch": 32, "max_wait_ms": 5},
+}
+
+
+def build_model(path: Path, hidden: int, layers: int) -> None:
+    rng = np.random.default_rng(0)
+    inits = []
+
+    def weight(name: str, *shape: int) -> str:
+        scale = 1 / np.sqrt(shape[0])
+        inits.append(
+            numpy_helper.from_array(
+                rng.normal(0, scale, shape).astype(np.float32), name
+            )
+        )
+        return name
+
+    def const(name: str, value, dtype=np.float32) -> str:
+        inits.append(numpy_helper.from_array(np.array(value, dtype=dtype), name))
+        return name
+
+    nodes = [
+        helper.make_node("Gather", [weight("emb", VOCAB, hidden), "input_ids"], ["h0"]),
+        # Additive mask [batch, 1, seq]: 0 for real tokens, -1e4 for padding.
+        helper.make_node("Cast", ["attention_mask"], ["maskf"], to=TensorProto.FLOAT),
+        helper.make_node("Sub", ["maskf", const("one", 1.0)], ["maskm"]),
+        helper.make_node("Mul", ["maskm", const("big", 1e4)], ["maskb"]),
+        helper.make_node("Unsqueeze", ["maskb", const("ax1", [1], np.int64)], ["bias"]),
+    ]
+    h = "h0"
+    for i in range(layers):
+        q, k, v, o = (f"{n}{i}" for n in "qkvo")
+        nodes += [
+            helper.make_node("MatMul", [h, weight(f"wq{i}", hidden, hidden)], [q]),
+            helper.make_node("MatMul", [h, weight(f"wk{i}", hidden, hidden)], [k]),
+            helper.make_node("MatMul", [h, weight(f"wv{i}", hidden, hidden)], [v]),
+            helper.make_node("Transpose", [k], [f"kt{i}"], perm=[0, 2, 1]),
+            helper.make_node("MatMul", [q, f"kt{i}"], [f"s{i}"]),
+            helper.make_node(
+                "Mul", [f"s{i}", const(f"scale{i}", 1 / np.sqrt(hidden))], [f"ss{i}"]
+            ),
+            helper.make_node("Add", [f"ss{i}", "bias"], [f"sm{i}"]),
+            helper.make_node("Softmax", [f"sm{i}"], [f"p{i}"], axis=-1),
+            helper.make_node("MatMul", [f"p{i}", v], [o]),
+            helper.make_node("Add", [h, o], [f"r{i}"]),
+            helper.make_node(
+                "MatMul", [f"r{i}", weight(f"f1{i}", hidden, 2 * hidden)], [f"f{i}"]
+            ),
+            helper.make_node("Relu", [f"f{i}"], [f"g{i}"]),
+            helper.make_node(
+                "MatMul", [f"g{i}", weight(f"f2{i}", 2 * hidden, hidden)], [f"u{i}"]
+            ),
+            helper.make_node("Add", [f"r{i}", f"u{i}"], [f"h{i + 1}"]),
+        ]
+        h = f"h{i + 1}"
+    nodes.append(helper.make_node("MatMul", [h, weight("head", hidden, 2)], ["logits"]))
+    graph = helper.make_graph(
+        nodes,
+        "standin",
+        [
+            helper.make_tensor_value_info("input_ids", TensorProto.INT64, ["b", "s"]),
+            helper.make_tensor_value_info(
+                "attention_mask", TensorProto.INT64, ["b", "s"]
+            ),
+        ],
+        [helper.make_tensor_value_info("logits", TensorProto.FLOAT, ["b", "s", 2])],
+        inits,
+    )
+    model = helper.make_model(
+        graph, opset_imports=[helper.make_opsetid("", 17)], ir_version=8
+    )
+    onnx.checker.check_model(model)
+    onnx.save(model, str(path))
+
+
+class _Encoding(dict):
+    def __init__(self, data: dict, word_ids: list) -> None:
+        super().__init__(data)
+        self._word_ids = word_ids
+
+    def word_ids(self, b: int) -> list:
+        return self._word_ids[b]
+
+
+class WordTokenizer:
+    """Hashes words to ids; words over six characters take two tokens, like common subwords."""
+
+    def __call__(
+        self,
+        windows,
+        *,
+        is_split_into_words,
+        return_tensors,
+        truncation,
+        max_length,
+        padding=False,
+    ):
+        rows, word_ids = [], []
+        for words in windows:
+            ids, wids = [1], [None]
+            for w, word in enumerate(words):
+                for part in (word[:6], word[6:]) if len(word) > 6 else (word,):
+                    ids.append(3 + zlib.crc32(part.encode()) % (VOCAB - 3))
+                    wids.append(w)
+            rows.append([*ids[: max_length - 1], 2])
+            word_ids.append([*wids[: max_length - 1], None])
+        width = max(map(len, rows)) if padding else len(rows[0])
+        data = {
+            "input_ids": np.array(
+                [r + [0] * (width - len(r)) for r in rows], dtype=np.int64
+            ),
+            "attention_mask": np.array(
+                [[1] * len(r) + [0] * (width - len(r)) for r in rows], dtype=np.int64
+            ),
+        }
+        return _Encoding(data, [w + [None] * (width - len(w)) for w in word_ids])
+
+
+def make_texts(n: int, lo: int, hi: int) -> list[str]:
+    rng = random.Random(7)
+    vocab = [
+        f"{rng.choice('bcdfgklmnprst')}{'ae'[i % 2]}{i}x" * (1 + i % 3)
+        for i in range(900)
+    ]
+    return [" ".join(rng.choices(vocab, k=rng.randint(lo, hi))) for _ in range(n)]
+
+
+def run(model: LLMLingua2, texts: list[str], concurrency: int) -> tuple[float, float]:
+    latencies = []
+
+    def one(text: str) -> None:
+        start = time.perf_counter()
+        model.compress(text, rate=0.6)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, texts))
+    wall = time.perf_counter() - start
+    return len(texts) / wall, float(np.percentile(latencies, 99))
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=192)
+    parser.add_argument("--words", default="50-900", help="text length range, LO-HI")
+    parser.add_argument("--hidden", type=int, default=256)
+    parser.add_argument("--layers", type=int, default=2)
+    args = parser.parse_args(argv)
+
+    lo, hi = map(int, args.words.split("-"))
+    texts = make_texts(args.requests, lo, hi)
+    with tempfile.TemporaryDirectory() as tmp:
+        build_model(Path(tmp) / "model.onnx", args.hidden, args.layers)
+        print(
+            f"requests: {args.requests}  words: {args.words}  hidden: {args.hidden}  "
+            f"layers: {args.layers}  cpus: {os.cpu_count()}"
+        )
+        print(f"{'Mode':<15}  {'Conc':>4}  {'req/s':>7}  {'p99 ms':>8}")
+        print(f"{'-' * 15}  {'-' * 4}  {'-' * 7}  {'-' * 8}")
+        for name, kwargs in MODES.items():
+            model = LLMLingua2(tmp, tokenizer=WordTokenizer(), **kwargs)
+            model.compress(texts[0])  # load the session outside the timings
+            for concurrency in CONCURRENCY:
+                rps, p99 = run(model, texts, concurrency)
+                print(f"{name:<15}  {concurrency:>4}  {rps:>7.1f}  {p99 * 1000:>8.1f}")
+            if model.batcher is not None:
+                print(f"\nmicro-batcher: {model.batcher.stats()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
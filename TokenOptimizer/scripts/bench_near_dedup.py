@@ -0,0 +1,75 @@
+"""Scaling benchmark for near-duplicate paragraph dedup (``dedup_chunks(near_threshold=...)``).
+
+Builds attachment sets of N paragraphs spread over 100 documents: half are filled-in templates
+(contract clauses, report boilerplate, email sign-offs — 50 families, each instance differing by
+a date, a name and an amount), half are unique prose. Each row reports wall time for exact-only
+dedup and for near mode, microseconds per paragraph (flat as N grows = linear scaling; a
+pairwise scan would grow 10x per row), near-duplicates collapsed and tokens saved.
+No API calls. Usage: ``python scripts/bench_near_dedup.py [--sizes 10000 100000] [--threshold T]``
+"""
+
+import argparse
+import random
+import sys
+import time
+
+from cutok.normalize.dedup import dedup_chunks
+
+MODEL = "gpt-4o"
+DOCS = 100
+FAMILIES = 50
+_NAMES = ["Alice Smith", "Bob Jones", "Carol White", "Dan Brown", "Eve Black", "Frank Green"]
+_MONTHS = ["January", "March", "May", "July", "September", "November"]
+
+
+def _words(rng: random.Random, n: int, vocab: list[str]) -> str:
+    return " ".join(rng.choice(vocab) for _ in range(n))
+
+
+def build(paragraphs: int, seed: int = 0) -> dict[str, str]:
+    rng = random.Random(seed)
+    vocab = [f"w{i}" for i in range(5000)]
+    families = [
+        _words(rng, 30, vocab) + " on {date} for {name}, amount {amount}, " + _words(rng, 30, vocab)
+        for _ in range(FAMILIES)
+    ]
+    docs: list[list[str]] = [[] for _ in range(DOCS)]
+    for i in range(paragraphs):
+        if i % 2:
+            text = rng.choice(families).format(
+                date=f"{rng.randint(1, 28)} {rng.choice(_MONTHS)} {rng.randint(2019, 2025)}",
+                name=rng.choice(_NAMES),
+                amount=f"${rng.randint(100, 99999)}",
+            )
+        else:
+            text = _words(rng, 60, vocab)
+        docs[i % DOCS].append(text)
+    return {f"doc{n:03}.txt": "\n\n".join(paras) for n, paras in enumerate(docs)}
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--threshold", type=float, default=0.7)
+    args = parser.parse_args(argv)
+
+    print(f"{'Paragraphs':>10}  {'exact s':>7}  {'near s':>7}  {'near µs/para':>12}  "
+          f"{'collapsed':>9}  {'tokens saved':>12}")
+    print(f"{'-' * 10}  {'-' * 7}  {'-' * 7}  {'-' * 12}  {'-' * 9}  {'-' * 12}")
+    for n in args.sizes:
+        docs = build(n)
+        start = time.perf_counter()
+        dedup_chunks(docs, MODEL)
+        exact = time.perf_counter() - start
+        start = time.perf_counter()
+        _, changes = dedup_chunks(docs, MODEL, near_threshold=args.threshold)
+        near = time.perf_counter() - start
+        collapsed = [c for c in changes if c.kind == "near_dedup_chunk"]
+        saved = sum(c.tokens_saved for c in collapsed)
+        print(f"{n:>10}  {exact:>7.2f}  {near:>7.2f}  {near / n * 1e6:>12.1f}  "
+              f"{len(collapsed):>9}  {saved:>12}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
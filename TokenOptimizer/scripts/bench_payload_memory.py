@@ -0,0 +1,115 @@
+"""Memory benchmark: peak RSS of ``optimize_payload`` with copy-on-write vs per-stage deepcopy.
+
+Builds a large agent-style request (base64 images plus a long multi-block history), then runs the
+pipeline once per mode in a fresh subprocess and reports the peak-RSS growth over the process's
+resident size just before the run:
+
+  - ``deepcopy``: the previous behavior — each stage deep-copies its input before rewriting it.
+  - ``cow``: the current pipeline — one ``PayloadWriter`` copies only the paths it rewrites.
+
+``copy.deepcopy`` shares ``str`` objects, so the base64 bytes themselves were never duplicated;
+what the old pipeline paid for is every dict/list in the body plus deepcopy's memo table, which
+for long histories is the bulk of the overhead. No API calls.
+Usage: ``python scripts/bench_payload_memory.py [--messages N] [--images N]``
+"""
+
+import argparse
+import base64
+import copy
+import json
+import os
+import resource
+import subprocess
+import sys
+
+from cutok.budget.response_budget import apply_response_budget
+from cutok.cache.cache_optimizer import optimize_for_cache
+from cutok.core.ledger import Ledger
+from cutok.core.types import OptimizerConfig, Provider
+from cutok.normalize.delta import DeltaStore
+from cutok.optimizer import optimize_payload
+
+MODEL = "claude-sonnet-4-5"
+MODES = ("deepcopy", "cow")
+
+
+def build_payload(messages: int, images: int) -> dict:
+    image = base64.b64encode(os.urandom(384 * 1024)).decode()
+    history: list[dict] = []
+    for i in range(messages):
+        role = "user" if i % 2 == 0 else "assistant"
+        blocks = [{"type": "text", "text": f"turn {i}: step output {j}"} for j in range(4)]
+        blocks.append({"type": "tool_result", "tool_use_id": f"t{i}", "content": [{"k": i}]})
+        history.append({"role": role, "content": blocks})
+    for i in range(images):
+        history[2 * i % len(history)]["content"].append(
+            {"type": "image", "source": {"type": "base64", "media_type": "image/png", "data": image}}
+        )
+    history.append({"role": "user", "content": "Continue."})
+    return {"model": MODEL, "system": "You are a careful agent.", "messages": history}
+
+
+def _config() -> OptimizerConfig:
+    return OptimizerConfig(model=MODEL, provider=Provider.ANTHROPIC, max_output_tokens=1024)
+
+
+def _run_deepcopy(payload: dict) -> dict:
+    ledger = Ledger()
+    for stage in (optimize_for_cache, apply_response_budget):
+        payload, _ = stage(copy.deepcopy(payload), _config(), ledger)
+    return payload
+
+
+def _run_cow(payload: dict) -> dict:
+    out, _ = optimize_payload(payload, _config(), Ledger(), DeltaStore())
+    return out
+
+
+def _peak_rss_kib() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak  # macOS reports bytes
+
+
+def _current_rss_kib() -> int:
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except OSError:
+        return _peak_rss_kib()
+
+
+def measure(mode: str, messages: int, images: int) -> dict:
+    """Run one mode in this process; call from a fresh interpreter for a clean peak."""
+    payload = build_payload(messages, images)
+    _run_cow({"model": MODEL, "messages": [{"role": "user", "content": "warm up"}]})
+    before = _current_rss_kib()
+    out = (_run_deepcopy if mode == "deepcopy" else _run_cow)(payload)
+    assert out["max_tokens"] == 1024
+    return {"mode": mode, "peak_growth_kib": max(0, _peak_rss_kib() - before)}
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=3000)
+    parser.add_argument("--images", type=int, default=40)
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)  # subprocess entry
+    args = parser.parse_args(argv)
+
+    if args.mode:
+        print(json.dumps(measure(args.mode, args.messages, args.images)))
+        return 0
+
+    size_mib = len(json.dumps(build_payload(args.messages, args.images))) / 2**20
+    print(f"payload: {args.messages} messages, {args.images} images, {size_mib:.1f} MiB JSON")
+    print(f"{'Mode':<10}  {'Peak RSS growth':>16}")
+    print(f"{'-' * 10}  {'-' * 16}")
+    for mode in MODES:
+        cmd = [sys.executable, __file__, "--mode", mode]
+        cmd += ["--messages", str(args.messages), "--images", str(args.images)]
+        row = json.loads(subprocess.run(cmd, check=True, capture_output=True, text=True).stdout)
+        print(f"{mode:<10}  {row['peak_growth_kib'] / 1024:>12.1f} MiB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""PDF extraction benchmark: whole-document MarkItDown vs page-streamed ``extract_pdf``.
+
+Generates text PDFs of the requested page counts (30 lines a page, a running header and a page
+footer) and extracts + cleans each in a fresh subprocess per mode, reporting wall time and the
+peak-RSS growth over the process's resident size just before the run:
+
+  - ``markitdown``: ``extract_to_markdown`` then ``TextCleanNormalizer`` — the default path.
+  - ``stream``: ``extract_pdf`` with no budget — every page, cleaned as it arrives.
+  - ``budget``: ``extract_pdf`` with ``--budget`` tokens — stops at the first page that overruns.
+
+Page ranges go to ``attachment_pool`` workers when ``TS_ATTACHMENT_WORKERS`` is 2 or more (it is
+off by default); otherwise the stream runs inline. The extraction cache is disabled. No API calls.
+Usage: ``python scripts/bench_pdf_stream.py [--pages 50 500 2000] [--budget 4000]``
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+from cutok.normalize.extract import extract_to_markdown
+from cutok.normalize.extract_cache import extraction_cache
+from cutok.normalize.pdf import extract_pdf
+from cutok.normalize.pool import attachment_pool
+from cutok.normalize.textclean import TextCleanNormalizer
+
+MODEL = "gpt-4o"
+MODES = ("markitdown", "stream", "budget")
+
+
+def build_pdf(pages: int) -> bytes:
+    """A minimal valid PDF with ``pages`` pages of Helvetica text lines."""
+    catalog = b"<< /Type /Catalog /Pages 2 0 R >>"
+    font = b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"
+    objects = [catalog, b"", font]  # object 2, the page tree, is filled in once kids are known
+    kids = []
+    for page in range(1, pages + 1):
+        lines = ["Acme Platform Quarterly Operations Report"]
+        lines += [
+            f"Item {page}.{i}: the ingest pipeline processed shard {i * 7 % 101} in {i * 13 % 97} "
+            f"ms with {i % 5} retries."
+            for i in range(28)
+        ]
+        lines.append(f"Confidential - page {page} of {pages}")
+        ops = "".join(f"({line}) Tj 0 -14 Td " for line in lines)
+        stream = f"BT /F1 9 Tf 40 780 Td {ops}ET".encode()
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        kids.append(len(objects) + 1)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents %d 0 R "
+            b"/Resources << /Font << /F1 3 0 R >> >> >>" % len(objects)
+        )
+    refs = " ".join(f"{k} 0 R" for k in kids).encode()
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (refs, len(kids))
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\n" % (len(objects) + 1)
+    out += b"startxref\n%d\n%%%%EOF\n" % xref
+    return bytes(out)
+
+
+def _peak_rss_kib() -> int:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak  # macOS reports bytes
+
+
+def _current_rss_kib() -> int:
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except OSError:
+        return _peak_rss_kib()
+
+
+def measure(mode: str, pages: int, budget: int) -> dict:
+    """Run one mode in this process; call from a fresh interpreter for a clean peak."""
+    extraction_cache.configure(enabled=False)
+    data = build_pdf(pages)
+    extract_pdf(build_pdf(1), MODEL)  # import pdfminer and warm the tokenizer outside the timing
+    before = _current_rss_kib()
+    start = time.perf_counter()
+    if mode == "markitdown":
+        TextCleanNormalizer().normalize(extract_to_markdown(data, "r.pdf"), "r.pdf", MODEL)
+        read = pages
+    else:
+        result = extract_pdf(data, MODEL, token_budget=budget if mode == "budget" else None)
+        read = result.pages_read
+    elapsed = time.perf_counter() - start
+    attachment_pool.shutdown()
+    return {
+        "mode": mode,
+        "pages_read": read,
+        "wall_s": elapsed,
+        "peak_growth_kib": max(0, _peak_rss_kib() - before),
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[50, 500, 2000])
+    parser.add_argument("--budget", type=int, default=4000, help="token budget of the budget mode")
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)  # subprocess entry
+    args = parser.parse_args(argv)
+
+    if args.mode:
+        print(json.dumps(measure(args.mode, args.pages[0], args.budget)))
+        return 0
+
+    print(f"workers: {attachment_pool.stats()['workers']}, budget: {args.budget} tokens")
+    print(f"{'Pages':>6}  {'Mode':<10}  {'Read':>5}  {'Wall s':>7}  {'Peak RSS growth':>16}")
+    print(f"{'-' * 6}  {'-' * 10}  {'-' * 5}  {'-' * 7}  {'-' * 16}")
+    for pages in args.pages:
+        for mode in MODES:
+            cmd = [sys.executable, __file__, "--mode", mode, "--pages", str(pages)]
+            cmd += ["--budget", str(args.budget)]
+            out = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+            row = json.loads(out)
+            print(
+                f"{pages:>6}  {mode:<10}  {row['pages_read']:>5}  {row['wall_s']:>7.2f}  "
+                f"{row['peak_growth_kib'] / 1024:>12.1f} MiB"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""Cache-stage token counting over a long session: per-request batch counts vs the prefix chain.
+
+Replays an agent session of ``--turns`` requests, each resending the whole history (a system
+prompt, then alternating user turns and tool-output-sized assistant turns), through
+``optimize_for_cache`` three ways: with neither cache (every block encoded on every request),
+with ``token_cache`` only (the previous behavior: blocks of 64+ characters are looked up by
+digest, shorter ones re-encoded), and with ``prefix_chain``. Reports the wall time for the whole
+session and the number of blocks the tokenizer actually encoded. No API calls.
+Usage: ``python scripts/bench_prefix_chain.py [--turns 200]``
+"""
+
+import argparse
+import random
+import sys
+import time
+
+from cutok.cache.cache_optimizer import optimize_for_cache
+from cutok.core.ledger import Ledger
+from cutok.core.prefix_chain import prefix_chain
+from cutok.core.providers import tokenizer_for
+from cutok.core.token_cache import token_cache
+from cutok.core.types import OptimizerConfig, Provider
+
+CONFIG = OptimizerConfig(model="claude-sonnet-4-5", provider=Provider.ANTHROPIC)
+_WORDS = ["the", "build", "failed", "on", "shard", "retry", "with", "logs", "ok", "see", "diff"]
+
+
+def build_session(turns: int) -> list[dict]:
+    rng = random.Random(3)
+    messages = []
+    for i in range(turns):
+        if i % 2 == 0:
+            text = " ".join(rng.choice(_WORDS) for _ in range(rng.randint(4, 30)))
+        else:
+            text = "\n".join(
+                " ".join(rng.choice(_WORDS) for _ in range(12)) for _ in range(rng.randint(5, 80))
+            )
+        messages.append({"role": "user" if i % 2 == 0 else "assistant", "content": text})
+    return messages
+
+
+def replay(messages: list[dict]) -> float:
+    system = "You are a careful build assistant. Answer with the failing step first."
+    start = time.perf_counter()
+    for n in range(1, len(messages) + 1):
+        optimize_for_cache({"system": system, "messages": messages[:n]}, CONFIG, Ledger())
+    return time.perf_counter() - start
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    messages = build_session(args.turns)
+    replay(messages[:2])  # load the tokenizer outside the timing
+    tokenizer = tokenizer_for(CONFIG.model)
+    encode_batch = tokenizer.count_batch
+    encoded = 0
+
+    def counting_batch(texts):
+        nonlocal encoded
+        encoded += len(texts)
+        return encode_batch(texts)
+
+    tokenizer.count_batch = counting_batch
+    history = sum(len(m["content"]) for m in messages)
+    print(f"turns: {args.turns}, history at the last turn: {history / 1024:.0f} KiB")
+    print(f"{'Counting':<16}  {'Seconds':>8}  {'Blocks encoded':>14}")
+    print(f"{'-' * 16}  {'-' * 8}  {'-' * 14}")
+    modes = [("no caches", False, False), ("token_cache", True, False)]
+    modes.append(("prefix chain", True, True))
+    for name, use_token_cache, use_chain in modes:
+        token_cache.configure(enabled=use_token_cache)
+        token_cache.clear()
+        prefix_chain.configure(enabled=use_chain)
+        prefix_chain.clear()
+        encoded = 0
+        seconds = replay(messages)
+        print(f"{name:<16}  {seconds:>8.3f}  {encoded:>14}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""Per-request optimizer CPU over a growing conversation, with and without ``MessageMemo``.
+
+Replays one chat session: every user turn attaches a fresh document (alternating an HTML report,
+a pretty-printed JSON export and a CSV) and every request resends the whole history, as chat
+clients do. Reports the optimizer's wall time for the request at selected turns. Without the memo
+the per-file work on every old attachment is redone per request (the extraction and token-count
+caches soften that but base64 decode, normalizers and lookups remain), so time grows with the
+conversation; with it only the newest turn's attachments are prepared.
+No API calls.
+Usage: ``python scripts/bench_session_memo.py [--turns 80] [--kib 64] [--window 10]``
+"""
+
+import argparse
+import base64
+import json
+import sys
+import time
+
+from cutok.core.ledger import Ledger
+from cutok.core.types import OptimizerConfig
+from cutok.normalize.delta import DeltaStore
+from cutok.normalize.extract_cache import extraction_cache
+from cutok.normalize.history import HistoryStore
+from cutok.normalize.memo import MessageMemo
+from cutok.optimizer import optimize_payload
+
+MODEL = "gpt-4o"
+
+
+def _document(turn: int, kib: int) -> dict:
+    rows = kib * 1024 // 48
+    kind = turn % 3
+    if kind == 0:
+        body = "".join(f"<p>Turn {turn}, finding {i}: up {i % 17} ms.</p>" for i in range(rows))
+        media_type, data = "text/html", f"<html><body><h1>Report {turn}</h1>{body}</body></html>"
+    elif kind == 1:
+        records = [{"id": i, "turn": turn, "status": "ok", "score": i % 97} for i in range(rows)]
+        media_type, data = "application/json", json.dumps(records, indent=4)
+    else:
+        lines = [f"{i},{turn},region-{i % 9},{i * 13 % 1000}" for i in range(rows)]
+        media_type, data = "text/csv", "id,turn,region,amount\n" + "\n".join(lines)
+    encoded = base64.b64encode(data.encode()).decode()
+    source = {"type": "base64", "media_type": media_type, "data": encoded}
+    return {"type": "document", "source": source}
+
+
+def replay(turns: int, kib: int, memo: MessageMemo | None) -> list[float]:
+    config = OptimizerConfig(model=MODEL, enable_compression=False)
+    delta_store, history, ledger = DeltaStore(), HistoryStore(), Ledger()
+    extraction_cache.clear()
+    messages: list[dict] = []
+    times = []
+    for turn in range(turns):
+        text = {"type": "text", "text": f"Turn {turn}: what changed?"}
+        messages = [*messages, {"role": "user", "content": [_document(turn, kib), text]}]
+        start = time.perf_counter()
+        optimize_payload(
+            {"model": MODEL, "messages": messages},
+            config,
+            ledger,
+            delta_store,
+            "bench",
+            history=history,
+            memo=memo,
+        )
+        times.append(time.perf_counter() - start)
+        messages = [*messages, {"role": "assistant", "content": f"Answer {turn}."}]
+    return times
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=80)
+    parser.add_argument("--kib", type=int, default=64, help="size of each attached document")
+    parser.add_argument("--window", type=int, default=10, help="turns averaged per row")
+    args = parser.parse_args(argv)
+
+    cold = replay(args.turns, args.kib, None)
+    memo = MessageMemo()
+    warm = replay(args.turns, args.kib, memo)
+    # Averaged over windows of turns: a single turn's time depends on its document's format.
+    print(f"{'Turns':>9}  {'no memo ms':>10}  {'memo ms':>8}  {'speedup':>7}")
+    print(f"{'-' * 9}  {'-' * 10}  {'-' * 8}  {'-' * 7}")
+    for lo in range(0, args.turns, args.window):
+        hi = min(lo + args.window, args.turns)
+        a = sum(cold[lo:hi]) / (hi - lo)
+        b = sum(warm[lo:hi]) / (hi - lo)
+        print(f"{f'{lo + 1}-{hi}':>9}  {a * 1000:>10.1f}  {b * 1000:>8.1f}  {a / b:>6.1f}x")
+    print(f"\nmemo: {memo.stats()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
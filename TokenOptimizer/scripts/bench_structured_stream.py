@@ -0,0 +1,121 @@
+"""Large-JSON normalization: whole-document ``json.loads`` vs the streaming minifier.
+
+Generates a pretty-printed export (``{"meta": ..., "records": [...]}`` with long repeated keys,
+so the key dictionary applies) of each requested size and runs ``JsonYamlNormalizer`` on it in a
+fresh subprocess per mode, reporting wall time and the peak-RSS growth over the process's
+resident size just before the run (the input text itself is already resident; on Linux the
+high-water mark is reset first, so building the input doesn't count):
+
+  - ``memory``: the in-memory path — ``json.loads``, ``json.dumps`` twice, recursive key walks.
+  - ``stream``: ``stream_min_chars=0`` — ``_stream_json`` for the minify and the rename passes.
+
+Both modes must produce the same text. No API calls.
+Usage: ``python scripts/bench_structured_stream.py [--mib 8 32 128]``
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+from cutok.normalize.structured import JsonYamlNormalizer
+
+MODEL = "gpt-4o"
+MODES = ("memory", "stream")
+
+
+def build_export(mib: float) -> str:
+    record = {
+        "customer_account_identifier": 0,
+        "transaction_timestamp_utc": "2024-05-01T12:00:00Z",
+        "settlement_currency_code": "EUR",
+        "line_items": [{"product_stock_keeping_unit": "SKU-1", "quantity": 2, "price": 9.5}],
+    }
+    one = len(json.dumps(record, indent=2)) + 6
+    records = []
+    for i in range(int(mib * 2**20 / one)):
+        records.append(dict(record, customer_account_identifier=i))
+    return json.dumps({"meta": {"source": "bench"}, "records": records}, indent=2)
+
+
+def _reset_peak() -> None:
+    """Reset the kernel's high-water mark so building the input doesn't count (Linux only)."""
+    try:
+        with open("/proc/self/clear_refs", "w") as fh:
+            fh.write("5")
+    except OSError:
+        pass
+
+
+def _peak_rss_kib() -> int:
+    try:
+        with open("/proc/self/status") as fh:
+            return next(int(ln.split()[1]) for ln in fh if ln.startswith("VmHWM:"))
+    except (OSError, StopIteration):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak // 1024 if sys.platform == "darwin" else peak  # macOS reports bytes
+
+
+def _current_rss_kib() -> int:
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except OSError:
+        return _peak_rss_kib()
+
+
+def measure(mode: str, mib: float) -> dict:
+    """Run one mode in this process; call from a fresh interpreter for a clean peak."""
+    text = build_export(mib)
+    norm = JsonYamlNormalizer(stream_min_chars=0) if mode == "stream" else JsonYamlNormalizer(
+        stream_min_chars=len(text) + 1
+    )
+    norm.normalize('{"warm": 1}', "w.json", MODEL)  # load the tokenizer outside the timing
+    _reset_peak()
+    before = _current_rss_kib()
+    start = time.perf_counter()
+    result = norm.normalize(text, "export.json", MODEL)
+    elapsed = time.perf_counter() - start
+    return {
+        "chars": len(text),
+        "out_chars": len(result.text),
+        "digest": hash(result.text),
+        "kinds": [c.kind for c in result.changes],
+        "wall_s": elapsed,
+        "peak_growth_kib": max(0, _peak_rss_kib() - before),
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mib", type=float, nargs="+", default=[8, 32, 128])
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)  # subprocess entry
+    args = parser.parse_args(argv)
+
+    if args.mode:
+        print(json.dumps(measure(args.mode, args.mib[0])))
+        return 0
+
+    env = dict(os.environ, PYTHONHASHSEED="0")  # comparable digests across subprocesses
+    print(f"{'MiB':>5}  {'Mode':<7}  {'Wall s':>7}  {'Peak RSS growth':>16}  {'Out MiB':>7}")
+    print(f"{'-' * 5}  {'-' * 7}  {'-' * 7}  {'-' * 16}  {'-' * 7}")
+    for mib in args.mib:
+        rows = []
+        for mode in MODES:
+            cmd = [sys.executable, __file__, "--mode", mode, "--mib", str(mib)]
+            out = subprocess.run(cmd, check=True, capture_output=True, text=True, env=env).stdout
+            row = json.loads(out)
+            rows.append(row)
+            print(
+                f"{mib:>5g}  {mode:<7}  {row['wall_s']:>7.2f}  "
+                f"{row['peak_growth_kib'] / 1024:>12.1f} MiB  {row['out_chars'] / 2**20:>7.1f}"
+            )
+        assert rows[0]["digest"] == rows[1]["digest"], "streamed output differs"
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
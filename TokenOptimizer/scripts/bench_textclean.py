@@ -0,0 +1,85 @@
+"""Text-cleanup throughput: the five textclean passes run one by one vs the fused engine.
+
+Builds extracted-looking markdown (wrapped lines with hyphenated breaks, running headers, HTML
+comments, smart punctuation, blank runs and a fenced block every few hundred lines) and times
+``_sequential_stages`` and ``_fused_stages`` on it, then the whole ``TextCleanNormalizer`` —
+whose per-pass token attribution is unchanged and still re-encodes every paragraph a pass edits.
+No API calls.
+Usage: ``python scripts/bench_textclean.py [--mib 4] [--repeat 3]``
+"""
+
+import argparse
+import random
+import sys
+import time
+
+from cutok.normalize.document import Document, clear_documents
+from cutok.normalize.textclean import TextCleanNormalizer, _fused_stages, _sequential_stages
+
+MODEL = "gpt-4o"
+_WORDS = ["the", "pipeline", "processed", "every", "shard", "and", "reported", "“healthy”"]
+_WORDS += ["results", "—", "mostly"]
+
+
+def build_text(mib: float) -> str:
+    rng = random.Random(7)
+    lines = []
+    size = 0
+    i = 0
+    while size < mib * 2**20:
+        line = " ".join(rng.choice(_WORDS) for _ in range(11))
+        if i % 7 == 0:
+            line += " perfor-"  # wrapped word, continued on the next line
+        elif i % 7 == 1 and i > 1:
+            line = "mance " + line
+        if i % 45 == 0:
+            lines.append(f"Acme Operations Review Page {i // 45 + 1}")
+        if i % 60 == 0:
+            line += "\n\n\n\n"
+        if i % 90 == 0:
+            lines.append("<!-- page break -->")
+        if i % 400 == 0:
+            lines.append('```python\nprint("“raw”")  # inter-\nnational\n```')
+        lines.append(line)
+        size += len(line) + 1
+        i += 1
+    return "\n".join(lines)
+
+
+def _best(fn, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mib", type=float, default=4.0, help="size of the generated text")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per engine (best is kept)")
+    args = parser.parse_args(argv)
+
+    text = build_text(args.mib)
+    fused_texts = [(kind, doc.text) for kind, doc in _fused_stages(Document(text))]
+    assert fused_texts == _sequential_stages(text)
+    mib = len(text.encode()) / 2**20
+    seq = _best(lambda: _sequential_stages(text), args.repeat)
+    fused = _best(lambda: _fused_stages(Document(text)), args.repeat)
+    def normalize():
+        clear_documents()  # a cold document: no fence split or paragraph counts to reuse
+        TextCleanNormalizer().normalize(text, "doc.md", MODEL)
+
+    full = _best(normalize, args.repeat)
+    print(f"text: {mib:.1f} MiB")
+    print(f"{'Engine':<20}  {'Seconds':>8}  {'MiB/s':>7}")
+    print(f"{'-' * 20}  {'-' * 8}  {'-' * 7}")
+    for name, seconds in (("pass by pass", seq), ("fused", fused), ("normalize (fused)", full)):
+        print(f"{name:<20}  {seconds:>8.3f}  {mib / seconds:>7.1f}")
+    print(f"\nfused speedup: {seq / fused:.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""Prefix-cache hits and stage cost with tool sets an SDK rebuilds on every call.
+
+Generates ``--tools`` pydantic-style tool definitions (generated ``title`` keys, nested ``$defs``)
+in ``--variants`` serializations with shuffled tool and schema key order, as SDK workers that
+rebuild tools from a dict or a registry emit them, and replays ``--requests`` calls each sending
+one of them. Reports how many distinct tool prefixes reach the provider with and without
+``run_schema_stage`` (each distinct one is a cache miss on an implicit-cache provider), the tokens
+the dropped titles save, and the stage's time without and with ``tool_schema_cache``.
+No API calls.
+Usage: ``python scripts/bench_tool_schema.py [--tools 40] [--variants 8] [--requests 200]``
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+
+from cutok.cache.tool_schema import run_schema_stage, tool_schema_cache
+from cutok.core.ledger import Ledger
+from cutok.core.payload import PayloadWriter
+from cutok.core.types import OptimizerConfig
+
+CONFIG = OptimizerConfig(model="gpt-4o")
+_FIELDS = [
+    "query",
+    "limit",
+    "user_id",
+    "region",
+    "since",
+    "include_archived",
+    "sort_order",
+]
+
+
+def _shuffled(obj, rng: random.Random):
+    if isinstance(obj, dict):
+        keys = list(obj)
+        if "type" in obj or "name" in obj:  # schemas and tools, not ``properties`` maps
+            rng.shuffle(keys)
+        return {k: _shuffled(obj[k], rng) for k in keys}
+    if isinstance(obj, list):
+        return [_shuffled(v, rng) for v in obj]
+    return obj
+
+
+def build_tools(n: int) -> list[dict]:
+    rng = random.Random(5)
+    tools = []
+    for i in range(n):
+        fields = rng.sample(_FIELDS, rng.randint(2, len(_FIELDS)))
+        props = {
+            f: {
+                "title": f.replace("_", " ").title(),
+                "type": "string",
+                "description": f"The {f}.",
+            }
+            for f in fields
+        }
+        props["filter"] = {"$ref": "#/$defs/Filter"}
+        schema = {
+            "title": f"Tool{i}Args",
+            "type": "object",
+            "properties": props,
+            "required": fields[:2],
+            "$defs": {
+                "Filter": {"title": "Filter", "type": "object", "properties": {}}
+            },
+        }
+        fn = {
+            "name": f"tool_{i:03d}",
+            "description": f"Tool number {i}.",
+            "parameters": schema,
+        }
+        tools.append({"type": "function", "function": fn})
+    return tools
+
+
+def variants(tools: list[dict], n: int) -> list[list[dict]]:
+    rng = random.Random(11)
+    return [_shuffled(rng.sample(tools, len(tools)), rng) for _ in range(n)]
+
+
+def replay(
+    sent: list[list[dict]], requests: int, stage: bool
+) -> tuple[int, int, float]:
+    rng = random.Random(13)
+    prefixes: set[str] = set()
+    saved = 0
+    seconds = 0.0
+    for _ in range(requests):
+        payload = {"model": CONFIG.model, "tools": rng.choice(sent), "messages": []}
+        if stage:
+            writer = PayloadWriter(payload)
+            start = time.perf_counter()
+            result = run_schema_stage(writer, CONFIG, Ledger())
+            seconds += time.perf_counter() - start
+            saved += result.tokens_before - result.tokens_after
+            payload = writer.payload
+        prefixes.add(json.dumps(payload["tools"], separators=(",", ":")))
+    return len(prefixes), saved, seconds
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tools", type=int, default=40)
+    parser.add_argument(
+        "--variants", type=int, default=8, help="serializations the SDK emits"
+    )
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    sent = variants(build_tools(args.tools), args.variants)
+    print(f"tools: {args.tools}  variants: {args.variants}  requests: {args.requests}")
+    print(f"{'Run':<20}  {'Prefixes':>8}  {'Tok saved':>9}  {'ms/request':>10}")
+    print(f"{'-' * 20}  {'-' * 8}  {'-' * 9}  {'-' * 10}")
+    distinct, _, _ = replay(sent, args.requests, stage=False)
+    print(f"{'as received':<20}  {distinct:>8}  {0:>9}  {'-':>10}")
+    for name, entries in (("canonical, no memo", 0), ("canonical, memo", 1024)):
+        tool_schema_cache.clear()
+        tool_schema_cache.configure(max_entries=entries)
+        distinct, saved, seconds = replay(sent, args.requests, stage=True)
+        ms = 1000 * seconds / args.requests
+        print(f"{name:<20}  {distinct:>8}  {saved:>9}  {ms:>10.3f}")
+    print(f"\ncache: {tool_schema_cache.stats()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())